@@ -0,0 +1,436 @@
+# bulk_import.py
+"""
+Streaming bulk importer for Customers, Products, historical Orders and OrderItems.
+Reads CSV or Parquet in chunks, validates each chunk with vectorized pandas checks
+(the same rules as sp_AddCustomer / sp_ProcessOrder), writes the valid rows with a
+multi-row INSERT (executemany) or LOAD DATA LOCAL INFILE, and commits every commit_rows rows.
+Rejected rows are written to a CSV report with the reason.
+
+Usage (from the App/ directory, connection settings from database.DB_CONFIG):
+    python bulk_import.py customers customers.csv --rejects customers_rejected.csv
+    python bulk_import.py orders orders.parquet
+    python bulk_import.py order_items order_items.csv --method load_data
+Import historical orders before their order items. Restart the Streamlit app afterwards (or use the
+Reports page maintenance buttons) so its query cache does not serve results from before the import.
+"""
+
+import argparse
+import csv
+import datetime
+import os
+import re
+import tempfile
+import time
+from decimal import Decimal, InvalidOperation
+
+import pandas as pd
+import pymysql
+
+# --- Import Configuration ---
+IMPORT_CONFIG = {
+    'chunk_size': 10000,        # Rows read and validated at a time (bounds memory use)
+    'commit_rows': 50000,       # Rows inserted per transaction
+    'method': 'executemany',    # 'executemany' (multi-row INSERT) or 'load_data' (LOAD DATA LOCAL INFILE)
+}
+
+# LOAD DATA LOCAL skips rows that hit these errors (as if IGNORE were given) and leaves a warning:
+# duplicate key, foreign key, CHECK constraint
+LOAD_DATA_SKIP_CODES = {1062, 1452, 3819}
+_AT_ROW_RE = re.compile(r'\bat row (\d+)')
+
+# Same pattern as sp_AddCustomer's `p_Email LIKE '_%@_%._%'`
+EMAIL_RE = re.compile(r'^.+@.+\..+$', re.DOTALL)
+
+# Columns written per entity; optional columns fall back to the table default when absent from the file
+ENTITIES = {
+    'customers': {
+        'table': 'Customers',
+        'columns': ['FirstName', 'LastName', 'Email', 'PhoneNumber', 'JoinDate', 'LoyaltyPoints'],
+    },
+    'products': {
+        'table': 'Products',
+        'columns': ['ProductName', 'Category', 'Price', 'StockQuantity'],
+    },
+    'orders': {
+        'table': 'Orders',
+        'columns': ['OrderID', 'CustomerID', 'EmployeeID', 'StoreID', 'OrderTimestamp',
+                    'TotalAmount', 'PointsEarned', 'PointsRedeemed'],
+    },
+    'order_items': {
+        'table': 'OrderItems',
+        'columns': ['OrderID', 'ProductID', 'Quantity', 'PriceAtTimeOfOrder'],
+    },
+}
+
+
+class ImportResult:
+    """Counts and throughput for one import run."""
+
+    def __init__(self, entity):
+        self.entity = entity
+        self.rows_read = 0
+        self.rows_inserted = 0
+        self.rows_rejected = 0
+        self.commits = 0
+        self.seconds = 0.0
+
+    @property
+    def rows_per_sec(self):
+        return self.rows_read / self.seconds if self.seconds else 0.0
+
+    def __repr__(self):
+        return (f"ImportResult({self.entity}: read={self.rows_read}, inserted={self.rows_inserted}, "
+                f"rejected={self.rows_rejected}, commits={self.commits}, {self.rows_per_sec:,.0f} rows/sec)")
+
+
+# --- Reading ---
+def read_chunks(path, chunk_size):
+    """Yields DataFrames of at most chunk_size rows from a CSV or Parquet file."""
+    if os.path.splitext(path)[1].lower() in ('.parquet', '.pq'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Reading Parquet files requires pyarrow (pip install pyarrow).") from e
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        # Read everything as text; validation does the type conversion and reports bad values
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False, na_values=[''])
+
+
+# --- Vectorized Column Helpers ---
+def _text(chunk, column):
+    """Stripped strings with empty values as NA."""
+    if column not in chunk:
+        return pd.Series(pd.NA, index=chunk.index, dtype='string')
+    values = chunk[column].astype('string').str.strip()
+    return values.mask(values == '')
+
+def _whole(chunk, column, default=None):
+    """(values, bad_mask) for a whole-number column; missing values become `default`."""
+    if column not in chunk:
+        return pd.Series(default, index=chunk.index, dtype=object), pd.Series(False, index=chunk.index)
+    raw = _text(chunk, column)
+    numbers = pd.to_numeric(raw, errors='coerce')
+    bad = raw.notna() & (numbers.isna() | (numbers != numbers.round()))
+    values = numbers.astype(object).where(numbers.notna(), default)
+    values = values.map(lambda v: int(v) if v is not None and not pd.isna(v) else v)
+    return values, bad
+
+def _decimal(value):
+    try:
+        number = Decimal(str(value))
+        return number if number.is_finite() else None
+    except (InvalidOperation, ValueError):
+        return None
+
+def _money(chunk, column, default=None):
+    """(Decimal values rounded to cents, bad_mask) for a money column; missing values become `default`."""
+    if column not in chunk:
+        return pd.Series(default, index=chunk.index, dtype=object), pd.Series(False, index=chunk.index)
+    raw = _text(chunk, column)
+    values = raw.map(lambda v: _decimal(v) if not pd.isna(v) else None, na_action=None)
+    bad = raw.notna() & values.isna()
+    values = values.map(lambda v: v.quantize(Decimal('0.01')) if v is not None and not pd.isna(v) else default)
+    return values.astype(object), bad
+
+def _datetime(chunk, column, default=None, date_only=False):
+    """(values, bad_mask) for a date/datetime column."""
+    if column not in chunk:
+        return pd.Series(default, index=chunk.index, dtype=object), pd.Series(False, index=chunk.index)
+    raw = _text(chunk, column)
+    parsed = pd.to_datetime(raw, errors='coerce')
+    bad = raw.notna() & parsed.isna()
+    convert = (lambda t: t.date()) if date_only else (lambda t: t.to_pydatetime())
+    values = pd.Series([default if pd.isna(t) else convert(t) for t in parsed], index=chunk.index, dtype=object)
+    return values, bad
+
+def _reject(reasons, mask, message):
+    """Records `message` for rows matching mask that don't already have an earlier reason."""
+    reasons.loc[mask.fillna(True).astype(bool) & reasons.isna()] = message
+
+def _existing(cursor, table, column, values):
+    """Values present in table.column, as a list (indexed IN lookups; sees this transaction's own rows)."""
+    values = [v for v in pd.unique(pd.Series(values, dtype=object).dropna())]
+    if not values:
+        return []
+    found = set()
+    for start in range(0, len(values), 5000):
+        batch = values[start:start + 5000]
+        placeholders = ', '.join(['%s'] * len(batch))
+        cursor.execute(f"SELECT {column} AS value FROM {table} WHERE {column} IN ({placeholders})", batch)
+        found.update(row['value'] for row in cursor.fetchall())
+    return list(found)
+
+
+# --- Validation (one function per entity; rules mirror the stored procedures) ---
+def validate_customers(chunk, cursor):
+    reasons = pd.Series(None, index=chunk.index, dtype=object)
+    first, last = _text(chunk, 'FirstName'), _text(chunk, 'LastName')
+    email, phone = _text(chunk, 'Email'), _text(chunk, 'PhoneNumber')
+    join_date, bad_date = _datetime(chunk, 'JoinDate', default=datetime.date.today(), date_only=True)
+    points, bad_points = _whole(chunk, 'LoyaltyPoints', default=0)
+
+    _reject(reasons, first.isna() | last.isna(), 'First name and last name cannot be empty.')
+    _reject(reasons, email.isna() | ~email.fillna('').str.match(EMAIL_RE).astype(bool), 'A valid email address is required.')
+    # Email/phone uniqueness is case-insensitive under the table collation
+    email_key = email.str.casefold()
+    existing_emails = {e.casefold() for e in _existing(cursor, 'Customers', 'Email', email[reasons.isna()])}
+    _reject(reasons, email_key.isin(existing_emails) | (email_key.duplicated(keep='first') & email_key.notna()),
+            'Email address already exists.')
+    phone_key = phone.str.casefold()
+    existing_phones = {p.casefold() for p in _existing(cursor, 'Customers', 'PhoneNumber', phone[reasons.isna()])}
+    _reject(reasons, phone_key.notna() & (phone_key.isin(existing_phones) | phone_key.duplicated(keep='first')),
+            'Phone number already exists.')
+    _reject(reasons, bad_date, 'Invalid JoinDate.')
+    _reject(reasons, bad_points | (points.fillna(0) < 0), 'LoyaltyPoints must be a non-negative whole number.')
+
+    rows = pd.DataFrame({'FirstName': first, 'LastName': last, 'Email': email, 'PhoneNumber': phone,
+                         'JoinDate': join_date, 'LoyaltyPoints': points})
+    return rows, reasons
+
+def validate_products(chunk, cursor):
+    reasons = pd.Series(None, index=chunk.index, dtype=object)
+    name, category = _text(chunk, 'ProductName'), _text(chunk, 'Category')
+    price, bad_price = _money(chunk, 'Price')
+    stock, bad_stock = _whole(chunk, 'StockQuantity', default=0)
+
+    _reject(reasons, name.isna(), 'Product Name is required.')
+    _reject(reasons, bad_price | price.isna() | (price.map(lambda p: p is not None and p < 0)), 'Price must be a non-negative amount.')
+    _reject(reasons, bad_stock | (stock.fillna(0) < 0), 'Stock Quantity must be a non-negative whole number.')
+
+    rows = pd.DataFrame({'ProductName': name, 'Category': category, 'Price': price, 'StockQuantity': stock})
+    return rows, reasons
+
+def validate_orders(chunk, cursor):
+    reasons = pd.Series(None, index=chunk.index, dtype=object)
+    order_id, bad_order_id = _whole(chunk, 'OrderID')
+    customer_id, bad_customer = _whole(chunk, 'CustomerID')
+    employee_id, bad_employee = _whole(chunk, 'EmployeeID')
+    store_id, bad_store = _whole(chunk, 'StoreID')
+    timestamp, bad_timestamp = _datetime(chunk, 'OrderTimestamp')
+    total, bad_total = _money(chunk, 'TotalAmount', default=Decimal('0.00'))
+    earned, bad_earned = _whole(chunk, 'PointsEarned', default=0)
+    redeemed, bad_redeemed = _whole(chunk, 'PointsRedeemed', default=0)
+
+    _reject(reasons, bad_order_id | order_id.isna() | (order_id.fillna(0) <= 0), 'OrderID must be a positive whole number.')
+    _reject(reasons, order_id.isin(_existing(cursor, 'Orders', 'OrderID', order_id[reasons.isna()]))
+            | (order_id.duplicated(keep='first') & order_id.notna()), 'OrderID already exists.')
+    _reject(reasons, bad_employee | ~employee_id.isin(_existing(cursor, 'Employees', 'EmployeeID', employee_id)),
+            'Invalid or missing EmployeeID.')
+    _reject(reasons, bad_store | ~store_id.isin(_existing(cursor, 'Stores', 'StoreID', store_id)),
+            'Invalid or missing StoreID.')
+    _reject(reasons, bad_customer | (customer_id.notna() & ~customer_id.isin(_existing(cursor, 'Customers', 'CustomerID', customer_id))),
+            'Invalid CustomerID provided.')
+    _reject(reasons, bad_timestamp | timestamp.isna(), 'Invalid or missing OrderTimestamp.')
+    _reject(reasons, bad_total | total.map(lambda t: t is None or t < 0), 'TotalAmount must be a non-negative amount.')
+    _reject(reasons, bad_earned | bad_redeemed | (earned.fillna(0) < 0) | (redeemed.fillna(0) < 0),
+            'Points must be non-negative whole numbers.')
+
+    rows = pd.DataFrame({'OrderID': order_id, 'CustomerID': customer_id, 'EmployeeID': employee_id,
+                         'StoreID': store_id, 'OrderTimestamp': timestamp, 'TotalAmount': total,
+                         'PointsEarned': earned, 'PointsRedeemed': redeemed})
+    return rows, reasons
+
+def validate_order_items(chunk, cursor):
+    reasons = pd.Series(None, index=chunk.index, dtype=object)
+    order_id, bad_order = _whole(chunk, 'OrderID')
+    product_id, bad_product = _whole(chunk, 'ProductID')
+    quantity, bad_quantity = _whole(chunk, 'Quantity')
+    price, bad_price = _money(chunk, 'PriceAtTimeOfOrder')
+
+    _reject(reasons, bad_order | ~order_id.isin(_existing(cursor, 'Orders', 'OrderID', order_id)), 'Invalid OrderID.')
+    _reject(reasons, bad_product | ~product_id.isin(_existing(cursor, 'Products', 'ProductID', product_id)),
+            'Invalid ProductID found in order items.')
+    _reject(reasons, bad_quantity | quantity.isna() | (quantity.fillna(0) <= 0), 'Quantity must be a positive whole number.')
+    _reject(reasons, bad_price | price.map(lambda p: p is None or p < 0), 'PriceAtTimeOfOrder must be a non-negative amount.')
+
+    rows = pd.DataFrame({'OrderID': order_id, 'ProductID': product_id, 'Quantity': quantity,
+                         'PriceAtTimeOfOrder': price})
+    return rows, reasons
+
+VALIDATORS = {
+    'customers': validate_customers,
+    'products': validate_products,
+    'orders': validate_orders,
+    'order_items': validate_order_items,
+}
+
+
+# --- Writing ---
+def _python_rows(rows):
+    """Row tuples with NA/NaN turned into None so the driver sends NULL."""
+    return [tuple(None if (v is None or (not isinstance(v, (str, bytes)) and pd.isna(v))) else v for v in row)
+            for row in rows.itertuples(index=False, name=None)]
+
+def insert_executemany(cursor, table, columns, rows):
+    """
+    PyMySQL rewrites a VALUES executemany into multi-row INSERT statements.
+    Returns (rows inserted, skipped rows) like insert_load_data; a failing row raises instead.
+    """
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    cursor.executemany(sql, _python_rows(rows))
+    return len(rows), []
+
+def _load_data_field(value):
+    """One LOAD DATA field: NULL bare (read as SQL NULL), anything else enclosed, so the text 'NULL' stays text."""
+    if value is None:
+        return 'NULL'
+    return '"' + str(value).replace('"', '""') + '"'
+
+def _skipped_rows(cursor, loaded, missing):
+    """
+    [(0-based row position or None, reason)] for the `missing` of `loaded` rows LOAD DATA skipped, from SHOW WARNINGS.
+    Duplicate-key and foreign-key warnings don't name their row; those rows get position None.
+    """
+    cursor.execute("SHOW WARNINGS")
+    skipped = []
+    for warning in cursor.fetchall():
+        if warning['Code'] in LOAD_DATA_SKIP_CODES:
+            row = _AT_ROW_RE.search(warning['Message'])
+            position = int(row.group(1)) - 1 if row else None
+            skipped.append((position if position is not None and 0 <= position < loaded else None, warning['Message']))
+    skipped = skipped[:missing]
+    # SHOW WARNINGS keeps at most max_error_count entries
+    skipped += [(None, 'Skipped by LOAD DATA (no server warning left to give the reason).')] * (missing - len(skipped))
+    return skipped
+
+def insert_load_data(cursor, table, columns, rows):
+    """
+    Writes the rows to a temporary CSV and loads it with LOAD DATA LOCAL INFILE.
+    With LOCAL, MySQL turns duplicate-key, foreign-key and CHECK errors into warnings and skips the
+    row, so the affected-row count is compared with len(rows) and the difference reported.
+    Returns (rows inserted, [(0-based row position or None, reason)] for the skipped rows).
+    """
+    handle = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, newline='', encoding='utf-8')
+    try:
+        with handle:
+            for row in _python_rows(rows):
+                handle.write(','.join(_load_data_field(v) for v in row) + '\n')
+        inserted = cursor.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET utf8mb4 "
+            f"FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' LINES TERMINATED BY '\\n' "
+            f"({', '.join(columns)})",
+            (handle.name,))
+    finally:
+        os.unlink(handle.name)
+    if inserted == len(rows):
+        return inserted, []
+    return inserted, _skipped_rows(cursor, len(rows), len(rows) - inserted)
+
+WRITERS = {
+    'executemany': insert_executemany,
+    'load_data': insert_load_data,
+}
+
+
+# --- Import Driver ---
+def import_file(conn, entity, path, rejects_path=None, chunk_size=None, commit_rows=None, method=None):
+    """
+    Imports `path` into the entity's table over `conn` (a PyMySQL DictCursor connection; use
+    local_infile=True for method='load_data'). Returns an ImportResult. Rejected rows, including
+    any the server skipped during LOAD DATA, are written to rejects_path as CSV
+    (Row = 1-based data row number, Reason, original columns).
+    A database error rolls back the uncommitted batch and is re-raised; earlier batches stay committed.
+    """
+    if entity not in ENTITIES:
+        raise ValueError(f"entity must be one of {sorted(ENTITIES)}")
+    chunk_size = chunk_size or IMPORT_CONFIG['chunk_size']
+    commit_rows = commit_rows or IMPORT_CONFIG['commit_rows']
+    method = method or IMPORT_CONFIG['method']
+    if method not in WRITERS:
+        raise ValueError(f"method must be one of {sorted(WRITERS)}")
+    table, all_columns = ENTITIES[entity]['table'], ENTITIES[entity]['columns']
+    validate, write = VALIDATORS[entity], WRITERS[method]
+
+    result = ImportResult(entity)
+    start = time.perf_counter()
+    rejects_file = open(rejects_path, 'w', newline='', encoding='utf-8') if rejects_path else None
+    rejects_writer = None
+    pending = 0
+
+    def report_rejects(report):
+        nonlocal rejects_writer
+        if rejects_file is None:
+            return
+        if rejects_writer is None:
+            rejects_writer = csv.writer(rejects_file)
+            rejects_writer.writerow(report.columns)
+        rejects_writer.writerows(report.itertuples(index=False, name=None))
+
+    try:
+        with conn.cursor() as cursor:
+            if entity == 'order_items':
+                cursor.execute("SET @_historical_import = 1") # Historical sales must not touch current stock
+            conn.begin()
+            for chunk in read_chunks(path, chunk_size):
+                chunk.index = pd.RangeIndex(result.rows_read + 1, result.rows_read + 1 + len(chunk))
+                result.rows_read += len(chunk)
+                rows, reasons = validate(chunk, cursor)
+
+                rejected = reasons.notna()
+                if rejected.any():
+                    result.rows_rejected += int(rejected.sum())
+                    report = chunk[rejected].copy()
+                    report.insert(0, 'Reason', reasons[rejected])
+                    report.insert(0, 'Row', report.index)
+                    report_rejects(report)
+
+                valid = rows[~rejected]
+                if valid.empty:
+                    continue
+                # Optional columns missing from the file were filled with the table defaults during validation
+                inserted, skipped = write(cursor, table, all_columns, valid[all_columns])
+                result.rows_inserted += inserted
+                result.rows_rejected += len(valid) - inserted
+                pending += inserted
+                if skipped:
+                    # Rows the server skipped (LOAD DATA); the ones its warnings can't place get an empty Row
+                    report = pd.DataFrame([chunk.loc[valid.index[pos]] if pos is not None else pd.Series(dtype=object)
+                                           for pos, _ in skipped], columns=chunk.columns).astype(object)
+                    report = report.where(report.notna(), None)
+                    report.insert(0, 'Reason', [reason for _, reason in skipped])
+                    report.insert(0, 'Row', [valid.index[pos] if pos is not None else None for pos, _ in skipped])
+                    report_rejects(report)
+                if pending >= commit_rows:
+                    conn.commit()
+                    result.commits += 1
+                    pending = 0
+                    conn.begin()
+            conn.commit()
+            if pending:
+                result.commits += 1
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if entity == 'order_items' and conn.open:
+            with conn.cursor() as cursor:
+                cursor.execute("SET @_historical_import = NULL")
+        if rejects_file is not None:
+            rejects_file.close()
+        result.seconds = time.perf_counter() - start
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('entity', choices=sorted(ENTITIES))
+    parser.add_argument('path', help="CSV or Parquet file with a header row of column names")
+    parser.add_argument('--rejects', help="Write rejected rows with reasons to this CSV")
+    parser.add_argument('--chunk-size', type=int, default=IMPORT_CONFIG['chunk_size'])
+    parser.add_argument('--commit-rows', type=int, default=IMPORT_CONFIG['commit_rows'])
+    parser.add_argument('--method', choices=sorted(WRITERS), default=IMPORT_CONFIG['method'])
+    args = parser.parse_args()
+
+    from database import DB_CONFIG # Same connection settings as the app
+    conn = pymysql.connect(**dict(DB_CONFIG, autocommit=False, local_infile=(args.method == 'load_data')))
+    try:
+        result = import_file(conn, args.entity, args.path, args.rejects, args.chunk_size, args.commit_rows, args.method)
+    finally:
+        conn.close()
+    print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# cart.py
+"""
+Cart pricing for the Create New Order tab.
+The product catalog is held once per version as a ProductID-indexed frame with prices in
+integer cents, so pricing a cart is one join plus integer arithmetic (exact, like Decimal)
+instead of a catalog scan per cart line. Stock changes with every order, so it isn't part of
+the version: each rerun attaches the current stock with with_stock.
+"""
+
+import copy
+from decimal import Decimal
+
+import pandas as pd
+
+CATALOG_COLUMNS = ['ProductName', 'Category', 'Price']
+CART_COLUMNS = ['Product', 'ID', 'Qty', 'Price', 'Subtotal']
+
+
+def to_cents(price):
+    """Exact integer cents for a DECIMAL(10,2) price (Decimal, float or str)."""
+    return int(Decimal(str(price)).scaleb(2).to_integral_value())
+
+
+def from_cents(cents):
+    """Decimal amount with two places for an integer number of cents."""
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def option_map(labels, ids):
+    """Selectbox options {label: id} from two aligned Series (ids become plain Python ints)."""
+    return dict(zip(labels.tolist(), ids.tolist()))
+
+
+class CartPricing:
+    """Result of pricing a cart: display lines, exact subtotal and any stock problems."""
+
+    def __init__(self, lines, subtotal, stock_problems, unknown_ids, items=()):
+        self.lines = lines                   # DataFrame with CART_COLUMNS
+        self.subtotal = subtotal             # Decimal
+        self.stock_problems = stock_problems # [(ProductID, ProductName, Qty, StockQuantity)]
+        self.unknown_ids = unknown_ids       # ProductIDs no longer in the catalog
+        self.items = list(items)             # [(ProductID, Category, Qty, price in cents)] for PromotionIndex.evaluate
+
+    @property
+    def ok(self):
+        return not self.stock_problems and not self.unknown_ids
+
+
+class ProductCatalog:
+    """
+    Immutable snapshot of the Products table for one catalog version.
+    Built from a (ProductID, ProductName, Category, Price) DataFrame; stock comes from with_stock
+    (or a StockQuantity column, if the frame has one). Products without a stock figure count as 0.
+    """
+
+    def __init__(self, products, version=None):
+        self.version = version
+        if products.empty:
+            products = pd.DataFrame(columns=['ProductID'] + CATALOG_COLUMNS)
+        frame = products.set_index('ProductID')[CATALOG_COLUMNS].copy()
+        frame.index = frame.index.astype('int64')
+        frame['PriceCents'] = frame['Price'].map(to_cents).astype('int64')
+        self.frame = frame
+        self.stock = (products.set_index('ProductID')['StockQuantity'] if 'StockQuantity' in products.columns
+                      else pd.Series(dtype='int64'))
+
+        # Option labels are built once per version, vectorized over the whole catalog
+        ids = frame.index.to_series()
+        labels = (frame['ProductName'].astype(str) + " (ID: " + ids.astype(str) + ") - $"
+                  + frame['PriceCents'].map(lambda c: f"{from_cents(c):.2f}"))
+        self.product_options = option_map(labels, ids)
+
+    def __len__(self):
+        return len(self.frame)
+
+    def with_stock(self, stock):
+        """
+        This catalog with `stock` ({ProductID: StockQuantity} Series) as its stock levels.
+        Shares the frame and option maps, so it costs nothing per rerun but the stock itself.
+        """
+        catalog = copy.copy(self)
+        stock = stock.copy()
+        stock.index = stock.index.astype('int64')
+        catalog.stock = stock.astype('int64')
+        return catalog
+
+    def stock_of(self, product_id):
+        return int(self.stock.get(int(product_id), 0))
+
+    def product(self, product_id):
+        """Catalog row for a ProductID, or None."""
+        try:
+            return self.frame.loc[int(product_id)]
+        except KeyError:
+            return None
+
+    def check_add(self, cart, product_id, qty):
+        """
+        Validates adding `qty` of a product to `cart` ({ProductID: qty}).
+        Returns (ok, message) with the same wording the page used before.
+        """
+        row = self.product(product_id)
+        if row is None:
+            return False, "Product data not found (should not happen)."
+        in_cart = cart.get(product_id, 0)
+        stock = self.stock_of(product_id)
+        if in_cart + qty <= stock:
+            return True, f"Added {qty} x {row['ProductName']}."
+        return False, (f"Cannot add {qty}. Only {stock} in stock (and {in_cart} already in cart). "
+                       f"Max add: {stock - in_cart}")
+
+    def price_cart(self, cart):
+        """Prices a {ProductID: qty} cart with one join against the catalog."""
+        if not cart:
+            return CartPricing(pd.DataFrame(columns=CART_COLUMNS), Decimal("0.00"), [], [])
+        cart_frame = pd.DataFrame({'Qty': list(cart.values())},
+                                  index=pd.Index([int(pid) for pid in cart.keys()], name='ProductID'))
+        lines = cart_frame.join(self.frame, how='left')
+        lines['StockQuantity'] = self.stock.reindex(lines.index).fillna(0).astype('int64')
+        known = lines['PriceCents'].notna()
+        price_cents = lines['PriceCents'].fillna(0).astype('int64')
+        subtotal_cents = lines['Qty'].astype('int64') * price_cents
+
+        short = known & (lines['Qty'] > lines['StockQuantity'])
+        stock_problems = [(int(pid), row['ProductName'], int(row['Qty']), int(row['StockQuantity']))
+                          for pid, row in lines[short].iterrows()]
+        unknown_ids = [int(pid) for pid in lines.index[~known]]
+        items = [(int(pid), category if isinstance(category, str) else None, int(qty), int(cents))
+                 for pid, category, qty, cents, is_known in zip(lines.index, lines['Category'], lines['Qty'], price_cents, known)
+                 if is_known]
+
+        # Per-line Decimals only for display (O(cart), not O(catalog))
+        unknown_names = "Unknown (ID:" + pd.Series(lines.index.astype(str), index=lines.index) + ")"
+        display = pd.DataFrame({
+            'Product': lines['ProductName'].where(known, unknown_names),
+            'ID': lines.index,
+            'Qty': lines['Qty'],
+            'Price': [from_cents(c) for c in price_cents],
+            'Subtotal': [from_cents(c) for c in subtotal_cents],
+        }).reset_index(drop=True)
+        return CartPricing(display, from_cents(subtotal_cents.sum()), stock_problems, unknown_ids, items)
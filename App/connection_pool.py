@@ -0,0 +1,209 @@
+# connection_pool.py
+"""
+Bounded, thread-safe pool of PyMySQL connections.
+Streamlit runs every session (and every rerun) in its own script thread, so the
+pool hands each caller its own connection instead of sharing one socket.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pymysql
+
+
+# MySQL errors worth retrying: the whole transaction was rolled back and can simply run again
+ER_LOCK_WAIT_TIMEOUT = 1205
+ER_LOCK_DEADLOCK = 1213
+RETRYABLE_ERROR_CODES = {ER_LOCK_WAIT_TIMEOUT, ER_LOCK_DEADLOCK}
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+def is_retryable_error(exc):
+    """True for deadlocks and lock-wait timeouts."""
+    return isinstance(exc, pymysql.MySQLError) and bool(exc.args) and exc.args[0] in RETRYABLE_ERROR_CODES
+
+
+def backoff_delay(attempt, base_delay=0.05, max_delay=1.0):
+    """Exponential backoff with full jitter for the given (1-based) retry attempt."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** (attempt - 1))))
+
+
+class ConnectionPool:
+    """
+    Keeps between min_size and max_size open connections.
+    - Checkout blocks (up to checkout_timeout seconds) when every connection is in use.
+    - Connections idle longer than health_check_interval are pinged (with reconnect) before reuse.
+    - Connections idle longer than max_idle_time are closed, down to min_size.
+    """
+
+    def __init__(self, connect_kwargs, min_size=1, max_size=10, checkout_timeout=10.0,
+                 max_idle_time=300.0, health_check_interval=30.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1.")
+        self._connect_kwargs = dict(connect_kwargs)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.max_idle_time = max_idle_time
+        self.health_check_interval = health_check_interval
+
+        self._lock = threading.Condition()
+        self._idle = deque()  # (connection, last_returned_monotonic) pairs, most recent on the right
+        self._in_use = 0
+        self._closed = False
+        self._metrics = {
+            'checkouts': 0,
+            'timeouts': 0,
+            'created': 0,
+            'closed': 0,
+            'evicted_idle': 0,
+            'health_check_failures': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+        }
+
+        # Open the minimum number of connections up front
+        for _ in range(self.min_size):
+            self._idle.append((self._create(), time.monotonic()))
+
+    # --- Internal helpers ---
+    def _create(self):
+        conn = pymysql.connect(**self._connect_kwargs)
+        with self._lock:  # Re-entrant, so this is safe whether or not the caller holds it
+            self._metrics['created'] += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass  # Already closed or broken socket; nothing else to release
+        self._metrics['closed'] += 1
+
+    def _size(self):
+        return len(self._idle) + self._in_use
+
+    def _evict_idle(self, now):
+        """Closes connections idle longer than max_idle_time, oldest first, keeping min_size open."""
+        while self._idle and self._size() > self.min_size:
+            conn, last_used = self._idle[0]
+            if now - last_used < self.max_idle_time:
+                break
+            self._idle.popleft()
+            self._discard(conn)
+            self._metrics['evicted_idle'] += 1
+
+    def _record_checkout(self, start):
+        waited = time.monotonic() - start
+        self._metrics['checkouts'] += 1
+        self._metrics['wait_time_total'] += waited
+        self._metrics['wait_time_max'] = max(self._metrics['wait_time_max'], waited)
+
+    def _is_healthy(self, conn, idle_for):
+        """Pings connections that sat idle long enough to have been dropped by the server."""
+        if not conn.open:
+            return False
+        if idle_for < self.health_check_interval:
+            return True
+        try:
+            conn.ping(reconnect=True)
+            return True
+        except Exception:
+            self._metrics['health_check_failures'] += 1
+            return False
+
+    # --- Public API ---
+    def acquire(self):
+        """Checks out a connection, waiting up to checkout_timeout seconds for one to free up."""
+        start = time.monotonic()
+        deadline = start + self.checkout_timeout
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise PoolTimeoutError("Connection pool is closed.")
+                now = time.monotonic()
+                self._evict_idle(now)
+
+                if self._idle:
+                    conn, last_used = self._idle.pop()  # Most recently used connection is the warmest
+                    if not self._is_healthy(conn, now - last_used):
+                        self._discard(conn)
+                        continue
+                    self._in_use += 1
+                    self._record_checkout(start)
+                    return conn
+
+                if self._size() < self.max_size:
+                    # Reserve the slot, then connect outside the lock so other threads are not blocked
+                    self._in_use += 1
+                    break
+
+                remaining = deadline - now
+                if remaining <= 0:
+                    self._metrics['timeouts'] += 1
+                    raise PoolTimeoutError(
+                        f"Timed out after {self.checkout_timeout:.1f}s waiting for a database connection "
+                        f"({self._in_use}/{self.max_size} in use)."
+                    )
+                self._lock.wait(remaining)
+
+        try:
+            conn = self._create()
+        except Exception:
+            with self._lock:
+                self._in_use -= 1
+                self._lock.notify()
+            raise
+        with self._lock:
+            self._record_checkout(start)
+        return conn
+
+    def release(self, conn):
+        """Returns a connection to the pool. Broken connections are closed instead of reused."""
+        with self._lock:
+            self._in_use -= 1
+            if self._closed or not conn.open:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+                self._evict_idle(time.monotonic())
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks out a connection and always returns it."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def stats(self):
+        """Snapshot of pool occupancy and checkout metrics."""
+        with self._lock:
+            snapshot = dict(self._metrics)
+            snapshot.update({
+                'size': self._size(),
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+            })
+            checkouts = snapshot['checkouts']
+            snapshot['wait_time_avg'] = snapshot['wait_time_total'] / checkouts if checkouts else 0.0
+            return snapshot
+
+    def close(self):
+        """Closes idle connections; checked-out connections are closed when released."""
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.popleft()
+                self._discard(conn)
+            self._lock.notify_all()
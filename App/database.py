@@ -7,6 +7,25 @@ Uses PyMySQL to connect to the MySQL database.
 import streamlit as st
 import pymysql
 import pandas as pd
+import datetime
+import json
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from contextlib import contextmanager
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from connection_pool import ConnectionPool, PoolTimeoutError, is_retryable_error, backoff_delay
+from query_cache import QueryCache, tables_written
+from prepared_statements import StatementRegistry
+from cart import ProductCatalog
+from promotion_engine import PromotionIndex
+from reference_data import ReferenceSnapshot, REFERENCE_TABLES
+from streaming import QueryStream, WRITERS as EXPORT_WRITERS
+from query_log import QueryLog, calling_page, attributed_to
+from page_profiler import profile_span
 
 # --- Database Configuration ---
 # Store database credentials securely (consider environment variables for production)
@@ -16,16 +35,85 @@ DB_CONFIG = {
     'user': "root",           # Local MySQL username if not root
     'password': "password", # password
     'database': "coffee_shop",
-    'cursorclass': pymysql.cursors.DictCursor # Fetch results as dictionaries
+    'cursorclass': pymysql.cursors.DictCursor, # Fetch results as dictionaries
+    'autocommit': True # Reads never hold a stale snapshot; run_command opens its own transaction
 }
 
-# --- Connection Function ---
-@st.cache_resource(show_spinner="Connecting to database...") # Cache the connection
-def get_connection():
-    """Establishes and returns a database connection."""
+# --- Connection Pool Configuration ---
+# Each Streamlit session/rerun borrows its own connection, so size max_size to the number of tills
+POOL_CONFIG = {
+    'min_size': 2,                # Connections opened at startup and kept warm
+    'max_size': 10,               # Hard cap on concurrent MySQL connections from this app
+    'checkout_timeout': 10.0,     # Seconds to wait for a free connection before giving up
+    'max_idle_time': 300.0,       # Seconds before an idle connection above min_size is closed
+    'health_check_interval': 30.0 # Idle seconds after which a connection is pinged before reuse
+}
+
+# --- Query Result Cache Configuration ---
+QUERY_CACHE_CONFIG = {
+    'max_entries': 256,              # Most distinct (sql, params) results kept
+    'max_bytes': 64 * 1024 * 1024    # Approximate memory cap for cached DataFrames
+}
+
+# --- Deadlock / Lock-Wait Retry Configuration (used for order processing) ---
+RETRY_CONFIG = {
+    'max_attempts': 5,   # Total tries, including the first
+    'base_delay': 0.05,  # Seconds; doubled on every retry, with jitter
+    'max_delay': 1.0     # Upper bound for a single backoff sleep
+}
+
+# --- Typeahead Search Configuration ---
+SEARCH_CONFIG = {
+    'limit': 20,        # Top-K matches returned to a picker
+    'substring': True   # Also match inside words via the ngram FULLTEXT indexes (migration V003)
+}
+
+# --- Export Configuration ---
+EXPORT_CONFIG = {
+    'directory': os.path.join(tempfile.gettempdir(), 'coffee_shop_exports'), # Where export files are written
+    'download_max_bytes': 50 * 1024 * 1024  # Larger files are left on disk instead of offered as a download
+}
+
+# --- Query Instrumentation Configuration ---
+QUERY_LOG_CONFIG = {
+    'enabled': True,                                  # Record every DB call (see the Query Insights page)
+    'capacity': 5000,                                 # Most recent calls kept in memory (ring buffer)
+    'jsonl_path': os.environ.get('COFFEE_QUERY_LOG')  # Also append each call to this JSON-lines file (None = off)
+}
+
+# --- Concurrent Query Configuration ---
+# Every worker holds its own pooled connection while it runs, so keep this below POOL_CONFIG['max_size']
+CONCURRENCY_CONFIG = {
+    'max_workers': 4  # Threads shared by all sessions for run_queries_concurrently (1 = run sequentially)
+}
+
+# --- Order Archive Configuration ---
+ARCHIVE_CONFIG = {
+    'keep_months': 3  # Closed months kept in Orders/OrderItems before archive_orders moves them (current month always stays)
+}
+
+# --- Prepared Statement Configuration ---
+# Registered hot statements are parsed once per pooled connection and then EXECUTEd (see prepared_statements.py)
+PREPARED_STATEMENTS_CONFIG = {
+    'enabled': os.environ.get('COFFEE_PREPARED_STATEMENTS') == '1', # Off = every statement is sent as text
+    'max_statements': 512,     # Distinct SQL texts the registry accepts (builders register each variant)
+    'max_per_connection': 64   # Prepared handles kept per connection, least recently used deallocated first
+}
+
+# --- Reorder Forecast Configuration ---
+REORDER_CONFIG = {
+    'windows': (7, 28),       # Rolling windows (days) for sales velocity; the fastest one is used
+    'lead_time_days': 7,      # Products with less cover than this need reordering now
+    'target_cover_days': 28,  # Suggested reorder quantity tops stock up to this many days of sales
+    'report_rows': 25         # Rows shown on the Reports page (exports include every product)
+}
+
+# --- Connection Functions ---
+@st.cache_resource(show_spinner="Connecting to database...") # One pool shared by all sessions
+def get_pool():
+    """Creates the process-wide connection pool."""
     try:
-        conn = pymysql.connect(**DB_CONFIG)
-        return conn
+        return ConnectionPool(DB_CONFIG, **POOL_CONFIG)
     except pymysql.MySQLError as e:
         st.error(f"Error connecting to MySQL database: {e}")
         st.stop() # Stop the app if DB connection fails
@@ -34,73 +122,227 @@ def get_connection():
         st.stop()
 
 
+@contextmanager
+def get_connection():
+    """Borrows a connection from the pool and returns it when the block exits."""
+    pool = get_pool()
+    try:
+        conn = pool.acquire()
+    except PoolTimeoutError as e:
+        st.error(f"Database is busy, please try again: {e}")
+        st.stop()
+    except pymysql.MySQLError as e:
+        st.error(f"Error connecting to MySQL database: {e}")
+        st.stop()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+
+@st.cache_resource
+def get_query_cache():
+    """Creates the process-wide query result cache."""
+    return QueryCache(**QUERY_CACHE_CONFIG)
+
+
+@st.cache_resource
+def get_query_log():
+    """Creates the process-wide query instrumentation buffer."""
+    return QueryLog(QUERY_LOG_CONFIG['capacity'], QUERY_LOG_CONFIG['jsonl_path'])
+
+
+def _log_call(kind, sql, params, started, rows=None, nbytes=None, cached=False, error=None):
+    """Records one DB call (wall time since `started`) in the query log."""
+    if QUERY_LOG_CONFIG['enabled']:
+        get_query_log().record(kind, sql, params, time.perf_counter() - started, rows, nbytes, cached, error)
+
+
+@st.cache_resource
+def get_query_executor():
+    """Creates the process-wide thread pool behind run_queries_concurrently."""
+    return ThreadPoolExecutor(max_workers=CONCURRENCY_CONFIG['max_workers'], thread_name_prefix="coffee_query")
+
+
+def get_pool_stats():
+    """Returns occupancy and checkout-timeout metrics for the connection pool."""
+    return get_pool().stats()
+
+
+# --- Prepared Statements ---
+@st.cache_resource
+def get_statement_registry():
+    """Creates the process-wide registry of statements run through prepared handles."""
+    return StatementRegistry(PREPARED_STATEMENTS_CONFIG['max_statements'], PREPARED_STATEMENTS_CONFIG['max_per_connection'])
+
+def register_statement(name, sql):
+    """Names a hot statement so run_query/run_command prepare it (when enabled); returns `sql` unchanged."""
+    return get_statement_registry().register(name, sql)
+
+_statement_capture = None # {sql: params of its first run} while capture_statements() is active
+
+@contextmanager
+def capture_statements():
+    """
+    Records every statement executed inside the block with the parameters of its first run, so tools
+    can analyse the SQL the pages build at runtime (Benchmarks/index_advisor.py). Yields a dict that
+    is filled with {sql: (registered name or None, params)} when the block exits. Cache hits don't
+    execute anything; capture in a fresh process.
+    """
+    global _statement_capture
+    runs = _statement_capture = {}
+    captured = {}
+    try:
+        yield captured
+    finally:
+        _statement_capture = None
+        registry = get_statement_registry()
+        captured.update({sql: (registry.name_of(sql), params) for sql, params in runs.items()})
+
+def _execute(cursor, sql, params=None):
+    """cursor.execute, through the statement's prepared handle when it is registered and the mode is on."""
+    if _statement_capture is not None:
+        _statement_capture.setdefault(sql, params)
+    if not (PREPARED_STATEMENTS_CONFIG['enabled'] and get_statement_registry().execute(cursor, sql, params)):
+        cursor.execute(sql, params)
+
+
 # --- Query Function ---
-# @st.cache_data(ttl=60, show_spinner="Running query...") # Optional: Cache query results
-def run_query(query, params=None):
+def run_query(query, params=None, use_cache=True):
     """
     Executes a SELECT query and returns the results as a Pandas DataFrame.
+    Results are cached per (query, params) until a command writes one of the tables the query reads.
     Handles potential database errors.
     """
-    conn = get_connection()
+    started = time.perf_counter()
+    cache = get_query_cache()
+    key, tables = cache.make_key(query, params) if use_cache else (None, None)
+    if key is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            _log_call('query', query, params, started, rows=len(cached), cached=True)
+            with profile_span('dataframe'):
+                return cached.copy() # Callers may modify the frame; keep the cached one intact
+        generation = cache.generation(tables)
+
     try:
-        # Use context manager for cursor safety
-        with conn.cursor() as cursor:
-            cursor.execute(query, params)
+        # Use context managers so the cursor is closed and the connection goes back to the pool
+        with profile_span('db'), get_connection() as conn, conn.cursor() as cursor:
+            _execute(cursor, query, params)
             results = cursor.fetchall()
+            column_names = [desc[0] for desc in cursor.description] if cursor.description else []
+        with profile_span('dataframe'):
             if results:
-                column_names = [desc[0] for desc in cursor.description]
                 df = pd.DataFrame(results, columns=column_names)
             else:
                 # Return empty DataFrame with columns if no results
-                column_names = [desc[0] for desc in cursor.description] if cursor.description else []
                 df = pd.DataFrame(columns=column_names)
-            return df
+        if key is not None:
+            # Deep size (walks every string) only for what the cache budget has to account for
+            cache.put(key, tables, df.copy(), int(df.memory_usage(deep=True).sum()), generation)
+        # The log only needs an approximate size; the shallow one is O(columns)
+        nbytes = int(df.memory_usage().sum()) if QUERY_LOG_CONFIG['enabled'] else None
+        _log_call('query', query, params, started, rows=len(df), nbytes=nbytes)
+        return df
     except pymysql.MySQLError as e:
+        _log_call('query', query, params, started, error=str(e))
         st.error(f"Database Query Error: {e}")
     except Exception as ex:
+        _log_call('query', query, params, started, error=str(ex))
         st.error(f"An error occurred during query execution: {ex}")
-    return pd.DataFrame() # Return empty DataFrame on error
+    return pd.DataFrame() # Return empty DataFrame on error (never cached)
 
 
-# --- Command Function ---
-def run_command(sql, params=None, fetch_output=False):
+def run_queries_concurrently(queries, use_cache=True):
     """
-    Executes a database command (INSERT, UPDATE, DELETE, CALL).
-    Handles transactions and potential errors.
-    Can optionally fetch output parameters from stored procedures.
-    Returns success status (True/False) and optionally fetched output.
+    Runs independent SELECT queries in parallel, each on its own pooled connection.
+    `queries` maps a name to a SQL string, a (sql, params) pair or a (sql, params, use_cache)
+    triple (overrides `use_cache` for that query); returns {name: DataFrame}
+    with the same results (and error handling) as run_query, so the caller waits for the
+    slowest query instead of the sum of all of them.
+    """
+    queries = {name: (q, None, use_cache) if isinstance(q, str) else (tuple(q) + (use_cache,))[:3]
+               for name, q in queries.items()}
+    if len(queries) <= 1 or CONCURRENCY_CONFIG['max_workers'] <= 1:
+        return {name: run_query(sql, params, cached) for name, (sql, params, cached) in queries.items()}
+
+    # Workers report errors to this page and log their calls against this rerun
+    ctx = get_script_run_ctx()
+    page, rerun = calling_page(get_query_log().app_dir)
+
+    def run_one(sql, params, cached):
+        add_script_run_ctx(None, ctx)
+        with attributed_to(page, rerun):
+            return run_query(sql, params, cached)
+
+    with profile_span('db'): # Workers aren't profiled; the fan-out's wall time counts as DB time
+        futures = {name: get_query_executor().submit(run_one, *query) for name, query in queries.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+# --- Command Functions ---
+def _execute_command(sql, params=None, fetch_output=False):
+    """
+    Runs one command in its own transaction on a pooled connection.
+    Returns the fetched output parameter (or None) and raises on failure after rolling back.
     """
-    conn = get_connection()
     output = None
-    success = False
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute(sql, params)
+    started = time.perf_counter()
+    affected, error = None, None
+    with get_connection() as conn:
+        try:
+            conn.begin() # Explicit transaction; the pool hands out autocommit connections
+            with conn.cursor() as cursor:
+                _execute(cursor, sql, params)
+                affected = cursor.rowcount
 
-            # Fetch output parameters if requested (specific to CALL statements)
-            if fetch_output and sql.strip().upper().startswith("CALL"):
-                 # Assumes output params are selected by the procedure after the call
-                 cursor.execute("SELECT @_proc_output AS output_param;") # Example convention
-                 output_result = cursor.fetchone()
-                 if output_result:
-                     output = output_result.get('output_param') # Assumes DictCursor
+                # Fetch output parameters if requested (specific to CALL statements)
+                if fetch_output and sql.strip().upper().startswith("CALL"):
+                     # Assumes the OUT parameter is bound to @_proc_output in the CALL
+                     cursor.execute("SELECT @_proc_output AS output_param;") # Same connection, same session
+                     output_result = cursor.fetchone()
+                     if output_result:
+                         output = output_result.get('output_param') # Assumes DictCursor
 
             conn.commit() # Commit changes
-            success = True
-            st.toast("Command executed successfully!", icon="✔️")
-            # Clear relevant caches if modifications were made
-            # st.cache_data.clear() 
-    except pymysql.MySQLError as e:
-        conn.rollback() # Rollback changes on error
-        st.error(f"Database Command Error: {e}")
-    except Exception as ex:
-        conn.rollback()
-        st.error(f"An error occurred during command execution: {ex}")
-    finally:
-        # Note: The connection is cached and shouldn't be closed here
-        pass
+            return output
+        except Exception as e:
+            error = str(e)
+            try:
+                conn.rollback() # Rollback changes on error
+            except pymysql.MySQLError:
+                pass # Connection is broken; the pool discards it on release
+            raise
+        finally:
+            # Drop cached results for every table the statement may have touched (all of them if unsure).
+            # Also done on failure: a procedure may have committed part of its work before raising.
+            get_query_cache().invalidate(tables_written(sql))
+            _log_call('command', sql, params, started, rows=affected, error=error)
 
-    return success, output
+
+def run_command(sql, params=None, fetch_output=False, retry_on_deadlock=False):
+    """
+    Executes a database command (INSERT, UPDATE, DELETE, CALL).
+    Handles transactions and potential errors.
+    Can optionally fetch output parameters from stored procedures.
+    With retry_on_deadlock, deadlocks and lock-wait timeouts are retried with exponential backoff.
+    Returns success status (True/False) and optionally fetched output.
+    """
+    max_attempts = RETRY_CONFIG['max_attempts'] if retry_on_deadlock else 1
+    for attempt in range(1, max_attempts + 1):
+        try:
+            with profile_span('db'):
+                output = _execute_command(sql, params, fetch_output)
+            st.toast("Command executed successfully!", icon="✔️")
+            return True, output
+        except pymysql.MySQLError as e:
+            if attempt < max_attempts and is_retryable_error(e):
+                time.sleep(backoff_delay(attempt, RETRY_CONFIG['base_delay'], RETRY_CONFIG['max_delay']))
+                continue
+            st.error(f"Database Command Error: {e}")
+        except Exception as ex:
+            st.error(f"An error occurred during command execution: {ex}")
+        return False, None
 
 
 # --- Stored Procedure Call Functions  ---
@@ -113,14 +355,572 @@ def call_sp_add_customer(first_name, last_name, email, phone):
 
 def call_sp_process_order(customer_id, employee_id, store_id, items_string, points_redeemed):
     """Calls the sp_ProcessOrder stored procedure."""
-    # Convention: Procedure sets session variable @_proc_output with the new OrderID
-    sql = "CALL sp_ProcessOrder(%s, %s, %s, %s, %s, @new_ord_id);"
+    # Convention: the OUT parameter is bound to @_proc_output and read back on the same pooled connection
+    sql = "CALL sp_ProcessOrder(%s, %s, %s, %s, %s, @_proc_output);"
     params = (customer_id, employee_id, store_id, items_string, points_redeemed)
-    
-    success, _ = run_command(sql, params)
-    new_order_id = None
-    if success:
-         df_new_id = run_query("SELECT @new_ord_id AS NewOrderID;")
-         if not df_new_id.empty:
-              new_order_id = df_new_id.iloc[0]['NewOrderID']
-    return success, new_order_id
\ No newline at end of file
+
+    success, new_order_id = run_command(sql, params, fetch_output=True, retry_on_deadlock=True)
+    return success, new_order_id
+
+def order_items_to_json(order_items):
+    """Converts a {ProductID: Quantity} mapping into the JSON array expected by sp_ProcessOrderSet."""
+    return json.dumps([{"ProductID": int(pid), "Quantity": int(qty)} for pid, qty in order_items.items()])
+
+def call_sp_process_order_set(customer_id, employee_id, store_id, order_items, points_redeemed):
+    """Calls the set-based sp_ProcessOrderSet procedure with a {ProductID: Quantity} mapping."""
+    sql = "CALL sp_ProcessOrderSet(%s, %s, %s, %s, %s, @_proc_output);"
+    params = (customer_id, employee_id, store_id, order_items_to_json(order_items), points_redeemed)
+
+    success, new_order_id = run_command(sql, params, fetch_output=True, retry_on_deadlock=True)
+    return success, new_order_id
+
+def checkout_order(customer_id, employee_id, store_id, order_items, points_redeemed, promotion_ids=None):
+    """
+    Places an order and applies the selected promotions in a single transaction (sp_CheckoutOrder).
+    Returns (success, summary) where summary holds OrderID, SubTotal, PointsDiscount, PromotionDiscount,
+    TotalAmount, PointsEarned, RewardPoints and the list of AppliedPromotions (amounts as Decimal).
+    """
+    sql = "CALL sp_CheckoutOrder(%s, %s, %s, %s, %s, %s, @_proc_output);"
+    promotions_json = json.dumps([int(pid) for pid in promotion_ids]) if promotion_ids else None
+    params = (customer_id, employee_id, store_id, order_items_to_json(order_items), points_redeemed, promotions_json)
+
+    success, summary_json = run_command(sql, params, fetch_output=True, retry_on_deadlock=True)
+    summary = json.loads(summary_json, parse_float=Decimal) if success and summary_json else None
+    return success, summary
+
+
+# --- Sales Summary Maintenance ---
+def rebuild_sales_summaries():
+    """Rebuilds ProductSalesSummary and CustomerOrderSummary from the base tables."""
+    success, _ = run_command("CALL sp_RebuildSalesSummaries();")
+    return success
+
+def check_sales_summaries():
+    """Returns the summary rows that disagree with the views (empty DataFrame = consistent)."""
+    return run_query("CALL sp_CheckSalesSummaries();", use_cache=False)
+
+
+# --- Loyalty Ledger (write-behind points) ---
+# The event scheduler compacts the ledger outside the app, so these reads bypass the result cache
+def get_loyalty_ledger_status():
+    """{'LedgerMode': bool, 'PendingEntries': int, 'PendingCustomers': int, 'OldestEntry': datetime or None}."""
+    df = run_query("""
+        SELECT
+            (SELECT LedgerMode FROM LoyaltySettings WHERE SettingID = 1) AS LedgerMode,
+            COUNT(*) AS PendingEntries,
+            COUNT(DISTINCT CustomerID) AS PendingCustomers,
+            MIN(CreatedAt) AS OldestEntry
+        FROM LoyaltyLedger;
+    """, use_cache=False)
+    if df.empty:
+        return {'LedgerMode': False, 'PendingEntries': 0, 'PendingCustomers': 0, 'OldestEntry': None}
+    row = df.iloc[0]
+    return {'LedgerMode': bool(row['LedgerMode']), 'PendingEntries': int(row['PendingEntries']),
+            'PendingCustomers': int(row['PendingCustomers']),
+            'OldestEntry': row['OldestEntry'] if pd.notna(row['OldestEntry']) else None}
+
+def loyalty_ledger_mode():
+    """
+    True when checkout posts to LoyaltyLedger. Cached: set_loyalty_ledger_mode writes
+    LoyaltySettings through run_command, which invalidates it.
+    """
+    df = run_query(register_statement('loyalty.ledger_mode', "SELECT LedgerMode FROM LoyaltySettings WHERE SettingID = 1;"))
+    return not df.empty and bool(df.iloc[0]['LedgerMode'])
+
+def set_loyalty_ledger_mode(enabled):
+    """
+    Switches checkout between appending point deltas to LoyaltyLedger (True) and updating
+    Customers.LoyaltyPoints directly (False). Turning the ledger off also compacts it.
+    """
+    success, _ = run_command("UPDATE LoyaltySettings SET LedgerMode = %s WHERE SettingID = 1;", (bool(enabled),))
+    if success and not enabled:
+        success, _ = compact_loyalty_ledger()
+    return success
+
+def compact_loyalty_ledger():
+    """
+    Folds pending ledger deltas into Customers.LoyaltyPoints and CustomerOrderSummary.
+    Returns (success, entries_compacted).
+    """
+    success, entries = run_command("CALL sp_CompactLoyaltyLedger(@_proc_output);", fetch_output=True, retry_on_deadlock=True)
+    return success, int(entries or 0)
+
+def get_loyalty_balances(customer_ids):
+    """{CustomerID: points} including pending ledger deltas (fn_GetCustomerLoyaltyPoints), in one query."""
+    customer_ids = [int(customer_id) for customer_id in customer_ids]
+    if not customer_ids:
+        return {}
+    placeholders = ', '.join(['%s'] * len(customer_ids))
+    query = register_statement('orders.loyalty_balances',
+                               f"SELECT CustomerID, fn_GetCustomerLoyaltyPoints(CustomerID) AS Points FROM Customers WHERE CustomerID IN ({placeholders});")
+    df = run_query(query, params=tuple(customer_ids), use_cache=False)
+    if df.empty:
+        return {}
+    return dict(zip(df['CustomerID'].astype(int), df['Points'].astype(int)))
+
+
+# --- Sales Rollup Reports ---
+ROLLUP_GRAINS = {
+    'day': '%Y-%m-%d',
+    'month': '%Y-%m',
+    'year': '%Y',
+}
+
+def sales_rollup_query(grain='month', start_date=None, end_date=None, store_id=None):
+    """(sql, params) behind get_sales_rollup; also used to export the report."""
+    if grain not in ROLLUP_GRAINS:
+        raise ValueError(f"grain must be one of {sorted(ROLLUP_GRAINS)}")
+    conditions = ["1 = 1"]
+    params = [ROLLUP_GRAINS[grain]]
+    if start_date is not None:
+        conditions.append("SaleDate >= %s")
+        params.append(start_date)
+    if end_date is not None:
+        conditions.append("SaleDate <= %s")
+        params.append(end_date)
+    if store_id is not None:
+        conditions.append("StoreID = %s")
+        params.append(store_id)
+    query = f"""
+        SELECT
+            DATE_FORMAT(SaleDate, %s) AS Period,
+            SUM(OrderCount) AS NumberOfOrders,
+            SUM(Revenue) AS Revenue,
+            SUM(PointsEarned) AS PointsEarned,
+            SUM(PointsRedeemed) AS PointsRedeemed
+        FROM DailyStoreSales
+        WHERE {' AND '.join(conditions)}
+        GROUP BY Period
+        HAVING SUM(OrderCount) > 0
+        ORDER BY Period DESC;
+    """
+    return register_statement('reports.sales_rollup', query), tuple(params)
+
+def get_sales_rollup(grain='month', start_date=None, end_date=None, store_id=None):
+    """
+    Sales per day/month/year from the DailyStoreSales rollup (never touches raw Orders).
+    Optional inclusive date range and store filter. Columns: Period, NumberOfOrders, Revenue,
+    PointsEarned, PointsRedeemed; newest period first.
+    """
+    query, params = sales_rollup_query(grain, start_date, end_date, store_id)
+    return run_query(query, params=params)
+
+def refresh_sales_rollup(start_date=None, end_date=None):
+    """Recomputes DailyStoreSales for an inclusive date range (None = unbounded) from Orders."""
+    success, _ = run_command("CALL sp_RefreshDailySales(%s, %s);", (start_date, end_date))
+    return success
+
+
+# --- Reorder Forecast (sales velocity, migration V008) ---
+def reorder_report_query(store_id=None, as_of=None, limit=None):
+    """
+    (sql, params) behind get_reorder_report; also used to export the report.
+    Velocity for each window in REORDER_CONFIG is units sold per day over the complete days before
+    `as_of` (default today), read from DailyProductSales. With a store, velocity is that store's
+    sales only; stock is always the chain-wide StockQuantity.
+    """
+    as_of = as_of or datetime.date.today()
+    windows = sorted(REORDER_CONFIG['windows'])
+    units = [f"SUM(CASE WHEN SaleDate >= %s THEN UnitsSold ELSE 0 END) AS Units{days}d" for days in windows]
+    rates = [f"SUM(CASE WHEN SaleDate >= %s THEN UnitsSold ELSE 0 END) / {days}" for days in windows]
+    rate = f"GREATEST({', '.join(rates)})" if len(rates) > 1 else rates[0]
+    # Placeholders in order: target cover, window starts (units, then rates), date range, store, limit
+    params = [REORDER_CONFIG['target_cover_days']] + [as_of - datetime.timedelta(days=days) for days in windows] * 2
+    conditions = ["SaleDate >= %s", "SaleDate < %s"]
+    params += [as_of - datetime.timedelta(days=windows[-1]), as_of]
+    if store_id is not None:
+        conditions.append("StoreID = %s")
+        params.append(store_id)
+    sep = ",\n                   "
+    unit_columns = ''.join(f"COALESCE(v.Units{days}d, 0) AS Units{days}d, " for days in windows)
+    query = f"""
+        SELECT
+            p.ProductID, p.ProductName, p.Category, p.StockQuantity, {unit_columns}
+            ROUND(COALESCE(v.DailyRate, 0), 2) AS DailyRate,
+            CASE WHEN p.StockQuantity <= 0 THEN 0
+                 WHEN v.DailyRate > 0 THEN ROUND(p.StockQuantity / v.DailyRate, 1) END AS DaysOfCover,
+            GREATEST(CEIL(COALESCE(v.DailyRate, 0) * %s) - p.StockQuantity, 0) AS ReorderQuantity
+        FROM Products p
+        LEFT JOIN (
+            SELECT ProductID,
+                   {sep.join(units)},
+                   {rate} AS DailyRate
+            FROM DailyProductSales
+            WHERE {' AND '.join(conditions)}
+            GROUP BY ProductID
+        ) AS v ON v.ProductID = p.ProductID
+        ORDER BY DaysOfCover IS NULL, DaysOfCover, p.StockQuantity, p.ProductName
+        {'LIMIT %s' if limit is not None else ''};
+    """
+    if limit is not None:
+        params.append(int(limit))
+    return register_statement('reports.reorder', query), tuple(params)
+
+def get_reorder_report(store_id=None, as_of=None, limit=None):
+    """
+    Products ranked by days of cover (stock / daily sales velocity), fewest first; products that
+    haven't sold in the longest window come last. Columns: ProductID, ProductName, Category,
+    StockQuantity, Units<N>d per window, DailyRate, DaysOfCover, ReorderQuantity.
+    """
+    query, params = reorder_report_query(store_id, as_of, limit)
+    return run_query(query, params=params)
+
+def refresh_product_sales(start_date=None, end_date=None):
+    """Recomputes DailyProductSales for an inclusive date range (None = unbounded) from the full history."""
+    success, _ = run_command("CALL sp_RefreshProductSales(%s, %s);", (start_date, end_date))
+    return success
+
+
+# --- Order History (Keyset Pagination) ---
+ORDER_HISTORY_PAGE_SIZE = 50
+
+def order_history_query(before=None, limit=None, store_id=None, employee_id=None, customer_id=None,
+                        start_date=None, end_date=None, archived_before=None):
+    """
+    (sql, params) for order history newest first, optionally after a keyset cursor and/or limited.
+    Shared by get_order_history_page and export_order_history.
+    `archived_before` is the order archive boundary (get_order_archive_boundary); OrdersArchive is
+    only read when the date range reaches below it, and then each table is read as its own
+    index range and the two are merged.
+    """
+    conditions = ["o.OrderTimestamp IS NOT NULL"]
+    params = []
+    if before is not None:
+        before_ts, before_id = before
+        # Expanded form of (OrderTimestamp, OrderID) < (ts, id) - the range optimizer handles this shape
+        conditions.append("(o.OrderTimestamp < %s OR (o.OrderTimestamp = %s AND o.OrderID < %s))")
+        params.extend([before_ts, before_ts, before_id])
+    if store_id is not None:
+        conditions.append("o.StoreID = %s")
+        params.append(store_id)
+    if employee_id is not None:
+        conditions.append("o.EmployeeID = %s")
+        params.append(employee_id)
+    if customer_id is not None:
+        conditions.append("o.CustomerID = %s")
+        params.append(customer_id)
+    if start_date is not None:
+        conditions.append("o.OrderTimestamp >= %s")
+        params.append(start_date)
+    if end_date is not None:
+        conditions.append("o.OrderTimestamp < %s + INTERVAL 1 DAY") # Half-open so the index range is exact
+        params.append(end_date)
+    limit_sql = "LIMIT %s" if limit is not None else ""
+
+    def branch(orders_table):
+        return f"""
+            SELECT
+                o.OrderID, o.OrderTimestamp,
+                CONCAT(c.FirstName, ' ', c.LastName) AS CustomerName, c.CustomerID,
+                CONCAT(e.FirstName, ' ', e.LastName) AS EmployeeName,
+                s.StoreName,
+                o.TotalAmount, o.PointsEarned, o.PointsRedeemed
+            FROM {orders_table} o
+            LEFT JOIN Customers c ON o.CustomerID = c.CustomerID
+            JOIN Employees e ON o.EmployeeID = e.EmployeeID
+            JOIN Stores s ON o.StoreID = s.StoreID
+            WHERE {' AND '.join(conditions)}
+            ORDER BY o.OrderTimestamp DESC, o.OrderID DESC
+            {limit_sql}
+        """
+
+    limit_params = [limit] if limit is not None else []
+    if archived_before is None or (start_date is not None and start_date >= archived_before):
+        return register_statement('orders.history_page', branch("Orders") + ";"), tuple(params + limit_params)
+    # Orders imported after an archive run may predate the boundary, so the hot table is always read
+    query = f"""
+        SELECT * FROM (
+            ({branch("Orders")})
+            UNION ALL
+            ({branch("OrdersArchive")})
+        ) AS history
+        ORDER BY OrderTimestamp DESC, OrderID DESC
+        {limit_sql};
+    """
+    return register_statement('orders.history_page', query), tuple((params + limit_params) * 2 + limit_params)
+
+def get_order_history_page(page_size=ORDER_HISTORY_PAGE_SIZE, before=None, store_id=None, employee_id=None,
+                           customer_id=None, start_date=None, end_date=None):
+    """
+    One page of order history, newest first, using keyset (seek) pagination on (OrderTimestamp, OrderID).
+    `before` is the cursor returned for the previous page (None = newest orders); every page is an
+    index range read, so page N costs the same as page 1. Dates are inclusive.
+    Returns (DataFrame, next_cursor); next_cursor is None on the last page.
+    """
+    # One extra row tells us whether another page exists
+    query, params = order_history_query(before, page_size + 1, store_id, employee_id, customer_id, start_date, end_date,
+                                        get_order_archive_boundary())
+    df = run_query(query, params=params)
+    if len(df) <= page_size:
+        return df, None
+    df = df.iloc[:page_size]
+    last = df.iloc[-1]
+    return df, (pd.Timestamp(last['OrderTimestamp']).to_pydatetime(), int(last['OrderID']))
+
+def get_order_items_for_orders(order_ids):
+    """
+    Items for a whole page of orders in one `WHERE OrderID IN (...)` query.
+    Returns {OrderID: DataFrame of OrderItemID, ProductName, Quantity, PriceAtTimeOfOrder};
+    orders without items map to an empty DataFrame.
+    """
+    order_ids = [int(order_id) for order_id in order_ids]
+    if not order_ids:
+        return {}
+    placeholders = ', '.join(['%s'] * len(order_ids))
+    items_table = "OrderItems"
+    params = tuple(order_ids)
+    if get_order_archive_boundary() is not None: # The page may include archived orders
+        items_table = f"""(
+            SELECT OrderItemID, OrderID, ProductID, Quantity, PriceAtTimeOfOrder FROM OrderItems WHERE OrderID IN ({placeholders})
+            UNION ALL
+            SELECT OrderItemID, OrderID, ProductID, Quantity, PriceAtTimeOfOrder FROM OrderItemsArchive WHERE OrderID IN ({placeholders})
+        )"""
+        params = params * 3
+    query = f"""
+        SELECT oi.OrderID, oi.OrderItemID, p.ProductName, oi.Quantity, oi.PriceAtTimeOfOrder
+        FROM {items_table} oi
+        JOIN Products p ON oi.ProductID = p.ProductID
+        WHERE oi.OrderID IN ({placeholders})
+        ORDER BY oi.OrderID, oi.OrderItemID;
+    """
+    df = run_query(register_statement('orders.page_items', query), params=params)
+    item_columns = ['OrderItemID', 'ProductName', 'Quantity', 'PriceAtTimeOfOrder']
+    items_by_order = {order_id: pd.DataFrame(columns=item_columns) for order_id in order_ids}
+    if not df.empty:
+        for order_id, group in df.groupby('OrderID', sort=False):
+            items_by_order[int(order_id)] = group[item_columns].reset_index(drop=True)
+    return items_by_order
+
+
+# --- Order Archive (hot/cold split, migration V005) ---
+def get_order_archive_boundary():
+    """First date still held in Orders (every archived order is older), or None if nothing is archived."""
+    df = run_query(register_statement('orders.archive_boundary', "SELECT ArchivedBefore FROM OrderArchiveState WHERE StateID = 1;"))
+    if df.empty or pd.isna(df.iloc[0]['ArchivedBefore']):
+        return None
+    return df.iloc[0]['ArchivedBefore']
+
+def archive_orders(keep_months=None):
+    """
+    Moves closed months older than the last `keep_months` (default ARCHIVE_CONFIG) into the
+    compressed archive tables via sp_ArchiveOrders. Returns (success, orders_archived).
+    """
+    keep_months = ARCHIVE_CONFIG['keep_months'] if keep_months is None else keep_months
+    first_of_month = datetime.date.today().replace(day=1)
+    months = first_of_month.year * 12 + first_of_month.month - 1 - keep_months
+    archive_before = datetime.date(months // 12, months % 12 + 1, 1)
+    success, archived = run_command("CALL sp_ArchiveOrders(%s, @_proc_output);", (archive_before,), fetch_output=True)
+    return success, int(archived or 0)
+
+
+# --- Reference Data Snapshot (Stores, Employees, Products, Promotions) ---
+@st.cache_resource
+def _reference_holder():
+    """Process-wide slot for the current ReferenceSnapshot."""
+    return {}
+
+def get_reference_data():
+    """
+    ReferenceSnapshot of the reference tables, shared by all sessions. Each call polls the
+    ReferenceVersions counters (migration V007) with one small query and reloads, in parallel,
+    only the tables whose counter moved. Call it once per rerun and pass the snapshot along.
+    """
+    polled = run_query(register_statement('reference.versions', "SELECT TableName, Version FROM ReferenceVersions;"), use_cache=False)
+    versions = dict(zip(polled['TableName'], polled['Version'].astype(int))) if 'TableName' in polled.columns else {}
+    holder = _reference_holder()
+    snapshot = holder.get('snapshot') or ReferenceSnapshot()
+    stale = snapshot.stale(versions)
+    if stale:
+        frames = run_queries_concurrently({name: register_statement(f'reference.{name.lower()}', REFERENCE_TABLES[name][1])
+                                           for name in stale}, use_cache=False)
+        snapshot = snapshot.refreshed(frames, versions)
+        holder['snapshot'] = snapshot
+    return snapshot
+
+
+# --- Product Catalog (Create New Order tab) ---
+@st.cache_resource
+def _catalog_holder():
+    """Process-wide slot for the current ProductCatalog."""
+    return {}
+
+def get_product_catalog(reference=None):
+    """
+    ProductCatalog for the reference snapshot's Products version, with the current stock.
+    Names, categories and prices come from the snapshot, so the catalog (and its option maps)
+    is rebuilt only when ReferenceVersions says they changed, whoever changed them. Stock, which
+    moves with every order and doesn't bump that version (migration V007), is read separately
+    on each call through the query cache.
+    """
+    products = (reference or get_reference_data())['Products']
+    holder = _catalog_holder()
+    catalog = holder.get('catalog')
+    if catalog is None or products.version is None or catalog.version != products.version:
+        catalog = ProductCatalog(products.frame, products.version)
+        if products.version is not None: # Otherwise the load failed; don't keep it
+            holder['catalog'] = catalog
+    stock = run_query(register_statement('orders.stock', "SELECT ProductID, StockQuantity FROM Products;"))
+    if 'ProductID' not in stock.columns:
+        return catalog # Query failed (error already shown); every product reads as out of stock
+    return catalog.with_stock(stock.set_index('ProductID')['StockQuantity'])
+
+
+# --- Promotion Rule Index (Create New Order tab) ---
+@st.cache_resource
+def _promotion_index_holder():
+    """Process-wide slot for the current PromotionIndex."""
+    return {}
+
+def get_promotion_index(reference=None):
+    """
+    PromotionIndex compiled from the reference snapshot's Promotions, once per Promotions
+    version. The index is keyed by date, so promotions starting or ending later need no rebuild.
+    """
+    promotions = (reference or get_reference_data())['Promotions']
+    holder = _promotion_index_holder()
+    index = holder.get('index')
+    if index is None or promotions.version is None or index.version != promotions.version:
+        index = PromotionIndex(promotions.frame, promotions.version)
+        if promotions.version is not None: # Otherwise the load failed; don't keep it
+            holder['index'] = index
+    return index
+
+
+# --- Typeahead Search ---
+def _like_prefix(term):
+    """LIKE pattern matching values that start with `term` (wildcards in the term are literal)."""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+def _fulltext_phrase(term):
+    """Boolean-mode phrase; with the ngram parser this matches the term anywhere in the text."""
+    return '"' + term.replace('"', ' ') + '"'
+
+def _search(columns, table, term, prefix_branches, fulltext_columns, order_by, limit, substring):
+    """
+    Runs a top-K typeahead search as one UNION of index-backed branches:
+    prefix LIKE on each indexed column (rank 0), then an ngram FULLTEXT substring match (rank 1).
+    prefix_branches: [(where_sql, order_sql, params for where_sql)].
+    """
+    select_list = ', '.join(columns)
+    term = (term or '').strip()
+    if not term:
+        # No search text: first K rows in display order (an index scan that stops after K rows)
+        query = register_statement(f'search.{table.lower()}', f"SELECT {select_list} FROM {table} ORDER BY {order_by} LIMIT %s;")
+        return run_query(query, params=(limit,))
+
+    branches, params = [], []
+    for where_sql, order_sql, param_values in prefix_branches:
+        branches.append(f"(SELECT {select_list}, 0 AS MatchRank FROM {table} WHERE {where_sql} ORDER BY {order_sql} LIMIT %s)")
+        params.extend(param_values)
+        params.append(limit)
+    if substring and len(term) >= 2: # ngram_token_size defaults to 2
+        branches.append(f"(SELECT {select_list}, 1 AS MatchRank FROM {table} "
+                        f"WHERE MATCH({fulltext_columns}) AGAINST (%s IN BOOLEAN MODE) LIMIT %s)")
+        params.extend([_fulltext_phrase(term), limit])
+    query = f"""
+        SELECT {select_list}
+        FROM ({' UNION ALL '.join(branches)}) AS matches
+        GROUP BY {select_list}
+        ORDER BY MIN(MatchRank), {order_by}
+        LIMIT %s;
+    """
+    params.append(limit)
+    return run_query(register_statement(f'search.{table.lower()}', query), params=tuple(params))
+
+def search_customers(term, limit=None, substring=None, columns=None):
+    """
+    Top-K customers whose last name, first name, "first last", email or phone starts with `term`,
+    then (optionally) customers containing it anywhere. An empty term returns the first K by name.
+    Columns: CustomerID, FirstName, LastName, Email, PhoneNumber (or `columns`, which must include CustomerID).
+    """
+    limit = limit or SEARCH_CONFIG['limit']
+    substring = SEARCH_CONFIG['substring'] if substring is None else substring
+    term = (term or '').strip()
+    pattern = _like_prefix(term)
+    branches = [
+        ("LastName LIKE %s", "LastName, FirstName", [pattern]),
+        ("FirstName LIKE %s", "FirstName, LastName", [pattern]),
+        ("Email LIKE %s", "Email", [pattern]),
+        ("PhoneNumber LIKE %s", "PhoneNumber", [pattern]),
+    ]
+    words = term.split()
+    if len(words) >= 2: # "Jane Do" -> first name "Jane", last name starting "Do"
+        branches.append(("FirstName = %s AND LastName LIKE %s", "LastName",
+                         [words[0], _like_prefix(' '.join(words[1:]))]))
+    return _search(columns or ['CustomerID', 'FirstName', 'LastName', 'Email', 'PhoneNumber'], 'Customers', term, branches,
+                   'FirstName, LastName, Email, PhoneNumber', 'LastName, FirstName', limit, substring)
+
+def search_products(term, limit=None, substring=None, columns=None):
+    """
+    Top-K products whose name or category starts with `term`, then (optionally) products containing it.
+    An empty term returns the first K by name.
+    Columns: ProductID, ProductName, Category, Price, StockQuantity (or `columns`, which must include ProductID).
+    """
+    limit = limit or SEARCH_CONFIG['limit']
+    substring = SEARCH_CONFIG['substring'] if substring is None else substring
+    pattern = _like_prefix((term or '').strip())
+    branches = [
+        ("ProductName LIKE %s", "ProductName", [pattern]),
+        ("Category LIKE %s", "Category, ProductName", [pattern]),
+    ]
+    return _search(columns or ['ProductID', 'ProductName', 'Category', 'Price', 'StockQuantity'], 'Products', term, branches,
+                   'ProductName, Category', 'ProductName', limit, substring)
+
+
+# --- Streaming Queries & Exports ---
+@contextmanager
+def stream_query(query, params=None):
+    """
+    Runs a SELECT on an unbuffered server-side cursor (SSDictCursor) and yields a QueryStream.
+    Rows arrive from the server as stream.batches() / stream.arrow_batches() consume them, so memory
+    stays at one batch whatever the result size. Results are never cached.
+    """
+    started = time.perf_counter()
+    error = None
+    with get_connection() as conn:
+        cursor = conn.cursor(pymysql.cursors.SSDictCursor)
+        stream = None
+        try:
+            with profile_span('db'): # Batches fetched later count toward whatever consumes them
+                cursor.execute(query, params)
+            stream = QueryStream(cursor)
+            yield stream
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            _log_call('stream', query, params, started, rows=stream.rows_read if stream is not None else None, error=error)
+            if stream is not None and not stream.exhausted:
+                conn.close() # Unread rows would have to be drained first; the pool discards closed connections
+            else:
+                cursor.close()
+
+def export_query(query, params=None, fmt='csv', name='export'):
+    """
+    Streams a query into a CSV or Parquet file under EXPORT_CONFIG['directory'].
+    Returns (success, path, row_count).
+    """
+    if fmt not in EXPORT_WRITERS:
+        raise ValueError(f"fmt must be one of {sorted(EXPORT_WRITERS)}")
+    os.makedirs(EXPORT_CONFIG['directory'], exist_ok=True)
+    path = os.path.join(EXPORT_CONFIG['directory'],
+                        f"{name}_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}.{fmt}")
+    try:
+        with stream_query(query, params) as stream:
+            rows = EXPORT_WRITERS[fmt](stream, path)
+        return True, path, rows
+    except ImportError as e:
+        st.error(str(e)) # pyarrow missing for Parquet
+    except pymysql.MySQLError as e:
+        st.error(f"Database Export Error: {e}")
+    except Exception as ex:
+        st.error(f"An error occurred during export: {ex}")
+    if os.path.exists(path):
+        os.remove(path)
+    return False, None, 0
+
+def export_order_history(fmt='csv', store_id=None, employee_id=None, customer_id=None, start_date=None, end_date=None):
+    """Exports the full (filtered) order history, newest first. Returns (success, path, row_count)."""
+    query, params = order_history_query(None, None, store_id, employee_id, customer_id, start_date, end_date,
+                                        get_order_archive_boundary())
+    return export_query(query, params, fmt, name='order_history')
@@ -0,0 +1,37 @@
+# export_controls.py
+"""
+CSV/Parquet export buttons for the Orders and Reports pages.
+The file is streamed to disk by database.export_query; small files are then offered as a
+download, larger ones are left on disk (the download button would hold the whole file in memory).
+"""
+
+import os
+
+import streamlit as st
+from database import EXPORT_CONFIG
+
+
+def export_controls(export_fn, key, label="Export"):
+    """
+    Renders "CSV" / "Parquet" buttons. export_fn(fmt) must return (success, path, row_count),
+    e.g. lambda fmt: export_query(sql, params, fmt, name="low_stock").
+    """
+    col_csv, col_parquet, col_result = st.columns([1, 1, 4])
+    with col_csv:
+        csv_clicked = st.button(f"{label} CSV", key=f"{key}_csv")
+    with col_parquet:
+        parquet_clicked = st.button(f"{label} Parquet", key=f"{key}_parquet")
+    if not (csv_clicked or parquet_clicked):
+        return
+    with col_result:
+        with st.spinner("Exporting..."):
+            success, path, rows = export_fn('csv' if csv_clicked else 'parquet')
+        if not success:
+            return
+        size = os.path.getsize(path)
+        if size <= EXPORT_CONFIG['download_max_bytes']:
+            with open(path, 'rb') as handle:
+                st.download_button(f"Download {os.path.basename(path)} ({rows:,} rows)", data=handle,
+                                   file_name=os.path.basename(path), key=f"{key}_download")
+        else:
+            st.success(f"Exported {rows:,} rows ({size / 1024 / 1024:,.1f} MB) to {path}")
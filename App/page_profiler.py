@@ -0,0 +1,170 @@
+# page_profiler.py
+"""
+Opt-in per-rerun page profiler.
+A page calls profile_page() after st.set_page_config and finish_page_profile() at the end.
+In between, time is attributed to:
+  db         executing statements and fetching rows (run_query / run_command / stream_query)
+  dataframe  building DataFrames from fetched rows (and copying cached ones)
+  iterrows   DataFrame.iterrows loops, including the dict/option building done in the loop body
+  widgets    everything else in the script: mostly building and sending Streamlit elements
+Nested time is counted once (a query run inside an iterrows loop is db, not iterrows).
+The breakdown is shown in a sidebar panel and every sample is appended to a JSON-lines file.
+Enable with COFFEE_PROFILE=1, or per browser tab with ?profile=1 in the URL.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+# --- Profiler Configuration ---
+PROFILER_CONFIG = {
+    'enabled': os.environ.get('COFFEE_PROFILE', '') not in ('', '0'),  # Profile every rerun (else only ?profile=1)
+    'samples_path': os.environ.get('COFFEE_PROFILE_LOG',
+                                   os.path.join(tempfile.gettempdir(), 'coffee_shop_profiles.jsonl')), # None = don't persist
+    'history': 20,  # Reruns per page kept for the sidebar table
+}
+
+SPAN_CATEGORIES = ('db', 'dataframe', 'iterrows')
+
+_local = threading.local()
+_file_lock = threading.Lock()
+_original_iterrows = pd.DataFrame.iterrows
+
+
+class PageProfile:
+    """Time spent per category during one rerun of one page."""
+
+    def __init__(self, page):
+        self.page = page
+        self.ts = time.time()
+        self.started = time.perf_counter()
+        self.totals = dict.fromkeys(SPAN_CATEGORIES, 0.0)
+        self.counts = dict.fromkeys(SPAN_CATEGORIES, 0)
+        self._open = [] # [category, start, seconds of nested spans] for spans in progress
+
+    def open_span(self, category):
+        entry = [category, time.perf_counter(), 0.0]
+        self._open.append(entry)
+        return entry
+
+    def close_span(self, entry):
+        elapsed = time.perf_counter() - entry[1]
+        if entry in self._open: # A generator span may close out of order; drop just that entry
+            self._open.remove(entry)
+        self.totals[entry[0]] += max(0.0, elapsed - entry[2])
+        self.counts[entry[0]] += 1
+        if self._open:
+            self._open[-1][2] += elapsed
+
+    def sample(self, completed=True):
+        """The finished profile as a flat dict (milliseconds)."""
+        total = time.perf_counter() - self.started
+        accounted = sum(self.totals.values())
+        sample = {'ts': self.ts, 'page': self.page, 'completed': completed, 'total_ms': round(total * 1000.0, 3)}
+        for category in SPAN_CATEGORIES:
+            sample[f'{category}_ms'] = round(self.totals[category] * 1000.0, 3)
+        sample['widgets_ms'] = round(max(0.0, total - accounted) * 1000.0, 3)
+        sample.update({f'{category}_count': self.counts[category] for category in SPAN_CATEGORIES})
+        return sample
+
+
+def current():
+    """The profile of the rerun running on this thread, or None when profiling is off."""
+    return getattr(_local, 'profile', None)
+
+
+@contextmanager
+def profile_span(category):
+    """Attributes the time spent in the block to `category` (no-op when not profiling)."""
+    profile = current()
+    if profile is None:
+        yield
+        return
+    entry = profile.open_span(category)
+    try:
+        yield
+    finally:
+        profile.close_span(entry)
+
+
+def _profiled_iterrows(self):
+    if current() is None:
+        yield from _original_iterrows(self)
+        return
+    with profile_span('iterrows'):
+        yield from _original_iterrows(self)
+
+
+def _persist(sample):
+    path = PROFILER_CONFIG['samples_path']
+    if not path:
+        return
+    with _file_lock, open(path, 'a', encoding='utf-8') as handle:
+        handle.write(json.dumps(sample) + "\n")
+
+
+def _enabled():
+    if PROFILER_CONFIG['enabled']:
+        return True
+    try:
+        return st.query_params.get('profile') == '1'
+    except Exception:
+        return False
+
+
+# --- Page Hooks ---
+def profile_page():
+    """Starts profiling this rerun of the calling page (if enabled). Call right after st.set_page_config."""
+    # A rerun cut short by st.rerun()/st.stop() never reached finish_page_profile; keep it as incomplete
+    unfinished = st.session_state.pop('_page_profile', None)
+    if unfinished is not None:
+        _record(unfinished.sample(completed=False))
+    _local.profile = None
+    if not _enabled():
+        return
+    pd.DataFrame.iterrows = _profiled_iterrows # Passes straight through on threads that aren't profiling
+    page = os.path.splitext(os.path.basename(sys._getframe(1).f_code.co_filename))[0]
+    _local.profile = st.session_state['_page_profile'] = PageProfile(page)
+
+
+def _record(sample):
+    _persist(sample)
+    history = st.session_state.setdefault('_page_profile_history', [])
+    history.append(sample)
+    del history[:-PROFILER_CONFIG['history'] * 10]
+
+
+def finish_page_profile():
+    """Ends profiling for this rerun and renders the breakdown in the sidebar."""
+    profile = current()
+    if profile is None:
+        return
+    _local.profile = None
+    st.session_state.pop('_page_profile', None)
+    sample = profile.sample()
+    _record(sample)
+
+    with st.sidebar.expander("⏱️ Page Profile", expanded=True):
+        st.metric("This Rerun", f"{sample['total_ms']:.0f} ms")
+        breakdown = pd.Series({
+            'DB': sample['db_ms'],
+            'DataFrames': sample['dataframe_ms'],
+            'iterrows': sample['iterrows_ms'],
+            'Widgets/other': sample['widgets_ms'],
+        }, name='ms')
+        st.bar_chart(breakdown)
+        st.caption(f"{sample['db_count']} DB calls, {sample['dataframe_count']} DataFrames, "
+                   f"{sample['iterrows_count']} iterrows loops")
+        history = [s for s in st.session_state['_page_profile_history'] if s['page'] == profile.page]
+        df_history = pd.DataFrame(history[-PROFILER_CONFIG['history']:][::-1])
+        st.dataframe(df_history[['total_ms', 'db_ms', 'dataframe_ms', 'iterrows_ms', 'widgets_ms', 'completed']],
+                     hide_index=True, use_container_width=True)
+        if PROFILER_CONFIG['samples_path']:
+            st.caption(f"Samples: {PROFILER_CONFIG['samples_path']}")
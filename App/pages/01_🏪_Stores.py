@@ -5,16 +5,21 @@ Streamlit page for managing Store information (CRUD operations).
 
 import streamlit as st
 import pandas as pd
-from database import run_query, run_command
+from database import run_query, run_command, get_reference_data
+from page_profiler import profile_page, finish_page_profile
 
 # --- Page Configuration ---
 st.set_page_config(page_title="Store Management", layout="wide")
+profile_page() # Opt-in render profiler (COFFEE_PROFILE=1 or ?profile=1)
 st.title("🏪 Store Management")
 st.write("View, Add, Edit, or Delete Store locations.")
 
+reference = get_reference_data() # Shared snapshot; one version query per rerun
+stores = reference['Stores']
+
 # --- Display Existing Stores ---
 st.subheader("Existing Stores")
-df_stores = run_query("SELECT * FROM Stores ORDER BY StoreName;")
+df_stores = stores.frame
 if not df_stores.empty:
     st.dataframe(df_stores, use_container_width=True, hide_index=True)
 else:
@@ -49,21 +54,18 @@ st.divider()
 
 # --- Edit Existing Store ---
 st.subheader("Edit Existing Store")
-# Get list of stores for selection
-store_list = run_query("SELECT StoreID, StoreName FROM Stores ORDER BY StoreName;")
-if not store_list.empty:
-    # Create a mapping from display name to ID
-    store_options = {f"{row['StoreName']} (ID: {row['StoreID']})": row['StoreID'] for index, row in store_list.iterrows()}
+if not stores.empty:
+    # Mapping from display name to ID (built once per Stores version)
+    store_options = stores.options('name_id', lambda df: df['StoreName'] + " (ID: " + df['StoreID'].astype(str) + ")")
     selected_store_display = st.selectbox("Select Store to Edit", options=store_options.keys())
 
     if selected_store_display:
         selected_store_id = store_options[selected_store_display]
 
-        # Fetch current data for the selected store
-        current_store_data = run_query("SELECT * FROM Stores WHERE StoreID = %s;", params=(selected_store_id,))
+        # Current data for the selected store
+        store = stores.row(selected_store_id)
 
-        if not current_store_data.empty:
-            store = current_store_data.iloc[0] # Get the first (only) row
+        if store is not None:
 
             with st.form(f"edit_store_{selected_store_id}"):
                 st.write(f"Editing: {store['StoreName']}")
@@ -98,9 +100,8 @@ st.divider()
 
 # --- Delete Existing Store ---
 st.subheader("Delete Existing Store")
-# Re-fetch or reuse store_list for consistency
-if not store_list.empty:
-    store_options_del = {f"{row['StoreName']} (ID: {row['StoreID']})": row['StoreID'] for index, row in store_list.iterrows()}
+if not stores.empty:
+    store_options_del = store_options
     selected_store_display_del = st.selectbox("Select Store to Delete", options=store_options_del.keys(), key="delete_store_select")
 
     if selected_store_display_del:
@@ -116,7 +117,7 @@ if not store_list.empty:
                      # Depending on strictness, you might prevent deletion entirely here.
 
                 # Check if orders reference this store
-                orders_exist = run_query("SELECT COUNT(*) as count FROM Orders WHERE StoreID = %s;", params=(selected_store_id_del,))
+                orders_exist = run_query("SELECT (SELECT COUNT(*) FROM Orders WHERE StoreID = %s) + (SELECT COUNT(*) FROM OrdersArchive WHERE StoreID = %s) as count;", params=(selected_store_id_del, selected_store_id_del))
                 if orders_exist.iloc[0]['count'] > 0:
                      st.error(f"Cannot delete store. {orders_exist.iloc[0]['count']} order(s) reference this store. (Deletion restricted by database constraint). Please reassign or delete orders first.")
                 else:
@@ -132,4 +133,6 @@ if not store_list.empty:
             except Exception as e:
                 st.error(f"An error occurred during deletion: {e}")
 else:
-    st.info("No stores available to delete.")
\ No newline at end of file
+    st.info("No stores available to delete.")
+
+finish_page_profile()
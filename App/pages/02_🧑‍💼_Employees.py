@@ -5,30 +5,28 @@ Streamlit page for managing Employee information (CRUD operations).
 
 import streamlit as st
 import pandas as pd
-from database import run_query, run_command
+from database import run_query, run_command, get_reference_data
+from page_profiler import profile_page, finish_page_profile
 import datetime
 
 st.set_page_config(page_title="Employee Management", layout="wide")
+profile_page() # Opt-in render profiler (COFFEE_PROFILE=1 or ?profile=1)
 st.title("🧑‍💼 Employee Management")
 st.write("View, Add, Edit, or Delete Employee records.")
 
+reference = get_reference_data() # Shared snapshot; one version query per rerun
+employees = reference['Employees']
+stores = reference['Stores']
+
 # --- Helper Function to Get Stores for Dropdown ---
 def get_store_options():
-    stores = run_query("SELECT StoreID, StoreName FROM Stores ORDER BY StoreName;")
-    if not stores.empty:
-        return {f"{row['StoreName']} (ID: {row['StoreID']})": row['StoreID'] for index, row in stores.iterrows()}
-    return {}
+    return stores.options('name_id', lambda df: df['StoreName'] + " (ID: " + df['StoreID'].astype(str) + ")")
 
 # --- Display Existing Employees ---
 st.subheader("Existing Employees")
-# Join with stores to show store name
-query_emp = """
-SELECT e.EmployeeID, e.FirstName, e.LastName, e.Position, e.HireDate, e.HourlyRate, s.StoreName
-FROM Employees e
-LEFT JOIN Stores s ON e.StoreID = s.StoreID
-ORDER BY e.LastName, e.FirstName;
-"""
-df_employees = run_query(query_emp)
+# Store names looked up in the Stores snapshot (no join needed)
+df_employees = employees.frame[['EmployeeID', 'FirstName', 'LastName', 'Position', 'HireDate', 'HourlyRate']].assign(
+    StoreName=employees.frame['StoreID'].map(stores.lookup('StoreName')))
 if not df_employees.empty:
     st.dataframe(df_employees, use_container_width=True, hide_index=True, column_config={
         "HourlyRate": st.column_config.NumberColumn(format="$%.2f")
@@ -70,17 +68,15 @@ st.divider()
 
 # --- Edit Existing Employee ---
 st.subheader("Edit Existing Employee")
-employee_list = run_query("SELECT EmployeeID, FirstName, LastName FROM Employees ORDER BY LastName, FirstName;")
-if not employee_list.empty:
-    emp_options = {f"{row['LastName']}, {row['FirstName']} (ID: {row['EmployeeID']})": row['EmployeeID'] for index, row in employee_list.iterrows()}
+if not employees.empty:
+    emp_options = employees.options('name_id', lambda df: df['LastName'] + ", " + df['FirstName'] + " (ID: " + df['EmployeeID'].astype(str) + ")")
     selected_emp_display = st.selectbox("Select Employee to Edit", options=emp_options.keys())
 
     if selected_emp_display:
         selected_emp_id = emp_options[selected_emp_display]
-        current_emp_data = run_query("SELECT * FROM Employees WHERE EmployeeID = %s;", params=(selected_emp_id,))
+        emp = employees.row(selected_emp_id)
 
-        if not current_emp_data.empty:
-            emp = current_emp_data.iloc[0]
+        if emp is not None:
             store_options_edit = get_store_options()
             # Find the display key for the current StoreID
             current_store_key = None
@@ -130,8 +126,8 @@ st.divider()
 
 # --- Delete Existing Employee ---
 st.subheader("Delete Existing Employee")
-if not employee_list.empty:
-    emp_options_del = {f"{row['LastName']}, {row['FirstName']} (ID: {row['EmployeeID']})": row['EmployeeID'] for index, row in employee_list.iterrows()}
+if not employees.empty:
+    emp_options_del = emp_options
     selected_emp_display_del = st.selectbox("Select Employee to Delete", options=emp_options_del.keys(), key="delete_emp_select")
 
     if selected_emp_display_del:
@@ -139,7 +135,7 @@ if not employee_list.empty:
         emp_name_del = selected_emp_display_del.split(" (ID:")[0]
 
         if st.button(f"Confirm Delete Employee: {emp_name_del}"):
-            orders_exist = run_query("SELECT COUNT(*) as count FROM Orders WHERE EmployeeID = %s;", params=(selected_emp_id_del,))
+            orders_exist = run_query("SELECT (SELECT COUNT(*) FROM Orders WHERE EmployeeID = %s) + (SELECT COUNT(*) FROM OrdersArchive WHERE EmployeeID = %s) as count;", params=(selected_emp_id_del, selected_emp_id_del))
             if orders_exist.iloc[0]['count'] > 0:
                 st.error(f"Cannot delete employee. {orders_exist.iloc[0]['count']} order(s) reference this employee. (Deletion restricted by database constraint). Please reassign or delete orders first.")
             else:
@@ -150,4 +146,6 @@ if not employee_list.empty:
                     st.success(f"Employee '{emp_name_del}' deleted successfully!")
                     st.rerun()
 else:
-    st.info("No employees available to delete.")
\ No newline at end of file
+    st.info("No employees available to delete.")
+
+finish_page_profile()
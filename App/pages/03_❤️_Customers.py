@@ -6,19 +6,28 @@ Uses the sp_AddCustomer stored procedure for inserts.
 
 import streamlit as st
 import pandas as pd
-from database import run_query, run_command, call_sp_add_customer # Import specific procedure call
+from database import run_query, run_command, call_sp_add_customer, search_customers, get_loyalty_balances, get_loyalty_ledger_status, set_loyalty_ledger_mode, compact_loyalty_ledger # Import specific procedure call
+from page_profiler import profile_page, finish_page_profile
+from typeahead import customer_picker
 import datetime
 
 st.set_page_config(page_title="Customer Management", layout="wide")
+profile_page() # Opt-in render profiler (COFFEE_PROFILE=1 or ?profile=1)
 st.title("❤️ Customer Management")
 st.write("View, Add, Edit, or Delete Customer records and view loyalty points.")
 
 # --- Display Existing Customers ---
 st.subheader("Existing Customers")
-df_customers = run_query("SELECT CustomerID, FirstName, LastName, Email, PhoneNumber, JoinDate, LoyaltyPoints FROM Customers ORDER BY LastName, FirstName;")
+CUSTOMER_LIST_LIMIT = 100 # Rows shown at once; search narrows them down
+customer_search = st.text_input("Search customers", placeholder="Type a name, email or phone...", key="customer_list_search")
+df_customers = search_customers(customer_search, limit=CUSTOMER_LIST_LIMIT, columns=['CustomerID', 'FirstName', 'LastName', 'Email', 'PhoneNumber', 'JoinDate', 'LoyaltyPoints'])
 
 if not df_customers.empty:
+    # Balance + pending ledger deltas (Customers.LoyaltyPoints alone lags behind in ledger mode)
+    balances = get_loyalty_balances(df_customers['CustomerID'])
+    df_customers['LoyaltyPoints'] = df_customers['CustomerID'].map(balances).fillna(df_customers['LoyaltyPoints'])
     st.dataframe(df_customers, use_container_width=True, hide_index=True)
+    st.caption(f"Showing up to {CUSTOMER_LIST_LIMIT} customers{' matching the search' if customer_search else ''}.")
 else:
     st.info("No customers found.")
 
@@ -53,72 +62,85 @@ st.divider()
 
 # --- Edit Existing Customer ---
 st.subheader("Edit Existing Customer")
-customer_list = run_query("SELECT CustomerID, FirstName, LastName, Email FROM Customers ORDER BY LastName, FirstName;")
-if not customer_list.empty:
-    cust_options = {f"{row['LastName']}, {row['FirstName']} ({row['Email']})": row['CustomerID'] for index, row in customer_list.iterrows()}
-    selected_cust_display = st.selectbox("Select Customer to Edit", options=cust_options.keys())
-
-    if selected_cust_display:
-        selected_cust_id = cust_options[selected_cust_display]
-        current_cust_data = run_query("SELECT * FROM Customers WHERE CustomerID = %s;", params=(selected_cust_id,))
-
-        if not current_cust_data.empty:
-            cust = current_cust_data.iloc[0]
-
-            with st.form(f"edit_customer_{selected_cust_id}"):
-                st.write(f"Editing: {cust['FirstName']} {cust['LastName']}")
-                edit_fname = st.text_input("First Name*", value=cust['FirstName'], max_chars=100)
-                edit_lname = st.text_input("Last Name*", value=cust['LastName'], max_chars=100)
-                edit_email = st.text_input("Email*", value=cust['Email'], max_chars=255)
-                edit_phone = st.text_input("Phone Number", value=cust['PhoneNumber'] if cust['PhoneNumber'] else "", max_chars=50)
-                # Display loyalty points, but maybe don't allow direct editing here
-                st.text_input("Loyalty Points", value=str(cust['LoyaltyPoints']), disabled=True)
-                # Join Date might also be read-only
-                st.date_input("Join Date", value=cust['JoinDate'], disabled=True)
-
-
-                submitted_edit = st.form_submit_button("Update Customer")
-                if submitted_edit:
-                    if not edit_fname or not edit_lname or not edit_email:
-                        st.warning("First Name, Last Name, and Email are required.")
-                    elif "@" not in edit_email or "." not in edit_email.split("@")[-1]:
-                         st.warning("Please enter a valid email address.")
-                    else:
-                        phone_to_update = edit_phone if edit_phone else None
-                        sql_update = """
-                            UPDATE Customers
-                            SET FirstName=%s, LastName=%s, Email=%s, PhoneNumber=%s
-                            WHERE CustomerID=%s;
-                        """
-                        # Note: Not updating JoinDate or LoyaltyPoints via this form
-                        params_update = (edit_fname, edit_lname, edit_email, phone_to_update, selected_cust_id)
-                        success, _ = run_command(sql_update, params_update)
-                        if success:
-                            st.success(f"Customer '{edit_fname} {edit_lname}' updated successfully!")
-                            st.rerun()
-else:
-    st.info("No customers available to edit.")
+selected_cust_id, selected_cust_display = customer_picker("Select Customer to Edit", key="edit_cust_select")
+if selected_cust_display:
+    current_cust_data = run_query("SELECT * FROM Customers WHERE CustomerID = %s;", params=(selected_cust_id,))
+
+    if not current_cust_data.empty:
+        cust = current_cust_data.iloc[0]
+
+        with st.form(f"edit_customer_{selected_cust_id}"):
+            st.write(f"Editing: {cust['FirstName']} {cust['LastName']}")
+            edit_fname = st.text_input("First Name*", value=cust['FirstName'], max_chars=100)
+            edit_lname = st.text_input("Last Name*", value=cust['LastName'], max_chars=100)
+            edit_email = st.text_input("Email*", value=cust['Email'], max_chars=255)
+            edit_phone = st.text_input("Phone Number", value=cust['PhoneNumber'] if cust['PhoneNumber'] else "", max_chars=50)
+            # Display loyalty points, but maybe don't allow direct editing here
+            st.text_input("Loyalty Points", value=str(get_loyalty_balances([selected_cust_id]).get(selected_cust_id, cust['LoyaltyPoints'])), disabled=True)
+            # Join Date might also be read-only
+            st.date_input("Join Date", value=cust['JoinDate'], disabled=True)
+
+
+            submitted_edit = st.form_submit_button("Update Customer")
+            if submitted_edit:
+                if not edit_fname or not edit_lname or not edit_email:
+                    st.warning("First Name, Last Name, and Email are required.")
+                elif "@" not in edit_email or "." not in edit_email.split("@")[-1]:
+                     st.warning("Please enter a valid email address.")
+                else:
+                    phone_to_update = edit_phone if edit_phone else None
+                    sql_update = """
+                        UPDATE Customers
+                        SET FirstName=%s, LastName=%s, Email=%s, PhoneNumber=%s
+                        WHERE CustomerID=%s;
+                    """
+                    # Note: Not updating JoinDate or LoyaltyPoints via this form
+                    params_update = (edit_fname, edit_lname, edit_email, phone_to_update, selected_cust_id)
+                    success, _ = run_command(sql_update, params_update)
+                    if success:
+                        st.success(f"Customer '{edit_fname} {edit_lname}' updated successfully!")
+                        st.rerun()
 
 st.divider()
 
 # --- Delete Existing Customer ---
 st.subheader("Delete Existing Customer")
-if not customer_list.empty:
-    cust_options_del = {f"{row['LastName']}, {row['FirstName']} ({row['Email']})": row['CustomerID'] for index, row in customer_list.iterrows()}
-    selected_cust_display_del = st.selectbox("Select Customer to Delete", options=cust_options_del.keys(), key="delete_cust_select")
-
-    if selected_cust_display_del:
-        selected_cust_id_del = cust_options_del[selected_cust_display_del]
-        cust_name_del = selected_cust_display_del.split(" (")[0] # Get name part
-
-        if st.button(f"Confirm Delete Customer: {cust_name_del}"):
-            # Note: ON DELETE SET NULL for Orders means associated orders will remain but point to NULL CustomerID
-            st.info("Deleting a customer will set their ID to NULL in past orders.")
-            sql_delete = "DELETE FROM Customers WHERE CustomerID = %s;"
-            params_delete = (selected_cust_id_del,)
-            success, _ = run_command(sql_delete, params_delete)
-            if success:
-                st.success(f"Customer '{cust_name_del}' deleted successfully!")
-                st.rerun()
-else:
-    st.info("No customers available to delete.")
\ No newline at end of file
+selected_cust_id_del, selected_cust_display_del = customer_picker("Select Customer to Delete", key="delete_cust_select")
+if selected_cust_display_del:
+    cust_name_del = selected_cust_display_del.split(" (")[0] # Get name part
+
+    if st.button(f"Confirm Delete Customer: {cust_name_del}"):
+        # Note: ON DELETE SET NULL for Orders means associated orders will remain but point to NULL CustomerID
+        st.info("Deleting a customer will set their ID to NULL in past orders.")
+        sql_delete = "DELETE FROM Customers WHERE CustomerID = %s;"
+        params_delete = (selected_cust_id_del,)
+        success, _ = run_command(sql_delete, params_delete)
+        if success:
+            st.success(f"Customer '{cust_name_del}' deleted successfully!")
+            st.rerun()
+
+st.divider()
+
+# --- Loyalty Ledger ---
+with st.expander("Loyalty Ledger"):
+    st.write("In ledger mode, checkout appends each order's point change, order count and spend to LoyaltyLedger "
+             "instead of updating the customer's rows, so busy customers' orders don't wait on each other. "
+             "Pending changes count toward the balance right away and are folded into the customer records "
+             "(and the Reports page's customer totals) by the compaction event (every 5 minutes) or the button below.")
+    ledger_status = get_loyalty_ledger_status()
+    ledger_col1, ledger_col2, ledger_col3 = st.columns(3)
+    ledger_col1.metric("Mode", "Ledger" if ledger_status['LedgerMode'] else "Direct")
+    ledger_col2.metric("Pending Entries", ledger_status['PendingEntries'])
+    ledger_col3.metric("Customers with Pending Points", ledger_status['PendingCustomers'])
+    if ledger_status['OldestEntry'] is not None:
+        st.caption(f"Oldest pending entry: {ledger_status['OldestEntry']}")
+    ledger_mode = st.toggle("Use the loyalty ledger", value=ledger_status['LedgerMode'], key="loyalty_ledger_mode")
+    if ledger_mode != ledger_status['LedgerMode']:
+        if set_loyalty_ledger_mode(ledger_mode):
+            st.rerun()
+    if st.button("Compact Now", key="compact_loyalty_ledger", disabled=ledger_status['PendingEntries'] == 0):
+        success, entries = compact_loyalty_ledger()
+        if success:
+            st.success(f"Compacted {entries} ledger entr{'y' if entries == 1 else 'ies'}.")
+
+finish_page_profile()
@@ -5,20 +5,26 @@ Streamlit page for managing Product information (CRUD operations).
 
 import streamlit as st
 import pandas as pd
-from database import run_query, run_command
+from database import run_query, run_command, search_products
+from page_profiler import profile_page, finish_page_profile
+from typeahead import product_picker
 
 st.set_page_config(page_title="Product Management", layout="wide")
+profile_page() # Opt-in render profiler (COFFEE_PROFILE=1 or ?profile=1)
 st.title("☕ Product Management")
 st.write("View, Add, Edit, or Delete Products in the catalog.")
 
 # --- Display Existing Products ---
 st.subheader("Product Catalog")
-df_products = run_query("SELECT * FROM Products ORDER BY Category, ProductName;")
+PRODUCT_LIST_LIMIT = 100 # Rows shown at once; search narrows them down
+product_search = st.text_input("Search products", placeholder="Type a product name or category...", key="product_list_search")
+df_products = search_products(product_search, limit=PRODUCT_LIST_LIMIT, columns=['ProductID', 'ProductName', 'Category', 'Price', 'StockQuantity'])
 if not df_products.empty:
     st.dataframe(df_products, use_container_width=True, hide_index=True, column_config={
         "Price": st.column_config.NumberColumn(format="$%.2f"),
         "StockQuantity": st.column_config.NumberColumn(label="Stock Qty")
     })
+    st.caption(f"Showing up to {PRODUCT_LIST_LIMIT} products{' matching the search' if product_search else ''}.")
 else:
     st.info("No products found.")
 
@@ -56,70 +62,63 @@ st.divider()
 
 # --- Edit Existing Product ---
 st.subheader("Edit Existing Product")
-product_list = run_query("SELECT ProductID, ProductName, Category FROM Products ORDER BY Category, ProductName;")
-if not product_list.empty:
-    prod_options = {f"{row['ProductName']} ({row['Category'] or 'N/A'}) - ID: {row['ProductID']}": row['ProductID'] for index, row in product_list.iterrows()}
-    selected_prod_display = st.selectbox("Select Product to Edit", options=prod_options.keys())
-
-    if selected_prod_display:
-        selected_prod_id = prod_options[selected_prod_display]
-        current_prod_data = run_query("SELECT * FROM Products WHERE ProductID = %s;", params=(selected_prod_id,))
-
-        if not current_prod_data.empty:
-            prod = current_prod_data.iloc[0]
-
-            with st.form(f"edit_product_{selected_prod_id}"):
-                st.write(f"Editing: {prod['ProductName']}")
-                edit_name = st.text_input("Product Name*", value=prod['ProductName'], max_chars=150)
-                edit_category = st.text_input("Category", value=prod['Category'], max_chars=100)
-                edit_price = st.number_input("Price*", value=float(prod['Price']), min_value=0.00, step=0.01, format="%.2f")
-                edit_stock = st.number_input("Stock Quantity*", value=int(prod['StockQuantity']), min_value=0, step=1)
-
-                submitted_edit = st.form_submit_button("Update Product")
-                if submitted_edit:
-                    if not edit_name:
-                         st.warning("Product Name is required.")
-                    elif edit_price < 0:
-                         st.warning("Price cannot be negative.")
-                    elif edit_stock < 0:
-                         st.warning("Stock Quantity cannot be negative.")
-                    else:
-                        sql_update = """
-                            UPDATE Products
-                            SET ProductName=%s, Category=%s, Price=%s, StockQuantity=%s
-                            WHERE ProductID=%s;
-                        """
-                        params_update = (edit_name, edit_category, edit_price, edit_stock, selected_prod_id)
-                        success, _ = run_command(sql_update, params_update)
-                        if success:
-                            st.success(f"Product '{edit_name}' updated successfully!")
-                            st.rerun()
-else:
-    st.info("No products available to edit.")
+selected_prod_id, selected_prod_display = product_picker("Select Product to Edit", key="edit_prod_select")
+if selected_prod_display:
+    current_prod_data = run_query("SELECT * FROM Products WHERE ProductID = %s;", params=(selected_prod_id,))
+
+    if not current_prod_data.empty:
+        prod = current_prod_data.iloc[0]
+
+        with st.form(f"edit_product_{selected_prod_id}"):
+            st.write(f"Editing: {prod['ProductName']}")
+            edit_name = st.text_input("Product Name*", value=prod['ProductName'], max_chars=150)
+            edit_category = st.text_input("Category", value=prod['Category'], max_chars=100)
+            edit_price = st.number_input("Price*", value=float(prod['Price']), min_value=0.00, step=0.01, format="%.2f")
+            edit_stock = st.number_input("Stock Quantity*", value=int(prod['StockQuantity']), min_value=0, step=1)
+
+            submitted_edit = st.form_submit_button("Update Product")
+            if submitted_edit:
+                if not edit_name:
+                     st.warning("Product Name is required.")
+                elif edit_price < 0:
+                     st.warning("Price cannot be negative.")
+                elif edit_stock < 0:
+                     st.warning("Stock Quantity cannot be negative.")
+                else:
+                    sql_update = """
+                        UPDATE Products
+                        SET ProductName=%s, Category=%s, Price=%s, StockQuantity=%s
+                        WHERE ProductID=%s;
+                    """
+                    params_update = (edit_name, edit_category, edit_price, edit_stock, selected_prod_id)
+                    success, _ = run_command(sql_update, params_update)
+                    if success:
+                        st.success(f"Product '{edit_name}' updated successfully!")
+                        st.rerun()
 
 st.divider()
 
 # --- Delete Existing Product ---
 st.subheader("Delete Existing Product")
-if not product_list.empty:
-    prod_options_del = {f"{row['ProductName']} ({row['Category'] or 'N/A'}) - ID: {row['ProductID']}": row['ProductID'] for index, row in product_list.iterrows()}
-    selected_prod_display_del = st.selectbox("Select Product to Delete", options=prod_options_del.keys(), key="delete_prod_select")
-
-    if selected_prod_display_del:
-        selected_prod_id_del = prod_options_del[selected_prod_display_del]
-        prod_name_del = selected_prod_display_del.split(" (")[0]
+selected_prod_id_del, selected_prod_display_del = product_picker("Select Product to Delete", key="delete_prod_select")
+if selected_prod_display_del:
+    prod_name_del = selected_prod_display_del.split(" (")[0]
+
+    if st.button(f"Confirm Delete Product: {prod_name_del}"):
+        # Check OrderItems (FK is RESTRICT)
+        items_exist = run_query("SELECT (SELECT COUNT(*) FROM OrderItems WHERE ProductID = %s) + (SELECT COUNT(*) FROM OrderItemsArchive WHERE ProductID = %s) as count;", params=(selected_prod_id_del, selected_prod_id_del))
+        # Check Promotions scoped to this product (FK is RESTRICT, migration V006)
+        promos_exist = run_query("SELECT COUNT(*) as count FROM Promotions WHERE ScopeProductID = %s;", params=(selected_prod_id_del,))
+        if items_exist.iloc[0]['count'] > 0:
+            st.error(f"Cannot delete product. It exists in {items_exist.iloc[0]['count']} past order item(s). (Deletion restricted by database constraint).")
+        elif promos_exist.iloc[0]['count'] > 0:
+            st.error(f"Cannot delete product. {promos_exist.iloc[0]['count']} promotion(s) apply to it; change or delete them first.")
+        else:
+            sql_delete = "DELETE FROM Products WHERE ProductID = %s;"
+            params_delete = (selected_prod_id_del,)
+            success, _ = run_command(sql_delete, params_delete)
+            if success:
+                st.success(f"Product '{prod_name_del}' deleted successfully!")
+                st.rerun()
 
-        if st.button(f"Confirm Delete Product: {prod_name_del}"):
-            # Check OrderItems (FK is RESTRICT)
-            items_exist = run_query("SELECT COUNT(*) as count FROM OrderItems WHERE ProductID = %s;", params=(selected_prod_id_del,))
-            if items_exist.iloc[0]['count'] > 0:
-                st.error(f"Cannot delete product. It exists in {items_exist.iloc[0]['count']} past order item(s). (Deletion restricted by database constraint).")
-            else:
-                sql_delete = "DELETE FROM Products WHERE ProductID = %s;"
-                params_delete = (selected_prod_id_del,)
-                success, _ = run_command(sql_delete, params_delete)
-                if success:
-                    st.success(f"Product '{prod_name_del}' deleted successfully!")
-                    st.rerun()
-else:
-    st.info("No products available to delete.")
\ No newline at end of file
+finish_page_profile()
@@ -5,16 +5,22 @@ Streamlit page for managing Promotion information (CRUD operations).
 
 import streamlit as st
 import pandas as pd
-from database import run_query, run_command
+from database import run_query, run_command, get_reference_data
+from page_profiler import profile_page, finish_page_profile
 import datetime
 
 st.set_page_config(page_title="Promotion Management", layout="wide")
+profile_page() # Opt-in render profiler (COFFEE_PROFILE=1 or ?profile=1)
 st.title("🎉 Promotion Management")
 st.write("View, Add, Edit, or Delete Promotions.")
 
+reference = get_reference_data() # Shared snapshot; one version query per rerun
+promotions = reference['Promotions']
+products = reference['Products']
+
 # --- Display Existing Promotions ---
 st.subheader("Active & Past Promotions")
-df_promotions = run_query("SELECT * FROM Promotions ORDER BY EndDate DESC, StartDate DESC;")
+df_promotions = promotions.sorted_by(['EndDate', 'StartDate'], ascending=False) # Open-ended dates last, as in MySQL
 if not df_promotions.empty:
     st.dataframe(df_promotions, use_container_width=True, hide_index=True, column_config={
         "DiscountValue": st.column_config.NumberColumn(format="%.2f"),
@@ -26,6 +32,20 @@ else:
 
 st.divider()
 
+# --- Promotion scope options (migration V006): whole order, one category or one product ---
+categories = sorted({category for category in products.lookup('Category').values if isinstance(category, str)})
+scope_options = {"Whole order": (None, None)}
+scope_options.update({f"Category: {category}": (None, category) for category in categories})
+product_options = products.options('name_id', lambda df: df['ProductName'] + " (ID: " + df['ProductID'].astype(str) + ")")
+scope_options.update({f"Product: {label}": (product_id, None) for label, product_id in product_options.items()})
+
+def scope_label(product_id, category):
+    """Option label for a promotion's stored scope."""
+    for label, scope in scope_options.items():
+        if scope == (product_id, category):
+            return label
+    return "Whole order"
+
 # --- Add New Promotion Form ---
 st.subheader("Add New Promotion")
 with st.form("add_promo_form", clear_on_submit=True):
@@ -37,6 +57,7 @@ with st.form("add_promo_form", clear_on_submit=True):
     add_start_date = st.date_input("Start Date (Optional)", value=None)
     add_end_date = st.date_input("End Date (Optional)", value=None)
     add_points = st.number_input("Required Points (Optional, for Loyalty)", min_value=0, step=10, value=None, placeholder="Leave blank if not point-based")
+    add_scope = st.selectbox("Applies To", options=scope_options.keys(), help="Item promotions discount only the matching lines; FIXED is taken off each matching unit")
 
     submitted_add = st.form_submit_button("Add Promotion")
     if submitted_add:
@@ -52,13 +73,14 @@ with st.form("add_promo_form", clear_on_submit=True):
             start_date_db = add_start_date if add_start_date else None
             end_date_db = add_end_date if add_end_date else None
             req_points_db = int(add_points) if add_points is not None and add_points > 0 else None
+            scope_product_db, scope_category_db = scope_options[add_scope]
 
             sql = """
             INSERT INTO Promotions
-            (PromotionName, Description, DiscountType, DiscountValue, StartDate, EndDate, RequiredPoints)
-            VALUES (%s, %s, %s, %s, %s, %s, %s);
+            (PromotionName, Description, DiscountType, DiscountValue, StartDate, EndDate, RequiredPoints, ScopeProductID, ScopeCategory)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s);
             """
-            params = (add_name, add_desc, add_type, add_value, start_date_db, end_date_db, req_points_db)
+            params = (add_name, add_desc, add_type, add_value, start_date_db, end_date_db, req_points_db, scope_product_db, scope_category_db)
             success, _ = run_command(sql, params)
             if success:
                 st.success(f"Promotion '{add_name}' added successfully!")
@@ -67,17 +89,15 @@ st.divider()
 
 # --- Edit Existing Promotion ---
 st.subheader("Edit Existing Promotion")
-promo_list = run_query("SELECT PromotionID, PromotionName FROM Promotions ORDER BY PromotionName;")
-if not promo_list.empty:
-    promo_options = {f"{row['PromotionName']} (ID: {row['PromotionID']})": row['PromotionID'] for index, row in promo_list.iterrows()}
+if not promotions.empty:
+    promo_options = promotions.options('name_id', lambda df: df['PromotionName'] + " (ID: " + df['PromotionID'].astype(str) + ")")
     selected_promo_display = st.selectbox("Select Promotion to Edit", options=promo_options.keys())
 
     if selected_promo_display:
         selected_promo_id = promo_options[selected_promo_display]
-        current_promo_data = run_query("SELECT * FROM Promotions WHERE PromotionID = %s;", params=(selected_promo_id,))
+        promo = promotions.row(selected_promo_id)
 
-        if not current_promo_data.empty:
-            promo = current_promo_data.iloc[0]
+        if promo is not None:
             discount_type_index = ["PERCENT", "FIXED"].index(promo['DiscountType']) if promo['DiscountType'] in ["PERCENT", "FIXED"] else 0
 
             with st.form(f"edit_promo_{selected_promo_id}"):
@@ -88,7 +108,11 @@ if not promo_list.empty:
                 edit_value = st.number_input("Discount Value*", value=float(promo['DiscountValue']), min_value=0.0, step=0.01, format="%.2f")
                 edit_start_date = st.date_input("Start Date (Optional)", value=promo['StartDate']) # handles None okay
                 edit_end_date = st.date_input("End Date (Optional)", value=promo['EndDate'])
-                edit_points = st.number_input("Required Points (Optional)", value=promo['RequiredPoints'], min_value=0, step=10, placeholder="Leave blank if not point-based")
+                current_points = int(promo['RequiredPoints']) if pd.notna(promo['RequiredPoints']) else None # Float in a frame with NULLs
+                edit_points = st.number_input("Required Points (Optional)", value=current_points, min_value=0, step=10, placeholder="Leave blank if not point-based")
+                current_scope = scope_label(int(promo['ScopeProductID']) if pd.notna(promo['ScopeProductID']) else None,
+                                            promo['ScopeCategory'] if pd.notna(promo['ScopeCategory']) else None)
+                edit_scope = st.selectbox("Applies To", options=list(scope_options.keys()), index=list(scope_options.keys()).index(current_scope))
 
                 submitted_edit = st.form_submit_button("Update Promotion")
                 if submitted_edit:
@@ -99,14 +123,15 @@ if not promo_list.empty:
                         start_date_db = edit_start_date if edit_start_date else None
                         end_date_db = edit_end_date if edit_end_date else None
                         req_points_db = int(edit_points) if edit_points is not None and edit_points > 0 else None
+                        scope_product_db, scope_category_db = scope_options[edit_scope]
 
                         sql_update = """
                             UPDATE Promotions SET
                             PromotionName=%s, Description=%s, DiscountType=%s, DiscountValue=%s,
-                            StartDate=%s, EndDate=%s, RequiredPoints=%s
+                            StartDate=%s, EndDate=%s, RequiredPoints=%s, ScopeProductID=%s, ScopeCategory=%s
                             WHERE PromotionID=%s;
                         """
-                        params_update = (edit_name, edit_desc, edit_type, edit_value, start_date_db, end_date_db, req_points_db, selected_promo_id)
+                        params_update = (edit_name, edit_desc, edit_type, edit_value, start_date_db, end_date_db, req_points_db, scope_product_db, scope_category_db, selected_promo_id)
                         success, _ = run_command(sql_update, params_update)
                         if success:
                             st.success(f"Promotion '{edit_name}' updated successfully!")
@@ -118,8 +143,8 @@ st.divider()
 
 # --- Delete Existing Promotion ---
 st.subheader("Delete Existing Promotion")
-if not promo_list.empty:
-    promo_options_del = {f"{row['PromotionName']} (ID: {row['PromotionID']})": row['PromotionID'] for index, row in promo_list.iterrows()}
+if not promotions.empty:
+    promo_options_del = promo_options
     selected_promo_display_del = st.selectbox("Select Promotion to Delete", options=promo_options_del.keys(), key="delete_promo_select")
 
     if selected_promo_display_del:
@@ -128,7 +153,7 @@ if not promo_list.empty:
 
         if st.button(f"Confirm Delete Promotion: {promo_name_del}"):
             # Check AppliedPromotions (FK is RESTRICT)
-            applied_exist = run_query("SELECT COUNT(*) as count FROM AppliedPromotions WHERE PromotionID = %s;", params=(selected_promo_id_del,))
+            applied_exist = run_query("SELECT (SELECT COUNT(*) FROM AppliedPromotions WHERE PromotionID = %s) + (SELECT COUNT(*) FROM AppliedPromotionsArchive WHERE PromotionID = %s) as count;", params=(selected_promo_id_del, selected_promo_id_del))
             if applied_exist.iloc[0]['count'] > 0:
                 st.error(f"Cannot delete promotion. It has been applied to {applied_exist.iloc[0]['count']} order(s). (Deletion restricted by database constraint).")
             else:
@@ -139,4 +164,6 @@ if not promo_list.empty:
                     st.success(f"Promotion '{promo_name_del}' deleted successfully!")
                     st.rerun()
 else:
-    st.info("No promotions available to delete.")
\ No newline at end of file
+    st.info("No promotions available to delete.")
+
+finish_page_profile()
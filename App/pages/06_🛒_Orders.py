@@ -1,39 +1,77 @@
 # pages/06_Orders.py
 """
 Streamlit page for viewing past Orders and creating new ones
-using the sp_ProcessOrder stored procedure.
+using the sp_CheckoutOrder stored procedure (order, promotions and points in one transaction).
+Promotions are chosen automatically by the promotion engine (best non-conflicting combination).
 """
 
 import streamlit as st
 import pandas as pd
-from database import run_query, run_command, call_sp_process_order # Import database functions
+from database import get_reference_data, checkout_order, get_order_history_page, get_order_items_for_orders, get_product_catalog, get_promotion_index, get_loyalty_balances, export_order_history, ORDER_HISTORY_PAGE_SIZE # Import database functions
+from page_profiler import profile_page, finish_page_profile
+from cart import option_map
+from typeahead import customer_picker, product_picker
+from export_controls import export_controls
 import datetime
-from decimal import Decimal # Use Decimal for currency precision
 
 st.set_page_config(page_title="Order Management", layout="wide")
+profile_page() # Opt-in render profiler (COFFEE_PROFILE=1 or ?profile=1)
 st.title("🛒 Order Management") 
 
+# --- Reference data used by both tabs (shared snapshot; one version query per rerun) ---
+reference = get_reference_data()
+
 tab1, tab2 = st.tabs(["View Past Orders", "Create New Order"])
 
 # --- Tab 1: View Past Orders  ---
 with tab1:
     st.header("View Past Orders")
-    st.write("Displaying recent orders.")
-    query_orders = """
-        SELECT
-            o.OrderID, o.OrderTimestamp,
-            CONCAT(c.FirstName, ' ', c.LastName) AS CustomerName, c.CustomerID,
-            CONCAT(e.FirstName, ' ', e.LastName) AS EmployeeName,
-            s.StoreName,
-            o.TotalAmount, o.PointsEarned, o.PointsRedeemed
-        FROM Orders o
-        LEFT JOIN Customers c ON o.CustomerID = c.CustomerID
-        JOIN Employees e ON o.EmployeeID = e.EmployeeID
-        JOIN Stores s ON o.StoreID = s.StoreID
-        ORDER BY o.OrderTimestamp DESC
-        LIMIT 50;
-    """
-    df_orders = run_query(query_orders)
+
+    # --- History filters ---
+    store_filter_options = reference['Stores'].lookup('StoreName')
+    first_names, last_names = reference['Employees'].lookup('FirstName'), reference['Employees'].lookup('LastName')
+    employee_filter_options = {employee_id: f"{first_names[employee_id]} {last_names[employee_id]}" for employee_id in first_names}
+
+    f_col1, f_col2, f_col3, f_col4 = st.columns(4)
+    with f_col1:
+        history_store = st.selectbox("Store", options=list(store_filter_options.keys()), format_func=lambda x: store_filter_options.get(x, "Unknown"), index=None, placeholder="All stores", key="history_store")
+    with f_col2:
+        history_employee = st.selectbox("Employee", options=list(employee_filter_options.keys()), format_func=lambda x: employee_filter_options.get(x, "Unknown"), index=None, placeholder="All employees", key="history_employee")
+    with f_col3:
+        history_customer, _ = customer_picker("Customer", key="history_customer", placeholder="All customers")
+    with f_col4:
+        history_dates = st.date_input("Date range", value=(), key="history_dates")
+    history_start = history_dates[0] if len(history_dates) > 0 else None
+    history_end = history_dates[1] if len(history_dates) > 1 else None
+
+    # --- Keyset paging state: a stack of cursors, one per page visited (None = newest page) ---
+    history_filters = (history_store, history_employee, history_customer, history_start, history_end)
+    if st.session_state.get('order_history_filters') != history_filters:
+        st.session_state.order_history_filters = history_filters
+        st.session_state.order_history_cursors = [None]
+    cursors = st.session_state.order_history_cursors
+
+    df_orders, next_cursor = get_order_history_page(
+        before=cursors[-1], store_id=history_store, employee_id=history_employee,
+        customer_id=history_customer, start_date=history_start, end_date=history_end
+    )
+
+    nav_col1, nav_col2, nav_col3 = st.columns([1, 1, 4])
+    with nav_col1:
+        if st.button("⬅️ Newer", disabled=len(cursors) == 1, key="history_newer"):
+            cursors.pop()
+            st.rerun()
+    with nav_col2:
+        if st.button("Older ➡️", disabled=next_cursor is None, key="history_older"):
+            cursors.append(next_cursor)
+            st.rerun()
+    with nav_col3:
+        st.write(f"Page {len(cursors)} ({ORDER_HISTORY_PAGE_SIZE} orders per page, newest first)")
+
+    # Full filtered history, streamed to a file (not limited to the visible page)
+    export_controls(lambda fmt: export_order_history(fmt, history_store, history_employee, history_customer, history_start, history_end),
+                    key="history_export", label="Export history")
+
     if not df_orders.empty:
         st.dataframe(df_orders, hide_index=True, use_container_width=True, column_config={
              "TotalAmount": st.column_config.NumberColumn(format="$%.2f"),
@@ -42,15 +80,10 @@ with tab1:
         st.divider()
         st.subheader("View Order Details")
         order_ids = df_orders['OrderID'].tolist()
+        items_by_order = get_order_items_for_orders(order_ids) # One query for every order on this page
         selected_order_id = st.selectbox("Select OrderID to view items", options=order_ids, index=None, placeholder="Choose an Order ID...", key="view_order_items_select")
         if selected_order_id:
-             query_items = """
-                SELECT oi.OrderItemID, p.ProductName, oi.Quantity, oi.PriceAtTimeOfOrder
-                FROM OrderItems oi
-                JOIN Products p ON oi.ProductID = p.ProductID
-                WHERE oi.OrderID = %s;
-             """
-             df_items = run_query(query_items, params=(selected_order_id,))
+             df_items = items_by_order.get(int(selected_order_id), pd.DataFrame())
              if not df_items.empty:
                   st.write(f"Items for Order ID: {selected_order_id}")
                   st.dataframe(df_items, hide_index=True, use_container_width=True, column_config={
@@ -59,7 +92,7 @@ with tab1:
              else:
                   st.info("No items found for this order.")
     else:
-        st.info("No past orders found.")
+        st.info("No orders found for these filters.")
 
 
 # --- Tab 2: Create New Order ---
@@ -67,24 +100,14 @@ with tab2:
     st.header("Create New Order")
 
     # --- Fetch data for dropdowns (Run once at the start) ---
-    employees = run_query("SELECT EmployeeID, FirstName, LastName FROM Employees ORDER BY LastName, FirstName;")
-    stores = run_query("SELECT StoreID, StoreName FROM Stores ORDER BY StoreName;")
-    customers = run_query("SELECT CustomerID, FirstName, LastName, Email FROM Customers ORDER BY LastName, FirstName;")
-    products = run_query("SELECT ProductID, ProductName, Price, StockQuantity FROM Products ORDER BY ProductName;")
-
-    # --- Fetch Active Promotions ---
-    active_promos_query = "SELECT PromotionID, PromotionName, Description, DiscountType, DiscountValue FROM Promotions WHERE (StartDate IS NULL OR StartDate <= CURDATE()) AND (EndDate IS NULL OR EndDate >= CURDATE()) AND RequiredPoints IS NULL;"
-    df_active_promos = run_query(active_promos_query)
-    active_promo_options = {row['PromotionName']: row['PromotionID'] for index, row in df_active_promos.iterrows()} if not df_active_promos.empty else {}
-    active_promo_details = {row['PromotionID']: row for index, row in df_active_promos.iterrows()} if not df_active_promos.empty else {}
+    employees = reference['Employees']
+    stores = reference['Stores']
+    catalog = get_product_catalog(reference) # ProductID-indexed; rebuilt only when names/prices change, stock read per rerun
+    promotion_index = get_promotion_index(reference) # Compiled rule index; rebuilt only when Promotions changes
 
     # --- Create dictionaries for dropdowns ---
-    employee_options = {f"{row['LastName']}, {row['FirstName']} (ID: {row['EmployeeID']})": row['EmployeeID'] for index, row in employees.iterrows()} if not employees.empty else {}
-    store_options = {f"{row['StoreName']} (ID: {row['StoreID']})": row['StoreID'] for index, row in stores.iterrows()} if not stores.empty else {}
-    customer_options = {"Guest Order (No Customer)": None}
-    if not customers.empty:
-        customer_options.update({f"{row['LastName']}, {row['FirstName']} ({row['Email']})": row['CustomerID'] for index, row in customers.iterrows()})
-    product_options = {f"{row['ProductName']} (ID: {row['ProductID']}) - ${row['Price']:.2f}": row['ProductID'] for index, row in products.iterrows()} if not products.empty else {}
+    employee_options = employees.options('name_id', lambda df: df['LastName'] + ", " + df['FirstName'] + " (ID: " + df['EmployeeID'].astype(str) + ")")
+    store_options = stores.options('name_id', lambda df: df['StoreName'] + " (ID: " + df['StoreID'].astype(str) + ")")
 
     # --- Initialize session state ---
     if 'order_items' not in st.session_state: st.session_state.order_items = {}
@@ -94,43 +117,32 @@ with tab2:
     st.subheader("Build Order Items")
     st.markdown("Add products to the order:")
     col_item, col_qty, col_add_btn = st.columns([3, 1, 1])
-    with col_item: selected_product_display = st.selectbox("Select Product", options=product_options.keys(), index=None, placeholder="Choose a product...", key="add_product_select")
+    with col_item: prod_id_to_add, selected_product_display = product_picker("Select Product", key="add_product_select", placeholder="Choose a product...")
     with col_qty: add_qty = st.number_input("Quantity", min_value=1, step=1, value=1, key="add_qty_input")
     with col_add_btn:
         st.markdown("<br/>", unsafe_allow_html=True)
         add_button_clicked = st.button("Add Item", key="add_item_button")
     if add_button_clicked:
         if selected_product_display:
-            prod_id_to_add = product_options[selected_product_display]
-            prod_info_rows = products[products['ProductID'] == prod_id_to_add]
-            if not prod_info_rows.empty:
-                 prod_info = prod_info_rows.iloc[0]
-                 current_stock = prod_info['StockQuantity']
-                 current_qty_in_cart = st.session_state.order_items.get(prod_id_to_add, 0)
-                 if (current_qty_in_cart + add_qty) <= current_stock:
-                      st.session_state.order_items[prod_id_to_add] = current_qty_in_cart + add_qty
-                      st.success(f"Added {add_qty} x {prod_info['ProductName']}.")
-                 else: st.warning(f"Cannot add {add_qty}. Only {current_stock} in stock (and {current_qty_in_cart} already in cart). Max add: {current_stock - current_qty_in_cart}")
-            else: st.error("Product data not found (should not happen).") # error check
+            can_add, add_message = catalog.check_add(st.session_state.order_items, prod_id_to_add, add_qty)
+            if can_add:
+                 st.session_state.order_items[prod_id_to_add] = st.session_state.order_items.get(prod_id_to_add, 0) + add_qty
+                 st.success(add_message)
+            elif catalog.product(prod_id_to_add) is None: st.error(add_message) # error check
+            else: st.warning(add_message)
         else: st.warning("Please select a product to add.")
     st.markdown("---")
 
     # Display Current Items and Remove Item Section 
+    pricing = catalog.price_cart(st.session_state.order_items) # One join for the whole cart
     if st.session_state.order_items:
         st.write("**Current Items in Order:**")
-        items_list = []; total_sub = Decimal("0.00")
-        for prod_id, qty in st.session_state.order_items.items():
-             prod_info_rows = products[products['ProductID'] == prod_id]
-             if not prod_info_rows.empty:
-                 prod_info = prod_info_rows.iloc[0]
-                 price = Decimal(str(prod_info['Price'])); subtotal = qty * price
-                 items_list.append({"Product": prod_info['ProductName'], "ID": prod_id, "Qty": qty, "Price": price, "Subtotal": subtotal})
-                 total_sub += subtotal
-             else: items_list.append({"Product": f"Unknown (ID:{prod_id})", "ID": prod_id, "Qty": qty, "Price": Decimal("0.00"), "Subtotal": Decimal("0.00")})
-        st.dataframe(pd.DataFrame(items_list), hide_index=True, column_config={"Price": st.column_config.NumberColumn(format="$%.2f"),"Subtotal": st.column_config.NumberColumn(format="$%.2f")})
-        st.write(f"**Subtotal: ${total_sub:.2f}**")
+        st.dataframe(pricing.lines, hide_index=True, column_config={"Price": st.column_config.NumberColumn(format="$%.2f"),"Subtotal": st.column_config.NumberColumn(format="$%.2f")})
+        st.write(f"**Subtotal: ${pricing.subtotal:.2f}**")
+        for prod_id, prod_name, qty, stock in pricing.stock_problems:
+            st.warning(f"Only {stock} x {prod_name} left in stock (cart has {qty}).")
         st.markdown("Remove items from the order:")
-        remove_options = {f"{item['Product']} (Qty: {item['Qty']})": item['ID'] for item in items_list}
+        remove_options = option_map(pricing.lines['Product'] + " (Qty: " + pricing.lines['Qty'].astype(str) + ")", pricing.lines['ID'])
         selected_item_to_remove_display = st.selectbox("Select Item to Remove", options=remove_options.keys(), index=None, placeholder="Choose an item...", key="remove_item_select")
         remove_button_clicked = st.button("Remove Selected Item", key="remove_item_button")
         if remove_button_clicked:
@@ -151,8 +163,7 @@ with tab2:
         selected_employee_display = st.selectbox("Employee Processing Order*", options=employee_options.keys(), index=None, key="order_emp_select")
         selected_store_display = st.selectbox("Store Location*", options=store_options.keys(), index=None, key="order_store_select")
     with col2:
-        selected_customer_display = st.selectbox("Customer*", options=customer_options.keys(), index=0, key="order_cust_select")
-        customer_id = customer_options.get(selected_customer_display) # Get current customer ID
+        customer_id, selected_customer_display = customer_picker("Customer*", key="order_cust_select", guest_label="Guest Order (No Customer)") # Get current customer ID
 
         # --- Points Input ---
         # Tied to session state, enabled/disabled based on customer_id
@@ -163,17 +174,25 @@ with tab2:
             disabled=(customer_id is None), # Enable only if a customer is selected
         )
 
-    # --- Promotion Selection  ---
+        use_rewards = st.checkbox("Use point rewards", key="use_rewards_input", disabled=(customer_id is None),
+                                  help="Let rewards that cost loyalty points apply (on top of the points redeemed above)")
+
+    # --- Promotions (best combination for this cart) ---
+    points_to_redeem = int(st.session_state.points_redeem_input) if customer_id is not None else 0
+    points_available = 0
+    if use_rewards and customer_id is not None:
+        points_available = max(get_loyalty_balances([customer_id]).get(customer_id, 0) - points_to_redeem, 0)
+    promotions = promotion_index.evaluate(pricing.items, points_redeemed=points_to_redeem, points_available=points_available)
+    st.markdown("**Promotions**")
+    if promotions.applied:
+        st.dataframe(promotions.lines(), hide_index=True, column_config={"Discount": st.column_config.NumberColumn(format="-$%.2f")})
+        if promotions.points_spent: st.caption(f"Rewards use {promotions.points_spent} loyalty points.")
+    else:
+        st.info("No promotions apply to this order.")
+    st.write(f"**Estimated Total: ${promotions.total:.2f}**")
+
     # --- Final Submit Form ---
     with st.form("finalize_order_form"):
-        st.markdown("**Apply General Promotions (Optional)**")
-        selected_promo_names = st.multiselect(
-            "Select active promotions:",
-            options=active_promo_options.keys(),
-            key="promo_multiselect"
-        )
-
-        st.divider()
         # The SUBMIT button for the form
         submitted_order = st.form_submit_button("Process Order")
 
@@ -183,8 +202,7 @@ with tab2:
             employee_id = employee_options.get(selected_employee_display)
             store_id = store_options.get(selected_store_display)
             # customer_id already retrieved above
-            # Retrieve points from SESSION STATE as it's outside the form
-            points_to_redeem = int(st.session_state.points_redeem_input) if customer_id is not None else 0
+            # points_to_redeem and the promotions were computed above from the current inputs
 
             # Validation
             if not employee_id or not store_id:
@@ -192,61 +210,18 @@ with tab2:
             elif not st.session_state.order_items:
                 st.warning("Order must contain at least one item.")
             else:
-                items_string = ",".join([f"{pid}:{qty}" for pid, qty in st.session_state.order_items.items()])
-
-                # 1. Call SP
-                st.info("Processing base order and loyalty points...")
-                success_sp, new_order_id = call_sp_process_order(
-                    customer_id, employee_id, store_id, items_string, points_to_redeem
+                # Order, promotions and loyalty points are processed in one transaction
+                st.info("Processing order, promotions and loyalty points...")
+                success_checkout, summary = checkout_order(
+                    customer_id, employee_id, store_id, st.session_state.order_items, points_to_redeem, promotions.promotion_ids
                 )
 
-                if success_sp and new_order_id:
-                    st.success(f"Base order created (ID: {new_order_id}). Applying promotions...")
-                    total_promo_discount = Decimal("0.00")
-                    applied_promo_details_msg = []
-
-                    # 2. Apply selected general promotions (get promo details selected IN the form)
-                    selected_promo_ids = [active_promo_options[name] for name in selected_promo_names if name in active_promo_options]
-
-                    if selected_promo_ids:
-                        df_order_total = run_query("SELECT TotalAmount FROM Orders WHERE OrderID = %s", params=(new_order_id,))
-                        if not df_order_total.empty:
-                            order_total_before_promos = Decimal(str(df_order_total.iloc[0]['TotalAmount']))
-
-                            for promo_id in selected_promo_ids:
-                                if promo_id in active_promo_details:
-                                    promo_detail = active_promo_details[promo_id]
-                                    discount_this_promo = Decimal("0.00")
-                                    promo_type = promo_detail['DiscountType']
-                                    promo_value = Decimal(str(promo_detail['DiscountValue']))
-
-                                    if promo_type == 'PERCENT':
-                                        discount_this_promo = (order_total_before_promos * promo_value / Decimal("100.0")).quantize(Decimal("0.01"))
-                                    elif promo_type == 'FIXED':
-                                        discount_this_promo = promo_value
-
-                                    remaining_total = order_total_before_promos - total_promo_discount
-                                    discount_this_promo = min(discount_this_promo, remaining_total)
-
-                                    if discount_this_promo > 0:
-                                        applied_sql = "INSERT INTO AppliedPromotions (OrderID, PromotionID, DiscountAmountApplied) VALUES (%s, %s, %s);"
-                                        applied_params = (new_order_id, promo_id, float(discount_this_promo))
-                                        success_applied, _ = run_command(applied_sql, applied_params)
-                                        if success_applied:
-                                            total_promo_discount += discount_this_promo
-                                            applied_promo_details_msg.append(f"{promo_detail['PromotionName']}: -${discount_this_promo:.2f}")
-                                        else: st.error(f"Failed to apply promotion '{promo_detail['PromotionName']}'.")
-                                else: st.warning(f"Details not found for promo ID {promo_id}. Skipping.")
-
-                            if total_promo_discount > 0:
-                                st.info(f"Updating final total with promotion discount: ${total_promo_discount:.2f}")
-                                update_total_sql = "UPDATE Orders SET TotalAmount = TotalAmount - %s WHERE OrderID = %s;"
-                                update_params = (float(total_promo_discount), new_order_id)
-                                success_update, _ = run_command(update_total_sql, update_params)
-                                if not success_update: st.error("Failed to update final order total.")
-
+                if success_checkout and summary:
                     # Final success message
-                    final_message = f"Order Processed Successfully! New Order ID: {new_order_id}."
+                    final_message = f"Order Processed Successfully! New Order ID: {summary['OrderID']}. Total: ${summary['TotalAmount']:.2f}"
+                    if customer_id is not None: final_message += f", points earned: {summary['PointsEarned']}"
+                    final_message += "."
+                    applied_promo_details_msg = [f"{promo['PromotionName']}: -${promo['DiscountAmountApplied']:.2f}" for promo in summary['AppliedPromotions']]
                     if applied_promo_details_msg: final_message += " Promotions applied: " + ", ".join(applied_promo_details_msg)
                     st.success(final_message)
 
@@ -255,4 +230,6 @@ with tab2:
                     st.rerun()
 
                 else:
-                    st.error("Failed to process base order. See error message above if available.")
\ No newline at end of file
+                    st.error("Failed to process order. See error message above if available.")
+
+finish_page_profile()
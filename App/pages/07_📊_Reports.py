@@ -5,31 +5,56 @@ Streamlit page for displaying various aggregated reports.
 
 import streamlit as st
 import pandas as pd
-from database import run_query
+from database import run_queries_concurrently, rebuild_sales_summaries, check_sales_summaries, get_sales_rollup, refresh_sales_rollup, sales_rollup_query, export_query, get_order_archive_boundary, archive_orders, ARCHIVE_CONFIG, get_reorder_report, reorder_report_query, refresh_product_sales, REORDER_CONFIG, register_statement, loyalty_ledger_mode
+from page_profiler import profile_page, finish_page_profile
+from export_controls import export_controls
+import datetime
 
 st.set_page_config(page_title="Reports", layout="wide")
+profile_page() # Opt-in render profiler (COFFEE_PROFILE=1 or ?profile=1)
 st.title("📊 Reports Dashboard") 
 st.write("View aggregated data and performance metrics.")
 
 st.divider()
 
+# --- Report Queries ---
+# Reads the incrementally maintained summaries (indexed on TotalRevenue / TotalSpent) instead of the views
+query_all_products = """
+SELECT p.ProductName, p.Category, s.TotalQuantitySold, s.TotalRevenue
+FROM ProductSalesSummary s
+JOIN Products p ON p.ProductID = s.ProductID
+ORDER BY s.TotalRevenue DESC
+"""
+query_all_customers = """
+SELECT c.FirstName, c.LastName, c.Email, s.TotalOrders, s.TotalSpent
+FROM CustomerOrderSummary s
+JOIN Customers c ON c.CustomerID = s.CustomerID
+ORDER BY s.TotalSpent DESC
+"""
+
+# The reports don't depend on each other or on any widget, so fetch them in parallel
+# (the monthly summary and the reorder forecast wait for their filters below).
+# In ledger mode evt_CompactLoyaltyLedger updates CustomerOrderSummary outside run_command, so
+# nothing would invalidate a cached top-customers result; read it fresh then.
+report_data = run_queries_concurrently({
+    'top_products': register_statement('reports.top_products', query_all_products + "LIMIT 10;"),
+    'stores': register_statement('reports.stores', "SELECT StoreID, StoreName FROM Stores ORDER BY StoreName;"),
+    'top_customers': (register_statement('reports.top_customers', query_all_customers + "LIMIT 10;"), None,
+                      not loyalty_ledger_mode()),
+})
+
 # --- Report 1: Top Selling Products ---
 st.subheader("Top Selling Products (by Revenue)")
 try:
-    # Query already sorts by revenue descending
-    query_top_prod = """
-    SELECT ProductName, Category, TotalQuantitySold, TotalRevenue
-    FROM vw_ProductSalesPerformance
-    ORDER BY TotalRevenue DESC
-    LIMIT 10;
-    """
-    df_top_products = run_query(query_top_prod)
+    df_top_products = report_data['top_products']
     if not df_top_products.empty:
         st.dataframe(df_top_products, hide_index=True, use_container_width=True, column_config={
             "TotalRevenue": st.column_config.NumberColumn(format="$%.2f")
         })
         # Bar chart - data is passed sorted by revenue DESC
         st.bar_chart(df_top_products.set_index('ProductName')['TotalRevenue'])
+        # Export covers every product, not just the top 10
+        export_controls(lambda fmt: export_query(query_all_products, None, fmt, name="product_sales"), key="export_top_products")
     else:
         st.info("No product performance data found.")
 except Exception as e:
@@ -41,17 +66,22 @@ st.divider()
 # --- Report 2: Monthly Sales Summary ---
 st.subheader("Monthly Sales Summary")
 try:
-    query_monthly = """
-    SELECT
-        DATE_FORMAT(OrderTimestamp, '%Y-%m') AS SaleMonth,
-        COUNT(OrderID) AS NumberOfOrders,
-        SUM(TotalAmount) AS MonthlyRevenue
-    FROM Orders
-    GROUP BY SaleMonth
-    ORDER BY SaleMonth DESC;
-    """
-    df_monthly = run_query(query_monthly)
+    # Answered from the DailyStoreSales rollup (day x store), so history size doesn't matter
+    stores = report_data['stores']
+    store_filter_options = {"All Stores": None}
+    if not stores.empty:
+        store_filter_options.update({f"{row['StoreName']} (ID: {row['StoreID']})": row['StoreID'] for index, row in stores.iterrows()})
+    col_store, col_range = st.columns(2)
+    with col_store:
+        selected_store_display = st.selectbox("Store", options=store_filter_options.keys(), key="monthly_store_filter")
+    with col_range:
+        date_range = st.date_input("Date Range (Optional)", value=(), key="monthly_date_range")
+    start_date = date_range[0] if len(date_range) > 0 else None
+    end_date = date_range[1] if len(date_range) > 1 else None
+
+    df_monthly = get_sales_rollup('month', start_date, end_date, store_filter_options[selected_store_display])
     if not df_monthly.empty:
+         df_monthly = df_monthly.rename(columns={"Period": "SaleMonth", "Revenue": "MonthlyRevenue"})
          st.dataframe(df_monthly, hide_index=True, use_container_width=True, column_config={
              "MonthlyRevenue": st.column_config.NumberColumn(format="$%.2f")
          })
@@ -59,6 +89,8 @@ try:
          df_monthly_chart = df_monthly.set_index('SaleMonth')
          df_monthly_chart = df_monthly_chart.sort_index(ascending=True) # Sort index for chart
          st.bar_chart(df_monthly_chart['MonthlyRevenue'])
+         monthly_query, monthly_params = sales_rollup_query('month', start_date, end_date, store_filter_options[selected_store_display])
+         export_controls(lambda fmt: export_query(monthly_query, monthly_params, fmt, name="monthly_sales"), key="export_monthly_sales")
     else:
          st.info("No monthly sales data found.")
 except Exception as e:
@@ -69,19 +101,15 @@ st.divider()
 # --- Report 3: Top Customers ---
 st.subheader("Top Customers (by Total Spent)")
 try:
-    query_top_cust = """
-    SELECT FirstName, LastName, Email, TotalOrders, TotalSpent
-    FROM vw_CustomerOrderSummary
-    ORDER BY TotalSpent DESC
-    LIMIT 10;
-    """
-    df_top_cust = run_query(query_top_cust)
+    df_top_cust = report_data['top_customers']
     if not df_top_cust.empty:
         st.dataframe(df_top_cust, hide_index=True, use_container_width=True, column_config={
              "TotalSpent": st.column_config.NumberColumn(format="$%.2f")
          })
         df_top_cust = df_top_cust.sort_values(by='TotalSpent', ascending=False)
         st.bar_chart(df_top_cust.set_index('Email')['TotalSpent']) # Using Email as unique index
+        # Export covers every customer, not just the top 10
+        export_controls(lambda fmt: export_query(query_all_customers, None, fmt, name="customer_spending"), key="export_top_customers")
     else:
         st.info("No top customer data found.")
 except Exception as e:
@@ -90,15 +118,84 @@ except Exception as e:
 
 st.divider()
 
-# --- Report 4: Low Stock Items ---
-st.subheader("Low Stock Alert (Items <= 10)")
+# --- Report 4: Reorder Forecast ---
+st.subheader("Reorder Forecast (by Days of Cover)")
 try:
-    low_stock_threshold = 10
-    query_low_stock = "SELECT ProductID, ProductName, Category, StockQuantity FROM Products WHERE StockQuantity <= %s ORDER BY StockQuantity ASC;"
-    df_low_stock = run_query(query_low_stock, params=(low_stock_threshold,))
-    if not df_low_stock.empty:
-        st.dataframe(df_low_stock, hide_index=True, use_container_width=True)
+    # Velocity comes from the DailyProductSales rollup (day x store x product), a few weeks of rows
+    windows = sorted(REORDER_CONFIG['windows'])
+    st.caption(f"Daily rate is the faster of the last {' and '.join(str(days) for days in windows)} days' sales. "
+               f"Reorder quantities top stock up to {REORDER_CONFIG['target_cover_days']} days of cover. "
+               "Stock is shared by all stores; a store filter uses only that store's sales.")
+    reorder_store_options = {"All Stores": None}
+    if not report_data['stores'].empty:
+        reorder_store_options.update({f"{row['StoreName']} (ID: {row['StoreID']})": row['StoreID'] for index, row in report_data['stores'].iterrows()})
+    selected_reorder_store = st.selectbox("Store", options=reorder_store_options.keys(), key="reorder_store_filter")
+    reorder_store_id = reorder_store_options[selected_reorder_store]
+
+    df_reorder = get_reorder_report(reorder_store_id, limit=REORDER_CONFIG['report_rows'])
+    if not df_reorder.empty:
+        lead_time = REORDER_CONFIG['lead_time_days']
+        due = df_reorder['DaysOfCover'].notna() & (df_reorder['DaysOfCover'] < lead_time)
+        if due.any():
+            st.warning(f"{int(due.sum())} product(s) have less than {lead_time} days of cover.")
+        st.dataframe(df_reorder, hide_index=True, use_container_width=True, column_config={
+            "DailyRate": st.column_config.NumberColumn("Units/Day", format="%.2f"),
+            "DaysOfCover": st.column_config.NumberColumn("Days of Cover", format="%.1f"),
+        })
+        # Export covers every product, not just the first rows
+        reorder_query, reorder_params = reorder_report_query(reorder_store_id)
+        export_controls(lambda fmt: export_query(reorder_query, reorder_params, fmt, name="reorder_forecast"), key="export_reorder")
     else:
-        st.info(f"No products found with stock at or below {low_stock_threshold}.")
+        st.info("No products found.")
 except Exception as e:
-    st.error(f"Error loading low stock report: {e}")
\ No newline at end of file
+    st.error(f"Error loading reorder forecast: {e}")
+
+st.divider()
+
+# --- Summary Table Maintenance ---
+with st.expander("Summary Table Maintenance"):
+    st.write("Top Products and Top Customers read from summary tables that triggers keep up to date. "
+             "Check them against the views, or rebuild them from the full order history.")
+    col_check, col_rebuild = st.columns(2)
+    with col_check:
+        if st.button("Check Consistency", key="check_summaries_button"):
+            df_drift = check_sales_summaries()
+            if df_drift.empty:
+                st.success("Summary tables match vw_ProductSalesPerformance and vw_CustomerOrderSummary.")
+            else:
+                st.warning(f"{len(df_drift)} summary row(s) differ from the views. Rebuild to fix.")
+                st.dataframe(df_drift, hide_index=True, use_container_width=True)
+    with col_rebuild:
+        if st.button("Rebuild Summaries", key="rebuild_summaries_button"):
+            if rebuild_sales_summaries():
+                st.success("Summary tables rebuilt.")
+    st.write("Recompute the daily sales rollup behind the Monthly Sales Summary for a date range.")
+    refresh_range = st.date_input("Rollup Date Range", value=(datetime.date.today().replace(day=1), datetime.date.today()), key="rollup_refresh_range")
+    if st.button("Refresh Sales Rollup", key="refresh_rollup_button"):
+        if len(refresh_range) == 2 and refresh_sales_rollup(refresh_range[0], refresh_range[1]):
+            st.success(f"Sales rollup refreshed for {refresh_range[0]} to {refresh_range[1]}.")
+        elif len(refresh_range) != 2:
+            st.warning("Please select a start and end date.")
+    st.write("Recompute the per-product daily sales behind the Reorder Forecast for a date range.")
+    velocity_range = st.date_input("Velocity Date Range", value=(datetime.date.today() - datetime.timedelta(days=max(REORDER_CONFIG['windows'])), datetime.date.today()), key="velocity_refresh_range")
+    if st.button("Refresh Product Sales", key="refresh_velocity_button"):
+        if len(velocity_range) == 2 and refresh_product_sales(velocity_range[0], velocity_range[1]):
+            st.success(f"Product sales refreshed for {velocity_range[0]} to {velocity_range[1]}.")
+        elif len(velocity_range) != 2:
+            st.warning("Please select a start and end date.")
+
+# --- Order Archive ---
+with st.expander("Order Archive"):
+    st.write("Closed months of order history can be moved from Orders/OrderItems to compressed archive tables. "
+             "Order history only reads the archive for date ranges that reach back that far, and the reports "
+             "and summaries still include archived orders.")
+    archive_boundary = get_order_archive_boundary()
+    st.write(f"Orders before **{archive_boundary}** are archived." if archive_boundary else "Nothing has been archived yet.")
+    keep_months = st.number_input("Closed months to keep in the hot tables", min_value=0, max_value=120,
+                                  value=ARCHIVE_CONFIG['keep_months'], step=1, key="archive_keep_months")
+    if st.button("Archive Old Orders", key="archive_orders_button"):
+        success, archived = archive_orders(int(keep_months))
+        if success:
+            st.success(f"Archived {archived} order(s).")
+
+finish_page_profile()
@@ -0,0 +1,103 @@
+# pages/08_Query_Insights.py
+"""
+Streamlit admin page for the query instrumentation: slowest calls, most frequent statements,
+DB cost per page rerun and N+1 patterns, from the in-process query log.
+"""
+
+import json
+
+import streamlit as st
+import pandas as pd
+from database import get_query_log, get_pool_stats, QUERY_LOG_CONFIG
+from page_profiler import profile_page, finish_page_profile
+from query_log import slowest, by_fingerprint, by_page, by_rerun, n_plus_one
+
+st.set_page_config(page_title="Query Insights", layout="wide")
+profile_page() # Opt-in render profiler (COFFEE_PROFILE=1 or ?profile=1)
+st.title("🔎 Query Insights")
+st.write("Every database call made by this app process since it started (most recent "
+         f"{QUERY_LOG_CONFIG['capacity']:,} kept). Use the app in another tab, then refresh this page.")
+
+query_log = get_query_log()
+# This page only reads the buffer, so its own reruns don't show up in it
+events = query_log.events()
+
+col_events, col_total, col_pool, col_file = st.columns(4)
+col_events.metric("Calls in Buffer", f"{len(events):,}")
+col_total.metric("Calls Recorded", f"{query_log.total_recorded:,}")
+pool_stats = get_pool_stats()
+col_pool.metric("Pool Connections In Use", f"{pool_stats['in_use']} / {pool_stats['max_size']}")
+col_file.metric("JSON-Lines Export", "On" if QUERY_LOG_CONFIG['jsonl_path'] else "Off",
+                help=QUERY_LOG_CONFIG['jsonl_path'] or "Set COFFEE_QUERY_LOG=/path/to/file.jsonl to enable")
+
+if not QUERY_LOG_CONFIG['enabled']:
+    st.warning("Query instrumentation is disabled (QUERY_LOG_CONFIG['enabled'] in database.py).")
+if not events:
+    st.info("No database calls recorded yet.")
+    st.stop()
+
+pages = sorted({e['page'] for e in events if e['page']})
+page_filter = st.selectbox("Page", options=["All Pages"] + pages, key="insights_page_filter")
+if page_filter != "All Pages":
+    events = [e for e in events if e['page'] == page_filter]
+
+st.divider()
+
+# --- Cost Per Page ---
+st.subheader("DB Cost Per Page Rerun")
+df_pages = pd.DataFrame(by_page(events))
+if not df_pages.empty:
+    st.dataframe(df_pages, hide_index=True, use_container_width=True, column_config={
+        "mean_db_ms": st.column_config.NumberColumn("Mean DB ms / Rerun", format="%.1f"),
+        "max_db_ms": st.column_config.NumberColumn("Max DB ms / Rerun", format="%.1f"),
+    })
+    st.bar_chart(df_pages.set_index('page')['mean_db_ms'])
+else:
+    st.info("No calls attributed to a page yet.")
+
+with st.expander("Recent Reruns"):
+    st.dataframe(pd.DataFrame(by_rerun(events)[:100]), hide_index=True, use_container_width=True)
+
+st.divider()
+
+# --- Slowest Calls ---
+st.subheader("Slowest Calls")
+df_slowest = pd.DataFrame(slowest(events, limit=25))
+if not df_slowest.empty:
+    df_slowest['ts'] = pd.to_datetime(df_slowest['ts'], unit='s')
+    st.dataframe(df_slowest[['ts', 'page', 'kind', 'ms', 'rows', 'bytes', 'param_shape', 'error', 'fingerprint']],
+                 hide_index=True, use_container_width=True)
+
+st.divider()
+
+# --- Most Frequent Statements ---
+st.subheader("Most Frequent Statements")
+df_frequent = pd.DataFrame(by_fingerprint(events))
+sort_by = st.radio("Sort by", options=["calls", "total_ms", "p95_ms", "bytes"], horizontal=True, key="insights_sort")
+st.dataframe(df_frequent.sort_values(sort_by, ascending=False), hide_index=True, use_container_width=True)
+
+st.divider()
+
+# --- N+1 Patterns ---
+st.subheader("N+1 Patterns")
+min_repeats = st.number_input("Flag a statement run at least this many times in one rerun", min_value=2, value=5, step=1)
+df_n_plus_one = pd.DataFrame(n_plus_one(events, min_repeats=int(min_repeats)))
+if not df_n_plus_one.empty:
+    st.warning("These statements run once per row inside a loop; one IN (...) or JOIN query could replace each group.")
+    st.dataframe(df_n_plus_one, hide_index=True, use_container_width=True)
+else:
+    st.success("No N+1 patterns found.")
+
+st.divider()
+
+# --- Export / Reset ---
+col_download, col_clear = st.columns(2)
+with col_download:
+    st.download_button("Download Buffer (JSON Lines)", data="\n".join(json.dumps(e, default=str) for e in query_log.events()),
+                       file_name="query_log.jsonl", mime="application/json")
+with col_clear:
+    if st.button("Clear Buffer", key="clear_query_log"):
+        query_log.clear()
+        st.rerun()
+
+finish_page_profile()
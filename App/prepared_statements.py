@@ -0,0 +1,173 @@
+# prepared_statements.py
+"""
+Named registry of hot statements and server-side prepared statements for them.
+A registered statement is parsed by MySQL once per pooled connection (PREPARE) and then run with
+EXECUTE ... USING, its parameters bound through session variables. PyMySQL only speaks the text
+protocol, so this uses SQL-level PREPARE/EXECUTE rather than COM_STMT_PREPARE; the server keeps the
+parsed statement either way. Handles live as long as the MySQL session: a reconnect (new thread
+id) or a server-side "unknown handler" error drops them and they are prepared again.
+Unregistered SQL, dict parameters and statements MySQL refuses to prepare take the normal path.
+"""
+
+import re
+import threading
+import weakref
+from collections import OrderedDict
+
+import pymysql
+
+ER_PARSE_ERROR = 1064
+ER_UNKNOWN_STMT_HANDLER = 1243 # Session lost its prepared statements (e.g. after a reconnect)
+ER_UNSUPPORTED_PS = 1295       # Statement type can't be prepared
+UNPREPARABLE_ERROR_CODES = {ER_PARSE_ERROR, ER_UNSUPPORTED_PS}
+
+_PLACEHOLDER_RE = re.compile(r'%(s|%)')
+
+
+def to_prepared_sql(sql, interpolated=True):
+    """
+    (text for PREPARE, placeholder count): %s becomes ? and %% becomes %, as PyMySQL would
+    interpolate them (only when parameters are passed, hence `interpolated`); the trailing ; goes.
+    """
+    sql = sql.strip().rstrip(';').rstrip()
+    if not interpolated:
+        return sql, 0
+    count = 0
+    def replace(match):
+        nonlocal count
+        if match.group(1) == 's':
+            count += 1
+            return '?'
+        return '%'
+    return _PLACEHOLDER_RE.sub(replace, sql), count
+
+
+class StatementRegistry:
+    """
+    Thread-safe {SQL text: name} of the statements worth preparing, plus the per-connection
+    handles. Builders that produce several variants register each text under one name.
+    """
+
+    def __init__(self, max_statements=512, max_per_connection=64):
+        self.max_statements = max_statements
+        self.max_per_connection = max_per_connection
+        self._lock = threading.Lock()
+        self._names = {}          # SQL text -> name
+        self._unpreparable = set() # SQL texts MySQL refused to prepare
+        self._connections = weakref.WeakKeyDictionary() # Connection -> ConnectionStatements
+
+    def register(self, name, sql):
+        """Registers `sql` under `name` (ignored once the registry is full) and returns `sql`."""
+        with self._lock:
+            if sql in self._names or len(self._names) < self.max_statements:
+                self._names[sql] = name
+        return sql
+
+    def name_for(self, sql):
+        """Name of a registered, preparable statement, or None."""
+        name = self._names.get(sql)
+        return None if name is None or sql in self._unpreparable else name
+
+    def name_of(self, sql):
+        """Name `sql` was registered under (preparable or not), or None."""
+        return self._names.get(sql)
+
+    def names(self):
+        """{name: number of registered variants}."""
+        with self._lock:
+            counts = {}
+            for name in self._names.values():
+                counts[name] = counts.get(name, 0) + 1
+            return counts
+
+    def mark_unpreparable(self, sql):
+        with self._lock:
+            self._unpreparable.add(sql)
+
+    def for_connection(self, conn):
+        """The ConnectionStatements of a connection, created on first use."""
+        with self._lock:
+            statements = self._connections.get(conn)
+            if statements is None:
+                statements = self._connections[conn] = ConnectionStatements(self.max_per_connection)
+            return statements
+
+    def execute(self, cursor, sql, params=None):
+        """
+        Runs a registered statement through its prepared handle on the cursor's connection.
+        Returns False, having run nothing, when the statement has to take the normal path.
+        """
+        if self.name_for(sql) is None or not (params is None or isinstance(params, (tuple, list))):
+            return False
+        statements = self.for_connection(cursor.connection)
+        try:
+            return statements.execute(cursor, sql, params)
+        except pymysql.MySQLError as e:
+            if e.args and e.args[0] == ER_UNKNOWN_STMT_HANDLER:
+                statements.reset()
+                return statements.execute(cursor, sql, params)
+            raise
+        except _Unpreparable:
+            self.mark_unpreparable(sql)
+            return False
+
+
+class _Unpreparable(Exception):
+    """PREPARE failed for a reason that won't go away (syntax MySQL can't prepare, wrong placeholder count)."""
+
+
+class ConnectionStatements:
+    """Prepared handles of one MySQL session, least recently used deallocated first."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._handles = OrderedDict() # SQL text -> (handle name, placeholder count)
+        self._counter = 0
+        self._thread_id = None
+        self.stats = {'prepared': 0, 'executed': 0, 'deallocated': 0, 'resets': 0}
+
+    def reset(self):
+        """Forgets every handle (the session that held them is gone)."""
+        self._handles.clear()
+        self.stats['resets'] += 1
+
+    def _handle(self, cursor, sql, params):
+        conn = cursor.connection
+        thread_id = conn.thread_id()
+        if thread_id != self._thread_id: # Reconnected: the old session's handles went with it
+            if self._thread_id is not None:
+                self.reset()
+            self._thread_id = thread_id
+        entry = self._handles.get(sql)
+        if entry is not None:
+            self._handles.move_to_end(sql)
+            return entry
+        prepared_sql, count = to_prepared_sql(sql, params is not None)
+        if count != len(params or ()):
+            raise _Unpreparable(sql)
+        self._counter += 1
+        name = f"coffee_ps_{self._counter}"
+        try:
+            cursor.execute(f"PREPARE {name} FROM %s;", (prepared_sql,))
+        except pymysql.MySQLError as e:
+            if e.args and e.args[0] in UNPREPARABLE_ERROR_CODES:
+                raise _Unpreparable(sql) from e
+            raise
+        self._handles[sql] = entry = (name, count)
+        self.stats['prepared'] += 1
+        if len(self._handles) > self.capacity:
+            _, (old_name, _) = self._handles.popitem(last=False)
+            cursor.execute(f"DEALLOCATE PREPARE {old_name};")
+            self.stats['deallocated'] += 1
+        return entry
+
+    def execute(self, cursor, sql, params):
+        name, count = self._handle(cursor, sql, params)
+        if count:
+            variables = [f"@_ps_{i}" for i in range(count)]
+            cursor.execute("SET " + ", ".join(f"{variable} = %s" for variable in variables) + ";", tuple(params))
+            cursor.execute(f"EXECUTE {name} USING {', '.join(variables)};")
+        else:
+            cursor.execute(f"EXECUTE {name};")
+        self.stats['executed'] += 1
+        return True
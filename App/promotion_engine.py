@@ -0,0 +1,231 @@
+# promotion_engine.py
+"""
+Promotion evaluation for the Create New Order tab.
+Promotions are compiled once per Promotions version into a PromotionIndex: one segment per
+date range between start/end dates, each mapping ProductID and Category to the item promotions
+that can touch a cart line, plus the order-wide ones. Evaluating a cart looks up only its lines'
+rules and returns the best combination that respects:
+  * a cart line gets at most one item promotion (ScopeProductID or ScopeCategory set),
+  * an order gets at most one order-wide promotion,
+  * point rewards (RequiredPoints set) don't count toward the order-wide limit, but their
+    points must fit in what the customer makes available.
+sp_CheckoutOrder rejects promotion lists that break the first two rules or repeat an ID.
+Discounts are integer cents computed exactly as sp_CheckoutOrder does (migration V006), so the
+preview matches what checkout records.
+"""
+
+import bisect
+import datetime
+from itertools import chain
+
+import pandas as pd
+
+from cart import to_cents, from_cents
+
+EXACT_SEARCH_LIMIT = 16 # More candidate promotions than this are combined greedily
+
+
+def _round_half_up(numerator, denominator):
+    """numerator / denominator rounded half up, like MySQL ROUND(x, 2) on a non-negative DECIMAL."""
+    return (2 * numerator + denominator) // (2 * denominator)
+
+def _none_if_null(value):
+    return None if value is None or pd.isna(value) else value
+
+def _as_date(value):
+    value = _none_if_null(value)
+    if value is None or type(value) is datetime.date:
+        return value
+    return pd.Timestamp(value).date() # datetime / Timestamp / ISO string
+
+
+class PromotionRule:
+    """One Promotions row. DiscountValue is held in hundredths (cents, or 1/100 of a percent)."""
+
+    def __init__(self, row):
+        self.promotion_id = int(row['PromotionID'])
+        self.name = row['PromotionName']
+        self.percent = row['DiscountType'] == 'PERCENT'
+        self.value = to_cents(row['DiscountValue'])
+        self.start = _as_date(row['StartDate'])
+        self.end = _as_date(row['EndDate'])
+        points = _none_if_null(row['RequiredPoints'])
+        self.required_points = int(points) if points else None
+        product_id = _none_if_null(row.get('ScopeProductID'))
+        self.product_id = int(product_id) if product_id is not None else None
+        self.category = _none_if_null(row.get('ScopeCategory')) if self.product_id is None else None
+
+    @property
+    def item_scoped(self):
+        return self.product_id is not None or self.category is not None
+
+    def active_on(self, day):
+        return (self.start is None or self.start <= day) and (self.end is None or self.end >= day)
+
+    def discount(self, base_cents, matched_cents=0, matched_qty=0):
+        """
+        Uncapped discount in cents (sp_CheckoutOrder's RawDiscount). Order-wide rules apply to
+        base_cents (total after points); item rules to the matching lines' subtotal, with FIXED
+        taken off each matching unit.
+        """
+        if not self.item_scoped:
+            return _round_half_up(base_cents * self.value, 10000) if self.percent else self.value
+        if self.percent:
+            return _round_half_up(matched_cents * self.value, 10000)
+        return min(self.value * matched_qty, matched_cents)
+
+
+class PromotionResult:
+    """Promotions chosen for one cart, in the order checkout applies them."""
+
+    def __init__(self, applied, base_cents, points_spent):
+        self.applied = applied           # [(PromotionID, PromotionName, discount in cents)]
+        self.base_cents = base_cents     # Total after points; the discounts never exceed it
+        self.points_spent = points_spent # RequiredPoints of the chosen rewards
+
+    @property
+    def promotion_ids(self):
+        return [promotion_id for promotion_id, _, _ in self.applied]
+
+    @property
+    def discount(self):
+        return from_cents(sum(cents for _, _, cents in self.applied))
+
+    @property
+    def total(self):
+        return from_cents(self.base_cents) - self.discount
+
+    def lines(self):
+        """DataFrame of (Promotion, Discount) for display."""
+        return pd.DataFrame({'Promotion': [name for _, name, _ in self.applied],
+                             'Discount': [from_cents(cents) for _, _, cents in self.applied]})
+
+
+class _Segment:
+    """Rules active over one date range, keyed for cart lookups."""
+
+    __slots__ = ('order_rules', 'by_product', 'by_category')
+
+    def __init__(self, rules):
+        self.order_rules = [rule for rule in rules if not rule.item_scoped]
+        self.by_product, self.by_category = {}, {}
+        for rule in rules:
+            if rule.product_id is not None:
+                self.by_product.setdefault(rule.product_id, []).append(rule)
+            elif rule.category is not None:
+                self.by_category.setdefault(rule.category, []).append(rule)
+
+
+class PromotionIndex:
+    """
+    Immutable rule index for one Promotions version.
+    Built from a DataFrame with PromotionID, PromotionName, DiscountType, DiscountValue,
+    StartDate, EndDate, RequiredPoints, ScopeProductID and ScopeCategory.
+    """
+
+    def __init__(self, promotions, version=None):
+        self.version = version
+        rules = [PromotionRule(row) for row in promotions.to_dict('records')]
+        self.rules = {rule.promotion_id: rule for rule in rules}
+
+        # Segment boundaries: every start date and the day after every end date
+        bounds = {rule.start for rule in rules if rule.start is not None}
+        bounds |= {rule.end + datetime.timedelta(days=1) for rule in rules
+                   if rule.end is not None and rule.end < datetime.date.max}
+        self._starts = [datetime.date.min] + sorted(bounds - {datetime.date.min})
+        self._segments = [_Segment([rule for rule in rules if rule.active_on(day)]) for day in self._starts]
+
+    def __len__(self):
+        return len(self.rules)
+
+    def _segment(self, day):
+        return self._segments[bisect.bisect_right(self._starts, day) - 1]
+
+    def evaluate(self, items, on_date=None, points_redeemed=0, points_available=0):
+        """
+        Best promotions for a cart on `on_date` (default today).
+        items: [(ProductID, Category, Qty, price in cents)] as in CartPricing.items.
+        points_redeemed: points taken off the total before promotions (100 points = $1).
+        points_available: points rewards may spend (0 = no rewards).
+        """
+        segment = self._segment(on_date or datetime.date.today())
+        base_cents = max(sum(qty * price for _, _, qty, price in items) - int(points_redeemed), 0)
+        if base_cents == 0:
+            return PromotionResult([], base_cents, 0)
+
+        # One pass over the lines: subtotal, quantity and products each item rule matches
+        matched = {}
+        for product_id, category, qty, price in items:
+            for rule in chain(segment.by_product.get(product_id, ()), segment.by_category.get(category, ())):
+                entry = matched.setdefault(rule, [0, 0, set()])
+                entry[0] += qty * price
+                entry[1] += qty
+                entry[2].add(product_id)
+
+        candidates = [(rule, rule.discount(base_cents, cents, qty), frozenset(products))
+                      for rule, (cents, qty, products) in matched.items()]
+        candidates += [(rule, rule.discount(base_cents), None) for rule in segment.order_rules]
+        candidates = [c for c in candidates if c[1] > 0 and (c[0].required_points or 0) <= points_available]
+        candidates.sort(key=lambda c: (-c[1], c[0].promotion_id))
+
+        chosen = _best_combination(candidates, base_cents, int(points_available))
+
+        # Cap each discount by what the ones before it left of the total, as checkout does
+        applied, running = [], 0
+        for rule, raw in chosen:
+            cents = min(base_cents, running + raw) - min(base_cents, running)
+            running += raw
+            if cents > 0:
+                applied.append((rule.promotion_id, rule.name, cents))
+        points_spent = sum(rule.required_points or 0 for rule, _ in chosen)
+        return PromotionResult(applied, base_cents, points_spent)
+
+
+def _fits(rule, products, claimed, order_used, points_left):
+    """Whether a candidate can join a combination without breaking the rules in the module docstring."""
+    if (rule.required_points or 0) > points_left:
+        return False
+    if products is None:
+        return rule.required_points is not None or not order_used
+    return claimed.isdisjoint(products)
+
+def _best_combination(candidates, cap, points_available):
+    """
+    [(rule, raw cents)] with the highest capped total, then the fewest points spent.
+    Candidates are sorted by discount, largest first; that order is kept.
+    """
+    if len(candidates) > EXACT_SEARCH_LIMIT:
+        chosen, claimed, order_used, points_left = [], set(), False, points_available
+        for rule, raw, products in candidates:
+            if _fits(rule, products, claimed, order_used, points_left):
+                chosen.append((rule, raw))
+                claimed |= products or set()
+                order_used |= products is None and rule.required_points is None
+                points_left -= rule.required_points or 0
+        return chosen
+
+    remaining = [0] * (len(candidates) + 1) # Sum of the raw discounts from position i on
+    for i in range(len(candidates) - 1, -1, -1):
+        remaining[i] = remaining[i + 1] + candidates[i][1]
+    best = {'total': -1, 'spent': 0, 'chosen': []}
+    chosen = []
+
+    def search(i, claimed, order_used, points_left, total):
+        spent = points_available - points_left
+        capped = min(total, cap)
+        if capped > best['total'] or (capped == best['total'] and spent < best['spent']):
+            best.update(total=capped, spent=spent, chosen=list(chosen))
+        bound = min(total + remaining[i], cap)
+        if i == len(candidates) or bound < best['total'] or (bound == best['total'] and spent >= best['spent']):
+            return
+        rule, raw, products = candidates[i]
+        if _fits(rule, products, claimed, order_used, points_left):
+            chosen.append((rule, raw))
+            search(i + 1, (claimed | products) if products else claimed,
+                   order_used or (products is None and rule.required_points is None),
+                   points_left - (rule.required_points or 0), total + raw)
+            chosen.pop()
+        search(i + 1, claimed, order_used, points_left, total)
+
+    search(0, frozenset(), False, points_available, 0)
+    return best['chosen']
@@ -0,0 +1,215 @@
+# query_cache.py
+"""
+Table-aware result cache for run_query.
+Each entry remembers which tables its SELECT reads, so a write only invalidates
+the entries that depend on the tables it touches.
+"""
+
+import datetime
+import re
+import threading
+from collections import OrderedDict
+
+# --- Table Dependency Rules ---
+# Views are expanded to the base tables they read
+VIEW_TABLES = {
+    'vw_customerordersummary': {'Customers', 'Orders', 'OrdersArchive'},
+    'vw_productsalesperformance': {'Products', 'OrderItems', 'OrderItemsArchive'},
+    'vw_allorders': {'Orders', 'OrdersArchive'},
+    'vw_allorderitems': {'OrderItems', 'OrderItemsArchive'},
+}
+
+# Tables each stored procedure writes (directly or through triggers)
+PROCEDURE_WRITES = {
+    'sp_addcustomer': {'Customers'},
+    'sp_processorder': {'Orders', 'OrderItems', 'Products', 'Customers', 'LoyaltyLedger'},
+    'sp_processorderset': {'Orders', 'OrderItems', 'Products', 'Customers', 'LoyaltyLedger'},
+    'sp_checkoutorder': {'Orders', 'OrderItems', 'Products', 'Customers', 'AppliedPromotions', 'LoyaltyLedger'},
+    'sp_rebuildsalessummaries': {'ProductSalesSummary', 'CustomerOrderSummary', 'LoyaltyLedger'},
+    'sp_refreshdailysales': {'DailyStoreSales'},
+    'sp_refreshproductsales': {'DailyProductSales'},
+    'sp_compactloyaltyledger': {'Customers', 'LoyaltyLedger', 'CustomerOrderSummary'},
+    'sp_archiveorders': {'Orders', 'OrderItems', 'AppliedPromotions', 'OrdersArchive', 'OrderItemsArchive',
+                         'AppliedPromotionsArchive', 'OrderArchiveState'},
+}
+
+# Extra tables changed as a side effect of writing a table
+# (trg_UpdateStockAfterOrder, summary-table, velocity and reference-version triggers, ON DELETE SET NULL / CASCADE foreign keys)
+WRITE_SIDE_EFFECTS = {
+    'OrderItems': {'Products', 'ProductSalesSummary', 'DailyProductSales'},
+    'Stores': {'Employees', 'ReferenceVersions', 'DailyStoreSales', 'DailyProductSales'},
+    'Employees': {'ReferenceVersions'},
+    'Promotions': {'ReferenceVersions'},
+    'Customers': {'Orders', 'CustomerOrderSummary', 'LoyaltyLedger', 'OrdersArchive'},
+    'Orders': {'OrderItems', 'AppliedPromotions', 'CustomerOrderSummary', 'LoyaltyLedger', 'DailyStoreSales', 'DailyProductSales'},
+    'Products': {'ProductSalesSummary', 'ReferenceVersions', 'DailyProductSales'},
+}
+
+KNOWN_TABLES = {
+    'Customers', 'Stores', 'Employees', 'Products', 'Orders',
+    'OrderItems', 'Promotions', 'AppliedPromotions',
+    'ProductSalesSummary', 'CustomerOrderSummary', 'DailyStoreSales', 'DailyProductSales',
+    'LoyaltyLedger', 'LoyaltySettings',
+    'OrdersArchive', 'OrderItemsArchive', 'AppliedPromotionsArchive', 'OrderArchiveState',
+    'ReferenceVersions',
+}
+_CANONICAL = {name.lower(): name for name in KNOWN_TABLES}
+
+_READ_TABLE_RE = re.compile(r'\b(?:FROM|JOIN)\s+`?(\w+)`?', re.IGNORECASE)
+_WRITE_TABLE_RE = re.compile(r'^\s*(?:INSERT\s+(?:IGNORE\s+)?INTO|REPLACE\s+INTO|UPDATE|DELETE\s+FROM)\s+`?(\w+)`?',
+                             re.IGNORECASE)
+_CALL_RE = re.compile(r'^\s*CALL\s+`?(\w+)`?', re.IGNORECASE)
+# Queries whose result depends on the session or the clock are never cached
+_UNCACHEABLE_RE = re.compile(r'@|\b(?:NOW|RAND|UUID|SYSDATE|CURTIME|CURRENT_TIME|CURRENT_TIMESTAMP|LAST_INSERT_ID)\b',
+                             re.IGNORECASE)
+_CURDATE_RE = re.compile(r'\b(?:CURDATE|CURRENT_DATE)\b', re.IGNORECASE)
+
+
+def tables_read(sql):
+    """
+    Returns the set of base tables a SELECT reads, or None if the query must not be cached
+    (no recognised tables, session variables, or clock-dependent functions).
+    """
+    if _UNCACHEABLE_RE.search(sql):
+        return None
+    tables = set()
+    for name in _READ_TABLE_RE.findall(sql):
+        lowered = name.lower()
+        if lowered in VIEW_TABLES:
+            tables |= VIEW_TABLES[lowered]
+        elif lowered in _CANONICAL:
+            tables.add(_CANONICAL[lowered])
+        else:
+            return None # Unknown relation (derived table alias, new table) - play safe
+    return tables or None
+
+
+def tables_written(sql):
+    """
+    Returns the set of tables a write statement may change, including trigger and
+    foreign-key side effects. Returns None when the statement can't be classified,
+    which callers treat as "invalidate everything".
+    """
+    call_match = _CALL_RE.match(sql)
+    if call_match:
+        written = PROCEDURE_WRITES.get(call_match.group(1).lower())
+        if written is None:
+            return None
+        tables = set(written)
+    else:
+        write_match = _WRITE_TABLE_RE.match(sql)
+        if not write_match or write_match.group(1).lower() not in _CANONICAL:
+            return None
+        tables = {_CANONICAL[write_match.group(1).lower()]}
+
+    # Follow side effects until no new tables are added
+    pending = list(tables)
+    while pending:
+        for extra in WRITE_SIDE_EFFECTS.get(pending.pop(), ()):
+            if extra not in tables:
+                tables.add(extra)
+                pending.append(extra)
+    return tables
+
+
+def _freeze(params):
+    """Turns query parameters into a hashable cache-key component."""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in params.items()))
+    if isinstance(params, (list, tuple, set)):
+        return tuple(_freeze(p) for p in params)
+    return params
+
+
+class QueryCache:
+    """
+    LRU cache of query results bounded by entry count and approximate byte size.
+    Per-table generation counters make sure a result read while a write was
+    committing is never stored over the invalidation.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (result, tables, size)
+        self._by_table = {}            # table -> set of keys
+        self._generations = {}         # table -> write counter
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def make_key(self, sql, params):
+        """Returns (key, tables) for a query, or (None, None) if it is not cacheable."""
+        tables = tables_read(sql)
+        if tables is None:
+            return None, None
+        key = (' '.join(sql.split()), _freeze(params))
+        if _CURDATE_RE.search(sql):
+            key += (datetime.date.today(),) # CURDATE() results roll over at midnight
+        return key, tables
+
+    def generation(self, tables):
+        """Snapshot of the write counters for the given tables, taken before running a query."""
+        with self._lock:
+            return tuple(self._generations.get(t, 0) for t in sorted(tables))
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, tables, result, size, generation):
+        """Stores a result unless one of its tables was written since `generation` was taken."""
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if generation != tuple(self._generations.get(t, 0) for t in sorted(tables)):
+                return
+            self._remove(key)
+            self._entries[key] = (result, tables, size)
+            self._bytes += size
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        _, tables, size = entry
+        self._bytes -= size
+        for table in tables:
+            keys = self._by_table.get(table)
+            if keys:
+                keys.discard(key)
+
+    def invalidate(self, tables=None):
+        """Drops entries that read any of `tables`; None drops everything."""
+        with self._lock:
+            self.invalidations += 1
+            if tables is None:
+                tables = set(self._by_table) | set(KNOWN_TABLES)
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+                for key in list(self._by_table.get(table, ())):
+                    self._remove(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+            }
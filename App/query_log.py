@@ -0,0 +1,235 @@
+# query_log.py
+"""
+In-process query instrumentation.
+database.py records every run_query / run_command / stream_query call as an event: SQL
+fingerprint, parameter shape, wall time, rows, approximate bytes, calling page and page rerun.
+Events go into a bounded ring buffer (and optionally a JSON-lines file); the summary functions
+below turn them into the Query Insights page tables.
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_PLACEHOLDER_RE = re.compile(r"%s|%\(\w+\)s")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_RERUN_KEY = '__query_log_rerun__'
+_rerun_ids = itertools.count(1)
+_attribution = threading.local()
+
+
+def fingerprint(sql):
+    """SQL with literals and placeholders replaced by ? (IN lists collapsed), so repeats group together."""
+    text = _STRING_RE.sub('?', sql)
+    text = _PLACEHOLDER_RE.sub('?', text)
+    text = _NUMBER_RE.sub('?', text)
+    text = _IN_LIST_RE.sub('IN (...)', text)
+    return _WHITESPACE_RE.sub(' ', text).strip().rstrip(';').strip()
+
+
+def param_shape(params):
+    """Types of the parameters, not their values, e.g. "(int, str, NoneType)" or "(int x 50)"."""
+    if params is None:
+        return ""
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in sorted(params.items())) + "}"
+    if not isinstance(params, (list, tuple)):
+        return type(params).__name__
+    names = [type(p).__name__ for p in params]
+    if len(names) > 8 and len(set(names)) == 1:
+        return f"({names[0]} x {len(names)})"
+    return "(" + ", ".join(names) + ")"
+
+
+def _param_hash(params):
+    """Short digest of the parameter values, only used to tell repeated calls apart (values aren't stored)."""
+    if params is None:
+        return None
+    return hashlib.blake2b(repr(params).encode('utf-8', 'replace'), digest_size=6).hexdigest()
+
+
+def calling_page(app_dir):
+    """
+    (page, rerun) for the Streamlit script (app.py or pages/*.py) on the call stack, else (None, None).
+    Streamlit runs each rerun in a fresh module namespace, so a counter stored there identifies the rerun.
+    Inside attributed_to() the given (page, rerun) is returned instead.
+    """
+    caller = getattr(_attribution, 'caller', None)
+    if caller is not None:
+        return caller
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        path = os.path.abspath(code.co_filename)
+        if code.co_name == '<module>' and (path == os.path.join(app_dir, 'app.py')
+                                           or os.path.dirname(path) == os.path.join(app_dir, 'pages')):
+            if _RERUN_KEY not in frame.f_globals:
+                frame.f_globals[_RERUN_KEY] = next(_rerun_ids)
+            return os.path.splitext(os.path.basename(path))[0], frame.f_globals[_RERUN_KEY]
+        frame = frame.f_back
+    return None, None
+
+
+@contextmanager
+def attributed_to(page, rerun):
+    """Events recorded on this thread inside the block belong to (page, rerun) - for worker threads
+    running queries on behalf of a page, whose own call stack doesn't include the page script."""
+    previous = getattr(_attribution, 'caller', None)
+    _attribution.caller = (page, rerun)
+    try:
+        yield
+    finally:
+        _attribution.caller = previous
+
+
+class QueryLog:
+    """Thread-safe ring buffer of query events with optional JSON-lines export."""
+
+    def __init__(self, capacity=5000, jsonl_path=None, app_dir=None):
+        self.capacity = capacity
+        self.jsonl_path = jsonl_path
+        self.app_dir = os.path.abspath(app_dir or os.path.dirname(__file__))
+        self._events = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._file = None
+        self.total_recorded = 0
+
+    def record(self, kind, sql, params, seconds, rows=None, nbytes=None, cached=False, error=None):
+        """Adds one event. kind is 'query', 'command' or 'stream'."""
+        page, rerun = calling_page(self.app_dir)
+        sql_fingerprint = fingerprint(sql)
+        event = {
+            'ts': time.time(),
+            'kind': kind,
+            'fingerprint': sql_fingerprint,
+            'query_id': hashlib.blake2b(sql_fingerprint.encode('utf-8'), digest_size=4).hexdigest(),
+            'param_shape': param_shape(params),
+            'param_hash': _param_hash(params),
+            'ms': round(seconds * 1000.0, 3),
+            'rows': rows,
+            'bytes': nbytes,
+            'cached': cached,
+            'error': error,
+            'page': page,
+            'rerun': rerun,
+        }
+        with self._lock:
+            self._events.append(event)
+            self.total_recorded += 1
+            if self.jsonl_path:
+                if self._file is None:
+                    self._file = open(self.jsonl_path, 'a', encoding='utf-8')
+                self._file.write(json.dumps(event, default=str) + "\n")
+                self._file.flush()
+        return event
+
+    def events(self):
+        """Snapshot of the buffered events, oldest first."""
+        with self._lock:
+            return list(self._events)
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+
+
+# --- Summaries (lists of dicts, newest/most expensive first) ---
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))] if ordered else 0.0
+
+def slowest(events, limit=20):
+    """Individual calls, slowest first (cache hits excluded)."""
+    calls = [e for e in events if not e['cached']]
+    return sorted(calls, key=lambda e: e['ms'], reverse=True)[:limit]
+
+def by_fingerprint(events):
+    """One row per fingerprint: calls, cache hits, errors, total/mean/p95/max ms, rows, bytes and pages."""
+    groups = {}
+    for e in events:
+        groups.setdefault(e['query_id'], []).append(e)
+    rows = []
+    for query_id, calls in groups.items():
+        timings = [c['ms'] for c in calls if not c['cached']]
+        rows.append({
+            'query_id': query_id,
+            'fingerprint': calls[0]['fingerprint'],
+            'kind': calls[0]['kind'],
+            'calls': len(calls),
+            'cache_hits': sum(1 for c in calls if c['cached']),
+            'errors': sum(1 for c in calls if c['error']),
+            'total_ms': round(sum(timings), 3),
+            'mean_ms': round(sum(timings) / len(timings), 3) if timings else 0.0,
+            'p95_ms': round(_percentile(timings, 95), 3),
+            'max_ms': round(max(timings), 3) if timings else 0.0,
+            'rows': sum(c['rows'] or 0 for c in calls),
+            'bytes': sum(c['bytes'] or 0 for c in calls),
+            'pages': ", ".join(sorted({c['page'] or '-' for c in calls})),
+        })
+    return sorted(rows, key=lambda r: r['calls'], reverse=True)
+
+def by_rerun(events):
+    """One row per page rerun: number of calls, DB time, rows and bytes."""
+    reruns = {}
+    for e in events:
+        if e['rerun'] is None:
+            continue
+        run = reruns.setdefault(e['rerun'], {'page': e['page'], 'rerun': e['rerun'], 'started': e['ts'],
+                                             'calls': 0, 'cache_hits': 0, 'db_ms': 0.0, 'rows': 0, 'bytes': 0})
+        run['calls'] += 1
+        run['cache_hits'] += 1 if e['cached'] else 0
+        run['db_ms'] = round(run['db_ms'] + e['ms'], 3)
+        run['rows'] += e['rows'] or 0
+        run['bytes'] += e['bytes'] or 0
+    return sorted(reruns.values(), key=lambda r: r['started'], reverse=True)
+
+def by_page(events):
+    """Per page: reruns seen and the mean/max calls and DB time per rerun."""
+    pages = {}
+    for run in by_rerun(events):
+        pages.setdefault(run['page'], []).append(run)
+    rows = []
+    for page, runs in pages.items():
+        rows.append({
+            'page': page,
+            'reruns': len(runs),
+            'mean_calls': round(sum(r['calls'] for r in runs) / len(runs), 1),
+            'mean_db_ms': round(sum(r['db_ms'] for r in runs) / len(runs), 3),
+            'max_db_ms': max(r['db_ms'] for r in runs),
+            'mean_rows': round(sum(r['rows'] for r in runs) / len(runs), 1),
+        })
+    return sorted(rows, key=lambda r: r['mean_db_ms'], reverse=True)
+
+def n_plus_one(events, min_repeats=5):
+    """
+    Statements run at least min_repeats times with different parameters inside one rerun -
+    the signature of a per-row query inside a loop that one IN/JOIN query could replace.
+    """
+    groups = {}
+    for e in events:
+        if e['rerun'] is not None and e['kind'] == 'query':
+            groups.setdefault((e['rerun'], e['query_id']), []).append(e)
+    rows = []
+    for (rerun, query_id), calls in groups.items():
+        distinct = len({c['param_hash'] for c in calls})
+        if len(calls) >= min_repeats and distinct > 1:
+            rows.append({
+                'page': calls[0]['page'],
+                'rerun': rerun,
+                'fingerprint': calls[0]['fingerprint'],
+                'executions': len(calls),
+                'distinct_params': distinct,
+                'total_ms': round(sum(c['ms'] for c in calls), 3),
+            })
+    return sorted(rows, key=lambda r: r['executions'], reverse=True)
@@ -0,0 +1,97 @@
+# reference_data.py
+"""
+Process-wide snapshot of the slowly changing reference tables (Stores, Employees, Products,
+Promotions). Each table is held once per version as a frame in display order with an ID ->
+row lookup and memoized option maps. ReferenceVersions (migration V007) keeps a counter per
+table that triggers bump on every change, from this app or anywhere else, so a page rerun costs
+one small version query; only tables whose counter moved are read again.
+"""
+
+import pandas as pd
+
+# table: (ID column, SELECT giving the display order). Products leaves out StockQuantity, which
+# changes with every order and doesn't bump the version (the order catalog reads stock itself).
+REFERENCE_TABLES = {
+    'Stores': ('StoreID', "SELECT * FROM Stores ORDER BY StoreName;"),
+    'Employees': ('EmployeeID', "SELECT * FROM Employees ORDER BY LastName, FirstName;"),
+    'Products': ('ProductID', "SELECT ProductID, ProductName, Category, Price FROM Products ORDER BY ProductName;"),
+    'Promotions': ('PromotionID', "SELECT * FROM Promotions ORDER BY PromotionName;"),
+}
+
+
+class ReferenceTable:
+    """One reference table's rows for one version. Treat the frames as read-only."""
+
+    def __init__(self, frame, id_column, version=None):
+        self.version = version
+        self.id_column = id_column
+        self.frame = frame.reset_index(drop=True)
+        self._positions = {int(row_id): pos for pos, row_id in enumerate(self.frame[id_column].tolist())}
+        self._memo = {} # Sorted frames and option maps, built on first use
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def empty(self):
+        return self.frame.empty
+
+    def row(self, row_id):
+        """Row for an ID as a Series, or None."""
+        pos = self._positions.get(int(row_id)) if row_id is not None else None
+        return self.frame.iloc[pos] if pos is not None else None
+
+    def sorted_by(self, columns, ascending=True):
+        """Rows in another order (e.g. ['EndDate', 'StartDate']), sorted once per version."""
+        key = ('sorted', tuple(columns), ascending if isinstance(ascending, bool) else tuple(ascending))
+        if key not in self._memo:
+            self._memo[key] = self.frame.sort_values(list(columns), ascending=ascending, kind='stable').reset_index(drop=True)
+        return self._memo[key]
+
+    def lookup(self, column):
+        """{ID: value of `column`}, built once per version."""
+        key = ('lookup', column)
+        if key not in self._memo:
+            self._memo[key] = dict(zip([int(row_id) for row_id in self.frame[self.id_column].tolist()], self.frame[column].tolist()))
+        return self._memo[key]
+
+    def options(self, name, make_labels):
+        """
+        {label: ID} in display order, built once per version and `name`.
+        make_labels(frame) returns the label for every row as a Series.
+        """
+        key = ('options', name)
+        if key not in self._memo:
+            labels = make_labels(self.frame)
+            self._memo[key] = dict(zip(labels.tolist(), [int(row_id) for row_id in self.frame[self.id_column].tolist()]))
+        return self._memo[key]
+
+
+class ReferenceSnapshot:
+    """Immutable set of ReferenceTables; refreshing returns a new snapshot."""
+
+    def __init__(self, tables=None):
+        self.tables = dict(tables or {})
+
+    def __getitem__(self, name):
+        return self.tables[name]
+
+    def stale(self, versions):
+        """Tables to reload for the polled {TableName: Version} (an unknown version always reloads)."""
+        return [name for name in REFERENCE_TABLES
+                if name not in self.tables or versions.get(name) is None
+                or self.tables[name].version != versions[name]]
+
+    def refreshed(self, frames, versions):
+        """
+        New snapshot with the reloaded frames ({TableName: DataFrame}). A failed load keeps the
+        old table, or an empty one without a version (retried on the next poll).
+        """
+        tables = dict(self.tables)
+        for name, frame in frames.items():
+            id_column = REFERENCE_TABLES[name][0]
+            if id_column in frame.columns:
+                tables[name] = ReferenceTable(frame, id_column, versions.get(name))
+            elif name not in tables:
+                tables[name] = ReferenceTable(pd.DataFrame(columns=[id_column]), id_column)
+        return ReferenceSnapshot(tables)
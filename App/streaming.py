@@ -0,0 +1,103 @@
+# streaming.py
+"""
+Constant-memory result streaming for exports.
+QueryStream wraps an unbuffered server-side cursor (SSDictCursor) and hands out rows in
+fixed-size batches, as lists of dicts or as Arrow record batches with a schema taken from
+the result metadata. write_csv / write_parquet write those batches straight to a file.
+"""
+
+import csv
+
+from pymysql.constants import FIELD_TYPE
+
+STREAM_BATCH_SIZE = 10000 # Rows per batch (the most held in memory at once)
+
+_INT_TYPES = {FIELD_TYPE.TINY, FIELD_TYPE.SHORT, FIELD_TYPE.LONG, FIELD_TYPE.INT24, FIELD_TYPE.LONGLONG, FIELD_TYPE.YEAR}
+_FLOAT_TYPES = {FIELD_TYPE.FLOAT, FIELD_TYPE.DOUBLE}
+_DECIMAL_TYPES = {FIELD_TYPE.DECIMAL, FIELD_TYPE.NEWDECIMAL}
+_DATETIME_TYPES = {FIELD_TYPE.DATETIME, FIELD_TYPE.TIMESTAMP}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError("Arrow batches and Parquet export require pyarrow (pip install pyarrow).") from e
+    return pyarrow
+
+
+def arrow_schema(description):
+    """Arrow schema for a DB-API cursor.description, so every batch has the same column types."""
+    pa = _require_pyarrow()
+    fields = []
+    for name, type_code, _, _, _, scale, _ in description:
+        if type_code in _INT_TYPES:
+            arrow_type = pa.int64()
+        elif type_code in _FLOAT_TYPES:
+            arrow_type = pa.float64()
+        elif type_code in _DECIMAL_TYPES:
+            arrow_type = pa.decimal128(38, scale or 0) # Exact, like the Decimal values PyMySQL returns
+        elif type_code in _DATETIME_TYPES:
+            arrow_type = pa.timestamp('us')
+        elif type_code == FIELD_TYPE.DATE:
+            arrow_type = pa.date32()
+        elif type_code == FIELD_TYPE.TIME:
+            arrow_type = pa.duration('us')
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+
+class QueryStream:
+    """Batched reader over an executed SSDictCursor. Rows are fetched from the server as they are consumed."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.description = cursor.description or ()
+        self.columns = [desc[0] for desc in self.description]
+        self.exhausted = False
+        self.rows_read = 0
+
+    def batches(self, batch_size=STREAM_BATCH_SIZE):
+        """Yields lists of at most batch_size row dicts."""
+        while True:
+            rows = self._cursor.fetchmany(batch_size)
+            if not rows:
+                self.exhausted = True
+                return
+            self.rows_read += len(rows)
+            yield rows
+
+    def arrow_batches(self, batch_size=STREAM_BATCH_SIZE):
+        """Yields pyarrow.RecordBatch objects sharing one schema (see arrow_schema)."""
+        pa = _require_pyarrow()
+        schema = arrow_schema(self.description)
+        for rows in self.batches(batch_size):
+            yield pa.RecordBatch.from_pylist(rows, schema=schema)
+
+
+def write_csv(stream, path, batch_size=STREAM_BATCH_SIZE):
+    """Writes a QueryStream to a CSV file batch by batch. Returns the number of rows written."""
+    with open(path, 'w', newline='', encoding='utf-8') as handle:
+        writer = csv.DictWriter(handle, fieldnames=stream.columns)
+        writer.writeheader()
+        for rows in stream.batches(batch_size):
+            writer.writerows(rows)
+    return stream.rows_read
+
+
+def write_parquet(stream, path, batch_size=STREAM_BATCH_SIZE):
+    """Writes a QueryStream to a Parquet file, one row group per batch. Returns the number of rows written."""
+    pa = _require_pyarrow()
+    import pyarrow.parquet as pq
+    with pq.ParquetWriter(path, arrow_schema(stream.description)) as writer:
+        for batch in stream.arrow_batches(batch_size):
+            writer.write_table(pa.Table.from_batches([batch]))
+    return stream.rows_read
+
+
+WRITERS = {
+    'csv': write_csv,
+    'parquet': write_parquet,
+}
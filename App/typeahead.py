@@ -0,0 +1,53 @@
+# typeahead.py
+"""
+Search-as-you-type pickers for customers and products.
+Each picker is a search box plus a selectbox of the top-K server-side matches, so a rerun
+only transfers K rows no matter how large the table is.
+"""
+
+import streamlit as st
+from database import search_customers, search_products
+from cart import option_map
+
+
+def customer_options(df):
+    """{"Last, First (email)": CustomerID} for a search result."""
+    if df.empty:
+        return {}
+    return option_map(df['LastName'] + ", " + df['FirstName'] + " (" + df['Email'] + ")", df['CustomerID'])
+
+
+def product_options(df):
+    """{"Name (ID: n) - $price": ProductID} for a search result (same labels as the order catalog)."""
+    if df.empty:
+        return {}
+    prices = df['Price'].map(lambda p: f"{p:.2f}")
+    return option_map(df['ProductName'] + " (ID: " + df['ProductID'].astype(str) + ") - $" + prices, df['ProductID'])
+
+
+def _picker(label, key, search_fn, to_options, search_label, search_placeholder, guest_label=None, placeholder=None):
+    term = st.text_input(search_label, key=f"{key}_search", placeholder=search_placeholder)
+    options = {guest_label: None} if guest_label else {}
+    options.update(to_options(search_fn(term)))
+    if term and len(options) == (1 if guest_label else 0):
+        st.caption("No matches.")
+    selected = st.selectbox(label, options=list(options.keys()), index=0 if guest_label else None,
+                            placeholder=placeholder or "Choose from the matches...", key=key)
+    if selected is None:
+        return None, None
+    return options[selected], selected
+
+
+def customer_picker(label, key, guest_label=None, placeholder=None):
+    """
+    Customer typeahead. Returns (CustomerID, label) for the selection, (None, None) if nothing is
+    selected, or (None, guest_label) when the optional guest entry is chosen.
+    """
+    return _picker(label, key, search_customers, customer_options, "Search customers", "Type a name, email or phone...",
+                   guest_label=guest_label, placeholder=placeholder)
+
+
+def product_picker(label, key, placeholder=None):
+    """Product typeahead. Returns (ProductID, label) or (None, None)."""
+    return _picker(label, key, search_products, product_options, "Search products", "Type a product name or category...",
+                   placeholder=placeholder)
@@ -0,0 +1,91 @@
+# bench_bulk_import.py
+"""
+Throughput of App/bulk_import.py (rows/sec) for customers, with executemany and LOAD DATA LOCAL INFILE,
+against the one-row-per-call sp_AddCustomer path the Customers page uses.
+Writes a synthetic CSV (with a few invalid rows mixed in), imports it, then deletes the imported rows.
+
+Usage (from the repo root, against a scratch database with the schema installed):
+    python Benchmarks/bench_bulk_import.py --rows 200000 --chunk-size 10000 --commit-rows 50000
+LOAD DATA needs `local_infile=ON` on the server; the method is skipped if the server refuses it.
+"""
+
+import argparse
+import csv
+import os
+import tempfile
+import time
+import uuid
+
+import pymysql
+
+from bench_common import connect
+from bulk_import import import_file
+
+BENCH_DOMAIN = "bulk-import.bench"
+
+
+def write_customers_csv(path, rows, tag):
+    """Synthetic customers; every 500th row is invalid so the reject path is exercised too."""
+    with open(path, 'w', newline='', encoding='utf-8') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(['FirstName', 'LastName', 'Email', 'PhoneNumber'])
+        for i in range(rows):
+            email = f"c{i}.{tag}@{BENCH_DOMAIN}" if i % 500 != 499 else "not-an-email"
+            writer.writerow([f"First{i}", f"Last{i % 997}", email, f"{tag}-{i:09d}"])
+
+
+def cleanup(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("DELETE FROM Customers WHERE Email LIKE %s;", ('%@' + BENCH_DOMAIN,))
+    conn.commit()
+
+
+def bench_sp_add_customer(conn, rows, tag):
+    """Baseline: one CALL + commit per customer, as the Customers page does."""
+    start = time.perf_counter()
+    with conn.cursor() as cursor:
+        for i in range(rows):
+            cursor.execute("CALL sp_AddCustomer(%s, %s, %s, %s, @_proc_output);",
+                           (f"First{i}", f"Last{i}", f"sp{i}.{tag}@{BENCH_DOMAIN}", f"sp-{tag}-{i:09d}"))
+            conn.commit()
+    return rows / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000, help="Rows in the synthetic file")
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    parser.add_argument('--commit-rows', type=int, default=50000)
+    parser.add_argument('--baseline-rows', type=int, default=1000, help="Rows inserted through sp_AddCustomer")
+    args = parser.parse_args()
+
+    print(f"{'method':<16}{'rows':>10}{'inserted':>10}{'rejected':>10}{'seconds':>10}{'rows/sec':>12}")
+    for method in ('executemany', 'load_data'):
+        tag = uuid.uuid4().hex[:8]
+        path = os.path.join(tempfile.gettempdir(), f"bench_customers_{tag}.csv")
+        write_customers_csv(path, args.rows, tag)
+        conn = connect(autocommit=False, local_infile=(method == 'load_data'))
+        try:
+            result = import_file(conn, 'customers', path, chunk_size=args.chunk_size,
+                                 commit_rows=args.commit_rows, method=method)
+            print(f"{method:<16}{result.rows_read:>10}{result.rows_inserted:>10}{result.rows_rejected:>10}"
+                  f"{result.seconds:>10.2f}{result.rows_per_sec:>12,.0f}")
+        except pymysql.MySQLError as e:
+            print(f"{method:<16} skipped: {e}")
+        finally:
+            cleanup(conn)
+            conn.close()
+            os.unlink(path)
+
+    conn = connect(autocommit=False)
+    try:
+        rate = bench_sp_add_customer(conn, args.baseline_rows, uuid.uuid4().hex[:8])
+        print(f"{'sp_AddCustomer':<16}{args.baseline_rows:>10}{args.baseline_rows:>10}{0:>10}"
+              f"{args.baseline_rows / rate:>10.2f}{rate:>12,.0f}")
+    finally:
+        cleanup(conn)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
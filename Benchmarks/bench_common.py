@@ -0,0 +1,69 @@
+# bench_common.py
+"""
+Shared helpers for the benchmark scripts: connection settings and timing summaries.
+Connection settings default to App/database.py's DB_CONFIG and can be overridden
+with COFFEE_DB_HOST / COFFEE_DB_PORT / COFFEE_DB_USER / COFFEE_DB_PASSWORD / COFFEE_DB_NAME.
+Point them at a scratch copy of the database: benchmarks insert (and then delete) rows.
+"""
+
+import math
+import os
+import statistics
+import sys
+import time
+
+import pymysql
+
+# Let benchmarks reuse the Streamlit-free helpers in App/ (connection_pool, query_cache, ...)
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'App')
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+
+def connect_kwargs(**overrides):
+    """Returns PyMySQL connection arguments for the benchmark database."""
+    kwargs = {
+        'host': os.environ.get('COFFEE_DB_HOST', "127.0.0.1"),
+        'port': int(os.environ.get('COFFEE_DB_PORT', 3306)),
+        'user': os.environ.get('COFFEE_DB_USER', "root"),
+        'password': os.environ.get('COFFEE_DB_PASSWORD', "password"),
+        'database': os.environ.get('COFFEE_DB_NAME', "coffee_shop"),
+        'cursorclass': pymysql.cursors.DictCursor,
+        'autocommit': True,
+    }
+    kwargs.update(overrides)
+    return kwargs
+
+
+def connect(**overrides):
+    return pymysql.connect(**connect_kwargs(**overrides))
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(ordered))) # 1-based: smallest sample with pct% at or below it
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(samples_ms):
+    """Median/p95/p99/mean of latency samples in milliseconds."""
+    return {
+        'runs': len(samples_ms),
+        'p50_ms': round(percentile(samples_ms, 50), 3),
+        'p95_ms': round(percentile(samples_ms, 95), 3),
+        'p99_ms': round(percentile(samples_ms, 99), 3),
+        'mean_ms': round(statistics.fmean(samples_ms), 3) if samples_ms else 0.0,
+    }
+
+
+def time_call(fn, repeat):
+    """Runs fn() `repeat` times and returns the latencies in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return samples
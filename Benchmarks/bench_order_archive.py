@@ -0,0 +1,131 @@
+# bench_order_archive.py
+"""
+Recent-window query latency before and after moving cold history to the archive tables (migration V005).
+The recent window is the last --window-days days of orders. It covers the newest order-history page, a
+store-filtered page and that page's items, all built by the same database.py helpers the Orders page uses.
+The script times them with every order in the hot tables, then runs sp_ArchiveOrders (keeping
+--keep-months closed months) and times them again. A query that spans the archive boundary is timed
+afterwards for comparison.
+
+Run it once per scale. With history in the archive, the recent-window numbers should stay flat as
+history grows. Before archiving they grow with the size of Orders:
+    python Benchmarks/generate_data.py --scale small
+    python Benchmarks/bench_order_archive.py --label small --output Benchmarks/results/archive_small.json
+    python Benchmarks/generate_data.py --scale medium   # more history on top, then re-run with --label medium
+Archiving can't be undone by the script, so use a scratch database.
+"""
+
+import argparse
+import datetime
+import json
+import os
+
+from bench_common import connect, summarize, time_call
+import database # Imports Streamlit; outside `streamlit run` its caches fall back to in-memory ones
+
+SIZE_TABLES = ('Orders', 'OrderItems', 'OrdersArchive', 'OrderItemsArchive')
+
+
+def table_sizes(cursor):
+    sizes = {}
+    for table in SIZE_TABLES:
+        cursor.execute(f"SELECT COUNT(*) AS n FROM {table};")
+        sizes[table] = cursor.fetchone()['n']
+    return sizes
+
+def archive_boundary(cursor):
+    cursor.execute("SELECT ArchivedBefore FROM OrderArchiveState WHERE StateID = 1;")
+    row = cursor.fetchone()
+    return row['ArchivedBefore'] if row else None
+
+def window_benchmarks(cursor, window_start, store_id):
+    """{name: fn} for the recent-window queries at the current archive boundary."""
+    boundary = archive_boundary(cursor)
+    page_size = database.ORDER_HISTORY_PAGE_SIZE
+
+    def fetch(sql, params):
+        def run():
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+        return run
+
+    page_sql, page_params = database.order_history_query(limit=page_size + 1, start_date=window_start, archived_before=boundary)
+    store_sql, store_params = database.order_history_query(limit=page_size + 1, store_id=store_id, start_date=window_start,
+                                                           archived_before=boundary)
+    order_ids = [row['OrderID'] for row in fetch(page_sql, page_params)()] or [0]
+    placeholders = ', '.join(['%s'] * len(order_ids))
+    # The hot-table form get_order_items_for_orders uses for a page of recent orders
+    items_sql = f"""
+        SELECT oi.OrderID, oi.OrderItemID, p.ProductName, oi.Quantity, oi.PriceAtTimeOfOrder
+        FROM OrderItems oi
+        JOIN Products p ON oi.ProductID = p.ProductID
+        WHERE oi.OrderID IN ({placeholders})
+        ORDER BY oi.OrderID, oi.OrderItemID;
+    """
+    return {
+        'recent.history_page': fetch(page_sql, page_params),
+        'recent.history_page_by_store': fetch(store_sql, store_params),
+        'recent.page_items': fetch(items_sql, tuple(order_ids)),
+    }
+
+def run_phase(cursor, phase, window_start, store_id, repeat, results):
+    for name, fn in window_benchmarks(cursor, window_start, store_id).items():
+        fn() # Warm-up
+        results[f'{phase}.{name}'] = stats = summarize(time_call(fn, repeat))
+        print(f"{phase + '.' + name:<44}{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--window-days', type=int, default=30, help="Size of the recent window, ending at the newest order")
+    parser.add_argument('--keep-months', type=int, default=3, help="Closed months left in the hot tables")
+    parser.add_argument('--repeat', type=int, default=50, help="Timed runs per query")
+    parser.add_argument('--label', default=None, help="Scale label stored in the results")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    conn = connect()
+    results = {}
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT MAX(OrderTimestamp) AS newest FROM vw_AllOrders;")
+        newest = cursor.fetchone()['newest']
+        if newest is None:
+            raise SystemExit("No orders; seed the database with generate_data.py first.")
+        window_start = newest.date() - datetime.timedelta(days=args.window_days)
+        cursor.execute("SELECT StoreID FROM Stores ORDER BY StoreID LIMIT 1;")
+        store_id = cursor.fetchone()['StoreID']
+        meta = {'label': args.label, 'created': datetime.datetime.now().isoformat(timespec='seconds'),
+                'window_start': window_start.isoformat(), 'repeat': args.repeat, 'sizes_before': table_sizes(cursor)}
+
+        print(f"{'benchmark':<44}{'p50 ms':>10}{'p95 ms':>10}")
+        run_phase(cursor, 'before', window_start, store_id, args.repeat, results)
+
+        months = window_start.year * 12 + window_start.month - 1 - args.keep_months
+        archive_before = datetime.date(months // 12, months % 12 + 1, 1)
+        cursor.execute("CALL sp_ArchiveOrders(%s, @_proc_output);", (archive_before,))
+        cursor.execute("SELECT @_proc_output AS archived;")
+        meta['orders_archived'] = cursor.fetchone()['archived']
+        meta['archived_before'] = str(archive_boundary(cursor))
+        meta['sizes_after'] = table_sizes(cursor)
+        print(f"archived {meta['orders_archived']:,} orders (boundary {meta['archived_before']})")
+
+        run_phase(cursor, 'after', window_start, store_id, args.repeat, results)
+
+        # For comparison: a window reaching into the archive reads both tables
+        spanning = window_benchmarks(cursor, archive_before - datetime.timedelta(days=args.window_days), store_id)['recent.history_page']
+        spanning()
+        results['after.spanning.history_page'] = stats = summarize(time_call(spanning, args.repeat))
+        print(f"{'after.spanning.history_page':<44}{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}")
+    conn.close()
+
+    for name in ('recent.history_page', 'recent.history_page_by_store', 'recent.page_items'):
+        print(f"{name}: p50 {results['before.' + name]['p50_ms']:.3f} ms -> {results['after.' + name]['p50_ms']:.3f} ms")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump({'meta': meta, 'results': results}, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
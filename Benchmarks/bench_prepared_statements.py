@@ -0,0 +1,130 @@
+# bench_prepared_statements.py
+"""
+Text-protocol vs prepared execution of the Orders and Reports page statements
+(App/prepared_statements.py, enabled in the app with COFFEE_PREPARED_STATEMENTS=1).
+For each statement it times:
+  text      cursor.execute(sql, params), parsed by the server on every call (the default path)
+  prepared  SET of the parameters + EXECUTE of a handle prepared once on the connection
+  prepare   PREPARE + DEALLOCATE alone, i.e. the parse/plan cost the prepared path pays once
+Both modes use the same connection and warm handles, so the difference is parse cost against the
+extra round trip for the parameters. Read-only; any seeded database works:
+    python Benchmarks/bench_prepared_statements.py --repeat 200 --output Benchmarks/results/prepared.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+
+from bench_common import connect, summarize, time_call
+from load_driver import REPORT_QUERIES
+from prepared_statements import StatementRegistry, to_prepared_sql
+import database # Imports Streamlit; outside `streamlit run` its caches fall back to in-memory ones
+
+
+def page_statements(cursor):
+    """{name: (sql, params)} for the statements the Orders and Reports pages run on a rerun."""
+    cursor.execute("SELECT StoreID FROM Stores ORDER BY StoreID LIMIT 1;")
+    store = cursor.fetchone()
+    store_id = store['StoreID'] if store else 0
+    cursor.execute("SELECT CustomerID FROM Customers ORDER BY CustomerID LIMIT 1;")
+    customer = cursor.fetchone()
+    customer_id = customer['CustomerID'] if customer else 0
+
+    page_size = database.ORDER_HISTORY_PAGE_SIZE
+    history = database.order_history_query(limit=page_size + 1)
+    cursor.execute(*history)
+    order_ids = [row['OrderID'] for row in cursor.fetchall()][:page_size] or [0]
+    placeholders = ', '.join(['%s'] * len(order_ids))
+    # The hot-table form of get_order_items_for_orders
+    items_sql = f"""
+        SELECT oi.OrderID, oi.OrderItemID, p.ProductName, oi.Quantity, oi.PriceAtTimeOfOrder
+        FROM OrderItems oi
+        JOIN Products p ON oi.ProductID = p.ProductID
+        WHERE oi.OrderID IN ({placeholders})
+        ORDER BY oi.OrderID, oi.OrderItemID;
+    """
+    return {
+        'orders.reference_versions': ("SELECT TableName, Version FROM ReferenceVersions;", None),
+        'orders.archive_boundary': ("SELECT ArchivedBefore FROM OrderArchiveState WHERE StateID = 1;", None),
+        'orders.stock': ("SELECT ProductID, StockQuantity FROM Products;", None),
+        'orders.history_page': history,
+        'orders.history_page_by_store': database.order_history_query(limit=page_size + 1, store_id=store_id),
+        'orders.page_items': (items_sql, tuple(order_ids)),
+        'orders.loyalty_balances': ("SELECT CustomerID, fn_GetCustomerLoyaltyPoints(CustomerID) AS Points "
+                                    "FROM Customers WHERE CustomerID IN (%s);", (customer_id,)),
+        'reports.top_products': (REPORT_QUERIES['top_products'], None),
+        'reports.top_customers': (REPORT_QUERIES['top_customers'], None),
+        'reports.stores': ("SELECT StoreID, StoreName FROM Stores ORDER BY StoreName;", None),
+        'reports.monthly_sales': database.sales_rollup_query('month'),
+        'reports.reorder': database.reorder_report_query(limit=database.REORDER_CONFIG['report_rows']),
+    }
+
+def text_run(cursor, sql, params):
+    def run():
+        cursor.execute(sql, params)
+        cursor.fetchall()
+    return run
+
+def prepared_run(cursor, registry, sql, params):
+    def run():
+        if not registry.execute(cursor, sql, params):
+            raise RuntimeError("statement could not be prepared")
+        cursor.fetchall()
+    return run
+
+def prepare_run(cursor, sql, params):
+    prepared_sql, _ = to_prepared_sql(sql, params is not None)
+    def run():
+        cursor.execute("PREPARE bench_parse FROM %s;", (prepared_sql,))
+        cursor.execute("DEALLOCATE PREPARE bench_parse;")
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=200, help="Timed runs per statement and mode")
+    parser.add_argument('--label', default=None, help="Label stored in the results")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    conn = connect()
+    registry = StatementRegistry()
+    results = {}
+    with conn.cursor() as cursor:
+        statements = page_statements(cursor)
+        print(f"{'statement':<32}{'text p50':>10}{'prep p50':>10}{'parse p50':>11}{'text p95':>10}{'prep p95':>10}")
+        for name, (sql, params) in statements.items():
+            registry.register(name, sql)
+            runs = {
+                'text': text_run(cursor, sql, params),
+                'prepared': prepared_run(cursor, registry, sql, params),
+                'prepare': prepare_run(cursor, sql, params),
+            }
+            try:
+                for run in runs.values():
+                    run() # Warm-up; also prepares the handle
+            except Exception as e:
+                print(f"  skipped {name}: {e}")
+                continue
+            results[name] = {mode: summarize(time_call(run, args.repeat)) for mode, run in runs.items()}
+            text, prepared, prepare = (results[name][mode] for mode in ('text', 'prepared', 'prepare'))
+            print(f"{name:<32}{text['p50_ms']:>10.3f}{prepared['p50_ms']:>10.3f}{prepare['p50_ms']:>11.3f}"
+                  f"{text['p95_ms']:>10.3f}{prepared['p95_ms']:>10.3f}")
+    conn.close()
+
+    if results:
+        text_total = sum(stats['text']['p50_ms'] for stats in results.values())
+        prepared_total = sum(stats['prepared']['p50_ms'] for stats in results.values())
+        print(f"sum of p50: text {text_total:.3f} ms, prepared {prepared_total:.3f} ms")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump({'meta': {'label': args.label, 'created': datetime.datetime.now().isoformat(timespec='seconds'),
+                                'repeat': args.repeat},
+                       'results': results}, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
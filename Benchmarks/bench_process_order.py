@@ -0,0 +1,75 @@
+# bench_process_order.py
+"""
+Compares sp_ProcessOrder (string loop) with sp_ProcessOrderSet (JSON_TABLE, set-based)
+for 1, 10 and 100-item orders.
+
+Usage (from the repo root, against a scratch database with the schema installed):
+    python Benchmarks/bench_process_order.py --repeat 50
+"""
+
+import argparse
+import json
+
+from bench_common import connect, summarize, time_call
+
+CART_SIZES = (1, 10, 100)
+BENCH_PREFIX = "Bench Product "
+
+
+def create_bench_products(cursor, count):
+    """Adds `count` products with effectively unlimited stock and returns their IDs."""
+    cursor.executemany(
+        "INSERT INTO Products (ProductName, Category, Price, StockQuantity) VALUES (%s, 'Benchmark', %s, %s);",
+        [(f"{BENCH_PREFIX}{i}", 1.00 + (i % 7) * 0.25, 1_000_000_000) for i in range(count)],
+    )
+    cursor.execute("SELECT ProductID FROM Products WHERE ProductName LIKE %s ORDER BY ProductID;", (BENCH_PREFIX + '%',))
+    return [row['ProductID'] for row in cursor.fetchall()]
+
+
+def first_id(cursor, table, column):
+    cursor.execute(f"SELECT MIN({column}) AS id FROM {table};")
+    row = cursor.fetchone()
+    if not row or row['id'] is None:
+        raise SystemExit(f"{table} is empty; load SQL/DummyData.sql first.")
+    return row['id']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=30, help="Orders placed per procedure and cart size")
+    args = parser.parse_args()
+
+    conn = connect()
+    created_orders = []
+    with conn.cursor() as cursor:
+        employee_id = first_id(cursor, 'Employees', 'EmployeeID')
+        store_id = first_id(cursor, 'Stores', 'StoreID')
+        product_ids = create_bench_products(cursor, max(CART_SIZES))
+        try:
+            print(f"{'procedure':<22}{'items':>6}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+            for size in CART_SIZES:
+                cart = {pid: 1 + i % 3 for i, pid in enumerate(product_ids[:size])}
+                items_string = ",".join(f"{pid}:{qty}" for pid, qty in cart.items())
+                items_json = json.dumps([{"ProductID": pid, "Quantity": qty} for pid, qty in cart.items()])
+
+                for proc, items_arg in (("sp_ProcessOrder", items_string), ("sp_ProcessOrderSet", items_json)):
+                    def place_order():
+                        cursor.execute(f"CALL {proc}(NULL, %s, %s, %s, 0, @_proc_output);",
+                                       (employee_id, store_id, items_arg))
+                        cursor.execute("SELECT @_proc_output AS OrderID;")
+                        created_orders.append(cursor.fetchone()['OrderID'])
+
+                    place_order() # Warm-up (procedure cache, buffer pool)
+                    stats = summarize(time_call(place_order, args.repeat))
+                    print(f"{proc:<22}{size:>6}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['mean_ms']:>10}")
+        finally:
+            # OrderItems rows go with their orders (ON DELETE CASCADE)
+            for start in range(0, len(created_orders), 500):
+                chunk = created_orders[start:start + 500]
+                cursor.execute(f"DELETE FROM Orders WHERE OrderID IN ({', '.join(['%s'] * len(chunk))});", chunk)
+            cursor.execute("DELETE FROM Products WHERE ProductName LIKE %s;", (BENCH_PREFIX + '%',))
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
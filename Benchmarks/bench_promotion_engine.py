@@ -0,0 +1,133 @@
+# bench_promotion_engine.py
+"""
+Carts per second through the promotion engine (App/promotion_engine.py).
+Evaluates random carts against a PromotionIndex compiled once, and for comparison with the index
+rebuilt for every cart (the cost of loading the rules on each rerun, minus the query itself).
+Synthetic promotions and products by default, so no database is needed:
+    python Benchmarks/bench_promotion_engine.py --promotions 200 --products 500 --carts 20000
+Or use the Products and Promotions of the benchmark database (after migration V006):
+    python Benchmarks/bench_promotion_engine.py --from-db
+"""
+
+import argparse
+import datetime
+import json
+import os
+import random
+import time
+
+import pandas as pd
+
+import bench_common # Puts App/ on sys.path
+from cart import to_cents
+from promotion_engine import PromotionIndex
+
+CATEGORIES = ('Beverage', 'Food', 'Merchandise', 'Seasonal', 'Bakery')
+
+
+def synthetic_data(rng, promotion_count, product_count, today):
+    """(products, promotions) DataFrames shaped like the Products/Promotions tables."""
+    products = pd.DataFrame({
+        'ProductID': range(1, product_count + 1),
+        'Category': [rng.choice(CATEGORIES) for _ in range(product_count)],
+        'Price': [round(rng.uniform(1.5, 15.0), 2) for _ in range(product_count)],
+    })
+    rows = []
+    for promotion_id in range(1, promotion_count + 1):
+        scope = rng.random()
+        start = today + datetime.timedelta(days=rng.randint(-60, 10))
+        rows.append({
+            'PromotionID': promotion_id,
+            'PromotionName': f"Promotion {promotion_id}",
+            'DiscountType': rng.choice(('PERCENT', 'FIXED')),
+            'DiscountValue': round(rng.uniform(0.25, 20.0), 2),
+            'StartDate': start if rng.random() < 0.8 else None,
+            'EndDate': start + datetime.timedelta(days=rng.randint(1, 90)) if rng.random() < 0.8 else None,
+            'RequiredPoints': rng.choice((100, 200, 500)) if rng.random() < 0.1 else None,
+            'ScopeProductID': rng.randint(1, product_count) if scope < 0.6 else None,
+            'ScopeCategory': rng.choice(CATEGORIES) if 0.6 <= scope < 0.8 else None,
+        })
+    return products, pd.DataFrame(rows)
+
+def database_data():
+    conn = bench_common.connect()
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT ProductID, Category, Price FROM Products;")
+        products = pd.DataFrame(cursor.fetchall())
+        cursor.execute("""
+            SELECT PromotionID, PromotionName, DiscountType, DiscountValue, StartDate, EndDate,
+                   RequiredPoints, ScopeProductID, ScopeCategory
+            FROM Promotions WHERE EndDate IS NULL OR EndDate >= CURDATE();
+        """)
+        promotions = pd.DataFrame(cursor.fetchall())
+    conn.close()
+    if products.empty:
+        raise SystemExit("Products is empty; load SQL/DummyData.sql or run generate_data.py first.")
+    return products, promotions
+
+def random_carts(rng, products, count, max_lines):
+    """[(items, points_available)] with items as CartPricing.items builds them."""
+    catalog = [(int(pid), category, to_cents(price))
+               for pid, category, price in zip(products['ProductID'], products['Category'], products['Price'])]
+    carts = []
+    for _ in range(count):
+        lines = rng.sample(catalog, min(rng.randint(1, max_lines), len(catalog)))
+        items = [(pid, category, rng.randint(1, 4), price) for pid, category, price in lines]
+        carts.append((items, rng.choice((0, 0, 0, 300))))
+    return carts
+
+def carts_per_second(carts, evaluate):
+    started = time.perf_counter()
+    for items, points_available in carts:
+        evaluate(items, points_available)
+    elapsed = time.perf_counter() - started
+    return len(carts) / elapsed if elapsed else float('inf')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--promotions', type=int, default=200, help="Synthetic promotions")
+    parser.add_argument('--products', type=int, default=500, help="Synthetic products")
+    parser.add_argument('--carts', type=int, default=20000, help="Carts evaluated per measurement")
+    parser.add_argument('--max-lines', type=int, default=8, help="Most distinct products in one cart")
+    parser.add_argument('--from-db', action='store_true', help="Use the database's Products and Promotions")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    today = datetime.date.today()
+    products, promotions = database_data() if args.from_db else synthetic_data(rng, args.promotions, args.products, today)
+    carts = random_carts(rng, products, args.carts, args.max_lines)
+
+    started = time.perf_counter()
+    index = PromotionIndex(promotions)
+    compile_ms = (time.perf_counter() - started) * 1000
+
+    indexed = carts_per_second(carts, lambda items, points: index.evaluate(items, today, 0, points))
+    # Rebuilding is much slower; a slice of the carts is enough to measure it
+    rebuild_carts = carts[:max(1, min(len(carts), 2000))]
+    rebuilt = carts_per_second(rebuild_carts, lambda items, points: PromotionIndex(promotions).evaluate(items, today, 0, points))
+
+    applied = [len(index.evaluate(items, today, 0, points).applied) for items, points in carts]
+    results = {
+        'promotions': len(promotions), 'products': len(products), 'carts': len(carts),
+        'compile_ms': round(compile_ms, 3),
+        'carts_per_sec_indexed': round(indexed, 1),
+        'carts_per_sec_rebuilt': round(rebuilt, 1),
+        'mean_promotions_applied': round(sum(applied) / len(applied), 3),
+    }
+    print(f"{results['promotions']} promotions, {results['products']} products, {results['carts']} carts")
+    print(f"compile index:            {results['compile_ms']:>12.3f} ms")
+    print(f"compiled index:           {results['carts_per_sec_indexed']:>12,.1f} carts/sec")
+    print(f"index rebuilt per cart:   {results['carts_per_sec_rebuilt']:>12,.1f} carts/sec")
+    print(f"promotions applied/cart:  {results['mean_promotions_applied']:>12.3f}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
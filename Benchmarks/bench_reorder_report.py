@@ -0,0 +1,99 @@
+# bench_reorder_report.py
+"""
+Reorder forecast latency from the DailyProductSales velocity table (migration V008) against the
+same velocity aggregated from raw Orders/OrderItems. Both run for all stores and for one store,
+with the windows of database.REORDER_CONFIG ending at the newest order, so generated history counts.
+The rollup numbers should stay flat as OrderItems grows; the raw ones grow with the order volume
+in the window:
+    python Benchmarks/generate_data.py --scale medium
+    python Benchmarks/bench_reorder_report.py --label medium --output Benchmarks/results/reorder_medium.json
+The script only reads, and checks that both forms give the same ranking.
+"""
+
+import argparse
+import datetime
+import json
+import os
+
+from bench_common import connect, summarize, time_call
+import database # Imports Streamlit; outside `streamlit run` its caches fall back to in-memory ones
+
+SIZE_TABLES = ('OrderItems', 'DailyProductSales')
+
+
+def raw_velocity_query(query):
+    """The report query with DailyProductSales replaced by the same aggregation over the hot tables."""
+    raw_rows = """(
+                SELECT DATE(o.OrderTimestamp) AS SaleDate, o.StoreID, oi.ProductID, SUM(oi.Quantity) AS UnitsSold
+                FROM Orders o
+                JOIN OrderItems oi ON oi.OrderID = o.OrderID
+                WHERE o.OrderTimestamp >= %s AND o.OrderTimestamp < %s
+                GROUP BY DATE(o.OrderTimestamp), o.StoreID, oi.ProductID
+            ) AS DailyProductSales"""
+    return query.replace("FROM DailyProductSales", "FROM " + raw_rows, 1)
+
+def raw_params(params, as_of):
+    """Adds the raw subquery's timestamp range ahead of the rollup's own placeholders inside the derived table."""
+    windows = database.REORDER_CONFIG['windows']
+    start = as_of - datetime.timedelta(days=max(windows))
+    # Placeholders: target cover, 2 x windows starts, then the raw range, then the rest
+    head = 1 + 2 * len(windows)
+    return params[:head] + (start, as_of) + params[head:]
+
+def fetch(cursor, sql, params):
+    def run():
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=30, help="Timed runs per query")
+    parser.add_argument('--label', default=None, help="Scale label stored in the results")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    conn = connect()
+    results = {}
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT MAX(OrderTimestamp) AS newest FROM Orders;")
+        newest = cursor.fetchone()['newest']
+        if newest is None:
+            raise SystemExit("No orders; seed the database with generate_data.py first.")
+        as_of = newest.date() + datetime.timedelta(days=1)
+        cursor.execute("SELECT StoreID FROM Stores ORDER BY StoreID LIMIT 1;")
+        store_id = cursor.fetchone()['StoreID']
+        sizes = {}
+        for table in SIZE_TABLES:
+            cursor.execute(f"SELECT COUNT(*) AS n FROM {table};")
+            sizes[table] = cursor.fetchone()['n']
+        meta = {'label': args.label, 'created': datetime.datetime.now().isoformat(timespec='seconds'),
+                'as_of': as_of.isoformat(), 'windows': list(database.REORDER_CONFIG['windows']),
+                'repeat': args.repeat, 'sizes': sizes}
+
+        print(f"{'benchmark':<32}{'p50 ms':>10}{'p95 ms':>10}")
+        for scope, scope_store in (('all_stores', None), ('one_store', store_id)):
+            sql, params = database.reorder_report_query(scope_store, as_of)
+            rollup = fetch(cursor, sql, params)
+            raw = fetch(cursor, raw_velocity_query(sql), raw_params(params, as_of))
+            ranked = [(row['ProductID'], row['DaysOfCover']) for row in rollup()]
+            if ranked != [(row['ProductID'], row['DaysOfCover']) for row in raw()]:
+                print(f"  warning: {scope} rankings differ; run sp_RefreshProductSales(NULL, NULL) (or archived orders are in the window)")
+            for name, fn in ((f'{scope}.rollup', rollup), (f'{scope}.raw_items', raw)):
+                results[name] = stats = summarize(time_call(fn, args.repeat))
+                print(f"{name:<32}{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}")
+    conn.close()
+
+    for scope in ('all_stores', 'one_store'):
+        print(f"{scope}: raw p50 {results[scope + '.raw_items']['p50_ms']:.3f} ms -> "
+              f"rollup p50 {results[scope + '.rollup']['p50_ms']:.3f} ms")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump({'meta': meta, 'results': results}, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+# bench_suite.py
+"""
+Performance regression suite for the database layer, stored procedures and report queries.
+Groups (select with --groups):
+  layer       run_query / run_command against a raw cursor (their overhead), plus a cached run_query hit
+  procedures  sp_AddCustomer, and sp_ProcessOrder with 1, 5, 10 and 50-item carts
+  views       vw_ProductSalesPerformance and vw_CustomerOrderSummary
+  reports     the four Reports page queries and the first order-history page
+  pages       every SELECT the App/ pages and modules issue, run back to back per file: the literal
+              ones, and per registered name the ones built at runtime, with their captured parameters
+              (found with index_advisor.collect_all_queries, so new page queries are picked up automatically)
+Results go to JSON together with the table sizes they were measured at. Against a baseline, a
+benchmark regresses when its --metric is more than --threshold slower *and* more than
+--min-delta-ms slower; any regression makes the run exit with status 1.
+
+Usage (from the repo root, against a scratch database; seed one per scale with generate_data.py):
+    python Benchmarks/generate_data.py --scale small
+    python Benchmarks/bench_suite.py --label small --output Benchmarks/results/small.json
+    python Benchmarks/bench_suite.py --label small --baseline Benchmarks/results/small.json --threshold 0.2
+"""
+
+import argparse
+import datetime
+import itertools
+import json
+import os
+import uuid
+
+import pymysql
+
+from bench_common import connect, connect_kwargs, summarize, time_call
+from index_advisor import collect_all_queries, executable
+from load_driver import REPORT_QUERIES
+import database # Imports Streamlit; outside `streamlit run` its caches fall back to in-memory ones
+
+GROUPS = ('layer', 'procedures', 'views', 'reports', 'pages')
+CART_SIZES = (1, 5, 10, 50)
+BENCH_PREFIX = "Suite Bench Product "
+BENCH_DOMAIN = "bench-suite.bench"
+SIZE_TABLES = ('Orders', 'OrderItems', 'Customers', 'Products')
+
+
+class Fixtures:
+    """Rows the procedure benchmarks create, and their removal."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.tag = uuid.uuid4().hex[:8]
+        self.order_ids = []
+        self.product_ids = []
+        cursor.execute("SELECT MIN(EmployeeID) AS emp FROM Employees;")
+        self.employee_id = cursor.fetchone()['emp']
+        cursor.execute("SELECT StoreID FROM Employees WHERE EmployeeID = %s;", (self.employee_id,))
+        row = cursor.fetchone()
+        self.store_id = row['StoreID'] if row else None
+        if self.employee_id is None or self.store_id is None:
+            raise SystemExit("Employees/Stores are empty; run generate_data.py or load SQL/DummyData.sql first.")
+
+    def products(self, count):
+        """`count` products with effectively unlimited stock."""
+        if len(self.product_ids) < count:
+            self.cursor.executemany(
+                "INSERT INTO Products (ProductName, Category, Price, StockQuantity) VALUES (%s, 'Benchmark', %s, %s);",
+                [(f"{BENCH_PREFIX}{i}", 1.00 + (i % 7) * 0.25, 1_000_000_000) for i in range(len(self.product_ids), count)])
+            self.cursor.execute("SELECT ProductID FROM Products WHERE ProductName LIKE %s ORDER BY ProductID;",
+                                (BENCH_PREFIX + '%',))
+            self.product_ids = [row['ProductID'] for row in self.cursor.fetchall()]
+        return self.product_ids[:count]
+
+    def cleanup(self):
+        # OrderItems rows go with their orders (ON DELETE CASCADE)
+        for start in range(0, len(self.order_ids), 500):
+            chunk = self.order_ids[start:start + 500]
+            self.cursor.execute(f"DELETE FROM Orders WHERE OrderID IN ({', '.join(['%s'] * len(chunk))});", chunk)
+        self.cursor.execute("DELETE FROM Products WHERE ProductName LIKE %s;", (BENCH_PREFIX + '%',))
+        self.cursor.execute("DELETE FROM Customers WHERE Email LIKE %s;", ('%@' + BENCH_DOMAIN,))
+
+
+def fetch(cursor, sql, params=None):
+    def run():
+        cursor.execute(sql, params)
+        cursor.fetchall()
+    return run
+
+
+# --- Benchmark Groups: each returns {name: zero-argument callable} ---
+def layer_benchmarks(cursor, fixtures):
+    def raw_command():
+        cursor.execute("DO 0;")
+    return {
+        'layer.raw_select': fetch(cursor, "SELECT 1;"),
+        'layer.run_query_select': lambda: database.run_query("SELECT 1;", use_cache=False),
+        'layer.run_query_cache_hit': lambda: database.run_query("SELECT StoreID, StoreName FROM Stores ORDER BY StoreName;"),
+        'layer.raw_command': raw_command,
+        'layer.run_command': lambda: database.run_command("DO 0;"),
+    }
+
+def procedure_benchmarks(cursor, fixtures):
+    counter = itertools.count()
+    def add_customer():
+        n = next(counter)
+        cursor.execute("CALL sp_AddCustomer(%s, %s, %s, %s, @_proc_output);",
+                       ("Bench", f"Customer{n}", f"c{n}.{fixtures.tag}@{BENCH_DOMAIN}", f"{fixtures.tag}-{n:09d}"))
+    benchmarks = {'procedures.sp_AddCustomer': add_customer}
+    for size in CART_SIZES:
+        items_string = ",".join(f"{pid}:{1 + i % 3}" for i, pid in enumerate(fixtures.products(size)))
+        def place_order(items_string=items_string):
+            cursor.execute("CALL sp_ProcessOrder(NULL, %s, %s, %s, 0, @_proc_output);",
+                           (fixtures.employee_id, fixtures.store_id, items_string))
+            cursor.execute("SELECT @_proc_output AS OrderID;")
+            fixtures.order_ids.append(cursor.fetchone()['OrderID'])
+        benchmarks[f'procedures.sp_ProcessOrder_{size}_items'] = place_order
+    return benchmarks
+
+def view_benchmarks(cursor, fixtures):
+    return {
+        'views.vw_ProductSalesPerformance': fetch(cursor, "SELECT * FROM vw_ProductSalesPerformance;"),
+        'views.vw_CustomerOrderSummary': fetch(cursor, "SELECT * FROM vw_CustomerOrderSummary;"),
+    }
+
+def report_benchmarks(cursor, fixtures):
+    monthly_sql, monthly_params = database.sales_rollup_query('month')
+    reorder_sql, reorder_params = database.reorder_report_query(limit=database.REORDER_CONFIG['report_rows'])
+    history_sql, history_params = database.order_history_query(limit=database.ORDER_HISTORY_PAGE_SIZE + 1)
+    return {
+        'reports.top_products': fetch(cursor, REPORT_QUERIES['top_products']),
+        'reports.monthly_sales': fetch(cursor, monthly_sql, monthly_params),
+        'reports.top_customers': fetch(cursor, REPORT_QUERIES['top_customers']),
+        'reports.reorder': fetch(cursor, reorder_sql, reorder_params),
+        'reports.order_history_page': fetch(cursor, history_sql, history_params),
+    }
+
+def page_benchmarks(cursor, fixtures):
+    """
+    One benchmark per source file (literal SELECTs) and per registered runtime statement name,
+    each running all of its runnable statements in order.
+    """
+    by_file = {}
+    for sql, entry in collect_all_queries(cursor).items():
+        statement = executable(sql, entry['params'])
+        try:
+            cursor.execute(*statement)
+            cursor.fetchall()
+        except pymysql.MySQLError as e:
+            print(f"  skipped (does not run with sample parameters): {entry['sources'][0]}: {e}")
+            continue
+        for location in entry['sources']:
+            if location.startswith('runtime:'):
+                source = location.split(':', 1)[1]
+            else:
+                source = os.path.splitext(os.path.basename(location.rsplit(':', 1)[0]))[0]
+            by_file.setdefault(source, []).append(statement)
+
+    def run_all(statements):
+        def run():
+            for statement in statements:
+                cursor.execute(*statement)
+                cursor.fetchall()
+        return run
+    return {f'pages.{source}': run_all(statements) for source, statements in sorted(by_file.items())}
+
+GROUP_BUILDERS = {
+    'layer': layer_benchmarks,
+    'procedures': procedure_benchmarks,
+    'views': view_benchmarks,
+    'reports': report_benchmarks,
+    'pages': page_benchmarks,
+}
+
+
+# --- Running and Comparing ---
+def table_sizes(cursor):
+    sizes = {}
+    for table in SIZE_TABLES:
+        cursor.execute(f"SELECT COUNT(*) AS n FROM {table};")
+        sizes[table] = cursor.fetchone()['n']
+    return sizes
+
+def run_suite(groups, repeat, warmup):
+    conn = connect()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT VERSION() AS version;")
+            meta = {
+                'created': datetime.datetime.now().isoformat(timespec='seconds'),
+                'server_version': cursor.fetchone()['version'],
+                'table_sizes': table_sizes(cursor),
+                'repeat': repeat,
+            }
+            fixtures = Fixtures(cursor)
+            results = {}
+            try:
+                for group in groups:
+                    for name, fn in GROUP_BUILDERS[group](cursor, fixtures).items():
+                        for _ in range(warmup):
+                            fn()
+                        results[name] = summarize(time_call(fn, repeat))
+                        print(f"{name:<48}{results[name]['p50_ms']:>10.3f}{results[name]['p95_ms']:>10.3f}"
+                              f"{results[name]['p99_ms']:>10.3f}")
+            finally:
+                fixtures.cleanup()
+    finally:
+        conn.close()
+
+    derived = {}
+    if 'layer.raw_select' in results:
+        derived['run_query_overhead_p50_ms'] = round(results['layer.run_query_select']['p50_ms'] - results['layer.raw_select']['p50_ms'], 3)
+        derived['run_command_overhead_p50_ms'] = round(results['layer.run_command']['p50_ms'] - results['layer.raw_command']['p50_ms'], 3)
+    return {'meta': meta, 'results': results, 'derived': derived}
+
+def compare(current, baseline, metric, threshold, min_delta_ms):
+    """Prints current vs baseline and returns the names that regressed."""
+    regressions = []
+    for table, size in current['meta']['table_sizes'].items():
+        base_size = baseline.get('meta', {}).get('table_sizes', {}).get(table)
+        if base_size is not None and abs(size - base_size) > 0.1 * max(base_size, 1):
+            print(f"warning: {table} has {size:,} rows, the baseline was measured at {base_size:,}")
+    print(f"\n{'benchmark':<48}{'baseline':>10}{'current':>10}{'change':>9}")
+    for name, stats in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            print(f"{name:<48}{'-':>10}{stats[metric]:>10.3f}{'new':>9}")
+            continue
+        old, new = base[metric], stats[metric]
+        change = (new - old) / old if old else 0.0
+        regressed = change > threshold and new - old > min_delta_ms
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<48}{old:>10.3f}{new:>10.3f}{change:>+9.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--groups', default=",".join(GROUPS), help=f"Comma-separated subset of {', '.join(GROUPS)}")
+    parser.add_argument('--repeat', type=int, default=30, help="Timed runs per benchmark")
+    parser.add_argument('--warmup', type=int, default=3, help="Untimed runs per benchmark first")
+    parser.add_argument('--label', default=None, help="Scale/environment label stored in the results")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--baseline', help="Compare against a results file written with --output")
+    parser.add_argument('--metric', default='p50_ms', choices=['p50_ms', 'p95_ms', 'p99_ms', 'mean_ms'])
+    parser.add_argument('--threshold', type=float, default=0.25, help="Allowed relative slowdown (0.25 = 25%%)")
+    parser.add_argument('--min-delta-ms', type=float, default=0.5, help="Ignore slowdowns smaller than this")
+    args = parser.parse_args()
+    groups = [g.strip() for g in args.groups.split(',') if g.strip()]
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        raise SystemExit(f"Unknown group(s) {sorted(unknown)}; choose from {list(GROUPS)}")
+
+    # database.run_query/run_command use the app's pool; point it at the benchmark database
+    database.DB_CONFIG.update(connect_kwargs())
+
+    print(f"{'benchmark':<48}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    current = run_suite(groups, args.repeat, args.warmup)
+    current['meta']['label'] = args.label
+    for name, value in current['derived'].items():
+        print(f"{name}: {value}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump(current, handle, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as handle:
+            baseline = json.load(handle)
+        if baseline.get('meta', {}).get('label') != args.label:
+            print(f"warning: baseline label {baseline.get('meta', {}).get('label')!r} != {args.label!r}")
+        regressions = compare(current, baseline, args.metric, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\nFAIL: {len(regressions)} benchmark(s) more than {args.threshold:.0%} slower: {', '.join(regressions)}")
+            raise SystemExit(1)
+        print("\nPASS: no regressions.")
+
+
+if __name__ == "__main__":
+    main()
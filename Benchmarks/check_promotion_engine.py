@@ -0,0 +1,341 @@
+# check_promotion_engine.py
+"""
+Checks that the Orders page promotion preview (App/promotion_engine.py) matches what
+sp_CheckoutOrder (migration V006) records. Exits with status 1 on any mismatch.
+Offline (the default) it needs no database: random promotions and carts are evaluated with
+PromotionIndex and compared with
+  * a Decimal re-implementation of the procedure's arithmetic (ROUND(x, 2) half up, FIXED per
+    unit capped at the matched subtotal, each discount capped by what the ones before it left), and
+  * a brute-force search over every combination the rules allow (best capped total, then the
+    fewest points spent), for carts within promotion_engine.EXACT_SEARCH_LIMIT candidates:
+    python Benchmarks/check_promotion_engine.py --carts 5000
+With --from-db the carts are checked out through sp_CheckoutOrder against fixture products,
+promotions and a customer, and the recorded AppliedPromotions, totals and reward points must
+equal the preview (use a scratch database; the fixtures and their orders are deleted afterwards):
+    python Benchmarks/check_promotion_engine.py --from-db --carts 200
+"""
+
+import argparse
+import datetime
+import json
+import random
+import uuid
+from decimal import Decimal, ROUND_HALF_UP
+from itertools import combinations
+
+import pandas as pd
+
+import bench_common # Puts App/ on sys.path
+from cart import to_cents, from_cents
+from promotion_engine import EXACT_SEARCH_LIMIT, PromotionIndex
+
+CATEGORIES = ('Parity Drinks', 'Parity Food', 'Parity Merch')
+CHECK_PREFIX = "Parity Check "
+CHECK_DOMAIN = "parity-check.bench"
+CENT = Decimal('0.01')
+# Values chosen to land on half cents: 12.5% of an odd number of cents, 33.33% etc.
+PERCENT_VALUES = ('5.00', '10.00', '12.50', '15.00', '33.33', '50.00', '7.25', '100.00')
+FIXED_VALUES = ('0.25', '0.50', '1.00', '1.99', '2.00', '5.00', '25.00')
+
+
+# --- Reference arithmetic (sp_CheckoutOrder in Decimal) ---
+
+def sql_round(amount):
+    """MySQL ROUND(x, 2) on a non-negative DECIMAL."""
+    return amount.quantize(CENT, rounding=ROUND_HALF_UP)
+
+def reference_raw(promotion, base, lines):
+    """The procedure's RawDiscount for one Promotions row; lines are (ProductID, Category, Qty, Price)."""
+    value = Decimal(str(promotion['DiscountValue']))
+    product_id, category = promotion['ScopeProductID'], promotion['ScopeCategory']
+    if product_id is None and category is None:
+        return sql_round(base * value / 100) if promotion['DiscountType'] == 'PERCENT' else value
+    matching = [(qty, price) for pid, cat, qty, price in lines if pid == product_id or cat == category]
+    matched = sum((qty * price for qty, price in matching), Decimal('0.00'))
+    if promotion['DiscountType'] == 'PERCENT':
+        return sql_round(matched * value / 100)
+    return min(value * sum(qty for qty, _ in matching), matched)
+
+def reference_applied(raws, base):
+    """LEAST(base, running total) - LEAST(base, running total before it), zero amounts dropped."""
+    applied, running = [], Decimal('0.00')
+    for promotion_id, raw in raws:
+        amount = min(base, running + raw) - min(base, running)
+        running += raw
+        if amount > 0:
+            applied.append((promotion_id, amount))
+    return applied
+
+def reference_base(lines, points_redeemed):
+    subtotal = sum((qty * price for _, _, qty, price in lines), Decimal('0.00'))
+    return max(subtotal - Decimal(points_redeemed) / 100, Decimal('0.00'))
+
+
+# --- Reference search (every allowed combination) ---
+
+def active_on(promotion, day):
+    return ((promotion['StartDate'] is None or promotion['StartDate'] <= day)
+            and (promotion['EndDate'] is None or promotion['EndDate'] >= day))
+
+def scope_products(promotion, lines):
+    """Products of the cart an item promotion matches, or None for an order-wide one."""
+    product_id, category = promotion['ScopeProductID'], promotion['ScopeCategory']
+    if product_id is None and category is None:
+        return None
+    return frozenset(pid for pid, cat, _, _ in lines if pid == product_id or cat == category)
+
+def reference_candidates(promotions, lines, base, day, points_available):
+    """[(promotion, raw, products or None)] the engine may choose from, in no particular order."""
+    candidates = []
+    for promotion in promotions:
+        if not active_on(promotion, day) or (promotion['RequiredPoints'] or 0) > points_available:
+            continue
+        raw = reference_raw(promotion, base, lines)
+        if raw > 0:
+            candidates.append((promotion, raw, scope_products(promotion, lines)))
+    return candidates
+
+def allowed(combination, points_available):
+    """The combination rules of the promotion_engine module docstring."""
+    claimed, order_wide, points = set(), 0, 0
+    for promotion, _, products in combination:
+        points += promotion['RequiredPoints'] or 0
+        if products is None:
+            order_wide += promotion['RequiredPoints'] is None
+        elif not claimed.isdisjoint(products):
+            return False
+        else:
+            claimed |= products
+    return order_wide <= 1 and points <= points_available
+
+def brute_force(candidates, base, points_available):
+    """(best capped total, fewest points spent for it) over every allowed combination."""
+    best = (Decimal('0.00'), 0)
+    for size in range(1, len(candidates) + 1):
+        for combination in combinations(candidates, size):
+            if not allowed(combination, points_available):
+                continue
+            total = min(sum(raw for _, raw, _ in combination), base)
+            spent = sum(promotion['RequiredPoints'] or 0 for promotion, _, _ in combination)
+            if total > best[0] or (total == best[0] and spent < best[1]):
+                best = (total, spent)
+    return best
+
+
+# --- Random data ---
+
+def random_promotions(rng, product_ids, today, count):
+    """Promotions rows (dicts) with random scopes, values and date ranges."""
+    promotions = []
+    for promotion_id in range(1, count + 1):
+        percent = rng.random() < 0.5
+        scope = rng.random()
+        start = today + datetime.timedelta(days=rng.randint(-10, 2)) if rng.random() < 0.3 else None
+        end = today + datetime.timedelta(days=rng.randint(-2, 10)) if rng.random() < 0.3 else None
+        promotions.append({
+            'PromotionID': promotion_id,
+            'PromotionName': f"{CHECK_PREFIX}Promotion {promotion_id}",
+            'DiscountType': 'PERCENT' if percent else 'FIXED',
+            'DiscountValue': Decimal(rng.choice(PERCENT_VALUES if percent else FIXED_VALUES)),
+            'StartDate': start,
+            'EndDate': end,
+            'RequiredPoints': rng.choice((50, 100, 200)) if rng.random() < 0.25 else None,
+            'ScopeProductID': rng.choice(product_ids) if scope < 0.4 else None,
+            'ScopeCategory': rng.choice(CATEGORIES) if 0.4 <= scope < 0.7 else None,
+        })
+    return promotions
+
+def random_products(rng, count):
+    """[(ProductID, Category, Price)]; odd cent prices so percentages hit half cents."""
+    return [(product_id, rng.choice(CATEGORIES), Decimal(rng.randint(5, 1999)) / 100)
+            for product_id in range(1, count + 1)]
+
+def random_cart(rng, products, max_lines):
+    """(lines, points_redeemed, points_available) with lines as (ProductID, Category, Qty, Price)."""
+    chosen = rng.sample(products, rng.randint(1, min(max_lines, len(products))))
+    lines = [(pid, category, rng.randint(1, 4), price) for pid, category, price in chosen]
+    subtotal_cents = sum(qty * to_cents(price) for _, _, qty, price in lines)
+    points_redeemed = rng.choice((0, 0, 0, rng.randint(0, subtotal_cents + 200)))
+    points_available = rng.choice((0, 0, 50, 150, 400))
+    return lines, points_redeemed, points_available
+
+def engine_items(lines):
+    """CartPricing.items for reference lines."""
+    return [(pid, category, qty, to_cents(price)) for pid, category, qty, price in lines]
+
+
+# --- Checks ---
+
+def check_offline(rng, args):
+    today = datetime.date.today()
+    failures = exact = 0
+    for cart_no in range(args.carts):
+        products = random_products(rng, args.products)
+        promotions = random_promotions(rng, [pid for pid, _, _ in products], today, args.promotions)
+        index = PromotionIndex(pd.DataFrame(promotions))
+        by_id = {promotion['PromotionID']: promotion for promotion in promotions}
+        lines, points_redeemed, points_available = random_cart(rng, products, args.max_lines)
+
+        result = index.evaluate(engine_items(lines), today, points_redeemed, points_available)
+        base = reference_base(lines, points_redeemed)
+        raws = [(pid, reference_raw(by_id[pid], base, lines)) for pid in result.promotion_ids]
+        expected = reference_applied(raws, base)
+        preview = [(pid, from_cents(cents)) for pid, _, cents in result.applied]
+        problems = []
+        if from_cents(result.base_cents) != base:
+            problems.append(f"base {from_cents(result.base_cents)} != {base}")
+        if preview != expected:
+            problems.append(f"applied {preview} != checkout {expected}")
+        spent = sum(by_id[pid]['RequiredPoints'] or 0 for pid in result.promotion_ids)
+        if result.points_spent != spent:
+            problems.append(f"points_spent {result.points_spent} != RequiredPoints of the applied rewards {spent}")
+        if not allowed([(by_id[pid], raw, scope_products(by_id[pid], lines)) for pid, raw in raws], points_available):
+            problems.append(f"combination {result.promotion_ids} breaks the combination rules")
+
+        candidates = reference_candidates(promotions, lines, base, today, points_available)
+        if len(candidates) <= EXACT_SEARCH_LIMIT:
+            exact += 1
+            best_total, best_spent = brute_force(candidates, base, points_available)
+            if (result.discount, result.points_spent) != (best_total, best_spent):
+                problems.append(f"found ({result.discount}, {result.points_spent} pts), "
+                                f"best is ({best_total}, {best_spent} pts)")
+        if problems:
+            failures += 1
+            if failures <= args.show:
+                print(f"cart {cart_no}: {lines} points {points_redeemed}/{points_available}")
+                for problem in problems:
+                    print(f"  {problem}")
+    print(f"{args.carts} carts checked offline ({exact} against the brute-force search): {failures} mismatches")
+    return failures
+
+
+class Fixtures:
+    """Products, promotions and a customer created for the checkout comparison, and their removal."""
+
+    def __init__(self, cursor, rng, args, today):
+        self.cursor = cursor
+        self.tag = uuid.uuid4().hex[:8]
+        self.order_ids = []
+        cursor.execute("SELECT EmployeeID, StoreID FROM Employees WHERE StoreID IS NOT NULL ORDER BY EmployeeID LIMIT 1;")
+        row = cursor.fetchone()
+        if row is None:
+            raise SystemExit("Employees/Stores are empty; run generate_data.py or load SQL/DummyData.sql first.")
+        self.employee_id, self.store_id = row['EmployeeID'], row['StoreID']
+
+        self.products = []
+        for _, category, price in random_products(rng, args.products):
+            cursor.execute("INSERT INTO Products (ProductName, Category, Price, StockQuantity) VALUES (%s, %s, %s, %s);",
+                           (f"{CHECK_PREFIX}{self.tag} {len(self.products) + 1}", category, price, 1_000_000_000))
+            self.products.append((cursor.lastrowid, category, price))
+
+        self.promotion_ids = []
+        for promotion in random_promotions(rng, [pid for pid, _, _ in self.products], today, args.promotions):
+            cursor.execute("""
+                INSERT INTO Promotions (PromotionName, DiscountType, DiscountValue, StartDate, EndDate,
+                                        RequiredPoints, ScopeProductID, ScopeCategory)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
+            """, (f"{CHECK_PREFIX}{self.tag} {len(self.promotion_ids) + 1}", promotion['DiscountType'],
+                  promotion['DiscountValue'], promotion['StartDate'], promotion['EndDate'],
+                  promotion['RequiredPoints'], promotion['ScopeProductID'], promotion['ScopeCategory']))
+            self.promotion_ids.append(cursor.lastrowid)
+
+        cursor.execute("""
+            INSERT INTO Customers (FirstName, LastName, Email, JoinDate, LoyaltyPoints)
+            VALUES ('Parity', 'Check', %s, CURDATE(), %s);
+        """, (f"{self.tag}@{CHECK_DOMAIN}", 100_000_000))
+        self.customer_id = cursor.lastrowid
+
+    def promotions(self):
+        """The fixture promotions as the app loads them (Decimal values, dates, NULLs as None)."""
+        placeholders = ', '.join(['%s'] * len(self.promotion_ids))
+        self.cursor.execute(f"""
+            SELECT PromotionID, PromotionName, DiscountType, DiscountValue, StartDate, EndDate,
+                   RequiredPoints, ScopeProductID, ScopeCategory
+            FROM Promotions WHERE PromotionID IN ({placeholders});
+        """, self.promotion_ids)
+        return self.cursor.fetchall()
+
+    def points(self):
+        self.cursor.execute("SELECT fn_GetCustomerLoyaltyPoints(%s) AS points;", (self.customer_id,))
+        return self.cursor.fetchone()['points']
+
+    def cleanup(self):
+        # OrderItems and AppliedPromotions rows go with their orders (ON DELETE CASCADE)
+        for start in range(0, len(self.order_ids), 500):
+            chunk = self.order_ids[start:start + 500]
+            self.cursor.execute(f"DELETE FROM Orders WHERE OrderID IN ({', '.join(['%s'] * len(chunk))});", chunk)
+        if self.promotion_ids:
+            placeholders = ', '.join(['%s'] * len(self.promotion_ids))
+            self.cursor.execute(f"DELETE FROM Promotions WHERE PromotionID IN ({placeholders});", self.promotion_ids)
+        self.cursor.execute("DELETE FROM Products WHERE ProductName LIKE %s;", (f"{CHECK_PREFIX}{self.tag} %",))
+        self.cursor.execute("DELETE FROM Customers WHERE CustomerID = %s;", (self.customer_id,))
+
+
+def check_checkout(rng, args):
+    conn = bench_common.connect()
+    failures = 0
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT CURDATE() AS today;")
+        today = cursor.fetchone()['today'] # Promotions are active on the server's date
+        fixtures = Fixtures(cursor, rng, args, today)
+        try:
+            index = PromotionIndex(pd.DataFrame(fixtures.promotions()))
+            for cart_no in range(args.carts):
+                lines, points_redeemed, points_available = random_cart(rng, fixtures.products, args.max_lines)
+                result = index.evaluate(engine_items(lines), today, points_redeemed, points_available)
+                before = fixtures.points()
+
+                items = json.dumps([{'ProductID': pid, 'Quantity': qty} for pid, _, qty, _ in lines])
+                promotions = json.dumps(result.promotion_ids) if result.promotion_ids else None
+                cursor.execute("CALL sp_CheckoutOrder(%s, %s, %s, %s, %s, %s, @_proc_output);",
+                               (fixtures.customer_id, fixtures.employee_id, fixtures.store_id,
+                                items, points_redeemed, promotions))
+                cursor.execute("SELECT @_proc_output AS summary;")
+                summary = json.loads(cursor.fetchone()['summary'], parse_float=Decimal)
+                fixtures.order_ids.append(summary['OrderID'])
+
+                recorded = [(p['PromotionID'], Decimal(str(p['DiscountAmountApplied']))) for p in summary['AppliedPromotions']]
+                preview = [(pid, from_cents(cents)) for pid, _, cents in result.applied]
+                spent = before - fixtures.points()
+                expected_spent = points_redeemed + result.points_spent - summary['PointsEarned']
+                problems = []
+                if sorted(recorded) != sorted(preview):
+                    problems.append(f"applied {preview} != recorded {recorded}")
+                if Decimal(str(summary['TotalAmount'])) != result.total:
+                    problems.append(f"total {result.total} != recorded {summary['TotalAmount']}")
+                if summary['RewardPoints'] != result.points_spent:
+                    problems.append(f"reward points {result.points_spent} != recorded {summary['RewardPoints']}")
+                if spent != expected_spent:
+                    problems.append(f"balance fell by {spent}, expected {expected_spent}")
+                if problems:
+                    failures += 1
+                    if failures <= args.show:
+                        print(f"cart {cart_no}: {lines} points {points_redeemed}/{points_available}")
+                        for problem in problems:
+                            print(f"  {problem}")
+        finally:
+            fixtures.cleanup()
+    conn.close()
+    print(f"{args.carts} carts checked out through sp_CheckoutOrder: {failures} mismatches")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--carts', type=int, default=2000, help="Random carts to check")
+    parser.add_argument('--promotions', type=int, default=10, help="Random promotions per check")
+    parser.add_argument('--products', type=int, default=6, help="Random products per check")
+    parser.add_argument('--max-lines', type=int, default=5, help="Most distinct products in one cart")
+    parser.add_argument('--from-db', action='store_true', help="Check out the carts through sp_CheckoutOrder")
+    parser.add_argument('--show', type=int, default=10, help="Mismatches to print")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    failures = check_checkout(rng, args) if args.from_db else check_offline(rng, args)
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+# generate_data.py
+"""
+Deterministic synthetic data for capacity planning. Fills Stores, Employees, Customers, Products,
+Promotions, Orders and OrderItems at a configurable scale (10k to 50M+ orders):
+- orders follow a coffee-shop day (morning rush, lunch bump, quiet evenings) and a weekly cycle,
+- stores have uneven traffic and each order is rung up by one of that store's employees,
+- products follow a Zipf-like popularity that shifts by day part (coffee in the morning, food at lunch),
+- a share of orders are guests; members are skewed towards a core of regulars.
+The same seed and options (and numpy version) always produce the same rows.
+
+Usage (from the repo root, against a scratch database with the schema, triggers and procedures installed):
+    python Benchmarks/generate_data.py --scale small --seed 42
+    python Benchmarks/generate_data.py --orders 50000000 --days 730 --method load_data
+IDs continue after whatever the tables already hold, so this can run on top of SQL/DummyData.sql.
+Orders are inserted with their final totals, so the summary/rollup triggers keep ProductSalesSummary,
+CustomerOrderSummary and DailyStoreSales current; historical order items do not touch stock
+(the @_historical_import guard in trg_UpdateStockAfterOrder). Restart the Streamlit app afterwards.
+"""
+
+import argparse
+import datetime
+import time
+
+import numpy as np
+import pandas as pd
+
+from bench_common import connect
+from bulk_import import WRITERS
+
+SCALES = {
+    'tiny': 10_000,
+    'small': 100_000,
+    'medium': 1_000_000,
+    'large': 10_000_000,
+    'xlarge': 50_000_000,
+}
+
+# Share of the day's orders per hour (closed 21:00-06:00)
+HOUR_WEIGHTS = np.array([0, 0, 0, 0, 0, 0, 4, 10, 12, 9, 6, 6, 8, 7, 5, 6, 5, 4, 3, 2, 1, 0, 0, 0], dtype=float)
+WEEKDAY_WEIGHTS = np.array([1.0, 1.0, 1.0, 1.02, 1.08, 1.15, 0.95]) # Monday..Sunday
+
+# Category multipliers on top of the base popularity: before 11:00, 11:00-14:00, after 14:00
+DAY_PART_HOURS = [11, 14]
+DAY_PART_CATEGORY_WEIGHTS = [
+    {'Beverage': 1.6, 'Food': 1.0, 'Merchandise': 0.4},
+    {'Beverage': 0.9, 'Food': 1.8, 'Merchandise': 0.8},
+    {'Beverage': 1.1, 'Food': 0.8, 'Merchandise': 1.3},
+]
+PRODUCT_ZIPF_EXPONENT = 1.1  # Popularity of the n-th menu item ~ 1 / n^s
+CUSTOMER_ZIPF_EXPONENT = 0.8 # Visits of the n-th customer ~ 1 / n^s (a core of regulars)
+GUEST_SHARE = 0.35           # Orders without a loyalty customer
+QUANTITY_WEIGHTS = [85, 12, 3] # Quantity 1, 2, 3 per line
+MEAN_EXTRA_ITEMS = 0.7       # Items per order = 1 + Poisson(mean), capped at MAX_ITEMS
+MAX_ITEMS = 8
+
+# Menu in rough order of popularity: (name, category, price)
+MENU = [
+    ("Drip Coffee", 'Beverage', 2.50), ("Latte", 'Beverage', 4.50), ("Cappuccino", 'Beverage', 4.25),
+    ("Iced Coffee", 'Beverage', 4.00), ("Americano", 'Beverage', 3.25), ("Croissant", 'Food', 2.75),
+    ("Cold Brew", 'Beverage', 4.50), ("Espresso", 'Beverage', 3.50), ("Muffin", 'Food', 3.00),
+    ("Breakfast Sandwich", 'Food', 6.50), ("Mocha", 'Beverage', 4.95), ("Flat White", 'Beverage', 4.50),
+    ("Iced Latte", 'Beverage', 4.95), ("Bagel", 'Food', 2.95), ("Chai Latte", 'Beverage', 4.50),
+    ("Cookie", 'Food', 2.25), ("Tea", 'Beverage', 2.75), ("Panini", 'Food', 8.50),
+    ("Scone", 'Food', 3.25), ("Hot Chocolate", 'Beverage', 3.75), ("Matcha Latte", 'Beverage', 5.25),
+    ("Avocado Toast", 'Food', 7.95), ("Banana Bread", 'Food', 3.50), ("Macchiato", 'Beverage', 3.95),
+    ("Brownie", 'Food', 3.25), ("Salad", 'Food', 9.50), ("Coffee Beans (1lb)", 'Merchandise', 15.00),
+    ("Shop Mug", 'Merchandise', 12.00), ("Tumbler", 'Merchandise', 18.00), ("Gift Card", 'Merchandise', 25.00),
+]
+SIZE_VARIANTS = [("Large", 0.75), ("Small", -0.50), ("Decaf", 0.0), ("Oat Milk", 0.65)]
+
+FIRST_NAMES = ["Olivia", "Liam", "Emma", "Noah", "Ava", "Elijah", "Sophia", "James", "Isabella", "Lucas",
+               "Mia", "Mateo", "Amelia", "Benjamin", "Harper", "Henry", "Evelyn", "Theodore", "Aria", "Jack",
+               "Priya", "Wei", "Fatima", "Diego", "Yuki", "Omar", "Chloe", "Kwame", "Sofia", "Ivan"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez",
+              "Martinez", "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore",
+              "Jackson", "Martin", "Lee", "Nguyen", "Patel", "Kim", "Chen", "Singh", "Okafor", "Silva", "Cohen", "Novak"]
+CITIES = [("Anytown", "NY", "100"), ("Springfield", "IL", "627"), ("Riverside", "CA", "925"),
+          ("Fairview", "TX", "750"), ("Madison", "WI", "537"), ("Georgetown", "WA", "981"),
+          ("Salem", "OR", "973"), ("Franklin", "TN", "370")]
+STORE_NAMES = ["Downtown Brew", "Uptown Cafe", "Harbor Roast", "Station Espresso", "Campus Grind",
+               "Market Street Beans", "Riverside Perk", "Old Town Coffee", "Parkside Pour", "Airport Express"]
+STREETS = ["Main St", "Oak Ave", "Pine St", "Maple Dr", "Cedar Ln", "Elm St", "Lake Rd", "Hill St"]
+
+
+def derived_sizes(orders):
+    """Default dimension sizes for an order volume (overridable on the command line)."""
+    return {
+        'stores': int(np.clip(orders // 200_000, 2, 500)),
+        'customers': int(np.clip(orders // 8, 100, 5_000_000)),
+        'products': len(MENU),
+    }
+
+
+def cdf(weights):
+    """Cumulative distribution for _draw (computed once, then each draw is a binary search)."""
+    cumulative = np.cumsum(np.asarray(weights, dtype=float))
+    return cumulative / cumulative[-1] # Exactly 1.0 from the last non-zero weight on
+
+def _draw(rng, cumulative, size):
+    """`size` indices drawn from a distribution given as a cdf."""
+    return np.searchsorted(cumulative, rng.random(size), side='right')
+
+def zipf_weights(n, exponent):
+    return 1.0 / np.arange(1, n + 1) ** exponent
+
+def money_text(cents):
+    """Integer cents -> 'd.cc' strings, exact for DECIMAL(10, 2) columns."""
+    cents = pd.Series(np.asarray(cents, dtype=np.int64))
+    return (cents // 100).astype(str) + '.' + (cents % 100).astype(str).str.zfill(2)
+
+def next_id(cursor, table, column):
+    cursor.execute(f"SELECT COALESCE(MAX({column}), 0) + 1 AS next_id FROM {table};")
+    return int(cursor.fetchone()['next_id'])
+
+
+# --- Dimension Tables ---
+def make_stores(rng, count, first_id):
+    city = rng.integers(0, len(CITIES), count)
+    names = [STORE_NAMES[i % len(STORE_NAMES)] + (f" #{i // len(STORE_NAMES) + 1}" if i >= len(STORE_NAMES) else "")
+             for i in range(count)]
+    return pd.DataFrame({
+        'StoreID': first_id + np.arange(count),
+        'StoreName': names,
+        'Address': [f"{rng.integers(1, 2000)} {STREETS[rng.integers(0, len(STREETS))]}" for _ in range(count)],
+        'City': [CITIES[c][0] for c in city],
+        'State': [CITIES[c][1] for c in city],
+        'ZipCode': [f"{CITIES[c][2]}{rng.integers(0, 100):02d}" for c in city],
+    })
+
+def make_employees(rng, store_ids, first_id, start_date):
+    """One manager, one or two shift supervisors and 4-9 baristas per store."""
+    rows = []
+    for store_id in store_ids:
+        positions = ['Manager'] + ['Shift Supervisor'] * int(rng.integers(1, 3)) + ['Barista'] * int(rng.integers(4, 10))
+        for position in positions:
+            base = {'Manager': 25.0, 'Shift Supervisor': 20.0, 'Barista': 17.0}[position]
+            rows.append({
+                'FirstName': FIRST_NAMES[rng.integers(0, len(FIRST_NAMES))],
+                'LastName': LAST_NAMES[rng.integers(0, len(LAST_NAMES))],
+                'Position': position,
+                'HireDate': start_date - datetime.timedelta(days=int(rng.integers(30, 2000))),
+                'HourlyRate': f"{base + rng.integers(0, 400) / 100:.2f}",
+                'StoreID': int(store_id),
+            })
+    employees = pd.DataFrame(rows)
+    employees.insert(0, 'EmployeeID', first_id + np.arange(len(employees)))
+    return employees
+
+def make_products(count, first_id):
+    """The menu, then size/milk variants of it, then numbered seasonal specials."""
+    rows = list(MENU[:count])
+    for variant, delta in SIZE_VARIANTS:
+        for name, category, price in MENU:
+            if len(rows) >= count:
+                break
+            if category == 'Beverage':
+                rows.append((f"{name} ({variant})", category, max(1.0, price + delta)))
+    while len(rows) < count:
+        rows.append((f"Seasonal Special {len(rows) + 1}", 'Beverage' if len(rows) % 3 else 'Food', 4.95))
+    products = pd.DataFrame(rows, columns=['ProductName', 'Category', 'Price'])
+    products.insert(0, 'ProductID', first_id + np.arange(count))
+    products['PriceCents'] = (products['Price'] * 100).round().astype(np.int64)
+    products['Price'] = money_text(products['PriceCents'])
+    products['StockQuantity'] = 100_000
+    return products
+
+def make_promotions(rng, start_date, end_date, food_names):
+    """A percent-off special per month, a two-week item promo every other month, plus loyalty rewards."""
+    rows = []
+    month = datetime.date(start_date.year, start_date.month, 1)
+    while month <= end_date:
+        next_month = (month + datetime.timedelta(days=32)).replace(day=1)
+        percent = int(rng.choice([5, 10, 15]))
+        rows.append((f"{month:%B %Y} Special", f"{percent}% off entire order in {month:%B}", 'PERCENT',
+                     f"{percent:.2f}", month, next_month - datetime.timedelta(days=1), None))
+        if month.month % 2 == 0:
+            item = food_names[rng.integers(0, len(food_names))]
+            rows.append((f"{item} Madness {month:%Y-%m}", f"$0.50 off any {item}", 'FIXED', "0.50",
+                         month, month + datetime.timedelta(days=14), None))
+        month = next_month
+    for points, amount in ((100, "1.00"), (200, "2.00"), (500, "6.00")):
+        rows.append((f"Loyal Sip Reward {points}", f"${amount} off when redeeming {points} points", 'FIXED',
+                     amount, None, None, points))
+    return pd.DataFrame(rows, columns=['PromotionName', 'Description', 'DiscountType', 'DiscountValue',
+                                       'StartDate', 'EndDate', 'RequiredPoints'])
+
+def make_customers(rng, start, count, first_id, seed, start_date):
+    """Customers [start, start + count) of the run; emails/phones embed the seed so runs don't collide."""
+    index = np.arange(start, start + count)
+    first = np.array(FIRST_NAMES)[rng.integers(0, len(FIRST_NAMES), count)]
+    last = np.array(LAST_NAMES)[rng.integers(0, len(LAST_NAMES), count)]
+    emails = [f"{f.lower()}.{l.lower()}.{i}@s{seed}.example.com" for f, l, i in zip(first, last, index)]
+    phones = [f"555-{seed % 1000:03d}-{i:08d}" if has else None for i, has in zip(index, rng.random(count) < 0.7)]
+    join_dates = [start_date - datetime.timedelta(days=int(d)) for d in rng.integers(1, 730, count)]
+    return pd.DataFrame({
+        'CustomerID': first_id + index,
+        'FirstName': first, 'LastName': last, 'Email': emails, 'PhoneNumber': phones,
+        'JoinDate': join_dates, 'LoyaltyPoints': 0,
+    })
+
+
+# --- Orders ---
+class OrderModel:
+    """Everything needed to draw orders: the distributions as cdfs plus the ID lookups."""
+
+    def __init__(self, rng, stores, employees, products, customer_count, first_customer_id, start_date, days):
+        self.start = np.datetime64(start_date, 's')
+        dates = [start_date + datetime.timedelta(days=d) for d in range(days)]
+        # Slow growth over the period on top of the weekly cycle
+        self.day_weights = WEEKDAY_WEIGHTS[[d.weekday() for d in dates]] * np.linspace(0.85, 1.15, days)
+        self.hour_cdf = cdf(HOUR_WEIGHTS)
+        self.store_cdf = cdf(rng.lognormal(0.0, 0.5, len(stores)))
+        self.store_ids = stores['StoreID'].to_numpy()
+        counts = employees.groupby('StoreID').size().reindex(stores['StoreID']).to_numpy()
+        self.employee_first = employees['EmployeeID'].to_numpy()[np.concatenate([[0], np.cumsum(counts)[:-1]])]
+        self.employee_count = counts
+        self.customer_cdf = cdf(zipf_weights(customer_count, CUSTOMER_ZIPF_EXPONENT)) if customer_count else None
+        # Regulars are spread over the ID range rather than being the oldest IDs
+        self.customer_ids = first_customer_id + rng.permutation(customer_count)
+        base = zipf_weights(len(products), PRODUCT_ZIPF_EXPONENT)
+        self.product_cdfs = [cdf(base * products['Category'].map(weights).fillna(1.0).to_numpy())
+                             for weights in DAY_PART_CATEGORY_WEIGHTS]
+        self.product_ids = products['ProductID'].to_numpy()
+        self.price_cents = products['PriceCents'].to_numpy()
+        self.quantity_cdf = cdf(QUANTITY_WEIGHTS)
+
+    def orders(self, rng, day, n, first_order_id):
+        """(orders, order_items) DataFrames for n orders on one day, in timestamp order."""
+        seconds = day * 86400 + _draw(rng, self.hour_cdf, n) * 3600 + rng.integers(0, 3600, n)
+        seconds.sort() # OrderIDs follow time, as AUTO_INCREMENT would
+        hour = (seconds % 86400) // 3600
+
+        store = _draw(rng, self.store_cdf, n)
+        employee_id = self.employee_first[store] + (rng.random(n) * self.employee_count[store]).astype(np.int64)
+        member = rng.random(n) >= GUEST_SHARE if self.customer_cdf is not None else np.zeros(n, dtype=bool)
+        customer_id = pd.array(np.zeros(n, dtype=np.int64), dtype='Int64')
+        if member.any():
+            customer_id[member] = self.customer_ids[_draw(rng, self.customer_cdf, int(member.sum()))]
+        customer_id[~member] = pd.NA
+
+        items = 1 + np.minimum(rng.poisson(MEAN_EXTRA_ITEMS, n), MAX_ITEMS - 1)
+        item_order = np.repeat(np.arange(n), items)
+        day_part = np.digitize(hour[item_order], DAY_PART_HOURS)
+        product = np.empty(len(item_order), dtype=np.int64)
+        for part, part_cdf in enumerate(self.product_cdfs):
+            mask = day_part == part
+            product[mask] = _draw(rng, part_cdf, int(mask.sum()))
+        quantity = 1 + _draw(rng, self.quantity_cdf, len(item_order))
+        line_cents = quantity * self.price_cents[product]
+        total_cents = np.bincount(item_order, weights=line_cents, minlength=n).round().astype(np.int64)
+
+        order_ids = first_order_id + np.arange(n)
+        orders = pd.DataFrame({
+            'OrderID': order_ids,
+            'CustomerID': customer_id,
+            'EmployeeID': employee_id,
+            'StoreID': self.store_ids[store],
+            'OrderTimestamp': np.datetime_as_string(self.start + seconds.astype('timedelta64[s]'), unit='s'),
+            'TotalAmount': money_text(total_cents),
+            'PointsEarned': np.where(member, total_cents // 100, 0), # fn_CalculatePointsEarned: 1 point per whole dollar
+            'PointsRedeemed': 0,
+        })
+        order_items = pd.DataFrame({
+            'OrderID': order_ids[item_order],
+            'ProductID': self.product_ids[product],
+            'Quantity': quantity,
+            'PriceAtTimeOfOrder': money_text(self.price_cents[product]),
+        })
+        return orders, order_items
+
+
+# --- Loading ---
+def insert(cursor, method, table, rows):
+    inserted, skipped = WRITERS[method](cursor, table, list(rows.columns), rows)
+    if skipped:
+        raise RuntimeError(f"{table}: {len(rows) - inserted} of {len(rows)} rows were not inserted "
+                           f"(first reason: {skipped[0][1]})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument('--scale', choices=list(SCALES), default='tiny', help="Preset order volume")
+    size.add_argument('--orders', type=int, help="Exact number of orders (overrides --scale)")
+    parser.add_argument('--days', type=int, default=365, help="Days of history the orders are spread over")
+    parser.add_argument('--end-date', type=datetime.date.fromisoformat, default=datetime.date(2025, 5, 31),
+                        help="Last day of history (fixed by default so runs are reproducible)")
+    parser.add_argument('--stores', type=int, help="Default: 1 per 200k orders (2-500)")
+    parser.add_argument('--customers', type=int, help="Default: 1 per 8 orders (100-5M)")
+    parser.add_argument('--products', type=int, help=f"Default: the {len(MENU)}-item menu")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-orders', type=int, default=100_000, help="Orders per insert batch/transaction")
+    parser.add_argument('--method', choices=sorted(WRITERS), default='executemany')
+    args = parser.parse_args()
+
+    orders_total = args.orders if args.orders is not None else SCALES[args.scale]
+    sizes = derived_sizes(orders_total)
+    stores_total = args.stores or sizes['stores']
+    customers_total = args.customers if args.customers is not None else sizes['customers']
+    products_total = args.products or sizes['products']
+    start_date = args.end_date - datetime.timedelta(days=args.days - 1)
+    # One stream for the dimensions, one per day for orders: --chunk-orders doesn't change the data
+    rng = np.random.default_rng(args.seed)
+
+    conn = connect(autocommit=False, local_infile=(args.method == 'load_data'))
+    started = time.perf_counter()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM Customers WHERE Email LIKE %s LIMIT 1;", (f"%@s{args.seed}.example.com",))
+            if cursor.fetchone():
+                raise SystemExit(f"This database already holds data generated with seed {args.seed}; "
+                                 "use another --seed or a fresh database.")
+            cursor.execute("SET @_historical_import = 1") # Historical sales must not touch current stock
+
+            stores = make_stores(rng, stores_total, next_id(cursor, 'Stores', 'StoreID'))
+            employees = make_employees(rng, stores['StoreID'], next_id(cursor, 'Employees', 'EmployeeID'), start_date)
+            products = make_products(products_total, next_id(cursor, 'Products', 'ProductID'))
+            food = products.loc[products['Category'] == 'Food', 'ProductName'].tolist() or ["Muffin"]
+            promotions = make_promotions(rng, start_date, args.end_date, food)
+            insert(cursor, args.method, 'Stores', stores)
+            insert(cursor, args.method, 'Employees', employees)
+            insert(cursor, args.method, 'Products', products.drop(columns='PriceCents'))
+            insert(cursor, args.method, 'Promotions', promotions)
+            first_customer_id = next_id(cursor, 'Customers', 'CustomerID')
+            for start in range(0, customers_total, 100_000):
+                insert(cursor, args.method, 'Customers',
+                       make_customers(rng, start, min(100_000, customers_total - start), first_customer_id, args.seed, start_date))
+            conn.commit()
+            print(f"stores={len(stores)} employees={len(employees)} products={len(products)} "
+                  f"promotions={len(promotions)} customers={customers_total} "
+                  f"({time.perf_counter() - started:.1f}s)")
+
+            model = OrderModel(rng, stores, employees, products, customers_total, first_customer_id, start_date, args.days)
+            day_counts = rng.multinomial(orders_total, model.day_weights / model.day_weights.sum())
+            first_order_id = next_id(cursor, 'Orders', 'OrderID')
+            next_order_id, done, items_total = first_order_id, 0, 0
+            pending_orders, pending_items, pending = [], [], 0
+            for day, count in enumerate(day_counts):
+                if count:
+                    day_orders, day_items = model.orders(np.random.default_rng([args.seed, day]), day, int(count), next_order_id)
+                    pending_orders.append(day_orders)
+                    pending_items.append(day_items)
+                    next_order_id += int(count)
+                    done += int(count)
+                    pending += int(count)
+                if pending and (pending >= args.chunk_orders or day == len(day_counts) - 1):
+                    chunk_items = pd.concat(pending_items, ignore_index=True)
+                    insert(cursor, args.method, 'Orders', pd.concat(pending_orders, ignore_index=True))
+                    insert(cursor, args.method, 'OrderItems', chunk_items)
+                    conn.commit()
+                    items_total += len(chunk_items)
+                    pending_orders, pending_items, pending = [], [], 0
+                    elapsed = time.perf_counter() - started
+                    print(f"  orders {done:,}/{orders_total:,}  items {items_total:,}  ({done / elapsed:,.0f} orders/s)")
+
+            # Balances = points earned on the generated orders
+            cursor.execute("""
+                UPDATE Customers c
+                JOIN (SELECT CustomerID, SUM(PointsEarned - PointsRedeemed) AS Points
+                      FROM Orders WHERE OrderID >= %s AND CustomerID IS NOT NULL GROUP BY CustomerID) t
+                  ON t.CustomerID = c.CustomerID
+                SET c.LoyaltyPoints = c.LoyaltyPoints + t.Points;
+            """, (first_order_id,))
+            conn.commit()
+            cursor.execute("ANALYZE TABLE Stores, Employees, Customers, Products, Promotions, Orders, OrderItems;")
+            cursor.fetchall()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if conn.open:
+            with conn.cursor() as cursor:
+                cursor.execute("SET @_historical_import = NULL")
+        conn.close()
+    elapsed = time.perf_counter() - started
+    print(f"done: {orders_total:,} orders, {items_total:,} order items in {elapsed:.1f}s "
+          f"({orders_total / elapsed:,.0f} orders/s)")
+
+
+if __name__ == "__main__":
+    main()
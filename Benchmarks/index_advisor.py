@@ -0,0 +1,366 @@
+# index_advisor.py
+"""
+Index advisor for the app's SQL.
+1. Collects the SELECTs the Streamlit pages and database.py issue: every literal one (static scan
+   of App/), plus the ones built at runtime (keyset history pages, IN lists, typeahead search,
+   rollups, reorder report, loyalty balances). Those are captured with their real parameters
+   while the database.py functions the pages call run against the configured database.
+2. Runs EXPLAIN FORMAT=JSON on each against the configured database and reports full table
+   scans, filesorts and temporary tables.
+3. For each problem, derives a composite index candidate (equality columns, then range/sort
+   columns) from the query text and the table's real columns, skipping ones an existing index
+   already covers, and can write them out as a versioned migration.
+4. With --time, times every query before and after applying a migration (use a scratch database
+   loaded with a large synthetic dataset).
+
+Usage (from the repo root):
+    python Benchmarks/index_advisor.py                       # report only
+    python Benchmarks/index_advisor.py --write-migration SQL/Migrations/V002__advisor_indexes.sql
+    python Benchmarks/index_advisor.py --time --apply SQL/Migrations/V001__hot_query_indexes.sql \
+        --output Benchmarks/results/V001_index_timings.json
+"""
+
+import argparse
+import ast
+import datetime
+import glob
+import json
+import os
+import re
+
+from bench_common import APP_DIR, connect, connect_kwargs, summarize, time_call
+import database # Imports Streamlit; outside `streamlit run` its caches fall back to in-memory ones
+
+SQL_START_RE = re.compile(r'^\s*(SELECT|WITH)\b', re.IGNORECASE)
+CLAUSE_END_RE = re.compile(r'\b(GROUP\s+BY|ORDER\s+BY|LIMIT|HAVING|UNION|FOR\s+UPDATE)\b', re.IGNORECASE)
+TABLE_ALIAS_RE = re.compile(r'\b(?:FROM|JOIN)\s+`?(\w+)`?(?:\s+(?:AS\s+)?(?!ON\b|WHERE\b|JOIN\b|LEFT\b|RIGHT\b|INNER\b|ORDER\b|GROUP\b|LIMIT\b)(\w+))?',
+                            re.IGNORECASE)
+PREDICATE_RE = re.compile(r'(?:(\w+)\.)?`?(\w+)`?\s*(<=|>=|<>|!=|=|<|>|\bIN\b|\bBETWEEN\b|\bIS\s+NULL\b|\bLIKE\b)', re.IGNORECASE)
+ORDER_BY_RE = re.compile(r'\bORDER\s+BY\s+(.+?)(?:\bLIMIT\b|;|$)', re.IGNORECASE | re.DOTALL)
+SAMPLE_PARAM = "1"
+
+
+# --- Query Capture ---
+def collect_queries(app_dir=APP_DIR):
+    """Returns {sql: [source locations]} for every literal SELECT in App/*.py and App/pages/*.py."""
+    queries = {}
+    files = sorted(glob.glob(os.path.join(app_dir, '*.py')) + glob.glob(os.path.join(app_dir, 'pages', '*.py')))
+    for path in files:
+        with open(path, encoding='utf-8') as handle:
+            tree = ast.parse(handle.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Constant) and isinstance(node.value, str) and SQL_START_RE.match(node.value):
+                sql = node.value.strip()
+                if re.search(r'\bFROM\b', sql, re.IGNORECASE):
+                    queries.setdefault(sql, []).append(f"{os.path.relpath(path, os.path.dirname(app_dir))}:{node.lineno}")
+    return queries
+
+
+def first_value(cursor, sql):
+    cursor.execute(sql)
+    row = cursor.fetchone()
+    return next(iter(row.values())) if row else None
+
+def exercise_pages(cursor):
+    """
+    Calls the database.py functions the pages use on a rerun, with IDs and search terms sampled
+    from the database, so every statement they build at runtime is executed once.
+    """
+    store_id = first_value(cursor, "SELECT StoreID FROM Stores ORDER BY StoreID LIMIT 1;")
+    employee_id = first_value(cursor, "SELECT EmployeeID FROM Employees ORDER BY EmployeeID LIMIT 1;")
+    customer_id = first_value(cursor, "SELECT CustomerID FROM Customers ORDER BY CustomerID LIMIT 1;")
+    last_name = first_value(cursor, "SELECT LastName FROM Customers ORDER BY CustomerID LIMIT 1;") or "a"
+    product_name = first_value(cursor, "SELECT ProductName FROM Products ORDER BY ProductID LIMIT 1;") or "a"
+
+    reference = database.get_reference_data()
+    database.get_product_catalog(reference)
+    database.get_promotion_index(reference)
+    for scope in ({}, {'store_id': store_id}, {'employee_id': employee_id}, {'customer_id': customer_id}):
+        page, _ = database.get_order_history_page(**scope)
+        if not page.empty:
+            database.get_order_items_for_orders(page['OrderID'].tolist())
+    database.get_loyalty_balances([customer_id] if customer_id is not None else [])
+    database.get_loyalty_ledger_status()
+    for grain in database.ROLLUP_GRAINS:
+        database.get_sales_rollup(grain)
+    database.get_sales_rollup('month', store_id=store_id)
+    for reorder_store in (None, store_id):
+        database.get_reorder_report(reorder_store, limit=database.REORDER_CONFIG['report_rows'])
+    for term in (last_name[:1], last_name[:3]): # Short terms take the prefix branches, longer ones FULLTEXT too
+        database.search_customers(term)
+    for term in (product_name[:1], product_name[:3]):
+        database.search_products(term)
+
+def collect_runtime_queries(cursor):
+    """
+    Returns {sql: (source, params)} for every SELECT run while exercise_pages calls the pages' data
+    functions (database.capture_statements). source is "runtime:<registered name>".
+    """
+    # database.py uses the app's pool; point it at the advisor's database
+    database.DB_CONFIG.update(connect_kwargs())
+    with database.capture_statements() as captured:
+        exercise_pages(cursor)
+    return {sql.strip(): (f"runtime:{name or 'unregistered'}", params)
+            for sql, (name, params) in captured.items() if SQL_START_RE.match(sql)}
+
+def collect_all_queries(cursor):
+    """
+    {sql: {'sources': [locations], 'params': params}}: the static scan plus the runtime capture.
+    params is None for literal-only statements, whose placeholders get SAMPLE_PARAM.
+    """
+    queries = {sql: {'sources': locations, 'params': None} for sql, locations in collect_queries().items()}
+    for sql, (source, params) in collect_runtime_queries(cursor).items():
+        entry = queries.setdefault(sql, {'sources': [], 'params': None})
+        entry['sources'].append(source)
+        entry['params'] = params
+    return queries
+
+
+def bind_sample_params(sql):
+    """Replaces %s placeholders with a representative literal so EXPLAIN can run."""
+    return sql.replace('%s', SAMPLE_PARAM).rstrip().rstrip(';')
+
+def executable(sql, params):
+    """(sql, args) for cursor.execute: the captured parameters when there are any, else sample literals."""
+    if params is None:
+        return bind_sample_params(sql), None
+    return sql.rstrip().rstrip(';'), params
+
+
+# --- EXPLAIN Analysis ---
+def explain_problems(cursor, sql, params=None):
+    """Returns a list of {table, problem, rows} found in EXPLAIN FORMAT=JSON output."""
+    text, args = executable(sql, params)
+    cursor.execute("EXPLAIN FORMAT=JSON " + text, args)
+    plan = json.loads(next(iter(cursor.fetchone().values())))
+    problems = []
+
+    def walk(node, inherited_sort=False):
+        if isinstance(node, dict):
+            sort_here = inherited_sort or bool(node.get('using_filesort'))
+            if 'table' in node and isinstance(node['table'], dict):
+                table = node['table']
+                name = table.get('table_name')
+                rows = table.get('rows_examined_per_scan')
+                if table.get('access_type') == 'ALL':
+                    problems.append({'table': name, 'problem': 'full scan', 'rows': rows})
+                elif table.get('access_type') == 'index' and not table.get('using_index'):
+                    problems.append({'table': name, 'problem': 'full index scan', 'rows': rows})
+            if node.get('using_filesort'):
+                problems.append({'table': first_table(node), 'problem': 'filesort', 'rows': None})
+            if node.get('using_temporary_table'):
+                problems.append({'table': first_table(node), 'problem': 'temporary table', 'rows': None})
+            for value in node.values():
+                walk(value, sort_here)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item, inherited_sort)
+
+    walk(plan)
+    return problems
+
+
+def first_table(node):
+    """Name of the first table found under a plan node (the table a sort applies to)."""
+    if isinstance(node, dict):
+        if isinstance(node.get('table'), dict) and node['table'].get('table_name'):
+            return node['table']['table_name']
+        for value in node.values():
+            found = first_table(value)
+            if found:
+                return found
+    elif isinstance(node, list):
+        for item in node:
+            found = first_table(item)
+            if found:
+                return found
+    return None
+
+
+# --- Index Candidates ---
+def table_metadata(cursor):
+    """Returns ({table: [columns]}, {table: [[index columns in order], ...]}) for the current schema."""
+    cursor.execute("""
+        SELECT TABLE_NAME, COLUMN_NAME FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() ORDER BY TABLE_NAME, ORDINAL_POSITION;
+    """)
+    columns = {}
+    for row in cursor.fetchall():
+        columns.setdefault(row['TABLE_NAME'], []).append(row['COLUMN_NAME'])
+    cursor.execute("""
+        SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX;
+    """)
+    indexes = {}
+    for row in cursor.fetchall():
+        indexes.setdefault((row['TABLE_NAME'], row['INDEX_NAME']), []).append(row['COLUMN_NAME'])
+    by_table = {}
+    for (table, _), cols in indexes.items():
+        by_table.setdefault(table, []).append(cols)
+    return columns, by_table
+
+
+def candidate_index(sql, table, columns):
+    """
+    Derives (equality columns + range/sort columns) for `table` from the query's WHERE and
+    ORDER BY clauses. Returns a list of column names or [] when nothing useful is found.
+    """
+    known = {c.lower(): c for c in columns.get(table, [])}
+    if not known:
+        return []
+    aliases = {table.lower()}
+    for name, alias in TABLE_ALIAS_RE.findall(sql):
+        if name.lower() == table.lower() and alias:
+            aliases.add(alias.lower())
+    single_table = len(TABLE_ALIAS_RE.findall(sql)) == 1
+
+    def belongs(alias):
+        return (alias and alias.lower() in aliases) or (not alias and single_table)
+
+    operators = {}  # column -> was every predicate on it an equality?
+    where = re.search(r'\bWHERE\b(.+)', sql, re.IGNORECASE | re.DOTALL)
+    if where:
+        clause = CLAUSE_END_RE.split(where.group(1))[0]
+        for alias, column, operator in PREDICATE_RE.findall(clause):
+            col = known.get(column.lower())
+            if not col or not belongs(alias):
+                continue
+            is_equality = operator.strip().upper() in ('=', 'IN') or operator.upper().startswith('IS')
+            operators[col] = operators.get(col, True) and is_equality
+    equality = [col for col, eq in operators.items() if eq]
+    ranges = [col for col, eq in operators.items() if not eq]
+    sort_cols = []
+    order = ORDER_BY_RE.search(sql)
+    if order:
+        for part in order.group(1).split(','):
+            tokens = part.strip().split()
+            if not tokens:
+                continue
+            alias, _, column = tokens[0].rpartition('.')
+            col = known.get(column.strip('`').lower())
+            if col and belongs(alias) and col not in equality:
+                sort_cols.append(col)
+    # A range column stops index use for later sort columns, so prefer the sort when both exist
+    tail = sort_cols if sort_cols else ranges[:1]
+    return equality + [c for c in tail if c not in equality]
+
+
+def is_covered(candidate, existing):
+    """True if an existing index starts with the candidate's columns (or the PK already is it)."""
+    return any([c.lower() for c in index[:len(candidate)]] == [c.lower() for c in candidate] for index in existing)
+
+
+def index_name(table, cols):
+    return f"idx_{table}_{'_'.join(cols)}"[:64]
+
+
+# --- Main ---
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--write-migration', metavar='PATH', help="Write recommended indexes as a migration file")
+    parser.add_argument('--version', default=None, help="Migration version label (default: taken from the file name)")
+    parser.add_argument('--time', action='store_true', help="Time every query (before/after when --apply is given)")
+    parser.add_argument('--apply', metavar='MIGRATION', help="Apply this migration between the before/after timing runs")
+    parser.add_argument('--repeat', type=int, default=20, help="Runs per query when timing")
+    parser.add_argument('--label', default=None, help="Dataset label stored with the timings")
+    parser.add_argument('--output', help="With --time, write the before/after timings to this JSON file")
+    args = parser.parse_args()
+
+    conn = connect()
+    with conn.cursor() as cursor:
+        queries = collect_all_queries(cursor)
+        columns, existing = table_metadata(cursor)
+
+        runtime = sum(1 for entry in queries.values() if entry['params'] is not None)
+        print(f"Captured {len(queries)} distinct SELECT statements from App/ ({runtime} with runtime parameters)\n")
+        recommendations = {}
+        for sql, entry in queries.items():
+            locations = entry['sources']
+            try:
+                problems = explain_problems(cursor, sql, entry['params'])
+            except Exception as e:
+                print(f"[skipped] {locations[0]}: EXPLAIN failed ({e})")
+                continue
+            if not problems:
+                continue
+            print(f"{locations[0]}  ({len(locations)} call site(s))")
+            print("    " + " ".join(sql.split())[:140])
+            for problem in problems:
+                rows = f", ~{problem['rows']} rows" if problem['rows'] else ""
+                print(f"    - {problem['problem']} on {problem['table']}{rows}")
+                table = problem['table']
+                if table not in columns:
+                    continue # Derived/temporary table
+                cols = candidate_index(sql, table, columns)
+                if cols and not is_covered(cols, existing.get(table, [])):
+                    recommendations.setdefault((table, tuple(cols)), set()).add(locations[0])
+
+        print("\nRecommended indexes:")
+        if not recommendations:
+            print("    (none - every problem is either covered or not index-fixable)")
+        for (table, cols), sources in sorted(recommendations.items()):
+            print(f"    CREATE INDEX {index_name(table, cols)} ON {table} ({', '.join(cols)});  -- {', '.join(sorted(sources))}")
+
+        if args.write_migration:
+            version = args.version or os.path.basename(args.write_migration).split('__')[0]
+            with open(args.write_migration, 'w', encoding='utf-8') as handle:
+                handle.write(f"-- {version}: indexes recommended by Benchmarks/index_advisor.py\n\n")
+                for (table, cols), sources in sorted(recommendations.items()):
+                    handle.write(f"-- Serves: {', '.join(sorted(sources))}\n")
+                    handle.write(f"CREATE INDEX {index_name(table, cols)} ON {table} ({', '.join(cols)});\n\n")
+                handle.write("CREATE TABLE IF NOT EXISTS SchemaMigrations (\n"
+                             "    Version VARCHAR(20) PRIMARY KEY,\n"
+                             "    Description VARCHAR(255) NOT NULL,\n"
+                             "    AppliedAt DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP\n"
+                             ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;\n")
+                handle.write(f"INSERT INTO SchemaMigrations (Version, Description) VALUES ('{version}', 'Index advisor recommendations');\n")
+            print(f"\nWrote {args.write_migration}")
+
+        if args.time:
+            def time_all():
+                return {sql: summarize(time_call(lambda: run(cursor, sql, entry['params']), args.repeat))
+                        for sql, entry in queries.items()}
+            before = time_all()
+            after = None
+            if args.apply:
+                apply_migration(cursor, args.apply)
+                after = time_all()
+            print(f"\n{'query':<72}{'before p50':>12}{'after p50':>12}{'speedup':>9}")
+            for sql, entry in queries.items():
+                label = f"{entry['sources'][0]}  " + " ".join(sql.split())
+                b = before[sql]['p50_ms']
+                line = f"{label[:70]:<72}{b:>12.3f}"
+                if after:
+                    a = after[sql]['p50_ms']
+                    line += f"{a:>12.3f}{(b / a if a else 0):>8.1f}x"
+                print(line)
+
+            if args.output:
+                timings = [{'source': entry['sources'][0], 'sql': " ".join(sql.split()), 'before': before[sql],
+                            'after': after[sql] if after else None}
+                           for sql, entry in queries.items()]
+                os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+                with open(args.output, 'w', encoding='utf-8') as handle:
+                    json.dump({'meta': {'label': args.label, 'created': datetime.datetime.now().isoformat(timespec='seconds'),
+                                        'migration': args.apply, 'repeat': args.repeat},
+                               'results': timings}, handle, indent=2)
+                print(f"\nWrote {args.output}")
+    conn.close()
+
+
+def run(cursor, sql, params=None):
+    cursor.execute(*executable(sql, params))
+    cursor.fetchall()
+
+
+def apply_migration(cursor, path):
+    """Executes a migration file statement by statement (no DELIMITER blocks expected)."""
+    with open(path, encoding='utf-8') as handle:
+        script = "\n".join(line for line in handle if not line.lstrip().startswith('--'))
+    for statement in script.split(';'):
+        if statement.strip():
+            cursor.execute(statement)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+# load_driver.py
+"""
+Concurrent load test: simulated tills place orders through sp_ProcessOrder while back-office
+users load the Reports and Orders pages, for a fixed duration. Prints throughput and
+p50/p95/p99 latency per operation (optionally as JSON) so capacity planning rests on numbers.
+Carts follow the product popularity recorded in ProductSalesSummary, so after generate_data.py
+they match the generated history; stores, employees and customers are sampled from the tables.
+
+Usage (from the repo root, against a scratch database, e.g. one filled by generate_data.py):
+    python Benchmarks/load_driver.py --threads 32 --duration 120 --restock
+    python Benchmarks/load_driver.py --mix checkout=50,order_history=20,top_products=10,monthly_sales=20 --json out.json
+Every worker uses its own connection and a seeded random stream. Orders placed by the run are
+deleted at the end unless --keep-orders is given (stock taken by them is not put back).
+"""
+
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+
+import pymysql
+
+from bench_common import connect, summarize
+from connection_pool import is_retryable_error, backoff_delay
+import database # Imports Streamlit; outside `streamlit run` its caches fall back to in-memory ones
+
+DEFAULT_MIX = "checkout=70,order_history=10,customer_history=5,top_products=5,top_customers=3,monthly_sales=5,reorder=2"
+CART_SIZE_WEIGHTS = {1: 45, 2: 30, 3: 15, 4: 7, 5: 3}
+GUEST_SHARE = 0.35
+
+# The statements the Reports and Orders pages run on a fresh load (see pages/07 and pages/06);
+# the reorder report comes from database.reorder_report_query (op_reorder)
+REPORT_QUERIES = {
+    'top_products': """
+        SELECT p.ProductName, p.Category, s.TotalQuantitySold, s.TotalRevenue
+        FROM ProductSalesSummary s
+        JOIN Products p ON p.ProductID = s.ProductID
+        ORDER BY s.TotalRevenue DESC
+        LIMIT 10;
+    """,
+    'top_customers': """
+        SELECT c.FirstName, c.LastName, c.Email, s.TotalOrders, s.TotalSpent
+        FROM CustomerOrderSummary s
+        JOIN Customers c ON c.CustomerID = s.CustomerID
+        ORDER BY s.TotalSpent DESC
+        LIMIT 10;
+    """,
+    'monthly_sales': """
+        SELECT DATE_FORMAT(SaleDate, '%Y-%m') AS Period, SUM(OrderCount) AS NumberOfOrders, SUM(Revenue) AS Revenue,
+               SUM(PointsEarned) AS PointsEarned, SUM(PointsRedeemed) AS PointsRedeemed
+        FROM DailyStoreSales
+        GROUP BY Period
+        HAVING SUM(OrderCount) > 0
+        ORDER BY Period DESC;
+    """,
+    'order_history': """
+        SELECT o.OrderID, o.OrderTimestamp, CONCAT(c.FirstName, ' ', c.LastName) AS CustomerName, c.CustomerID,
+               CONCAT(e.FirstName, ' ', e.LastName) AS EmployeeName, s.StoreName,
+               o.TotalAmount, o.PointsEarned, o.PointsRedeemed
+        FROM Orders o
+        LEFT JOIN Customers c ON o.CustomerID = c.CustomerID
+        JOIN Employees e ON o.EmployeeID = e.EmployeeID
+        JOIN Stores s ON o.StoreID = s.StoreID
+        WHERE o.OrderTimestamp IS NOT NULL {customer_filter}
+        ORDER BY o.OrderTimestamp DESC, o.OrderID DESC
+        LIMIT 51;
+    """,
+}
+
+
+def parse_mix(text):
+    """"checkout=70,top_products=5" -> {'checkout': 70.0, 'top_products': 5.0}."""
+    mix = {}
+    for part in filter(None, (p.strip() for p in text.split(','))):
+        name, _, weight = part.partition('=')
+        if name not in OPERATIONS:
+            raise SystemExit(f"Unknown operation {name!r}; choose from {sorted(OPERATIONS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class Workload:
+    """Reference data the workers sample from (loaded once, read-only afterwards)."""
+
+    def __init__(self, cursor, customer_sample):
+        cursor.execute("SELECT EmployeeID, StoreID FROM Employees WHERE StoreID IS NOT NULL;")
+        self.staff = [(row['EmployeeID'], row['StoreID']) for row in cursor.fetchall()]
+        cursor.execute("""
+            SELECT p.ProductID, COALESCE(s.TotalQuantitySold, 0) + 1 AS Weight
+            FROM Products p LEFT JOIN ProductSalesSummary s ON s.ProductID = p.ProductID
+            WHERE p.Price > 0;
+        """)
+        products = cursor.fetchall()
+        self.product_ids = [row['ProductID'] for row in products]
+        self.product_cum = list(itertools.accumulate(float(row['Weight']) for row in products))
+        # A random slice of the ID range (an indexed range read, not ORDER BY RAND() over every customer)
+        cursor.execute("SELECT MIN(CustomerID) AS lo, MAX(CustomerID) AS hi FROM Customers;")
+        bounds = cursor.fetchone()
+        self.customer_ids = []
+        if bounds['lo'] is not None:
+            start = random.Random(0).randint(bounds['lo'], max(bounds['lo'], bounds['hi'] - customer_sample))
+            cursor.execute("SELECT CustomerID FROM Customers WHERE CustomerID >= %s ORDER BY CustomerID LIMIT %s;",
+                           (start, customer_sample))
+            self.customer_ids = [row['CustomerID'] for row in cursor.fetchall()]
+        if not self.staff or not self.product_ids:
+            raise SystemExit("Employees/Products are empty; run generate_data.py or load SQL/DummyData.sql first.")
+
+    def cart(self, rng):
+        size = rng.choices(list(CART_SIZE_WEIGHTS), weights=list(CART_SIZE_WEIGHTS.values()))[0]
+        cart = Counter(rng.choices(self.product_ids, cum_weights=self.product_cum, k=size))
+        return ",".join(f"{pid}:{qty}" for pid, qty in cart.items())
+
+    def customer(self, rng):
+        if not self.customer_ids or rng.random() < GUEST_SHARE:
+            return None
+        return rng.choice(self.customer_ids)
+
+
+# --- Operations: each returns 'ok' or 'rejected' (a business-rule SIGNAL), or raises ---
+def op_checkout(cursor, rng, workload, state):
+    employee_id, store_id = rng.choice(workload.staff)
+    cursor.execute("CALL sp_ProcessOrder(%s, %s, %s, %s, 0, @_proc_output);",
+                   (workload.customer(rng), employee_id, store_id, workload.cart(rng)))
+    cursor.execute("SELECT @_proc_output AS OrderID;")
+    state['order_ids'].append(cursor.fetchone()['OrderID'])
+    return 'ok'
+
+def report_op(name, params=None):
+    def run(cursor, rng, workload, state):
+        cursor.execute(REPORT_QUERIES[name], params)
+        cursor.fetchall()
+        return 'ok'
+    return run
+
+def op_reorder(cursor, rng, workload, state):
+    # Built like the Reports page does, so it follows REORDER_CONFIG
+    cursor.execute(*database.reorder_report_query(limit=database.REORDER_CONFIG['report_rows']))
+    cursor.fetchall()
+    return 'ok'
+
+def op_order_history(cursor, rng, workload, state):
+    cursor.execute(REPORT_QUERIES['order_history'].format(customer_filter=""))
+    cursor.fetchall()
+    return 'ok'
+
+def op_customer_history(cursor, rng, workload, state):
+    customer_id = rng.choice(workload.customer_ids) if workload.customer_ids else 0
+    cursor.execute(REPORT_QUERIES['order_history'].format(customer_filter="AND o.CustomerID = %s"), (customer_id,))
+    cursor.fetchall()
+    return 'ok'
+
+OPERATIONS = {
+    'checkout': op_checkout,
+    'order_history': op_order_history,
+    'customer_history': op_customer_history,
+    'top_products': report_op('top_products'),
+    'top_customers': report_op('top_customers'),
+    'monthly_sales': report_op('monthly_sales'),
+    'reorder': op_reorder,
+}
+
+
+def worker(index, args, mix, workload, start_at, stop_at, results, lock):
+    rng = random.Random(args.seed * 10_000 + index)
+    names, weights = list(mix), list(mix.values())
+    latencies = defaultdict(list)
+    outcomes = defaultdict(Counter)
+    state = {'order_ids': []}
+    conn = connect()
+    try:
+        with conn.cursor() as cursor:
+            while time.perf_counter() < stop_at:
+                name = rng.choices(names, weights=weights)[0]
+                start = time.perf_counter()
+                outcome = 'error'
+                for attempt in range(1, args.max_attempts + 1):
+                    try:
+                        outcome = OPERATIONS[name](cursor, rng, workload, state)
+                        break
+                    except pymysql.MySQLError as e:
+                        if is_retryable_error(e) and attempt < args.max_attempts:
+                            outcomes[name]['retries'] += 1
+                            time.sleep(backoff_delay(attempt))
+                            continue
+                        # 1644 = SIGNAL SQLSTATE '45000' (e.g. insufficient stock): a rejected order, not a failure
+                        outcome = 'rejected' if e.args and e.args[0] == 1644 else 'error'
+                        if outcome == 'error' and len(results['errors']) < 20:
+                            results['errors'].append(f"{name}: {e}")
+                        break
+                finished = time.perf_counter()
+                if start < start_at: # Warm-up: run but don't record
+                    continue
+                outcomes[name][outcome] += 1
+                if outcome != 'error':
+                    latencies[name].append((finished - start) * 1000.0)
+    finally:
+        conn.close()
+        with lock:
+            for name, samples in latencies.items():
+                results['latencies'][name].extend(samples)
+            for name, counts in outcomes.items():
+                results['outcomes'][name].update(counts)
+            results['order_ids'].extend(state['order_ids'])
+
+
+def report(results, measured_seconds):
+    rows = {}
+    for name in sorted(set(results['latencies']) | set(results['outcomes'])):
+        counts = results['outcomes'][name]
+        stats = summarize(results['latencies'][name])
+        stats.update({
+            'ok': counts['ok'], 'rejected': counts['rejected'], 'errors': counts['error'], 'retries': counts['retries'],
+            'throughput_per_s': round(counts['ok'] / measured_seconds, 2),
+        })
+        rows[name] = stats
+    total_ok = sum(row['ok'] for row in rows.values())
+    print(f"{'operation':<18}{'ok':>8}{'rejected':>10}{'errors':>8}{'retries':>9}{'ops/s':>10}"
+          f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, row in rows.items():
+        print(f"{name:<18}{row['ok']:>8}{row['rejected']:>10}{row['errors']:>8}{row['retries']:>9}"
+              f"{row['throughput_per_s']:>10.1f}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}")
+    print(f"total: {total_ok} ok operations in {measured_seconds:.1f}s ({total_ok / measured_seconds:,.1f} ops/s)")
+    for message in results['errors'][:5]:
+        print("  error:", message)
+    return {'seconds': round(measured_seconds, 3), 'throughput_per_s': round(total_ok / measured_seconds, 2),
+            'operations': rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16, help="Concurrent workers (tills + report users)")
+    parser.add_argument('--duration', type=float, default=60.0, help="Measured seconds")
+    parser.add_argument('--warmup', type=float, default=5.0, help="Seconds run before measuring")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"Operation weights (default: {DEFAULT_MIX})")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--max-attempts', type=int, default=5, help="Tries per operation on deadlock/lock-wait")
+    parser.add_argument('--customer-sample', type=int, default=10_000, help="Customers the workers pick from")
+    parser.add_argument('--restock', type=int, nargs='?', const=1_000_000_000, default=None,
+                        help="Raise every product's stock to at least this before the run (default 1e9)")
+    parser.add_argument('--keep-orders', action='store_true', help="Don't delete the orders placed by the run")
+    parser.add_argument('--json', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    setup = connect()
+    with setup.cursor() as cursor:
+        if args.restock is not None:
+            cursor.execute("UPDATE Products SET StockQuantity = GREATEST(StockQuantity, %s);", (args.restock,))
+        workload = Workload(cursor, args.customer_sample)
+
+    results = {'latencies': defaultdict(list), 'outcomes': defaultdict(Counter), 'order_ids': [], 'errors': []}
+    lock = threading.Lock()
+    start_at = time.perf_counter() + args.warmup
+    stop_at = start_at + args.duration
+    threads = [threading.Thread(target=worker, args=(i, args, mix, workload, start_at, stop_at, results, lock))
+               for i in range(args.threads)]
+    print(f"{args.threads} workers, {args.warmup:.0f}s warm-up + {args.duration:.0f}s measured, mix: {mix}")
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    summary = report(results, args.duration)
+    summary.update({'threads': args.threads, 'mix': mix, 'seed': args.seed})
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as handle:
+            json.dump(summary, handle, indent=2)
+
+    if not args.keep_orders:
+        with setup.cursor() as cursor:
+            order_ids = results['order_ids']
+            for chunk_start in range(0, len(order_ids), 500):
+                chunk = order_ids[chunk_start:chunk_start + 500]
+                cursor.execute(f"DELETE FROM Orders WHERE OrderID IN ({', '.join(['%s'] * len(chunk))});", chunk)
+    setup.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# stress_hot_product.py
+"""
+Concurrency stress test for stock reservation in sp_ProcessOrderSet (or, with --procedure,
+the loop-based sp_ProcessOrder, which takes the same ordered product locks).
+Fires hundreds of parallel orders at a single "hot" product whose stock is smaller than
+the demand, then checks that stock never goes negative and that exactly the successful
+orders were deducted. Exits with status 1 if anything was oversold.
+
+Usage (from the repo root, against a scratch database with the schema installed):
+    python Benchmarks/stress_hot_product.py --orders 400 --threads 32 --stock 150
+    python Benchmarks/stress_hot_product.py --procedure sp_ProcessOrder
+"""
+
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_common import connect
+from connection_pool import is_retryable_error, backoff_delay
+
+HOT_PRODUCT_NAME = "Stress Hot Product"
+PROCEDURES = ('sp_ProcessOrderSet', 'sp_ProcessOrder')
+COLD_PRODUCT_NAME = "Stress Cold Product"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=400, help="Orders to place in total")
+    parser.add_argument('--threads', type=int, default=32, help="Concurrent tills")
+    parser.add_argument('--stock', type=int, default=150, help="Starting stock of the hot product")
+    parser.add_argument('--max-attempts', type=int, default=8, help="Tries per order on deadlock/lock-wait")
+    parser.add_argument('--procedure', choices=PROCEDURES, default=PROCEDURES[0], help="Checkout procedure to stress")
+    args = parser.parse_args()
+
+    setup = connect()
+    with setup.cursor() as cursor:
+        cursor.execute("SELECT MIN(EmployeeID) AS emp FROM Employees;")
+        employee_id = cursor.fetchone()['emp']
+        cursor.execute("SELECT MIN(StoreID) AS store FROM Stores;")
+        store_id = cursor.fetchone()['store']
+        cursor.execute("INSERT INTO Products (ProductName, Category, Price, StockQuantity) VALUES (%s, 'Benchmark', 3.00, %s);",
+                       (HOT_PRODUCT_NAME, args.stock))
+        hot_id = cursor.lastrowid
+        cursor.execute("INSERT INTO Products (ProductName, Category, Price, StockQuantity) VALUES (%s, 'Benchmark', 1.00, 1000000);",
+                       (COLD_PRODUCT_NAME,))
+        cold_id = cursor.lastrowid
+
+    lock = threading.Lock()
+    results = {'ok': 0, 'sold': 0, 'out_of_stock': 0, 'retries': 0, 'errors': [], 'order_ids': []}
+    local = threading.local()
+
+    def place_order(n):
+        if not hasattr(local, 'conn'):
+            local.conn = connect()
+        qty = 1 + n % 2
+        # Mix the item order so the procedure, not the caller, has to make the lock order deterministic
+        items = [{"ProductID": cold_id, "Quantity": 1}, {"ProductID": hot_id, "Quantity": qty}]
+        if n % 2:
+            items.reverse()
+        for attempt in range(1, args.max_attempts + 1):
+            try:
+                with local.conn.cursor() as cursor:
+                    if args.procedure == 'sp_ProcessOrder':
+                        items_arg = ",".join(f"{item['ProductID']}:{item['Quantity']}" for item in items)
+                    else:
+                        items_arg = json.dumps(items)
+                    cursor.execute(f"CALL {args.procedure}(NULL, %s, %s, %s, 0, @_proc_output);",
+                                   (employee_id, store_id, items_arg))
+                    cursor.execute("SELECT @_proc_output AS OrderID;")
+                    order_id = cursor.fetchone()['OrderID']
+                with lock:
+                    results['ok'] += 1
+                    results['sold'] += qty
+                    results['order_ids'].append(order_id)
+                return
+            except Exception as e:
+                if is_retryable_error(e) and attempt < args.max_attempts:
+                    with lock:
+                        results['retries'] += 1
+                    time.sleep(backoff_delay(attempt))
+                    continue
+                with lock:
+                    if 'Insufficient stock' in str(e):
+                        results['out_of_stock'] += 1
+                    else:
+                        results['errors'].append(str(e))
+                return
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(place_order, range(args.orders)))
+    elapsed = time.perf_counter() - start
+
+    oversold = False
+    with setup.cursor() as cursor:
+        cursor.execute("SELECT StockQuantity FROM Products WHERE ProductID = %s;", (hot_id,))
+        final_stock = cursor.fetchone()['StockQuantity']
+        cursor.execute("SELECT COALESCE(SUM(Quantity), 0) AS qty FROM OrderItems WHERE ProductID = %s;", (hot_id,))
+        recorded_qty = int(cursor.fetchone()['qty'])
+
+        print(f"orders placed: {results['ok']}  rejected (no stock): {results['out_of_stock']}  "
+              f"other errors: {len(results['errors'])}  retries: {results['retries']}  "
+              f"elapsed: {elapsed:.2f}s ({args.orders / elapsed:.1f} orders/s)")
+        print(f"stock: start={args.stock} final={final_stock} sold={results['sold']} recorded in OrderItems={recorded_qty}")
+        for message in results['errors'][:5]:
+            print("  error:", message)
+
+        if final_stock < 0 or recorded_qty != results['sold'] or final_stock != args.stock - recorded_qty:
+            oversold = True
+            print("FAIL: stock and recorded sales disagree (oversold or lost update).")
+        elif results['errors']:
+            oversold = True
+            print("FAIL: unexpected errors.")
+        else:
+            print("PASS: nothing oversold.")
+
+        # Clean up everything this run created
+        order_ids = results['order_ids']
+        for chunk_start in range(0, len(order_ids), 500):
+            chunk = order_ids[chunk_start:chunk_start + 500]
+            cursor.execute(f"DELETE FROM Orders WHERE OrderID IN ({', '.join(['%s'] * len(chunk))});", chunk)
+        cursor.execute("DELETE FROM Products WHERE ProductID IN (%s, %s);", (hot_id, cold_id))
+    setup.close()
+    raise SystemExit(1 if oversold else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -28,10 +28,11 @@ INSERT INTO Products (ProductName, Category, Price, StockQuantity) VALUES
 ('Shop Mug', 'Merchandise', 12.00, 40);
 
 -- 5. Promotions
-INSERT INTO Promotions (PromotionName, Description, DiscountType, DiscountValue, StartDate, EndDate, RequiredPoints) VALUES
-('Spring Discount', '10% off entire order in Spring', 'PERCENT', 10.00, '2025-03-01', '2025-05-31', NULL),
-('Loyal Sip Reward', '$2 off when redeeming 200 points', 'FIXED', 2.00, NULL, NULL, 200),
-('Muffin Madness', '$0.50 off any Muffin', 'FIXED', 0.50, '2025-05-01', '2025-05-15', NULL);
+-- ScopeProductID/ScopeCategory come from migration V006 (Muffin Madness applies to Muffins only)
+INSERT INTO Promotions (PromotionName, Description, DiscountType, DiscountValue, StartDate, EndDate, RequiredPoints, ScopeProductID, ScopeCategory) VALUES
+('Spring Discount', '10% off entire order in Spring', 'PERCENT', 10.00, '2025-03-01', '2025-05-31', NULL, NULL, NULL),
+('Loyal Sip Reward', '$2 off when redeeming 200 points', 'FIXED', 2.00, NULL, NULL, 200, NULL, NULL),
+('Muffin Madness', '$0.50 off any Muffin', 'FIXED', 0.50, '2025-05-01', '2025-05-15', NULL, 6, NULL);
 
 -- 6. Manually Inserted Past Orders & Items (for testing views)
 -- Assumes first Customer is ID 1, second is ID 2, etc.
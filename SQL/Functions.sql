@@ -3,12 +3,14 @@ DELIMITER $$
 
 -- Function 1: Get Customer Loyalty Points
 -- Takes a CustomerID and returns their current points balance.
+-- The balance includes deltas still pending in LoyaltyLedger (see SQL/LoyaltyLedger.sql).
 CREATE FUNCTION fn_GetCustomerLoyaltyPoints (p_CustomerID INT)
 RETURNS INT
 DETERMINISTIC -- Indicates the function gives the same result for the same input
 READS SQL DATA -- Indicates the function only reads data, doesn't modify it
 BEGIN
     DECLARE points INT;
+    DECLARE pending INT;
 
     -- Select the points for the given customer.
     -- Use COALESCE to return 0 if the customer is not found or points are NULL.
@@ -16,8 +18,13 @@ BEGIN
     FROM Customers
     WHERE CustomerID = p_CustomerID;
 
+    -- Add the point changes not yet compacted into Customers.LoyaltyPoints
+    SELECT COALESCE(SUM(PointsDelta), 0) INTO pending
+    FROM LoyaltyLedger
+    WHERE CustomerID = p_CustomerID;
+
     -- Return 0 if the customer wasn't found (points will be NULL from the SELECT)
-    RETURN COALESCE(points, 0);
+    RETURN COALESCE(points, 0) + pending;
 END$$
 
 
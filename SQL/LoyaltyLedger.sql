@@ -0,0 +1,112 @@
+-- //////////////// Loyalty Ledger ///////////////
+-- Optional write-behind mode for loyalty points. With LedgerMode on, checkout appends the
+-- order's point delta to the insert-only LoyaltyLedger instead of updating the customer's row,
+-- so orders for the same customer no longer queue on one Customers row lock.
+-- sp_CompactLoyaltyLedger (run by evt_CompactLoyaltyLedger, or on demand) folds the pending
+-- deltas into Customers.LoyaltyPoints; fn_GetCustomerLoyaltyPoints returns balance + pending.
+-- Migration V010 routes the order's CustomerOrderSummary change through the ledger as well.
+-- Run this script after Coffee_Shop_DB.sql, Functions.sql and StoredProcedures.sql.
+
+-- Table: LoyaltySettings (exactly one row)
+CREATE TABLE LoyaltySettings (
+    SettingID TINYINT PRIMARY KEY DEFAULT 1 CHECK (SettingID = 1),
+    LedgerMode BOOLEAN NOT NULL DEFAULT FALSE -- FALSE = update Customers.LoyaltyPoints directly
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT INTO LoyaltySettings (SettingID, LedgerMode) VALUES (1, FALSE);
+
+-- Table: LoyaltyLedger (pending point deltas, deleted once compacted)
+CREATE TABLE LoyaltyLedger (
+    EntryID BIGINT AUTO_INCREMENT PRIMARY KEY,
+    CustomerID INT NOT NULL,
+    OrderID INT NULL,                 -- Order that earned/redeemed the points (informational)
+    PointsDelta INT NOT NULL,         -- Earned minus redeemed
+    CreatedAt DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_LoyaltyLedger_Customer (CustomerID, PointsDelta), -- Covers the pending-balance SUM
+    FOREIGN KEY (CustomerID) REFERENCES Customers(CustomerID) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+
+DELIMITER $$
+
+-- Posts one order's point change: a ledger row in ledger mode, else the direct UPDATE
+-- sp_ProcessOrder and sp_CheckoutOrder always did. Runs inside the caller's transaction.
+CREATE PROCEDURE sp_PostLoyaltyPoints (
+    IN p_CustomerID INT,
+    IN p_OrderID INT,
+    IN p_PointsDelta INT
+)
+BEGIN
+    IF p_CustomerID IS NOT NULL AND p_PointsDelta <> 0 THEN
+        IF (SELECT LedgerMode FROM LoyaltySettings WHERE SettingID = 1) THEN
+            INSERT INTO LoyaltyLedger (CustomerID, OrderID, PointsDelta)
+            VALUES (p_CustomerID, p_OrderID, p_PointsDelta);
+        ELSE
+            UPDATE Customers SET LoyaltyPoints = LoyaltyPoints + p_PointsDelta WHERE CustomerID = p_CustomerID;
+        END IF;
+    END IF;
+END$$
+
+-- Folds every pending delta into Customers.LoyaltyPoints in one transaction and removes it
+-- from the ledger. The FOR UPDATE read waits for checkouts that are still inserting entries in
+-- the range, and its gap locks hold back new ones until the commit, so every entry is either
+-- folded and deleted here or left for the next run - never counted twice or lost.
+-- p_EntriesCompacted returns the number of ledger entries folded in.
+CREATE PROCEDURE sp_CompactLoyaltyLedger (
+    OUT p_EntriesCompacted INT
+)
+BEGIN
+    DECLARE v_MaxEntryID BIGINT;
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        DROP TEMPORARY TABLE IF EXISTS tmp_LoyaltyCompaction;
+        RESIGNAL;
+    END;
+
+    SET p_EntriesCompacted = 0;
+    SELECT MAX(EntryID) INTO v_MaxEntryID FROM LoyaltyLedger;
+
+    IF v_MaxEntryID IS NOT NULL THEN
+        DROP TEMPORARY TABLE IF EXISTS tmp_LoyaltyCompaction;
+        CREATE TEMPORARY TABLE tmp_LoyaltyCompaction (
+            CustomerID INT PRIMARY KEY,
+            PointsDelta INT NOT NULL,
+            EntryCount INT NOT NULL
+        ) ENGINE=InnoDB;
+
+        START TRANSACTION;
+
+        INSERT INTO tmp_LoyaltyCompaction (CustomerID, PointsDelta, EntryCount)
+        SELECT CustomerID, SUM(PointsDelta), COUNT(*)
+        FROM LoyaltyLedger
+        WHERE EntryID <= v_MaxEntryID
+        GROUP BY CustomerID
+        FOR UPDATE;
+
+        UPDATE Customers c
+        JOIN tmp_LoyaltyCompaction t ON t.CustomerID = c.CustomerID
+        SET c.LoyaltyPoints = COALESCE(c.LoyaltyPoints, 0) + t.PointsDelta;
+
+        DELETE FROM LoyaltyLedger WHERE EntryID <= v_MaxEntryID;
+
+        SELECT COALESCE(SUM(EntryCount), 0) INTO p_EntriesCompacted FROM tmp_LoyaltyCompaction;
+
+        COMMIT;
+
+        DROP TEMPORARY TABLE tmp_LoyaltyCompaction;
+    END IF;
+END$$
+
+-- Periodic compaction (needs the event scheduler: SET GLOBAL event_scheduler = ON;)
+CREATE EVENT evt_CompactLoyaltyLedger
+ON SCHEDULE EVERY 5 MINUTE
+DO
+BEGIN
+    IF EXISTS (SELECT 1 FROM LoyaltyLedger) THEN
+        CALL sp_CompactLoyaltyLedger(@_loyalty_entries_compacted);
+    END IF;
+END$$
+
+DELIMITER ;
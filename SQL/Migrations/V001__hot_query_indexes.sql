@@ -0,0 +1,46 @@
+-- //////////////// V001: Hot Query Indexes ///////////////
+-- Composite / covering indexes for the queries the pages run on every load. Each one is derived
+-- from its query's WHERE / ORDER BY columns (equality columns, then range/sort columns), the same
+-- rule Benchmarks/index_advisor.py uses for its candidates. No before/after timings have been
+-- recorded yet; `index_advisor.py --time --apply` on a seeded database produces them.
+-- Run once after Coffee_Shop_DB.sql; SchemaMigrations records that it was applied.
+-- Note: the delete guards (COUNT(*) ... WHERE ProductID / PromotionID / EmployeeID / StoreID = ?)
+-- already use the indexes InnoDB creates for those foreign keys, so they need nothing new.
+
+-- Orders page: ORDER BY o.OrderTimestamp DESC LIMIT 50 reads the newest 50 entries backwards
+-- instead of sorting every order (OrderID makes the order total for keyset paging)
+CREATE INDEX idx_Orders_Timestamp ON Orders (OrderTimestamp, OrderID);
+
+-- Reports page: WHERE StockQuantity <= ? ORDER BY StockQuantity (covering; dropped in V011 with that query)
+CREATE INDEX idx_Products_Stock ON Products (StockQuantity, ProductName, Category);
+
+-- Products page: ORDER BY Category, ProductName
+CREATE INDEX idx_Products_Category_Name ON Products (Category, ProductName);
+
+-- Orders page product picker: ORDER BY ProductName (covering)
+CREATE INDEX idx_Products_Name ON Products (ProductName, Price, StockQuantity);
+
+-- Customers and Orders pages: ORDER BY LastName, FirstName (covering for the picker list)
+CREATE INDEX idx_Customers_Name ON Customers (LastName, FirstName, Email);
+
+-- Employees and Orders pages: ORDER BY LastName, FirstName
+CREATE INDEX idx_Employees_Name ON Employees (LastName, FirstName);
+
+-- Store pickers on every page: ORDER BY StoreName
+CREATE INDEX idx_Stores_Name ON Stores (StoreName);
+
+-- Active promotions: RequiredPoints IS NULL AND StartDate/EndDate around CURDATE()
+CREATE INDEX idx_Promotions_Active ON Promotions (RequiredPoints, EndDate, StartDate);
+
+-- Promotions page: ORDER BY EndDate DESC, StartDate DESC
+CREATE INDEX idx_Promotions_Dates ON Promotions (EndDate, StartDate);
+
+
+-- //////////////// Migration Bookkeeping ///////////////
+CREATE TABLE IF NOT EXISTS SchemaMigrations (
+    Version VARCHAR(20) PRIMARY KEY,
+    Description VARCHAR(255) NOT NULL,
+    AppliedAt DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT INTO SchemaMigrations (Version, Description) VALUES ('V001', 'Hot query indexes');
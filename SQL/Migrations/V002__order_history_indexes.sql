@@ -0,0 +1,13 @@
+-- //////////////// V002: Order History Indexes ///////////////
+-- Keyset pagination of the order history (database.get_order_history_page) seeks on
+-- (OrderTimestamp, OrderID) after an equality filter. These put each filter column in front of
+-- the sort key, so a filtered page is still one index range read of page_size + 1 rows.
+-- The unfiltered history uses idx_Orders_Timestamp from V001.
+
+CREATE INDEX idx_Orders_Store_Timestamp ON Orders (StoreID, OrderTimestamp, OrderID);
+
+CREATE INDEX idx_Orders_Employee_Timestamp ON Orders (EmployeeID, OrderTimestamp, OrderID);
+
+CREATE INDEX idx_Orders_Customer_Timestamp ON Orders (CustomerID, OrderTimestamp, OrderID);
+
+INSERT INTO SchemaMigrations (Version, Description) VALUES ('V002', 'Order history indexes');
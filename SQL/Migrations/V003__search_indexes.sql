@@ -0,0 +1,13 @@
+-- //////////////// V003: Typeahead Search Indexes ///////////////
+-- Backs database.search_customers / search_products.
+-- Prefix lookups (LIKE 'term%') use B-tree indexes: Customers.LastName (idx_Customers_Name, V001),
+-- FirstName (below), Email and PhoneNumber (UNIQUE), Products.ProductName and Category (V001).
+-- Substring lookups use ngram FULLTEXT indexes, so "ail" finds "...@gmail.com" without a table scan.
+
+CREATE INDEX idx_Customers_FirstName ON Customers (FirstName, LastName);
+
+CREATE FULLTEXT INDEX ft_Customers_Search ON Customers (FirstName, LastName, Email, PhoneNumber) WITH PARSER ngram;
+
+CREATE FULLTEXT INDEX ft_Products_Search ON Products (ProductName, Category) WITH PARSER ngram;
+
+INSERT INTO SchemaMigrations (Version, Description) VALUES ('V003', 'Typeahead search indexes');
@@ -0,0 +1,25 @@
+-- //////////////// V004: Historical Import Stock Guard ///////////////
+-- Historical order items loaded by App/bulk_import.py must not decrement today's stock.
+-- The importer sets @_historical_import on its session; trg_UpdateStockAfterOrder skips the
+-- stock update while it is set (same definition as SQL/Trigger.sql).
+
+DROP TRIGGER IF EXISTS trg_UpdateStockAfterOrder;
+
+DELIMITER $$
+
+CREATE TRIGGER trg_UpdateStockAfterOrder
+AFTER INSERT ON OrderItems
+FOR EACH ROW
+BEGIN
+    -- Skipped when sp_ProcessOrderSet already reserved (decremented) the stock for this order
+    -- and for historical order items loaded by bulk_import.py (@_historical_import is set)
+    IF @_historical_import IS NULL AND (@_stock_reserved_order IS NULL OR @_stock_reserved_order <> NEW.OrderID) THEN
+        UPDATE Products
+        SET StockQuantity = StockQuantity - NEW.Quantity
+        WHERE ProductID = NEW.ProductID;
+    END IF;
+END$$
+
+DELIMITER ;
+
+INSERT INTO SchemaMigrations (Version, Description) VALUES ('V004', 'Historical import stock guard');
@@ -0,0 +1,309 @@
+-- //////////////// V005: Order Archive (hot/cold split) ///////////////
+-- Orders, OrderItems and AppliedPromotions keep only recent history. sp_ArchiveOrders moves
+-- closed months, one month per transaction, into compressed *Archive tables with the same
+-- columns and keys. OrderArchiveState.ArchivedBefore records the boundary: every archived order is
+-- older than it, so order-history reads only touch the archive for date ranges that reach
+-- below it (database.order_history_query). vw_AllOrders / vw_AllOrderItems are the union read path
+-- for full history; the sales views, sp_RebuildSalesSummaries and sp_RefreshDailySales now use them.
+-- Partitioning by month was not used: MySQL does not allow foreign keys on partitioned tables.
+-- Run after SummaryTables.sql and SalesRollup.sql (this redefines some of their objects).
+
+-- Table: OrderArchiveState (exactly one row)
+CREATE TABLE OrderArchiveState (
+    StateID TINYINT PRIMARY KEY DEFAULT 1 CHECK (StateID = 1),
+    ArchivedBefore DATE NULL -- Orders before this date have been moved to OrdersArchive (NULL = none)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT INTO OrderArchiveState (StateID, ArchivedBefore) VALUES (1, NULL);
+
+-- Archive tables: same columns as the hot tables, compressed, with the order-history indexes
+-- of V001/V002. The Customers/Employees/Stores/Products/Promotions foreign keys keep the same
+-- actions, so archived orders still block deleting the rows they reference.
+CREATE TABLE OrdersArchive (
+    OrderID INT PRIMARY KEY,
+    CustomerID INT NULL,
+    EmployeeID INT NOT NULL,
+    StoreID INT NOT NULL,
+    OrderTimestamp DATETIME,
+    TotalAmount DECIMAL(10, 2) DEFAULT 0.00,
+    PointsEarned INT DEFAULT 0,
+    PointsRedeemed INT DEFAULT 0,
+    INDEX idx_OrdersArchive_Timestamp (OrderTimestamp, OrderID),
+    INDEX idx_OrdersArchive_Store_Timestamp (StoreID, OrderTimestamp, OrderID),
+    INDEX idx_OrdersArchive_Employee_Timestamp (EmployeeID, OrderTimestamp, OrderID),
+    INDEX idx_OrdersArchive_Customer_Timestamp (CustomerID, OrderTimestamp, OrderID),
+    FOREIGN KEY (CustomerID) REFERENCES Customers(CustomerID) ON DELETE SET NULL ON UPDATE CASCADE,
+    FOREIGN KEY (EmployeeID) REFERENCES Employees(EmployeeID) ON DELETE RESTRICT ON UPDATE CASCADE,
+    FOREIGN KEY (StoreID) REFERENCES Stores(StoreID) ON DELETE RESTRICT ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+CREATE TABLE OrderItemsArchive (
+    OrderItemID INT PRIMARY KEY,
+    OrderID INT NOT NULL,
+    ProductID INT NOT NULL,
+    Quantity INT NOT NULL,
+    PriceAtTimeOfOrder DECIMAL(10, 2) NOT NULL,
+    FOREIGN KEY (OrderID) REFERENCES OrdersArchive(OrderID) ON DELETE CASCADE ON UPDATE CASCADE,
+    FOREIGN KEY (ProductID) REFERENCES Products(ProductID) ON DELETE RESTRICT ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+CREATE TABLE AppliedPromotionsArchive (
+    AppliedPromotionID INT PRIMARY KEY,
+    OrderID INT NOT NULL,
+    PromotionID INT NOT NULL,
+    DiscountAmountApplied DECIMAL(10, 2) NOT NULL,
+    FOREIGN KEY (OrderID) REFERENCES OrdersArchive(OrderID) ON DELETE CASCADE ON UPDATE CASCADE,
+    FOREIGN KEY (PromotionID) REFERENCES Promotions(PromotionID) ON DELETE RESTRICT ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+
+-- //////////////// Union Read Path ///////////////
+CREATE VIEW vw_AllOrders AS
+SELECT OrderID, CustomerID, EmployeeID, StoreID, OrderTimestamp, TotalAmount, PointsEarned, PointsRedeemed FROM Orders
+UNION ALL
+SELECT OrderID, CustomerID, EmployeeID, StoreID, OrderTimestamp, TotalAmount, PointsEarned, PointsRedeemed FROM OrdersArchive;
+
+CREATE VIEW vw_AllOrderItems AS
+SELECT OrderItemID, OrderID, ProductID, Quantity, PriceAtTimeOfOrder FROM OrderItems
+UNION ALL
+SELECT OrderItemID, OrderID, ProductID, Quantity, PriceAtTimeOfOrder FROM OrderItemsArchive;
+
+-- Same definitions as SQL/Views.sql, over the full (hot + archived) history
+CREATE OR REPLACE VIEW vw_CustomerOrderSummary AS
+SELECT
+    c.CustomerID,
+    c.FirstName,
+    c.LastName,
+    c.Email,
+    COUNT(o.OrderID) AS TotalOrders,
+    COALESCE(SUM(o.TotalAmount), 0) AS TotalSpent
+FROM
+    Customers c
+    LEFT JOIN vw_AllOrders o ON c.CustomerID = o.CustomerID
+GROUP BY
+    c.CustomerID, c.FirstName, c.LastName, c.Email;
+
+CREATE OR REPLACE VIEW vw_ProductSalesPerformance AS
+SELECT
+    p.ProductID,
+    p.ProductName,
+    p.Category,
+    COALESCE(SUM(oi.Quantity), 0) AS TotalQuantitySold,
+    COALESCE(SUM(oi.Quantity * oi.PriceAtTimeOfOrder), 0) AS TotalRevenue,
+    AVG(oi.PriceAtTimeOfOrder) AS AverageSellingPrice
+FROM
+    Products p
+    LEFT JOIN vw_AllOrderItems oi ON p.ProductID = oi.ProductID
+GROUP BY
+    p.ProductID, p.ProductName, p.Category;
+
+
+-- //////////////// Summary Triggers: Skip Archival Deletes ///////////////
+-- Archived orders still count in the summaries and the rollup, so deletes made by
+-- sp_ArchiveOrders (@_archiving_orders is set) must not subtract them.
+-- Same definitions as SQL/SummaryTables.sql and SQL/SalesRollup.sql.
+DROP TRIGGER IF EXISTS trg_SalesSummaryBeforeOrderDelete;
+DROP TRIGGER IF EXISTS trg_DailySalesAfterOrderDelete;
+
+DELIMITER $$
+
+CREATE TRIGGER trg_SalesSummaryBeforeOrderDelete
+BEFORE DELETE ON Orders
+FOR EACH ROW
+BEGIN
+    IF @_archiving_orders IS NULL THEN
+        -- The cascaded OrderItems delete won't fire trg_ProductSummaryAfterItemDelete, so subtract here
+        UPDATE ProductSalesSummary s
+        JOIN (
+            SELECT ProductID,
+                   SUM(Quantity) AS Qty,
+                   SUM(Quantity * PriceAtTimeOfOrder) AS Revenue,
+                   COUNT(*) AS LineCount,
+                   SUM(PriceAtTimeOfOrder) AS Prices
+            FROM OrderItems
+            WHERE OrderID = OLD.OrderID
+            GROUP BY ProductID
+        ) AS removed ON removed.ProductID = s.ProductID
+        SET s.TotalQuantitySold = s.TotalQuantitySold - removed.Qty,
+            s.TotalRevenue = s.TotalRevenue - removed.Revenue,
+            s.SaleLineCount = s.SaleLineCount - removed.LineCount,
+            s.PriceSum = s.PriceSum - removed.Prices;
+
+        IF OLD.CustomerID IS NOT NULL THEN
+            UPDATE CustomerOrderSummary
+            SET TotalOrders = TotalOrders - 1,
+                TotalSpent = TotalSpent - COALESCE(OLD.TotalAmount, 0)
+            WHERE CustomerID = OLD.CustomerID;
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER trg_DailySalesAfterOrderDelete
+AFTER DELETE ON Orders
+FOR EACH ROW
+BEGIN
+    IF @_archiving_orders IS NULL THEN
+        UPDATE DailyStoreSales
+        SET OrderCount = OrderCount - 1,
+            Revenue = Revenue - COALESCE(OLD.TotalAmount, 0),
+            PointsEarned = PointsEarned - COALESCE(OLD.PointsEarned, 0),
+            PointsRedeemed = PointsRedeemed - COALESCE(OLD.PointsRedeemed, 0)
+        WHERE SaleDate = DATE(OLD.OrderTimestamp) AND StoreID = OLD.StoreID;
+    END IF;
+END$$
+
+
+-- //////////////// Rebuild Procedures Over Full History ///////////////
+-- Same as SQL/SummaryTables.sql and SQL/SalesRollup.sql, reading vw_AllOrders / vw_AllOrderItems
+DROP PROCEDURE IF EXISTS sp_RebuildSalesSummaries$$
+CREATE PROCEDURE sp_RebuildSalesSummaries ()
+BEGIN
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+
+    DELETE FROM ProductSalesSummary;
+    INSERT INTO ProductSalesSummary (ProductID, TotalQuantitySold, TotalRevenue, SaleLineCount, PriceSum)
+    SELECT p.ProductID,
+           COALESCE(SUM(oi.Quantity), 0),
+           COALESCE(SUM(oi.Quantity * oi.PriceAtTimeOfOrder), 0),
+           COUNT(oi.OrderItemID),
+           COALESCE(SUM(oi.PriceAtTimeOfOrder), 0)
+    FROM Products p
+    LEFT JOIN vw_AllOrderItems oi ON p.ProductID = oi.ProductID
+    GROUP BY p.ProductID;
+
+    DELETE FROM CustomerOrderSummary;
+    INSERT INTO CustomerOrderSummary (CustomerID, TotalOrders, TotalSpent)
+    SELECT c.CustomerID, COUNT(o.OrderID), COALESCE(SUM(o.TotalAmount), 0)
+    FROM Customers c
+    LEFT JOIN vw_AllOrders o ON c.CustomerID = o.CustomerID
+    GROUP BY c.CustomerID;
+
+    COMMIT;
+END$$
+
+DROP PROCEDURE IF EXISTS sp_RefreshDailySales$$
+CREATE PROCEDURE sp_RefreshDailySales (
+    IN p_FromDate DATE,
+    IN p_ToDate DATE
+)
+BEGIN
+    DECLARE v_From DATETIME;
+    DECLARE v_To DATETIME;
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    IF p_FromDate IS NOT NULL AND p_ToDate IS NOT NULL AND p_ToDate < p_FromDate THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'End date cannot be before start date.';
+    END IF;
+
+    -- Half-open timestamp range so the OrderTimestamp indexes of both tables can be used
+    SET v_From = COALESCE(p_FromDate, '1000-01-01');
+    SET v_To = COALESCE(p_ToDate, '9999-12-30') + INTERVAL 1 DAY;
+
+    START TRANSACTION;
+
+    DELETE FROM DailyStoreSales
+    WHERE SaleDate >= DATE(v_From) AND SaleDate < DATE(v_To);
+
+    INSERT INTO DailyStoreSales (SaleDate, StoreID, OrderCount, Revenue, PointsEarned, PointsRedeemed)
+    SELECT DATE(OrderTimestamp), StoreID, COUNT(*),
+           COALESCE(SUM(TotalAmount), 0), COALESCE(SUM(PointsEarned), 0), COALESCE(SUM(PointsRedeemed), 0)
+    FROM vw_AllOrders
+    WHERE OrderTimestamp >= v_From AND OrderTimestamp < v_To
+    GROUP BY DATE(OrderTimestamp), StoreID;
+
+    COMMIT;
+END$$
+
+
+-- //////////////// Archival Job ///////////////
+-- Moves every order from a closed month before p_ArchiveBefore (rounded down to the first of its
+-- month, and never the current month) into the archive tables. Each month is copied and deleted
+-- in its own transaction, so locks on the hot tables stay short and an interrupted run resumes
+-- where it stopped. Summaries and the daily rollup are unchanged (archived orders still count).
+-- p_OrdersArchived returns the number of orders moved.
+CREATE PROCEDURE sp_ArchiveOrders (
+    IN p_ArchiveBefore DATE,
+    OUT p_OrdersArchived INT
+)
+BEGIN
+    DECLARE v_Cutoff DATE;
+    DECLARE v_Month DATE;
+    DECLARE v_NextMonth DATE;
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        SET @_archiving_orders = NULL;
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    IF p_ArchiveBefore IS NULL THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Archive cutoff date is required.';
+    END IF;
+
+    SET p_OrdersArchived = 0;
+    SET v_Cutoff = LEAST(p_ArchiveBefore - INTERVAL (DAYOFMONTH(p_ArchiveBefore) - 1) DAY,
+                         CURDATE() - INTERVAL (DAYOFMONTH(CURDATE()) - 1) DAY);
+
+    SELECT MIN(OrderTimestamp) INTO v_Month FROM Orders WHERE OrderTimestamp < v_Cutoff;
+    SET v_Month = DATE(v_Month) - INTERVAL (DAYOFMONTH(v_Month) - 1) DAY;
+
+    WHILE v_Month IS NOT NULL AND v_Month < v_Cutoff DO
+        SET v_NextMonth = v_Month + INTERVAL 1 MONTH;
+
+        START TRANSACTION;
+        SET @_archiving_orders = 1;
+
+        -- Lock the month's orders first so a concurrent edit can't slip between copy and delete
+        SELECT COUNT(*) INTO @_archived_month_orders
+        FROM Orders
+        WHERE OrderTimestamp >= v_Month AND OrderTimestamp < v_NextMonth
+        FOR UPDATE;
+
+        INSERT INTO OrdersArchive (OrderID, CustomerID, EmployeeID, StoreID, OrderTimestamp, TotalAmount, PointsEarned, PointsRedeemed)
+        SELECT OrderID, CustomerID, EmployeeID, StoreID, OrderTimestamp, TotalAmount, PointsEarned, PointsRedeemed
+        FROM Orders
+        WHERE OrderTimestamp >= v_Month AND OrderTimestamp < v_NextMonth;
+
+        INSERT INTO OrderItemsArchive (OrderItemID, OrderID, ProductID, Quantity, PriceAtTimeOfOrder)
+        SELECT oi.OrderItemID, oi.OrderID, oi.ProductID, oi.Quantity, oi.PriceAtTimeOfOrder
+        FROM Orders o
+        JOIN OrderItems oi ON oi.OrderID = o.OrderID
+        WHERE o.OrderTimestamp >= v_Month AND o.OrderTimestamp < v_NextMonth;
+
+        INSERT INTO AppliedPromotionsArchive (AppliedPromotionID, OrderID, PromotionID, DiscountAmountApplied)
+        SELECT ap.AppliedPromotionID, ap.OrderID, ap.PromotionID, ap.DiscountAmountApplied
+        FROM Orders o
+        JOIN AppliedPromotions ap ON ap.OrderID = o.OrderID
+        WHERE o.OrderTimestamp >= v_Month AND o.OrderTimestamp < v_NextMonth;
+
+        -- Items and applied promotions follow through ON DELETE CASCADE
+        DELETE FROM Orders
+        WHERE OrderTimestamp >= v_Month AND OrderTimestamp < v_NextMonth;
+
+        UPDATE OrderArchiveState
+        SET ArchivedBefore = GREATEST(COALESCE(ArchivedBefore, v_NextMonth), v_NextMonth)
+        WHERE StateID = 1;
+
+        SET @_archiving_orders = NULL;
+        COMMIT;
+
+        SET p_OrdersArchived = p_OrdersArchived + @_archived_month_orders;
+        SET v_Month = v_NextMonth;
+    END WHILE;
+END$$
+
+DELIMITER ;
+
+INSERT INTO SchemaMigrations (Version, Description) VALUES ('V005', 'Order archive (hot/cold split)');
@@ -0,0 +1,123 @@
+-- //////////////// V007: Reference Data Versions ///////////////
+-- One change counter per reference table (Stores, Employees, Products, Promotions). Triggers
+-- bump it on every insert, update and delete, whoever makes the change (changes that foreign keys
+-- cascade from Stores to Employees bump Employees from the Stores triggers), and the app polls
+-- the counters once per rerun (database.get_reference_data) to decide which of its in-process
+-- copies to reload. Products updates only count when the name, category or price change:
+-- stock moves with every order and is read separately, and skipping it also keeps checkouts
+-- from queuing on the Products counter row.
+-- Run after Coffee_Shop_DB.sql.
+
+-- Table: ReferenceVersions (one row per reference table)
+CREATE TABLE ReferenceVersions (
+    TableName VARCHAR(64) PRIMARY KEY,
+    Version BIGINT UNSIGNED NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT INTO ReferenceVersions (TableName, Version) VALUES
+('Stores', 0), ('Employees', 0), ('Products', 0), ('Promotions', 0);
+
+DELIMITER $$
+
+-- Stores
+CREATE TRIGGER trg_StoresVersionAfterInsert
+AFTER INSERT ON Stores
+FOR EACH ROW
+BEGIN
+    UPDATE ReferenceVersions SET Version = Version + 1 WHERE TableName = 'Stores';
+END$$
+
+-- A changed StoreID cascades to Employees.StoreID (ON UPDATE CASCADE), and a deleted store sets it
+-- to NULL (ON DELETE SET NULL). Foreign-key actions fire no triggers, so Employees is bumped here.
+CREATE TRIGGER trg_StoresVersionAfterUpdate
+AFTER UPDATE ON Stores
+FOR EACH ROW
+BEGIN
+    IF OLD.StoreID <> NEW.StoreID THEN
+        UPDATE ReferenceVersions SET Version = Version + 1 WHERE TableName IN ('Employees', 'Stores');
+    ELSE
+        UPDATE ReferenceVersions SET Version = Version + 1 WHERE TableName = 'Stores';
+    END IF;
+END$$
+
+CREATE TRIGGER trg_StoresVersionAfterDelete
+AFTER DELETE ON Stores
+FOR EACH ROW
+BEGIN
+    UPDATE ReferenceVersions SET Version = Version + 1 WHERE TableName IN ('Employees', 'Stores');
+END$$
+
+
+-- Employees
+CREATE TRIGGER trg_EmployeesVersionAfterInsert
+AFTER INSERT ON Employees
+FOR EACH ROW
+BEGIN
+    UPDATE ReferenceVersions SET Version = Version + 1 WHERE TableName = 'Employees';
+END$$
+
+CREATE TRIGGER trg_EmployeesVersionAfterUpdate
+AFTER UPDATE ON Employees
+FOR EACH ROW
+BEGIN
+    UPDATE ReferenceVersions SET Version = Version + 1 WHERE TableName = 'Employees';
+END$$
+
+CREATE TRIGGER trg_EmployeesVersionAfterDelete
+AFTER DELETE ON Employees
+FOR EACH ROW
+BEGIN
+    UPDATE ReferenceVersions SET Version = Version + 1 WHERE TableName = 'Employees';
+END$$
+
+
+-- Products
+CREATE TRIGGER trg_ProductsVersionAfterInsert
+AFTER INSERT ON Products
+FOR EACH ROW
+BEGIN
+    UPDATE ReferenceVersions SET Version = Version + 1 WHERE TableName = 'Products';
+END$$
+
+CREATE TRIGGER trg_ProductsVersionAfterUpdate
+AFTER UPDATE ON Products
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.ProductName <=> NEW.ProductName) OR NOT (OLD.Category <=> NEW.Category) OR NOT (OLD.Price <=> NEW.Price) OR OLD.ProductID <> NEW.ProductID THEN
+        UPDATE ReferenceVersions SET Version = Version + 1 WHERE TableName = 'Products';
+    END IF;
+END$$
+
+CREATE TRIGGER trg_ProductsVersionAfterDelete
+AFTER DELETE ON Products
+FOR EACH ROW
+BEGIN
+    UPDATE ReferenceVersions SET Version = Version + 1 WHERE TableName = 'Products';
+END$$
+
+
+-- Promotions
+CREATE TRIGGER trg_PromotionsVersionAfterInsert
+AFTER INSERT ON Promotions
+FOR EACH ROW
+BEGIN
+    UPDATE ReferenceVersions SET Version = Version + 1 WHERE TableName = 'Promotions';
+END$$
+
+CREATE TRIGGER trg_PromotionsVersionAfterUpdate
+AFTER UPDATE ON Promotions
+FOR EACH ROW
+BEGIN
+    UPDATE ReferenceVersions SET Version = Version + 1 WHERE TableName = 'Promotions';
+END$$
+
+CREATE TRIGGER trg_PromotionsVersionAfterDelete
+AFTER DELETE ON Promotions
+FOR EACH ROW
+BEGIN
+    UPDATE ReferenceVersions SET Version = Version + 1 WHERE TableName = 'Promotions';
+END$$
+
+DELIMITER ;
+
+INSERT INTO SchemaMigrations (Version, Description) VALUES ('V007', 'Reference data versions');
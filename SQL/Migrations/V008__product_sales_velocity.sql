@@ -0,0 +1,173 @@
+-- //////////////// V008: Product Sales Velocity ///////////////
+-- DailyProductSales holds units sold per day, store and product. The reorder report
+-- (database.reorder_report_query) reads a few weeks of it to get each product's sales velocity
+-- and days of cover, so it never aggregates OrderItems however long the history gets.
+-- trg_UpdateStockAfterOrder now also adds every new order line to it. That includes lines whose stock
+-- sp_CheckoutOrder already reserved and historical lines loaded by bulk_import.py: their stock
+-- update is skipped, but they are still sales. Archived orders still count (@_archiving_orders).
+-- sp_RefreshProductSales recomputes a date range from the full history (vw_AllOrders / vw_AllOrderItems).
+-- Run after V005 (this reads its views).
+
+-- Table: DailyProductSales (one row per day x store x product with at least one sale)
+CREATE TABLE DailyProductSales (
+    SaleDate DATE NOT NULL,
+    StoreID INT NOT NULL,
+    ProductID INT NOT NULL,
+    UnitsSold INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (SaleDate, StoreID, ProductID),
+    INDEX idx_DailyProductSales_Store (StoreID, SaleDate, ProductID, UnitsSold), -- Covers the per-store report
+    INDEX idx_DailyProductSales_Product (ProductID, SaleDate),
+    FOREIGN KEY (StoreID) REFERENCES Stores(StoreID) ON DELETE CASCADE ON UPDATE CASCADE,
+    FOREIGN KEY (ProductID) REFERENCES Products(ProductID) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+
+-- //////////////// Velocity Maintenance Triggers ///////////////
+-- Same stock logic as SQL/Trigger.sql (V004), plus the velocity row for the line.
+DROP TRIGGER IF EXISTS trg_UpdateStockAfterOrder;
+
+DELIMITER $$
+
+CREATE TRIGGER trg_UpdateStockAfterOrder
+AFTER INSERT ON OrderItems
+FOR EACH ROW
+BEGIN
+    -- Skipped when sp_ProcessOrderSet already reserved (decremented) the stock for this order
+    -- and for historical order items loaded by bulk_import.py (@_historical_import is set)
+    IF @_historical_import IS NULL AND (@_stock_reserved_order IS NULL OR @_stock_reserved_order <> NEW.OrderID) THEN
+        UPDATE Products
+        SET StockQuantity = StockQuantity - NEW.Quantity
+        WHERE ProductID = NEW.ProductID;
+    END IF;
+
+    -- Every line counts toward velocity, whatever path decremented its stock
+    INSERT INTO DailyProductSales (SaleDate, StoreID, ProductID, UnitsSold)
+    SELECT DATE(o.OrderTimestamp), o.StoreID, NEW.ProductID, NEW.Quantity
+    FROM Orders o
+    WHERE o.OrderID = NEW.OrderID AND o.OrderTimestamp IS NOT NULL
+    ON DUPLICATE KEY UPDATE UnitsSold = UnitsSold + NEW.Quantity;
+END$$
+
+CREATE TRIGGER trg_ProductSalesAfterItemUpdate
+AFTER UPDATE ON OrderItems
+FOR EACH ROW
+BEGIN
+    IF OLD.Quantity <> NEW.Quantity OR OLD.ProductID <> NEW.ProductID OR OLD.OrderID <> NEW.OrderID THEN
+        UPDATE DailyProductSales d
+        JOIN Orders o ON o.OrderID = OLD.OrderID
+        SET d.UnitsSold = d.UnitsSold - OLD.Quantity
+        WHERE d.SaleDate = DATE(o.OrderTimestamp) AND d.StoreID = o.StoreID AND d.ProductID = OLD.ProductID;
+
+        INSERT INTO DailyProductSales (SaleDate, StoreID, ProductID, UnitsSold)
+        SELECT DATE(o.OrderTimestamp), o.StoreID, NEW.ProductID, NEW.Quantity
+        FROM Orders o
+        WHERE o.OrderID = NEW.OrderID AND o.OrderTimestamp IS NOT NULL
+        ON DUPLICATE KEY UPDATE UnitsSold = UnitsSold + NEW.Quantity;
+    END IF;
+END$$
+
+CREATE TRIGGER trg_ProductSalesAfterItemDelete
+AFTER DELETE ON OrderItems
+FOR EACH ROW
+BEGIN
+    UPDATE DailyProductSales d
+    JOIN Orders o ON o.OrderID = OLD.OrderID
+    SET d.UnitsSold = d.UnitsSold - OLD.Quantity
+    WHERE d.SaleDate = DATE(o.OrderTimestamp) AND d.StoreID = o.StoreID AND d.ProductID = OLD.ProductID;
+END$$
+
+-- An order moved to another day or store takes its lines with it
+CREATE TRIGGER trg_ProductSalesAfterOrderUpdate
+AFTER UPDATE ON Orders
+FOR EACH ROW
+BEGIN
+    IF NOT (DATE(OLD.OrderTimestamp) <=> DATE(NEW.OrderTimestamp)) OR OLD.StoreID <> NEW.StoreID THEN
+        UPDATE DailyProductSales d
+        JOIN (
+            SELECT ProductID, SUM(Quantity) AS Qty
+            FROM OrderItems
+            WHERE OrderID = NEW.OrderID
+            GROUP BY ProductID
+        ) AS moved ON moved.ProductID = d.ProductID
+        SET d.UnitsSold = d.UnitsSold - moved.Qty
+        WHERE d.SaleDate = DATE(OLD.OrderTimestamp) AND d.StoreID = OLD.StoreID;
+
+        IF NEW.OrderTimestamp IS NOT NULL THEN
+            INSERT INTO DailyProductSales (SaleDate, StoreID, ProductID, UnitsSold)
+            SELECT DATE(NEW.OrderTimestamp), NEW.StoreID, moved.ProductID, moved.Qty
+            FROM (
+                SELECT ProductID, SUM(Quantity) AS Qty
+                FROM OrderItems
+                WHERE OrderID = NEW.OrderID
+                GROUP BY ProductID
+            ) AS moved
+            ON DUPLICATE KEY UPDATE UnitsSold = UnitsSold + moved.Qty;
+        END IF;
+    END IF;
+END$$
+
+-- The cascaded OrderItems delete won't fire trg_ProductSalesAfterItemDelete, so subtract here
+CREATE TRIGGER trg_ProductSalesBeforeOrderDelete
+BEFORE DELETE ON Orders
+FOR EACH ROW
+BEGIN
+    IF @_archiving_orders IS NULL AND OLD.OrderTimestamp IS NOT NULL THEN
+        UPDATE DailyProductSales d
+        JOIN (
+            SELECT ProductID, SUM(Quantity) AS Qty
+            FROM OrderItems
+            WHERE OrderID = OLD.OrderID
+            GROUP BY ProductID
+        ) AS removed ON removed.ProductID = d.ProductID
+        SET d.UnitsSold = d.UnitsSold - removed.Qty
+        WHERE d.SaleDate = DATE(OLD.OrderTimestamp) AND d.StoreID = OLD.StoreID;
+    END IF;
+END$$
+
+
+-- //////////////// Velocity Refresh Procedure ///////////////
+-- Recomputes DailyProductSales for [p_FromDate, p_ToDate] (inclusive) from the full order history.
+-- NULL bounds mean "from the first order" / "through the last order".
+CREATE PROCEDURE sp_RefreshProductSales (
+    IN p_FromDate DATE,
+    IN p_ToDate DATE
+)
+BEGIN
+    DECLARE v_From DATETIME;
+    DECLARE v_To DATETIME;
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    IF p_FromDate IS NOT NULL AND p_ToDate IS NOT NULL AND p_ToDate < p_FromDate THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'End date cannot be before start date.';
+    END IF;
+
+    -- Half-open timestamp range so the OrderTimestamp indexes of both tables can be used
+    SET v_From = COALESCE(p_FromDate, '1000-01-01');
+    SET v_To = COALESCE(p_ToDate, '9999-12-30') + INTERVAL 1 DAY;
+
+    START TRANSACTION;
+
+    DELETE FROM DailyProductSales
+    WHERE SaleDate >= DATE(v_From) AND SaleDate < DATE(v_To);
+
+    INSERT INTO DailyProductSales (SaleDate, StoreID, ProductID, UnitsSold)
+    SELECT DATE(o.OrderTimestamp), o.StoreID, oi.ProductID, SUM(oi.Quantity)
+    FROM vw_AllOrders o
+    JOIN vw_AllOrderItems oi ON oi.OrderID = o.OrderID
+    WHERE o.OrderTimestamp >= v_From AND o.OrderTimestamp < v_To
+    GROUP BY DATE(o.OrderTimestamp), o.StoreID, oi.ProductID;
+
+    COMMIT;
+END$$
+
+DELIMITER ;
+
+-- Backfill from existing orders
+CALL sp_RefreshProductSales(NULL, NULL);
+
+INSERT INTO SchemaMigrations (Version, Description) VALUES ('V008', 'Product sales velocity');
@@ -0,0 +1,397 @@
+-- //////////////// V009: Daily Sales Rollup Contention ///////////////
+-- Every order at a store adds to the same DailyStoreSales row for today. trg_DailySalesAfterOrderInsert
+-- updated it when sp_CheckoutOrder inserted the order, so the row stayed locked for the rest of the
+-- checkout (stock checks, items, promotions, points) and checkouts at one store ran one at a time.
+-- sp_CheckoutOrder now sets @_deferred_sales_rollup while it writes the order, the two rollup
+-- triggers skip the order, and the procedure posts its final totals to the rollup as the last
+-- statement before COMMIT. Other writers (sp_ProcessOrder, sp_ProcessOrderSet, manual edits) still go
+-- through the triggers and hold the row until they commit.
+-- The per-product rows (ProductSalesSummary, DailyProductSales) are still written by the item
+-- triggers: checkout already holds those products' Products rows from its first statement, so they
+-- add no waiting of their own.
+-- Also makes DailyStoreSales follow a deleted store (ON DELETE CASCADE), like DailyProductSales:
+-- the zero rows left behind when a store's orders are deleted no longer block deleting the store.
+-- Run after V008.
+
+ALTER TABLE DailyStoreSales DROP FOREIGN KEY DailyStoreSales_ibfk_1;
+ALTER TABLE DailyStoreSales
+    ADD CONSTRAINT fk_DailyStoreSales_Store FOREIGN KEY (StoreID) REFERENCES Stores(StoreID)
+        ON DELETE CASCADE ON UPDATE CASCADE;
+
+DROP TRIGGER IF EXISTS trg_DailySalesAfterOrderInsert;
+DROP TRIGGER IF EXISTS trg_DailySalesAfterOrderUpdate;
+
+DELIMITER $$
+
+-- Same as SQL/SalesRollup.sql, skipped for the order sp_CheckoutOrder is writing
+CREATE TRIGGER trg_DailySalesAfterOrderInsert
+AFTER INSERT ON Orders
+FOR EACH ROW
+BEGIN
+    IF NEW.OrderTimestamp IS NOT NULL AND @_deferred_sales_rollup IS NULL THEN
+        INSERT INTO DailyStoreSales (SaleDate, StoreID, OrderCount, Revenue, PointsEarned, PointsRedeemed)
+        VALUES (DATE(NEW.OrderTimestamp), NEW.StoreID, 1, COALESCE(NEW.TotalAmount, 0),
+                COALESCE(NEW.PointsEarned, 0), COALESCE(NEW.PointsRedeemed, 0))
+        ON DUPLICATE KEY UPDATE
+            OrderCount = OrderCount + 1,
+            Revenue = Revenue + COALESCE(NEW.TotalAmount, 0),
+            PointsEarned = PointsEarned + COALESCE(NEW.PointsEarned, 0),
+            PointsRedeemed = PointsRedeemed + COALESCE(NEW.PointsRedeemed, 0);
+    END IF;
+END$$
+
+CREATE TRIGGER trg_DailySalesAfterOrderUpdate
+AFTER UPDATE ON Orders
+FOR EACH ROW
+BEGIN
+    IF @_deferred_sales_rollup IS NULL AND (
+           NOT (OLD.OrderTimestamp <=> NEW.OrderTimestamp) OR OLD.StoreID <> NEW.StoreID
+           OR NOT (OLD.TotalAmount <=> NEW.TotalAmount) OR NOT (OLD.PointsEarned <=> NEW.PointsEarned)
+           OR NOT (OLD.PointsRedeemed <=> NEW.PointsRedeemed)) THEN
+        UPDATE DailyStoreSales
+        SET OrderCount = OrderCount - 1,
+            Revenue = Revenue - COALESCE(OLD.TotalAmount, 0),
+            PointsEarned = PointsEarned - COALESCE(OLD.PointsEarned, 0),
+            PointsRedeemed = PointsRedeemed - COALESCE(OLD.PointsRedeemed, 0)
+        WHERE SaleDate = DATE(OLD.OrderTimestamp) AND StoreID = OLD.StoreID;
+
+        IF NEW.OrderTimestamp IS NOT NULL THEN
+            INSERT INTO DailyStoreSales (SaleDate, StoreID, OrderCount, Revenue, PointsEarned, PointsRedeemed)
+            VALUES (DATE(NEW.OrderTimestamp), NEW.StoreID, 1, COALESCE(NEW.TotalAmount, 0),
+                    COALESCE(NEW.PointsEarned, 0), COALESCE(NEW.PointsRedeemed, 0))
+            ON DUPLICATE KEY UPDATE
+                OrderCount = OrderCount + 1,
+                Revenue = Revenue + COALESCE(NEW.TotalAmount, 0),
+                PointsEarned = PointsEarned + COALESCE(NEW.PointsEarned, 0),
+                PointsRedeemed = PointsRedeemed + COALESCE(NEW.PointsRedeemed, 0);
+        END IF;
+    END IF;
+END$$
+
+-- Same as V006, with the rollup posted last
+DROP PROCEDURE IF EXISTS sp_CheckoutOrder$$
+CREATE PROCEDURE sp_CheckoutOrder (
+    IN p_CustomerID INT,
+    IN p_EmployeeID INT,
+    IN p_StoreID INT,
+    IN p_Items JSON,
+    IN p_PointsToRedeem INT,
+    IN p_PromotionIDs JSON,
+    OUT p_Summary JSON
+)
+BEGIN
+    DECLARE v_OrderID INT;
+    DECLARE v_SubTotal DECIMAL(10, 2) DEFAULT 0.00;
+    DECLARE v_FinalTotal DECIMAL(10, 2) DEFAULT 0.00;
+    DECLARE v_RedeemedValue DECIMAL(10, 2) DEFAULT 0.00;
+    DECLARE v_PointsEarned INT DEFAULT 0;
+    DECLARE v_CustomerPointsAvailable INT DEFAULT 0;
+    DECLARE v_ErrorCode INT DEFAULT 0;
+    DECLARE v_ErrorProductID INT;
+    DECLARE v_ErrorMessage VARCHAR(255);
+    DECLARE v_LockList TEXT;
+    DECLARE v_TotalBeforePromos DECIMAL(10, 2) DEFAULT 0.00;
+    DECLARE v_PromoDiscount DECIMAL(10, 2) DEFAULT 0.00;
+    DECLARE v_HasPromotions BOOLEAN DEFAULT FALSE;
+    DECLARE v_RewardPoints INT DEFAULT 0;
+    DECLARE v_OrderTimestamp DATETIME;
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        SET @_stock_reserved_order = NULL;
+        SET @_deferred_sales_rollup = NULL;
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    -- Basic validation for required IDs (identical to sp_ProcessOrder)
+    IF p_EmployeeID IS NULL OR NOT EXISTS (SELECT 1 FROM Employees WHERE EmployeeID = p_EmployeeID) THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Invalid or missing EmployeeID.';
+    END IF;
+    IF p_StoreID IS NULL OR NOT EXISTS (SELECT 1 FROM Stores WHERE StoreID = p_StoreID) THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Invalid or missing StoreID.';
+    END IF;
+    IF p_CustomerID IS NOT NULL AND NOT EXISTS (SELECT 1 FROM Customers WHERE CustomerID = p_CustomerID) THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Invalid CustomerID provided.';
+    END IF;
+    IF p_Items IS NULL OR JSON_TYPE(p_Items) <> 'ARRAY' OR JSON_LENGTH(p_Items) = 0 THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Order must contain at least one item.';
+    END IF;
+
+    START TRANSACTION;
+
+    -- Reserve stock: lock every ordered product row before anything else reads it.
+    -- The IDs are passed as a literal IN list, which InnoDB scans (and locks) in ascending
+    -- ProductID order; concurrent orders therefore always queue in the same order and can't
+    -- deadlock on each other. Because this is the first read of the transaction, the snapshot
+    -- used by the checks below already reflects the locked (current) stock levels.
+    SET SESSION group_concat_max_len = GREATEST(@@SESSION.group_concat_max_len, 1048576); -- Room for large catering orders
+    SELECT GROUP_CONCAT(DISTINCT j.ProductID ORDER BY j.ProductID) INTO v_LockList
+    FROM JSON_TABLE(p_Items, '$[*]' COLUMNS (
+             ProductID INT PATH '$.ProductID' NULL ON EMPTY NULL ON ERROR
+         )) AS j
+    WHERE j.ProductID > 0;
+
+    IF v_LockList IS NOT NULL THEN
+        -- Safe to concatenate: the list only contains integers produced by JSON_TABLE
+        SET @_lock_products_sql = CONCAT('SELECT COUNT(*) INTO @_locked_products FROM Products WHERE ProductID IN (', v_LockList, ') FOR UPDATE');
+        PREPARE lock_products FROM @_lock_products_sql;
+        EXECUTE lock_products;
+        DEALLOCATE PREPARE lock_products;
+    END IF;
+
+    -- A checkout that may spend points (a redemption, or promotions that could be point rewards)
+    -- locks the customer row next, before any plain read: the first plain read fixes the
+    -- transaction's snapshot, and the balance check below must see every redemption that committed
+    -- while this call waited for the lock. Orders that only earn points never touch the row.
+    SET p_PointsToRedeem = COALESCE(p_PointsToRedeem, 0);
+    SET v_HasPromotions = p_PromotionIDs IS NOT NULL AND JSON_TYPE(p_PromotionIDs) = 'ARRAY' AND JSON_LENGTH(p_PromotionIDs) > 0;
+    IF p_CustomerID IS NOT NULL AND (p_PointsToRedeem > 0 OR v_HasPromotions) THEN
+        SELECT COUNT(*) INTO @_locked_customer FROM Customers WHERE CustomerID = p_CustomerID FOR UPDATE;
+    END IF;
+
+    -- Promotions must be active today. Point rewards (RequiredPoints set) need a customer and
+    -- spend their points along with p_PointsToRedeem.
+    IF v_HasPromotions THEN
+        IF EXISTS (
+            SELECT 1
+            FROM JSON_TABLE(p_PromotionIDs, '$[*]' COLUMNS (
+                     PromotionID INT PATH '$' NULL ON EMPTY NULL ON ERROR
+                 )) AS j
+                 LEFT JOIN Promotions pr ON pr.PromotionID = j.PromotionID
+                     AND (pr.StartDate IS NULL OR pr.StartDate <= CURDATE())
+                     AND (pr.EndDate IS NULL OR pr.EndDate >= CURDATE())
+            WHERE pr.PromotionID IS NULL OR (pr.RequiredPoints IS NOT NULL AND p_CustomerID IS NULL)
+        ) THEN
+            SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Invalid or inactive PromotionID.';
+        END IF;
+
+        -- The combination rules promotion_engine.py chooses under are enforced here too: no ID twice,
+        -- at most one order-wide promotion (point rewards aside) and at most one item promotion per
+        -- ordered product. AppliedPromotions has no unique key, so a repeated ID would discount twice.
+        IF (SELECT COUNT(*) - COUNT(DISTINCT j.PromotionID)
+            FROM JSON_TABLE(p_PromotionIDs, '$[*]' COLUMNS (PromotionID INT PATH '$')) AS j) > 0 THEN
+            SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Duplicate PromotionID.';
+        END IF;
+        IF (SELECT COUNT(*)
+            FROM JSON_TABLE(p_PromotionIDs, '$[*]' COLUMNS (PromotionID INT PATH '$')) AS j
+                 JOIN Promotions pr ON pr.PromotionID = j.PromotionID
+            WHERE pr.ScopeProductID IS NULL AND pr.ScopeCategory IS NULL AND pr.RequiredPoints IS NULL) > 1 THEN
+            SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Only one order-wide promotion can be applied.';
+        END IF;
+        IF EXISTS (
+            SELECT 1
+            FROM (
+                SELECT DISTINCT i.ProductID
+                FROM JSON_TABLE(p_Items, '$[*]' COLUMNS (
+                         ProductID INT PATH '$.ProductID' NULL ON EMPTY NULL ON ERROR
+                     )) AS i
+            ) AS items
+                 JOIN Products p ON p.ProductID = items.ProductID
+                 JOIN JSON_TABLE(p_PromotionIDs, '$[*]' COLUMNS (PromotionID INT PATH '$')) AS j
+                 JOIN Promotions pr ON pr.PromotionID = j.PromotionID
+                     AND (pr.ScopeProductID = p.ProductID OR pr.ScopeCategory = p.Category)
+            GROUP BY items.ProductID
+            HAVING COUNT(*) > 1
+        ) THEN
+            SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Only one item promotion can apply to a product.';
+        END IF;
+
+        SELECT COALESCE(SUM(pr.RequiredPoints), 0) INTO v_RewardPoints
+        FROM JSON_TABLE(p_PromotionIDs, '$[*]' COLUMNS (
+                 PromotionID INT PATH '$'
+             )) AS j
+             JOIN Promotions pr ON pr.PromotionID = j.PromotionID;
+    END IF;
+
+    -- Handle Point Redemption (points discount plus any rewards). The customer row is already
+    -- locked, so two redemptions for one customer can't both pass the balance check.
+    IF p_CustomerID IS NOT NULL AND p_PointsToRedeem + v_RewardPoints > 0 THEN
+        SET v_CustomerPointsAvailable = fn_GetCustomerLoyaltyPoints(p_CustomerID);
+        IF v_CustomerPointsAvailable < p_PointsToRedeem + v_RewardPoints THEN
+            SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Insufficient loyalty points.';
+        END IF;
+        SET v_RedeemedValue = p_PointsToRedeem / 100.0;
+    END IF;
+
+    -- Validate every item in one statement and report the first failing item, in list order,
+    -- exactly as the loop in sp_ProcessOrder would. The running quantity per product mirrors
+    -- the loop seeing stock already reduced by earlier lines for the same product.
+    --   1 = bad format, 2 = unknown product, 3 = insufficient stock
+    SELECT ErrorCode, ItemProductID INTO v_ErrorCode, v_ErrorProductID
+    FROM (
+        SELECT
+            j.ItemNo,
+            j.ProductID AS ItemProductID,
+            CASE
+                WHEN j.ProductID IS NULL OR j.ProductID <= 0 OR j.Quantity IS NULL OR j.Quantity <= 0 THEN 1
+                WHEN p.ProductID IS NULL THEN 2
+                WHEN p.StockQuantity < SUM(j.Quantity) OVER (PARTITION BY j.ProductID ORDER BY j.ItemNo) THEN 3
+                ELSE 0
+            END AS ErrorCode
+        FROM JSON_TABLE(p_Items, '$[*]' COLUMNS (
+                 ItemNo FOR ORDINALITY,
+                 ProductID INT PATH '$.ProductID' NULL ON EMPTY NULL ON ERROR,
+                 Quantity INT PATH '$.Quantity' NULL ON EMPTY NULL ON ERROR
+             )) AS j
+             LEFT JOIN Products p ON p.ProductID = j.ProductID
+    ) AS checked
+    WHERE ErrorCode > 0
+    ORDER BY ItemNo
+    LIMIT 1;
+
+    IF v_ErrorCode = 1 THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Invalid ProductID or Quantity format in item list.';
+    ELSEIF v_ErrorCode = 2 THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Invalid ProductID found in order items.';
+    ELSEIF v_ErrorCode = 3 THEN
+        SET v_ErrorMessage = CONCAT('Insufficient stock for ProductID: ', v_ErrorProductID);
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = v_ErrorMessage;
+    END IF;
+
+    -- Create Initial Order record. The daily rollup triggers skip it (and the totals update below);
+    -- the order is posted to DailyStoreSales once, just before COMMIT.
+    SET v_OrderTimestamp = NOW();
+    SET @_deferred_sales_rollup = 1;
+    INSERT INTO Orders (CustomerID, EmployeeID, StoreID, OrderTimestamp, TotalAmount, PointsEarned, PointsRedeemed)
+    VALUES (p_CustomerID, p_EmployeeID, p_StoreID, v_OrderTimestamp, 0.00, 0, p_PointsToRedeem + v_RewardPoints);
+    SET v_OrderID = LAST_INSERT_ID();
+
+    -- Single atomic decrement for the whole order (rows are already locked and checked)
+    UPDATE Products p
+    JOIN (
+        SELECT j.ProductID, SUM(j.Quantity) AS OrderedQty
+        FROM JSON_TABLE(p_Items, '$[*]' COLUMNS (
+                 ProductID INT PATH '$.ProductID',
+                 Quantity INT PATH '$.Quantity'
+             )) AS j
+        GROUP BY j.ProductID
+    ) AS ordered ON ordered.ProductID = p.ProductID
+    SET p.StockQuantity = p.StockQuantity - ordered.OrderedQty;
+
+    -- Insert all items at once. Stock for this order was already reserved above, so tell
+    -- trg_UpdateStockAfterOrder not to decrement it a second time.
+    SET @_stock_reserved_order = v_OrderID;
+    INSERT INTO OrderItems (OrderID, ProductID, Quantity, PriceAtTimeOfOrder)
+    SELECT v_OrderID, j.ProductID, j.Quantity, p.Price
+    FROM JSON_TABLE(p_Items, '$[*]' COLUMNS (
+             ItemNo FOR ORDINALITY,
+             ProductID INT PATH '$.ProductID',
+             Quantity INT PATH '$.Quantity'
+         )) AS j
+         JOIN Products p ON p.ProductID = j.ProductID
+    ORDER BY j.ItemNo;
+    SET @_stock_reserved_order = NULL;
+
+    -- Subtotal from the rows just written, so it matches the prices actually recorded
+    SELECT COALESCE(SUM(Quantity * PriceAtTimeOfOrder), 0) INTO v_SubTotal
+    FROM OrderItems WHERE OrderID = v_OrderID;
+
+    -- Total after point redemption; promotions are computed on this amount
+    SET v_TotalBeforePromos = v_SubTotal - v_RedeemedValue;
+    IF v_TotalBeforePromos < 0 THEN SET v_TotalBeforePromos = 0.00; END IF;
+
+    -- Apply all promotions in one INSERT. Order-wide promotions discount the total after points;
+    -- item promotions (ScopeProductID / ScopeCategory) the subtotal of the order lines they match,
+    -- with FIXED taken off each matching unit. Each discount is capped by what is left of the total
+    -- after the promotions before it: capped running total minus the previous capped running total.
+    -- promotion_engine.py mirrors this arithmetic for the Orders page preview.
+    IF v_HasPromotions THEN
+        INSERT INTO AppliedPromotions (OrderID, PromotionID, DiscountAmountApplied)
+        SELECT v_OrderID, PromotionID, Applied
+        FROM (
+            SELECT
+                ItemNo,
+                PromotionID,
+                LEAST(v_TotalBeforePromos, SUM(RawDiscount) OVER w)
+                    - LEAST(v_TotalBeforePromos, SUM(RawDiscount) OVER w - RawDiscount) AS Applied
+            FROM (
+                SELECT
+                    j.ItemNo,
+                    pr.PromotionID,
+                    CASE
+                        WHEN pr.ScopeProductID IS NULL AND pr.ScopeCategory IS NULL THEN
+                            CASE pr.DiscountType
+                                WHEN 'PERCENT' THEN ROUND(v_TotalBeforePromos * pr.DiscountValue / 100, 2)
+                                ELSE pr.DiscountValue
+                            END
+                        WHEN pr.DiscountType = 'PERCENT' THEN ROUND(m.MatchedSubtotal * pr.DiscountValue / 100, 2)
+                        ELSE LEAST(pr.DiscountValue * m.MatchedQty, m.MatchedSubtotal)
+                    END AS RawDiscount
+                FROM JSON_TABLE(p_PromotionIDs, '$[*]' COLUMNS (
+                         ItemNo FOR ORDINALITY,
+                         PromotionID INT PATH '$'
+                     )) AS j
+                     JOIN Promotions pr ON pr.PromotionID = j.PromotionID
+                     JOIN LATERAL (
+                         SELECT COALESCE(SUM(oi.Quantity * oi.PriceAtTimeOfOrder), 0) AS MatchedSubtotal,
+                                COALESCE(SUM(oi.Quantity), 0) AS MatchedQty
+                         FROM OrderItems oi
+                         JOIN Products p ON p.ProductID = oi.ProductID
+                         WHERE oi.OrderID = v_OrderID
+                           AND (oi.ProductID = pr.ScopeProductID OR p.Category = pr.ScopeCategory)
+                     ) AS m
+            ) AS raw_discounts
+            WINDOW w AS (ORDER BY ItemNo)
+        ) AS capped
+        WHERE Applied > 0
+        ORDER BY ItemNo;
+
+        SELECT COALESCE(SUM(DiscountAmountApplied), 0) INTO v_PromoDiscount
+        FROM AppliedPromotions WHERE OrderID = v_OrderID;
+    END IF;
+
+    -- Calculate Final Total
+    SET v_FinalTotal = v_TotalBeforePromos - v_PromoDiscount;
+    IF v_FinalTotal < 0 THEN SET v_FinalTotal = 0.00; END IF;
+
+    -- Calculate Points Earned (on the discounted total)
+    IF p_CustomerID IS NOT NULL THEN SET v_PointsEarned = fn_CalculatePointsEarned(v_FinalTotal);
+    ELSE SET v_PointsEarned = 0; END IF;
+
+    -- Update Order with totals
+    UPDATE Orders SET TotalAmount = v_FinalTotal, PointsEarned = v_PointsEarned WHERE OrderID = v_OrderID;
+    SET @_deferred_sales_rollup = NULL;
+
+    -- Update Customer Loyalty Points (a LoyaltyLedger entry instead in ledger mode).
+    -- Point rewards spend their RequiredPoints on top of the redeemed points.
+    IF p_CustomerID IS NOT NULL THEN
+        CALL sp_PostLoyaltyPoints(p_CustomerID, v_OrderID, v_PointsEarned - p_PointsToRedeem - v_RewardPoints);
+    END IF;
+
+    -- Last write of the transaction: the (day, store) rollup row every checkout at this store
+    -- updates is locked from here to COMMIT only, not for the whole checkout
+    INSERT INTO DailyStoreSales (SaleDate, StoreID, OrderCount, Revenue, PointsEarned, PointsRedeemed)
+    VALUES (DATE(v_OrderTimestamp), p_StoreID, 1, v_FinalTotal, v_PointsEarned, p_PointsToRedeem + v_RewardPoints)
+    ON DUPLICATE KEY UPDATE
+        OrderCount = OrderCount + 1,
+        Revenue = Revenue + v_FinalTotal,
+        PointsEarned = PointsEarned + v_PointsEarned,
+        PointsRedeemed = PointsRedeemed + p_PointsToRedeem + v_RewardPoints;
+
+    COMMIT;
+
+    SET p_Summary = JSON_OBJECT(
+        'OrderID', v_OrderID,
+        'SubTotal', v_SubTotal,
+        'PointsDiscount', v_RedeemedValue,
+        'PromotionDiscount', v_PromoDiscount,
+        'TotalAmount', v_FinalTotal,
+        'PointsEarned', v_PointsEarned,
+        'RewardPoints', v_RewardPoints,
+        'AppliedPromotions', (
+            SELECT COALESCE(JSON_ARRAYAGG(JSON_OBJECT(
+                       'PromotionID', ap.PromotionID,
+                       'PromotionName', pr.PromotionName,
+                       'DiscountAmountApplied', ap.DiscountAmountApplied)), JSON_ARRAY())
+            FROM AppliedPromotions ap
+            JOIN Promotions pr ON pr.PromotionID = ap.PromotionID
+            WHERE ap.OrderID = v_OrderID
+        )
+    );
+
+END$$
+
+DELIMITER ;
+
+INSERT INTO SchemaMigrations (Version, Description) VALUES ('V009', 'Daily sales rollup posted at the end of checkout; cascade on store delete');
@@ -0,0 +1,208 @@
+-- //////////////// V010: Customer Summary Through the Loyalty Ledger ///////////////
+-- In ledger mode checkout stopped updating the customer's Customers row, but
+-- trg_CustomerSummaryAfterOrderInsert/Update still updated the customer's CustomerOrderSummary row,
+-- so concurrent orders for one customer still queued on it. Ledger entries now also carry the
+-- order-count and spend change (OrdersDelta, SpentDelta). In ledger mode the two triggers append an
+-- entry instead of touching the summary row, and sp_CompactLoyaltyLedger folds the entries into
+-- CustomerOrderSummary along with the points. Order deletes still update the row directly.
+-- In ledger mode CustomerOrderSummary (the Reports page's top customers) can therefore be one
+-- compaction behind; sp_CheckSalesSummaries counts the pending entries, and sp_RebuildSalesSummaries
+-- drops them, since the rebuild already counts their orders.
+-- Run after V005 (the last redefinition of sp_RebuildSalesSummaries) and SQL/LoyaltyLedger.sql.
+
+ALTER TABLE LoyaltyLedger
+    ADD COLUMN OrdersDelta INT NOT NULL DEFAULT 0 AFTER PointsDelta,             -- Change to CustomerOrderSummary.TotalOrders
+    ADD COLUMN SpentDelta DECIMAL(14, 2) NOT NULL DEFAULT 0.00 AFTER OrdersDelta; -- Change to CustomerOrderSummary.TotalSpent
+
+DROP TRIGGER IF EXISTS trg_CustomerSummaryAfterOrderInsert;
+DROP TRIGGER IF EXISTS trg_CustomerSummaryAfterOrderUpdate;
+
+DELIMITER $$
+
+-- Same as SQL/SummaryTables.sql, appending a ledger entry in ledger mode
+CREATE TRIGGER trg_CustomerSummaryAfterOrderInsert
+AFTER INSERT ON Orders
+FOR EACH ROW
+BEGIN
+    IF NEW.CustomerID IS NOT NULL THEN
+        IF (SELECT LedgerMode FROM LoyaltySettings WHERE SettingID = 1) THEN
+            INSERT INTO LoyaltyLedger (CustomerID, OrderID, PointsDelta, OrdersDelta, SpentDelta)
+            VALUES (NEW.CustomerID, NEW.OrderID, 0, 1, COALESCE(NEW.TotalAmount, 0));
+        ELSE
+            INSERT INTO CustomerOrderSummary (CustomerID, TotalOrders, TotalSpent)
+            VALUES (NEW.CustomerID, 1, COALESCE(NEW.TotalAmount, 0))
+            ON DUPLICATE KEY UPDATE
+                TotalOrders = TotalOrders + 1,
+                TotalSpent = TotalSpent + COALESCE(NEW.TotalAmount, 0);
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER trg_CustomerSummaryAfterOrderUpdate
+AFTER UPDATE ON Orders
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.CustomerID <=> NEW.CustomerID) OR NOT (OLD.TotalAmount <=> NEW.TotalAmount) THEN
+        IF (SELECT LedgerMode FROM LoyaltySettings WHERE SettingID = 1) THEN
+            -- Checkout filling in TotalAmount is one entry; a change of customer moves the order
+            IF OLD.CustomerID <=> NEW.CustomerID THEN
+                IF NEW.CustomerID IS NOT NULL THEN
+                    INSERT INTO LoyaltyLedger (CustomerID, OrderID, PointsDelta, OrdersDelta, SpentDelta)
+                    VALUES (NEW.CustomerID, NEW.OrderID, 0, 0, COALESCE(NEW.TotalAmount, 0) - COALESCE(OLD.TotalAmount, 0));
+                END IF;
+            ELSE
+                IF OLD.CustomerID IS NOT NULL THEN
+                    INSERT INTO LoyaltyLedger (CustomerID, OrderID, PointsDelta, OrdersDelta, SpentDelta)
+                    VALUES (OLD.CustomerID, OLD.OrderID, 0, -1, -COALESCE(OLD.TotalAmount, 0));
+                END IF;
+                IF NEW.CustomerID IS NOT NULL THEN
+                    INSERT INTO LoyaltyLedger (CustomerID, OrderID, PointsDelta, OrdersDelta, SpentDelta)
+                    VALUES (NEW.CustomerID, NEW.OrderID, 0, 1, COALESCE(NEW.TotalAmount, 0));
+                END IF;
+            END IF;
+        ELSE
+            IF OLD.CustomerID IS NOT NULL THEN
+                UPDATE CustomerOrderSummary
+                SET TotalOrders = TotalOrders - 1,
+                    TotalSpent = TotalSpent - COALESCE(OLD.TotalAmount, 0)
+                WHERE CustomerID = OLD.CustomerID;
+            END IF;
+            IF NEW.CustomerID IS NOT NULL THEN
+                INSERT INTO CustomerOrderSummary (CustomerID, TotalOrders, TotalSpent)
+                VALUES (NEW.CustomerID, 1, COALESCE(NEW.TotalAmount, 0))
+                ON DUPLICATE KEY UPDATE
+                    TotalOrders = TotalOrders + 1,
+                    TotalSpent = TotalSpent + COALESCE(NEW.TotalAmount, 0);
+            END IF;
+        END IF;
+    END IF;
+END$$
+
+-- Same as SQL/LoyaltyLedger.sql, also folding the summary deltas into CustomerOrderSummary.
+-- Customers rows are only updated for a points change, so summary-only entries don't lock them.
+DROP PROCEDURE IF EXISTS sp_CompactLoyaltyLedger$$
+CREATE PROCEDURE sp_CompactLoyaltyLedger (
+    OUT p_EntriesCompacted INT
+)
+BEGIN
+    DECLARE v_MaxEntryID BIGINT;
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        DROP TEMPORARY TABLE IF EXISTS tmp_LoyaltyCompaction;
+        RESIGNAL;
+    END;
+
+    SET p_EntriesCompacted = 0;
+    SELECT MAX(EntryID) INTO v_MaxEntryID FROM LoyaltyLedger;
+
+    IF v_MaxEntryID IS NOT NULL THEN
+        DROP TEMPORARY TABLE IF EXISTS tmp_LoyaltyCompaction;
+        CREATE TEMPORARY TABLE tmp_LoyaltyCompaction (
+            CustomerID INT PRIMARY KEY,
+            PointsDelta INT NOT NULL,
+            OrdersDelta INT NOT NULL,
+            SpentDelta DECIMAL(14, 2) NOT NULL,
+            EntryCount INT NOT NULL
+        ) ENGINE=InnoDB;
+
+        START TRANSACTION;
+
+        INSERT INTO tmp_LoyaltyCompaction (CustomerID, PointsDelta, OrdersDelta, SpentDelta, EntryCount)
+        SELECT CustomerID, SUM(PointsDelta), SUM(OrdersDelta), SUM(SpentDelta), COUNT(*)
+        FROM LoyaltyLedger
+        WHERE EntryID <= v_MaxEntryID
+        GROUP BY CustomerID
+        FOR UPDATE;
+
+        UPDATE Customers c
+        JOIN tmp_LoyaltyCompaction t ON t.CustomerID = c.CustomerID
+        SET c.LoyaltyPoints = COALESCE(c.LoyaltyPoints, 0) + t.PointsDelta
+        WHERE t.PointsDelta <> 0;
+
+        UPDATE CustomerOrderSummary s
+        JOIN tmp_LoyaltyCompaction t ON t.CustomerID = s.CustomerID
+        SET s.TotalOrders = s.TotalOrders + t.OrdersDelta,
+            s.TotalSpent = s.TotalSpent + t.SpentDelta
+        WHERE t.OrdersDelta <> 0 OR t.SpentDelta <> 0;
+
+        DELETE FROM LoyaltyLedger WHERE EntryID <= v_MaxEntryID;
+
+        SELECT COALESCE(SUM(EntryCount), 0) INTO p_EntriesCompacted FROM tmp_LoyaltyCompaction;
+
+        COMMIT;
+
+        DROP TEMPORARY TABLE tmp_LoyaltyCompaction;
+    END IF;
+END$$
+
+-- Same as V005; the rebuilt CustomerOrderSummary already counts every order, so pending summary
+-- deltas are dropped in the same transaction (pending points stay)
+DROP PROCEDURE IF EXISTS sp_RebuildSalesSummaries$$
+CREATE PROCEDURE sp_RebuildSalesSummaries ()
+BEGIN
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+
+    DELETE FROM ProductSalesSummary;
+    INSERT INTO ProductSalesSummary (ProductID, TotalQuantitySold, TotalRevenue, SaleLineCount, PriceSum)
+    SELECT p.ProductID,
+           COALESCE(SUM(oi.Quantity), 0),
+           COALESCE(SUM(oi.Quantity * oi.PriceAtTimeOfOrder), 0),
+           COUNT(oi.OrderItemID),
+           COALESCE(SUM(oi.PriceAtTimeOfOrder), 0)
+    FROM Products p
+    LEFT JOIN vw_AllOrderItems oi ON p.ProductID = oi.ProductID
+    GROUP BY p.ProductID;
+
+    DELETE FROM LoyaltyLedger WHERE PointsDelta = 0;
+    UPDATE LoyaltyLedger SET OrdersDelta = 0, SpentDelta = 0.00 WHERE OrdersDelta <> 0 OR SpentDelta <> 0;
+
+    DELETE FROM CustomerOrderSummary;
+    INSERT INTO CustomerOrderSummary (CustomerID, TotalOrders, TotalSpent)
+    SELECT c.CustomerID, COUNT(o.OrderID), COALESCE(SUM(o.TotalAmount), 0)
+    FROM Customers c
+    LEFT JOIN vw_AllOrders o ON c.CustomerID = o.CustomerID
+    GROUP BY c.CustomerID;
+
+    COMMIT;
+END$$
+
+-- Same as SQL/SummaryTables.sql, with pending ledger deltas added to the customer summary
+DROP PROCEDURE IF EXISTS sp_CheckSalesSummaries$$
+CREATE PROCEDURE sp_CheckSalesSummaries ()
+BEGIN
+    SELECT 'Product' AS SummaryType, v.ProductID AS EntityID,
+           v.TotalQuantitySold AS ViewCount, s.TotalQuantitySold AS SummaryCount,
+           v.TotalRevenue AS ViewAmount, s.TotalRevenue AS SummaryAmount
+    FROM vw_ProductSalesPerformance v
+    LEFT JOIN ProductSalesSummary s ON s.ProductID = v.ProductID
+    WHERE s.ProductID IS NULL
+       OR s.TotalQuantitySold <> v.TotalQuantitySold
+       OR s.TotalRevenue <> v.TotalRevenue
+       OR NOT (IF(s.SaleLineCount = 0, NULL, s.PriceSum / s.SaleLineCount) <=> v.AverageSellingPrice)
+    UNION ALL
+    SELECT 'Customer', v.CustomerID,
+           v.TotalOrders, s.TotalOrders + COALESCE(p.OrdersDelta, 0),
+           v.TotalSpent, s.TotalSpent + COALESCE(p.SpentDelta, 0)
+    FROM vw_CustomerOrderSummary v
+    LEFT JOIN CustomerOrderSummary s ON s.CustomerID = v.CustomerID
+    LEFT JOIN (
+        SELECT CustomerID, SUM(OrdersDelta) AS OrdersDelta, SUM(SpentDelta) AS SpentDelta
+        FROM LoyaltyLedger
+        GROUP BY CustomerID
+    ) AS p ON p.CustomerID = v.CustomerID
+    WHERE s.CustomerID IS NULL
+       OR s.TotalOrders + COALESCE(p.OrdersDelta, 0) <> v.TotalOrders
+       OR s.TotalSpent + COALESCE(p.SpentDelta, 0) <> v.TotalSpent;
+END$$
+
+DELIMITER ;
+
+INSERT INTO SchemaMigrations (Version, Description) VALUES ('V010', 'Customer summary through the loyalty ledger');
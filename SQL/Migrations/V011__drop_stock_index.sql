@@ -0,0 +1,11 @@
+-- //////////////// V011: Drop the Low-Stock Index ///////////////
+-- V001 added idx_Products_Stock (StockQuantity, ProductName, Category) for the Reports page's
+-- "WHERE StockQuantity <= ? ORDER BY StockQuantity" low-stock list. The reorder report
+-- (database.reorder_report_query, V008) replaced that list and ranks by days of cover, which no
+-- index on StockQuantity can serve. Every checkout updates StockQuantity, so the index was only
+-- write cost: one more secondary index entry moved per ordered product.
+-- Run after V001.
+
+DROP INDEX idx_Products_Stock ON Products;
+
+INSERT INTO SchemaMigrations (Version, Description) VALUES ('V011', 'Drop low-stock index');
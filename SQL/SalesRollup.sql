@@ -0,0 +1,131 @@
+-- //////////////// Daily Sales Rollup ///////////////
+-- Pre-aggregated sales per day and store. Month and year totals are derived from it, so the
+-- Monthly Sales Summary never has to group the raw Orders table.
+-- Run this script after Coffee_Shop_DB.sql (and SummaryTables.sql, if used).
+
+-- Table: DailyStoreSales (one row per day x store with at least one order)
+CREATE TABLE DailyStoreSales (
+    SaleDate DATE NOT NULL,
+    StoreID INT NOT NULL,
+    OrderCount INT NOT NULL DEFAULT 0,
+    Revenue DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+    PointsEarned INT NOT NULL DEFAULT 0,
+    PointsRedeemed INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (SaleDate, StoreID),
+    INDEX idx_DailyStoreSales_Store (StoreID, SaleDate),
+    FOREIGN KEY (StoreID) REFERENCES Stores(StoreID) ON DELETE CASCADE ON UPDATE CASCADE -- Rows go with a deleted store
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+
+-- //////////////// Rollup Maintenance Triggers ///////////////
+-- Migration V009 redefines the insert/update triggers: sp_CheckoutOrder posts its orders to the
+-- rollup itself, as the last write before COMMIT, so the (day, store) row isn't held during checkout.
+
+DELIMITER $$
+
+CREATE TRIGGER trg_DailySalesAfterOrderInsert
+AFTER INSERT ON Orders
+FOR EACH ROW
+BEGIN
+    IF NEW.OrderTimestamp IS NOT NULL THEN
+        INSERT INTO DailyStoreSales (SaleDate, StoreID, OrderCount, Revenue, PointsEarned, PointsRedeemed)
+        VALUES (DATE(NEW.OrderTimestamp), NEW.StoreID, 1, COALESCE(NEW.TotalAmount, 0),
+                COALESCE(NEW.PointsEarned, 0), COALESCE(NEW.PointsRedeemed, 0))
+        ON DUPLICATE KEY UPDATE
+            OrderCount = OrderCount + 1,
+            Revenue = Revenue + COALESCE(NEW.TotalAmount, 0),
+            PointsEarned = PointsEarned + COALESCE(NEW.PointsEarned, 0),
+            PointsRedeemed = PointsRedeemed + COALESCE(NEW.PointsRedeemed, 0);
+    END IF;
+END$$
+
+-- Checkout fills in TotalAmount/PointsEarned after the insert; move the order's contribution
+CREATE TRIGGER trg_DailySalesAfterOrderUpdate
+AFTER UPDATE ON Orders
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.OrderTimestamp <=> NEW.OrderTimestamp) OR OLD.StoreID <> NEW.StoreID
+       OR NOT (OLD.TotalAmount <=> NEW.TotalAmount) OR NOT (OLD.PointsEarned <=> NEW.PointsEarned)
+       OR NOT (OLD.PointsRedeemed <=> NEW.PointsRedeemed) THEN
+        UPDATE DailyStoreSales
+        SET OrderCount = OrderCount - 1,
+            Revenue = Revenue - COALESCE(OLD.TotalAmount, 0),
+            PointsEarned = PointsEarned - COALESCE(OLD.PointsEarned, 0),
+            PointsRedeemed = PointsRedeemed - COALESCE(OLD.PointsRedeemed, 0)
+        WHERE SaleDate = DATE(OLD.OrderTimestamp) AND StoreID = OLD.StoreID;
+
+        IF NEW.OrderTimestamp IS NOT NULL THEN
+            INSERT INTO DailyStoreSales (SaleDate, StoreID, OrderCount, Revenue, PointsEarned, PointsRedeemed)
+            VALUES (DATE(NEW.OrderTimestamp), NEW.StoreID, 1, COALESCE(NEW.TotalAmount, 0),
+                    COALESCE(NEW.PointsEarned, 0), COALESCE(NEW.PointsRedeemed, 0))
+            ON DUPLICATE KEY UPDATE
+                OrderCount = OrderCount + 1,
+                Revenue = Revenue + COALESCE(NEW.TotalAmount, 0),
+                PointsEarned = PointsEarned + COALESCE(NEW.PointsEarned, 0),
+                PointsRedeemed = PointsRedeemed + COALESCE(NEW.PointsRedeemed, 0);
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER trg_DailySalesAfterOrderDelete
+AFTER DELETE ON Orders
+FOR EACH ROW
+BEGIN
+    -- Skipped for orders moved to the archive by sp_ArchiveOrders (migration V005): they still count
+    IF @_archiving_orders IS NULL THEN
+        UPDATE DailyStoreSales
+        SET OrderCount = OrderCount - 1,
+            Revenue = Revenue - COALESCE(OLD.TotalAmount, 0),
+            PointsEarned = PointsEarned - COALESCE(OLD.PointsEarned, 0),
+            PointsRedeemed = PointsRedeemed - COALESCE(OLD.PointsRedeemed, 0)
+        WHERE SaleDate = DATE(OLD.OrderTimestamp) AND StoreID = OLD.StoreID;
+    END IF;
+END$$
+
+
+-- //////////////// Rollup Refresh Procedure ///////////////
+
+-- Recomputes the rollup for [p_FromDate, p_ToDate] (inclusive) from Orders.
+-- NULL bounds mean "from the first order" / "through the last order".
+-- Migration V005 redefines this to include archived orders (vw_AllOrders).
+CREATE PROCEDURE sp_RefreshDailySales (
+    IN p_FromDate DATE,
+    IN p_ToDate DATE
+)
+BEGIN
+    DECLARE v_From DATETIME;
+    DECLARE v_To DATETIME;
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    IF p_FromDate IS NOT NULL AND p_ToDate IS NOT NULL AND p_ToDate < p_FromDate THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'End date cannot be before start date.';
+    END IF;
+
+    -- Half-open timestamp range so an index on OrderTimestamp can be used
+    SET v_From = COALESCE(p_FromDate, '1000-01-01');
+    SET v_To = COALESCE(p_ToDate, '9999-12-30') + INTERVAL 1 DAY;
+
+    START TRANSACTION;
+
+    DELETE FROM DailyStoreSales
+    WHERE SaleDate >= DATE(v_From) AND SaleDate < DATE(v_To);
+
+    INSERT INTO DailyStoreSales (SaleDate, StoreID, OrderCount, Revenue, PointsEarned, PointsRedeemed)
+    SELECT DATE(OrderTimestamp), StoreID, COUNT(*),
+           COALESCE(SUM(TotalAmount), 0), COALESCE(SUM(PointsEarned), 0), COALESCE(SUM(PointsRedeemed), 0)
+    FROM Orders
+    WHERE OrderTimestamp >= v_From AND OrderTimestamp < v_To
+    GROUP BY DATE(OrderTimestamp), StoreID;
+
+    COMMIT;
+END$$
+
+DELIMITER ;
+
+-- Backfill from existing orders
+CALL sp_RefreshDailySales(NULL, NULL);
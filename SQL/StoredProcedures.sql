@@ -60,6 +60,9 @@ BEGIN
     DECLARE v_Stock INT;
     DECLARE v_Pos INT;
     DECLARE v_ErrorMessage VARCHAR(255); -- <<<< Added variable for error message
+    DECLARE v_ScanString TEXT;
+    DECLARE v_LockIDs JSON;
+    DECLARE v_LockList TEXT;
 
     -- 2. Declare Handlers AFTER variables but BEFORE other logic
     DECLARE EXIT HANDLER FOR SQLEXCEPTION
@@ -86,9 +89,38 @@ BEGIN
     -- Start Transaction
     START TRANSACTION;
 
-    -- Handle Point Redemption
+    -- Reserve stock the way sp_CheckoutOrder and sp_ProcessOrderSet do: lock every ordered product
+    -- row in ProductID order before anything reads it, then (for a redemption) the customer row.
+    -- Every checkout path takes its locks in that order, so they can't deadlock on each other, and
+    -- the stock read in the loop below (the first plain read of the transaction) sees the current,
+    -- locked levels, so two tills can't both sell the last unit.
+    SET v_LockIDs = JSON_ARRAY();
+    SET v_ScanString = CONCAT(p_ProductIDsAndQuantities, v_Delimiter);
+    WHILE LOCATE(v_Delimiter, v_ScanString) > 0 DO
+        SET v_Pos = LOCATE(v_Delimiter, v_ScanString);
+        SET v_ProductID = CONVERT(SUBSTRING_INDEX(TRIM(SUBSTRING(v_ScanString, 1, v_Pos - 1)), ':', 1), UNSIGNED INTEGER);
+        SET v_ScanString = SUBSTRING(v_ScanString, v_Pos + 1);
+        IF v_ProductID > 0 THEN
+            SET v_LockIDs = JSON_ARRAY_APPEND(v_LockIDs, '$', v_ProductID);
+        END IF;
+    END WHILE;
+
+    SET SESSION group_concat_max_len = GREATEST(@@SESSION.group_concat_max_len, 1048576); -- Room for large catering orders
+    SELECT GROUP_CONCAT(DISTINCT j.ProductID ORDER BY j.ProductID) INTO v_LockList
+    FROM JSON_TABLE(v_LockIDs, '$[*]' COLUMNS (ProductID INT PATH '$')) AS j;
+
+    IF v_LockList IS NOT NULL THEN
+        -- Safe to concatenate: the list only contains integers produced by JSON_TABLE
+        SET @_lock_products_sql = CONCAT('SELECT COUNT(*) INTO @_locked_products FROM Products WHERE ProductID IN (', v_LockList, ') FOR UPDATE');
+        PREPARE lock_products FROM @_lock_products_sql;
+        EXECUTE lock_products;
+        DEALLOCATE PREPARE lock_products;
+    END IF;
+
+    -- Handle Point Redemption (customer row locked after the products, as in sp_CheckoutOrder)
     SET p_PointsToRedeem = COALESCE(p_PointsToRedeem, 0);
     IF p_CustomerID IS NOT NULL AND p_PointsToRedeem > 0 THEN
+        SELECT COUNT(*) INTO @_locked_customer FROM Customers WHERE CustomerID = p_CustomerID FOR UPDATE;
         SET v_CustomerPointsAvailable = fn_GetCustomerLoyaltyPoints(p_CustomerID);
         IF v_CustomerPointsAvailable < p_PointsToRedeem THEN
             SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Insufficient loyalty points.';
@@ -145,9 +177,9 @@ BEGIN
     -- Update Order with totals
     UPDATE Orders SET TotalAmount = v_FinalTotal, PointsEarned = v_PointsEarned WHERE OrderID = v_OrderID;
 
-    -- Update Customer Loyalty Points
+    -- Update Customer Loyalty Points (a LoyaltyLedger entry instead in ledger mode)
     IF p_CustomerID IS NOT NULL THEN
-        UPDATE Customers SET LoyaltyPoints = LoyaltyPoints + v_PointsEarned - p_PointsToRedeem WHERE CustomerID = p_CustomerID;
+        CALL sp_PostLoyaltyPoints(p_CustomerID, v_OrderID, v_PointsEarned - p_PointsToRedeem);
     END IF;
 
     -- Commit
@@ -158,5 +190,277 @@ BEGIN
 
 END$$
 
+-- Procedure 3: Checkout Order (set-based, with promotions)
+-- Same behaviour and error messages as sp_ProcessOrder, but the items arrive as a JSON array
+-- ('[{"ProductID": 2, "Quantity": 1}, {"ProductID": 5, "Quantity": 1}]') and are validated,
+-- inserted and priced with a fixed number of statements instead of one loop pass per item.
+-- Stock is reserved up front: the ordered Products rows are locked in ProductID order (so two
+-- tills can't deadlock on each other), checked once and decremented by a single UPDATE.
+-- Selected general promotions ('[1, 3]', applied in list order) are recorded in AppliedPromotions
+-- in the same transaction, and points are earned on the final, discounted total.
+-- p_Summary returns {"OrderID", "SubTotal", "PointsDiscount", "PromotionDiscount", "TotalAmount",
+-- "PointsEarned", "AppliedPromotions": [{"PromotionID", "PromotionName", "DiscountAmountApplied"}]}.
+-- Migration V006 redefines it with product/category-scoped promotions and point rewards.
+CREATE PROCEDURE sp_CheckoutOrder (
+    IN p_CustomerID INT,
+    IN p_EmployeeID INT,
+    IN p_StoreID INT,
+    IN p_Items JSON,
+    IN p_PointsToRedeem INT,
+    IN p_PromotionIDs JSON,
+    OUT p_Summary JSON
+)
+BEGIN
+    DECLARE v_OrderID INT;
+    DECLARE v_SubTotal DECIMAL(10, 2) DEFAULT 0.00;
+    DECLARE v_FinalTotal DECIMAL(10, 2) DEFAULT 0.00;
+    DECLARE v_RedeemedValue DECIMAL(10, 2) DEFAULT 0.00;
+    DECLARE v_PointsEarned INT DEFAULT 0;
+    DECLARE v_CustomerPointsAvailable INT DEFAULT 0;
+    DECLARE v_ErrorCode INT DEFAULT 0;
+    DECLARE v_ErrorProductID INT;
+    DECLARE v_ErrorMessage VARCHAR(255);
+    DECLARE v_LockList TEXT;
+    DECLARE v_TotalBeforePromos DECIMAL(10, 2) DEFAULT 0.00;
+    DECLARE v_PromoDiscount DECIMAL(10, 2) DEFAULT 0.00;
+    DECLARE v_HasPromotions BOOLEAN DEFAULT FALSE;
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        SET @_stock_reserved_order = NULL;
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    -- Basic validation for required IDs (identical to sp_ProcessOrder)
+    IF p_EmployeeID IS NULL OR NOT EXISTS (SELECT 1 FROM Employees WHERE EmployeeID = p_EmployeeID) THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Invalid or missing EmployeeID.';
+    END IF;
+    IF p_StoreID IS NULL OR NOT EXISTS (SELECT 1 FROM Stores WHERE StoreID = p_StoreID) THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Invalid or missing StoreID.';
+    END IF;
+    IF p_CustomerID IS NOT NULL AND NOT EXISTS (SELECT 1 FROM Customers WHERE CustomerID = p_CustomerID) THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Invalid CustomerID provided.';
+    END IF;
+    IF p_Items IS NULL OR JSON_TYPE(p_Items) <> 'ARRAY' OR JSON_LENGTH(p_Items) = 0 THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Order must contain at least one item.';
+    END IF;
+
+    START TRANSACTION;
+
+    -- Reserve stock: lock every ordered product row before anything else reads it.
+    -- The IDs are passed as a literal IN list, which InnoDB scans (and locks) in ascending
+    -- ProductID order; concurrent orders therefore always queue in the same order and can't
+    -- deadlock on each other. Because this is the first read of the transaction, the snapshot
+    -- used by the checks below already reflects the locked (current) stock levels.
+    SET SESSION group_concat_max_len = GREATEST(@@SESSION.group_concat_max_len, 1048576); -- Room for large catering orders
+    SELECT GROUP_CONCAT(DISTINCT j.ProductID ORDER BY j.ProductID) INTO v_LockList
+    FROM JSON_TABLE(p_Items, '$[*]' COLUMNS (
+             ProductID INT PATH '$.ProductID' NULL ON EMPTY NULL ON ERROR
+         )) AS j
+    WHERE j.ProductID > 0;
+
+    IF v_LockList IS NOT NULL THEN
+        -- Safe to concatenate: the list only contains integers produced by JSON_TABLE
+        SET @_lock_products_sql = CONCAT('SELECT COUNT(*) INTO @_locked_products FROM Products WHERE ProductID IN (', v_LockList, ') FOR UPDATE');
+        PREPARE lock_products FROM @_lock_products_sql;
+        EXECUTE lock_products;
+        DEALLOCATE PREPARE lock_products;
+    END IF;
+
+    -- Handle Point Redemption
+    -- Redemptions lock the customer row first, so two redemptions for one customer can't both
+    -- pass the balance check (orders that only earn points never touch the row in ledger mode)
+    SET p_PointsToRedeem = COALESCE(p_PointsToRedeem, 0);
+    IF p_CustomerID IS NOT NULL AND p_PointsToRedeem > 0 THEN
+        SELECT COUNT(*) INTO @_locked_customer FROM Customers WHERE CustomerID = p_CustomerID FOR UPDATE;
+        SET v_CustomerPointsAvailable = fn_GetCustomerLoyaltyPoints(p_CustomerID);
+        IF v_CustomerPointsAvailable < p_PointsToRedeem THEN
+            SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Insufficient loyalty points.';
+        END IF;
+        SET v_RedeemedValue = p_PointsToRedeem / 100.0;
+    END IF;
+
+    -- Validate every item in one statement and report the first failing item, in list order,
+    -- exactly as the loop in sp_ProcessOrder would. The running quantity per product mirrors
+    -- the loop seeing stock already reduced by earlier lines for the same product.
+    --   1 = bad format, 2 = unknown product, 3 = insufficient stock
+    SELECT ErrorCode, ItemProductID INTO v_ErrorCode, v_ErrorProductID
+    FROM (
+        SELECT
+            j.ItemNo,
+            j.ProductID AS ItemProductID,
+            CASE
+                WHEN j.ProductID IS NULL OR j.ProductID <= 0 OR j.Quantity IS NULL OR j.Quantity <= 0 THEN 1
+                WHEN p.ProductID IS NULL THEN 2
+                WHEN p.StockQuantity < SUM(j.Quantity) OVER (PARTITION BY j.ProductID ORDER BY j.ItemNo) THEN 3
+                ELSE 0
+            END AS ErrorCode
+        FROM JSON_TABLE(p_Items, '$[*]' COLUMNS (
+                 ItemNo FOR ORDINALITY,
+                 ProductID INT PATH '$.ProductID' NULL ON EMPTY NULL ON ERROR,
+                 Quantity INT PATH '$.Quantity' NULL ON EMPTY NULL ON ERROR
+             )) AS j
+             LEFT JOIN Products p ON p.ProductID = j.ProductID
+    ) AS checked
+    WHERE ErrorCode > 0
+    ORDER BY ItemNo
+    LIMIT 1;
+
+    IF v_ErrorCode = 1 THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Invalid ProductID or Quantity format in item list.';
+    ELSEIF v_ErrorCode = 2 THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Invalid ProductID found in order items.';
+    ELSEIF v_ErrorCode = 3 THEN
+        SET v_ErrorMessage = CONCAT('Insufficient stock for ProductID: ', v_ErrorProductID);
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = v_ErrorMessage;
+    END IF;
+
+    -- Only active, non-point-based promotions can be applied at checkout
+    SET v_HasPromotions = p_PromotionIDs IS NOT NULL AND JSON_TYPE(p_PromotionIDs) = 'ARRAY' AND JSON_LENGTH(p_PromotionIDs) > 0;
+    IF v_HasPromotions AND EXISTS (
+        SELECT 1
+        FROM JSON_TABLE(p_PromotionIDs, '$[*]' COLUMNS (
+                 PromotionID INT PATH '$' NULL ON EMPTY NULL ON ERROR
+             )) AS j
+             LEFT JOIN Promotions pr ON pr.PromotionID = j.PromotionID
+                 AND (pr.StartDate IS NULL OR pr.StartDate <= CURDATE())
+                 AND (pr.EndDate IS NULL OR pr.EndDate >= CURDATE())
+                 AND pr.RequiredPoints IS NULL
+        WHERE pr.PromotionID IS NULL
+    ) THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Invalid or inactive PromotionID.';
+    END IF;
+
+    -- Create Initial Order record
+    INSERT INTO Orders (CustomerID, EmployeeID, StoreID, OrderTimestamp, TotalAmount, PointsEarned, PointsRedeemed)
+    VALUES (p_CustomerID, p_EmployeeID, p_StoreID, NOW(), 0.00, 0, p_PointsToRedeem);
+    SET v_OrderID = LAST_INSERT_ID();
+
+    -- Single atomic decrement for the whole order (rows are already locked and checked)
+    UPDATE Products p
+    JOIN (
+        SELECT j.ProductID, SUM(j.Quantity) AS OrderedQty
+        FROM JSON_TABLE(p_Items, '$[*]' COLUMNS (
+                 ProductID INT PATH '$.ProductID',
+                 Quantity INT PATH '$.Quantity'
+             )) AS j
+        GROUP BY j.ProductID
+    ) AS ordered ON ordered.ProductID = p.ProductID
+    SET p.StockQuantity = p.StockQuantity - ordered.OrderedQty;
+
+    -- Insert all items at once. Stock for this order was already reserved above, so tell
+    -- trg_UpdateStockAfterOrder not to decrement it a second time.
+    SET @_stock_reserved_order = v_OrderID;
+    INSERT INTO OrderItems (OrderID, ProductID, Quantity, PriceAtTimeOfOrder)
+    SELECT v_OrderID, j.ProductID, j.Quantity, p.Price
+    FROM JSON_TABLE(p_Items, '$[*]' COLUMNS (
+             ItemNo FOR ORDINALITY,
+             ProductID INT PATH '$.ProductID',
+             Quantity INT PATH '$.Quantity'
+         )) AS j
+         JOIN Products p ON p.ProductID = j.ProductID
+    ORDER BY j.ItemNo;
+    SET @_stock_reserved_order = NULL;
+
+    -- Subtotal from the rows just written, so it matches the prices actually recorded
+    SELECT COALESCE(SUM(Quantity * PriceAtTimeOfOrder), 0) INTO v_SubTotal
+    FROM OrderItems WHERE OrderID = v_OrderID;
+
+    -- Total after point redemption; promotions are computed on this amount
+    SET v_TotalBeforePromos = v_SubTotal - v_RedeemedValue;
+    IF v_TotalBeforePromos < 0 THEN SET v_TotalBeforePromos = 0.00; END IF;
+
+    -- Apply all promotions in one INSERT. Each discount is capped by what is left of the total
+    -- after the promotions before it: capped running total minus the previous capped running total.
+    IF v_HasPromotions THEN
+        INSERT INTO AppliedPromotions (OrderID, PromotionID, DiscountAmountApplied)
+        SELECT v_OrderID, PromotionID, Applied
+        FROM (
+            SELECT
+                ItemNo,
+                PromotionID,
+                LEAST(v_TotalBeforePromos, SUM(RawDiscount) OVER w)
+                    - LEAST(v_TotalBeforePromos, SUM(RawDiscount) OVER w - RawDiscount) AS Applied
+            FROM (
+                SELECT
+                    j.ItemNo,
+                    pr.PromotionID,
+                    CASE pr.DiscountType
+                        WHEN 'PERCENT' THEN ROUND(v_TotalBeforePromos * pr.DiscountValue / 100, 2)
+                        ELSE pr.DiscountValue
+                    END AS RawDiscount
+                FROM JSON_TABLE(p_PromotionIDs, '$[*]' COLUMNS (
+                         ItemNo FOR ORDINALITY,
+                         PromotionID INT PATH '$'
+                     )) AS j
+                     JOIN Promotions pr ON pr.PromotionID = j.PromotionID
+            ) AS raw_discounts
+            WINDOW w AS (ORDER BY ItemNo)
+        ) AS capped
+        WHERE Applied > 0
+        ORDER BY ItemNo;
+
+        SELECT COALESCE(SUM(DiscountAmountApplied), 0) INTO v_PromoDiscount
+        FROM AppliedPromotions WHERE OrderID = v_OrderID;
+    END IF;
+
+    -- Calculate Final Total
+    SET v_FinalTotal = v_TotalBeforePromos - v_PromoDiscount;
+    IF v_FinalTotal < 0 THEN SET v_FinalTotal = 0.00; END IF;
+
+    -- Calculate Points Earned (on the discounted total)
+    IF p_CustomerID IS NOT NULL THEN SET v_PointsEarned = fn_CalculatePointsEarned(v_FinalTotal);
+    ELSE SET v_PointsEarned = 0; END IF;
+
+    -- Update Order with totals
+    UPDATE Orders SET TotalAmount = v_FinalTotal, PointsEarned = v_PointsEarned WHERE OrderID = v_OrderID;
+
+    -- Update Customer Loyalty Points (a LoyaltyLedger entry instead in ledger mode)
+    IF p_CustomerID IS NOT NULL THEN
+        CALL sp_PostLoyaltyPoints(p_CustomerID, v_OrderID, v_PointsEarned - p_PointsToRedeem);
+    END IF;
+
+    COMMIT;
+
+    SET p_Summary = JSON_OBJECT(
+        'OrderID', v_OrderID,
+        'SubTotal', v_SubTotal,
+        'PointsDiscount', v_RedeemedValue,
+        'PromotionDiscount', v_PromoDiscount,
+        'TotalAmount', v_FinalTotal,
+        'PointsEarned', v_PointsEarned,
+        'AppliedPromotions', (
+            SELECT COALESCE(JSON_ARRAYAGG(JSON_OBJECT(
+                       'PromotionID', ap.PromotionID,
+                       'PromotionName', pr.PromotionName,
+                       'DiscountAmountApplied', ap.DiscountAmountApplied)), JSON_ARRAY())
+            FROM AppliedPromotions ap
+            JOIN Promotions pr ON pr.PromotionID = ap.PromotionID
+            WHERE ap.OrderID = v_OrderID
+        )
+    );
+
+END$$
+
+
+-- Procedure 4: Process Order (set-based, no promotions)
+-- Kept for callers that only need the new OrderID; runs sp_CheckoutOrder without promotions.
+CREATE PROCEDURE sp_ProcessOrderSet (
+    IN p_CustomerID INT,
+    IN p_EmployeeID INT,
+    IN p_StoreID INT,
+    IN p_Items JSON,
+    IN p_PointsToRedeem INT,
+    OUT p_NewOrderID INT
+)
+BEGIN
+    DECLARE v_Summary JSON;
+
+    CALL sp_CheckoutOrder(p_CustomerID, p_EmployeeID, p_StoreID, p_Items, p_PointsToRedeem, NULL, v_Summary);
+    SET p_NewOrderID = JSON_EXTRACT(v_Summary, '$.OrderID');
+
+END$$
+
 -- Change the delimiter back to the standard semicolon
 DELIMITER ;
\ No newline at end of file
@@ -0,0 +1,229 @@
+-- //////////////// Sales Summary Tables ///////////////
+-- Incrementally maintained copies of vw_ProductSalesPerformance and vw_CustomerOrderSummary.
+-- Triggers keep them current as orders, order items and promotions are written, so the
+-- Reports page reads the top rows through an index instead of aggregating all sales history.
+-- Run this script after Coffee_Shop_DB.sql, Views.sql, Functions.sql, StoredProcedures.sql and Trigger.sql.
+
+-- Table: ProductSalesSummary (one row per product)
+CREATE TABLE ProductSalesSummary (
+    ProductID INT PRIMARY KEY,
+    TotalQuantitySold INT NOT NULL DEFAULT 0,
+    TotalRevenue DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+    SaleLineCount INT NOT NULL DEFAULT 0,          -- Number of OrderItems rows (for the average price)
+    PriceSum DECIMAL(14, 2) NOT NULL DEFAULT 0.00, -- Sum of PriceAtTimeOfOrder over those rows
+    INDEX idx_ProductSalesSummary_Revenue (TotalRevenue),
+    FOREIGN KEY (ProductID) REFERENCES Products(ProductID) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Table: CustomerOrderSummary (one row per customer)
+CREATE TABLE CustomerOrderSummary (
+    CustomerID INT PRIMARY KEY,
+    TotalOrders INT NOT NULL DEFAULT 0,
+    TotalSpent DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+    INDEX idx_CustomerOrderSummary_Spent (TotalSpent),
+    FOREIGN KEY (CustomerID) REFERENCES Customers(CustomerID) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+
+-- //////////////// Summary Maintenance Triggers ///////////////
+-- Note: MySQL does not fire triggers for rows changed by foreign-key cascades, so order
+-- deletions are handled in a BEFORE DELETE trigger on Orders while the items still exist.
+
+DELIMITER $$
+
+-- New products and customers start with an all-zero summary row
+CREATE TRIGGER trg_ProductSummaryAfterProductInsert
+AFTER INSERT ON Products
+FOR EACH ROW
+BEGIN
+    INSERT IGNORE INTO ProductSalesSummary (ProductID) VALUES (NEW.ProductID);
+END$$
+
+CREATE TRIGGER trg_CustomerSummaryAfterCustomerInsert
+AFTER INSERT ON Customers
+FOR EACH ROW
+BEGIN
+    INSERT IGNORE INTO CustomerOrderSummary (CustomerID) VALUES (NEW.CustomerID);
+END$$
+
+-- Order items: add / adjust / remove the line's contribution
+CREATE TRIGGER trg_ProductSummaryAfterItemInsert
+AFTER INSERT ON OrderItems
+FOR EACH ROW
+BEGIN
+    INSERT INTO ProductSalesSummary (ProductID, TotalQuantitySold, TotalRevenue, SaleLineCount, PriceSum)
+    VALUES (NEW.ProductID, NEW.Quantity, NEW.Quantity * NEW.PriceAtTimeOfOrder, 1, NEW.PriceAtTimeOfOrder)
+    ON DUPLICATE KEY UPDATE
+        TotalQuantitySold = TotalQuantitySold + NEW.Quantity,
+        TotalRevenue = TotalRevenue + NEW.Quantity * NEW.PriceAtTimeOfOrder,
+        SaleLineCount = SaleLineCount + 1,
+        PriceSum = PriceSum + NEW.PriceAtTimeOfOrder;
+END$$
+
+CREATE TRIGGER trg_ProductSummaryAfterItemUpdate
+AFTER UPDATE ON OrderItems
+FOR EACH ROW
+BEGIN
+    UPDATE ProductSalesSummary
+    SET TotalQuantitySold = TotalQuantitySold - OLD.Quantity,
+        TotalRevenue = TotalRevenue - OLD.Quantity * OLD.PriceAtTimeOfOrder,
+        SaleLineCount = SaleLineCount - 1,
+        PriceSum = PriceSum - OLD.PriceAtTimeOfOrder
+    WHERE ProductID = OLD.ProductID;
+
+    INSERT INTO ProductSalesSummary (ProductID, TotalQuantitySold, TotalRevenue, SaleLineCount, PriceSum)
+    VALUES (NEW.ProductID, NEW.Quantity, NEW.Quantity * NEW.PriceAtTimeOfOrder, 1, NEW.PriceAtTimeOfOrder)
+    ON DUPLICATE KEY UPDATE
+        TotalQuantitySold = TotalQuantitySold + NEW.Quantity,
+        TotalRevenue = TotalRevenue + NEW.Quantity * NEW.PriceAtTimeOfOrder,
+        SaleLineCount = SaleLineCount + 1,
+        PriceSum = PriceSum + NEW.PriceAtTimeOfOrder;
+END$$
+
+CREATE TRIGGER trg_ProductSummaryAfterItemDelete
+AFTER DELETE ON OrderItems
+FOR EACH ROW
+BEGIN
+    UPDATE ProductSalesSummary
+    SET TotalQuantitySold = TotalQuantitySold - OLD.Quantity,
+        TotalRevenue = TotalRevenue - OLD.Quantity * OLD.PriceAtTimeOfOrder,
+        SaleLineCount = SaleLineCount - 1,
+        PriceSum = PriceSum - OLD.PriceAtTimeOfOrder
+    WHERE ProductID = OLD.ProductID;
+END$$
+
+-- Orders: count the order and track TotalAmount (promotions and checkout update it after insert)
+-- Migration V010 redefines these two to append LoyaltyLedger entries instead in ledger mode
+CREATE TRIGGER trg_CustomerSummaryAfterOrderInsert
+AFTER INSERT ON Orders
+FOR EACH ROW
+BEGIN
+    IF NEW.CustomerID IS NOT NULL THEN
+        INSERT INTO CustomerOrderSummary (CustomerID, TotalOrders, TotalSpent)
+        VALUES (NEW.CustomerID, 1, COALESCE(NEW.TotalAmount, 0))
+        ON DUPLICATE KEY UPDATE
+            TotalOrders = TotalOrders + 1,
+            TotalSpent = TotalSpent + COALESCE(NEW.TotalAmount, 0);
+    END IF;
+END$$
+
+CREATE TRIGGER trg_CustomerSummaryAfterOrderUpdate
+AFTER UPDATE ON Orders
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.CustomerID <=> NEW.CustomerID) OR NOT (OLD.TotalAmount <=> NEW.TotalAmount) THEN
+        IF OLD.CustomerID IS NOT NULL THEN
+            UPDATE CustomerOrderSummary
+            SET TotalOrders = TotalOrders - 1,
+                TotalSpent = TotalSpent - COALESCE(OLD.TotalAmount, 0)
+            WHERE CustomerID = OLD.CustomerID;
+        END IF;
+        IF NEW.CustomerID IS NOT NULL THEN
+            INSERT INTO CustomerOrderSummary (CustomerID, TotalOrders, TotalSpent)
+            VALUES (NEW.CustomerID, 1, COALESCE(NEW.TotalAmount, 0))
+            ON DUPLICATE KEY UPDATE
+                TotalOrders = TotalOrders + 1,
+                TotalSpent = TotalSpent + COALESCE(NEW.TotalAmount, 0);
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER trg_SalesSummaryBeforeOrderDelete
+BEFORE DELETE ON Orders
+FOR EACH ROW
+BEGIN
+    -- Skipped for orders moved to the archive by sp_ArchiveOrders (migration V005): they still count
+    IF @_archiving_orders IS NULL THEN
+        -- The cascaded OrderItems delete won't fire trg_ProductSummaryAfterItemDelete, so subtract here
+        UPDATE ProductSalesSummary s
+        JOIN (
+            SELECT ProductID,
+                   SUM(Quantity) AS Qty,
+                   SUM(Quantity * PriceAtTimeOfOrder) AS Revenue,
+                   COUNT(*) AS LineCount,
+                   SUM(PriceAtTimeOfOrder) AS Prices
+            FROM OrderItems
+            WHERE OrderID = OLD.OrderID
+            GROUP BY ProductID
+        ) AS removed ON removed.ProductID = s.ProductID
+        SET s.TotalQuantitySold = s.TotalQuantitySold - removed.Qty,
+            s.TotalRevenue = s.TotalRevenue - removed.Revenue,
+            s.SaleLineCount = s.SaleLineCount - removed.LineCount,
+            s.PriceSum = s.PriceSum - removed.Prices;
+
+        IF OLD.CustomerID IS NOT NULL THEN
+            UPDATE CustomerOrderSummary
+            SET TotalOrders = TotalOrders - 1,
+                TotalSpent = TotalSpent - COALESCE(OLD.TotalAmount, 0)
+            WHERE CustomerID = OLD.CustomerID;
+        END IF;
+    END IF;
+END$$
+
+-- Deleting a customer sets Orders.CustomerID to NULL through the foreign key (no Orders trigger
+-- fires); the summary row itself goes with the customer (ON DELETE CASCADE).
+
+
+-- //////////////// Summary Maintenance Procedures ///////////////
+
+-- Rebuild / backfill both summaries from the base tables (same aggregation as the views)
+-- Migration V005 redefines this to include archived orders (vw_AllOrders / vw_AllOrderItems)
+CREATE PROCEDURE sp_RebuildSalesSummaries ()
+BEGIN
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+
+    DELETE FROM ProductSalesSummary;
+    INSERT INTO ProductSalesSummary (ProductID, TotalQuantitySold, TotalRevenue, SaleLineCount, PriceSum)
+    SELECT p.ProductID,
+           COALESCE(SUM(oi.Quantity), 0),
+           COALESCE(SUM(oi.Quantity * oi.PriceAtTimeOfOrder), 0),
+           COUNT(oi.OrderItemID),
+           COALESCE(SUM(oi.PriceAtTimeOfOrder), 0)
+    FROM Products p
+    LEFT JOIN OrderItems oi ON p.ProductID = oi.ProductID
+    GROUP BY p.ProductID;
+
+    DELETE FROM CustomerOrderSummary;
+    INSERT INTO CustomerOrderSummary (CustomerID, TotalOrders, TotalSpent)
+    SELECT c.CustomerID, COUNT(o.OrderID), COALESCE(SUM(o.TotalAmount), 0)
+    FROM Customers c
+    LEFT JOIN Orders o ON c.CustomerID = o.CustomerID
+    GROUP BY c.CustomerID;
+
+    COMMIT;
+END$$
+
+-- Consistency check: returns one row per product/customer whose summary disagrees with the view
+-- (an empty result means the summaries are exact)
+CREATE PROCEDURE sp_CheckSalesSummaries ()
+BEGIN
+    SELECT 'Product' AS SummaryType, v.ProductID AS EntityID,
+           v.TotalQuantitySold AS ViewCount, s.TotalQuantitySold AS SummaryCount,
+           v.TotalRevenue AS ViewAmount, s.TotalRevenue AS SummaryAmount
+    FROM vw_ProductSalesPerformance v
+    LEFT JOIN ProductSalesSummary s ON s.ProductID = v.ProductID
+    WHERE s.ProductID IS NULL
+       OR s.TotalQuantitySold <> v.TotalQuantitySold
+       OR s.TotalRevenue <> v.TotalRevenue
+       OR NOT (IF(s.SaleLineCount = 0, NULL, s.PriceSum / s.SaleLineCount) <=> v.AverageSellingPrice)
+    UNION ALL
+    SELECT 'Customer', v.CustomerID,
+           v.TotalOrders, s.TotalOrders,
+           v.TotalSpent, s.TotalSpent
+    FROM vw_CustomerOrderSummary v
+    LEFT JOIN CustomerOrderSummary s ON s.CustomerID = v.CustomerID
+    WHERE s.CustomerID IS NULL
+       OR s.TotalOrders <> v.TotalOrders
+       OR s.TotalSpent <> v.TotalSpent;
+END$$
+
+DELIMITER ;
+
+-- Backfill from existing data
+CALL sp_RebuildSalesSummaries();
@@ -74,4 +74,162 @@ SELECT ProductID, ProductName, StockQuantity FROM Products WHERE ProductID = 7;
 -- Verify Customer 2's points
 -- Initial: 120 points. Manual Order: +11 points. This Order: +14 points earned, -100 points redeemed.
 -- Total = 120 + 11 + 14 - 100 = 45 points
-SELECT CustomerID, FirstName, LoyaltyPoints FROM Customers WHERE CustomerID = 2;
\ No newline at end of file
+SELECT CustomerID, FirstName, LoyaltyPoints FROM Customers WHERE CustomerID = 2;
+
+
+-- Test sp_ProcessOrderSet - Same order as Scenario 1, items passed as JSON
+-- Customer 1 (Eva), Employee 2 (Bob), Store 1, 1 Latte (ID 2) + 1 Croissant (ID 5)
+CALL sp_ProcessOrderSet(1, 2, 1, '[{"ProductID": 2, "Quantity": 1}, {"ProductID": 5, "Quantity": 1}]', 0, @new_ord_id3);
+
+-- Verify the Order details (TotalAmount = 7.25, PointsEarned = 7), same as sp_ProcessOrder
+SELECT * FROM Orders WHERE OrderID = @new_ord_id3;
+SELECT * FROM OrderItems WHERE OrderID = @new_ord_id3;
+
+-- Error semantics match sp_ProcessOrder (each should fail with the message shown)
+CALL sp_ProcessOrderSet(1, 2, 1, '[{"ProductID": 999, "Quantity": 1}]', 0, @bad);      -- Invalid ProductID found in order items.
+CALL sp_ProcessOrderSet(1, 2, 1, '[{"ProductID": 2, "Quantity": 0}]', 0, @bad);        -- Invalid ProductID or Quantity format in item list.
+CALL sp_ProcessOrderSet(1, 2, 1, '[{"ProductID": 7, "Quantity": 100000}]', 0, @bad);   -- Insufficient stock for ProductID: 7
+CALL sp_ProcessOrderSet(1, 2, 1, '[]', 0, @bad);                                       -- Order must contain at least one item.
+
+
+
+-- Test sp_CheckoutOrder - Order with promotions applied in the same transaction
+-- Customer 4 (Henry), Employee 1 (Alice), Store 1, 2 Muffins (ID 6), promotion 1 (10% off; must be active today)
+CALL sp_CheckoutOrder(4, 1, 1, '[{"ProductID": 6, "Quantity": 2}]', 0, '[1]', @checkout_summary);
+
+-- Summary: SubTotal 6.00, PromotionDiscount 0.60, TotalAmount 5.40, PointsEarned 5 (earned after the discount)
+SELECT @checkout_summary AS CheckoutSummary;
+SELECT * FROM AppliedPromotions WHERE OrderID = JSON_EXTRACT(@checkout_summary, '$.OrderID');
+
+-- Inactive promotions, and point rewards on a guest order, are rejected and nothing is written
+CALL sp_CheckoutOrder(4, 1, 1, '[{"ProductID": 6, "Quantity": 1}]', 0, '[3]', @bad);    -- Invalid or inactive PromotionID. (Muffin Madness has ended)
+CALL sp_CheckoutOrder(NULL, 1, 1, '[{"ProductID": 6, "Quantity": 1}]', 0, '[2]', @bad); -- Invalid or inactive PromotionID.
+
+-- Combinations promotion_engine.py would never pick are rejected too
+CALL sp_CheckoutOrder(4, 1, 1, '[{"ProductID": 6, "Quantity": 1}]', 0, '[1, 1]', @bad); -- Duplicate PromotionID.
+INSERT INTO Promotions (PromotionName, DiscountType, DiscountValue) VALUES ('Test Order Promo', 'FIXED', 1.00);
+SET @extra_order_promo = LAST_INSERT_ID();
+CALL sp_CheckoutOrder(4, 1, 1, '[{"ProductID": 6, "Quantity": 1}]', 0, JSON_ARRAY(1, @extra_order_promo), @bad); -- Only one order-wide promotion can be applied.
+UPDATE Promotions SET ScopeProductID = 6 WHERE PromotionID = @extra_order_promo;
+UPDATE Promotions SET EndDate = NULL WHERE PromotionID = 3;
+CALL sp_CheckoutOrder(4, 1, 1, '[{"ProductID": 6, "Quantity": 1}]', 0, JSON_ARRAY(3, @extra_order_promo), @bad); -- Only one item promotion can apply to a product.
+UPDATE Promotions SET EndDate = '2025-05-15' WHERE PromotionID = 3;
+DELETE FROM Promotions WHERE PromotionID = @extra_order_promo;
+
+-- Test promotion rules (migration V006)
+-- Item promotion: 50 cents off each Muffin (ID 6) for an order of 2 Muffins and 1 Latte (ID 2)
+UPDATE Promotions SET EndDate = NULL WHERE PromotionID = 3;
+CALL sp_CheckoutOrder(4, 1, 1, '[{"ProductID": 6, "Quantity": 2}, {"ProductID": 2, "Quantity": 1}]', 0, '[3]', @scoped_summary);
+-- Summary: SubTotal 10.50, PromotionDiscount 1.00 (Muffins only), TotalAmount 9.50
+SELECT @scoped_summary AS CheckoutSummary;
+UPDATE Promotions SET EndDate = '2025-05-15' WHERE PromotionID = 3;
+
+-- Point reward: Loyal Sip (200 points, $2 off) spends its points; PointsRedeemed on the order is 200
+UPDATE Customers SET LoyaltyPoints = LoyaltyPoints + 200 WHERE CustomerID = 4;
+SET @points_before = fn_GetCustomerLoyaltyPoints(4);
+CALL sp_CheckoutOrder(4, 1, 1, '[{"ProductID": 6, "Quantity": 2}]', 0, '[2]', @reward_summary);
+SELECT @reward_summary AS CheckoutSummary, @points_before AS PointsBefore, fn_GetCustomerLoyaltyPoints(4) AS PointsAfter;
+SELECT OrderID, PointsRedeemed FROM Orders WHERE OrderID = JSON_EXTRACT(@reward_summary, '$.OrderID');
+
+-- The balance falls by the reward's RequiredPoints (net of PointsEarned); expect BalanceCheck = 'OK'
+SELECT IF(fn_GetCustomerLoyaltyPoints(4) = @points_before - pr.RequiredPoints + JSON_EXTRACT(@reward_summary, '$.PointsEarned'),
+          'OK', 'FAIL: reward points not spent') AS BalanceCheck
+FROM Promotions pr WHERE pr.PromotionID = 2;
+
+
+
+-- Test the loyalty ledger (run SQL/LoyaltyLedger.sql first)
+-- Ledger mode: Customer 4 (Henry) earns points without Customers.LoyaltyPoints changing
+UPDATE LoyaltySettings SET LedgerMode = TRUE WHERE SettingID = 1;
+SELECT CustomerID, LoyaltyPoints, fn_GetCustomerLoyaltyPoints(CustomerID) AS Balance FROM Customers WHERE CustomerID = 4;
+SELECT * FROM CustomerOrderSummary WHERE CustomerID = 4;
+CALL sp_CheckoutOrder(4, 1, 1, '[{"ProductID": 6, "Quantity": 2}]', 0, NULL, @ledger_summary);
+
+-- LoyaltyPoints unchanged; Balance up by PointsEarned (6); one ledger entry for the order's points.
+-- After V010 the order's count and spend are ledger entries too (OrdersDelta 1, SpentDelta = TotalAmount)
+-- and CustomerOrderSummary is unchanged
+SELECT CustomerID, LoyaltyPoints, fn_GetCustomerLoyaltyPoints(CustomerID) AS Balance FROM Customers WHERE CustomerID = 4;
+SELECT * FROM LoyaltyLedger WHERE CustomerID = 4;
+SELECT * FROM CustomerOrderSummary WHERE CustomerID = 4;
+CALL sp_CheckSalesSummaries(); -- Counts the pending entries: expect no rows
+
+-- Compaction folds the entries in: LoyaltyPoints now equals Balance, TotalOrders is up by 1 and
+-- TotalSpent by the order's TotalAmount, and the ledger is empty
+CALL sp_CompactLoyaltyLedger(@compacted);
+SELECT @compacted AS EntriesCompacted;
+SELECT CustomerID, LoyaltyPoints, fn_GetCustomerLoyaltyPoints(CustomerID) AS Balance FROM Customers WHERE CustomerID = 4;
+SELECT * FROM CustomerOrderSummary WHERE CustomerID = 4;
+SELECT COUNT(*) AS PendingEntries FROM LoyaltyLedger;
+CALL sp_CheckSalesSummaries(); -- Expect no rows
+
+UPDATE LoyaltySettings SET LedgerMode = FALSE WHERE SettingID = 1;
+
+
+
+-- Test reference data versions (migration V007)
+-- Renaming a store bumps the Stores counter; a stock change doesn't bump Products
+SELECT * FROM ReferenceVersions;
+UPDATE Stores SET StoreName = CONCAT(StoreName, ' ') WHERE StoreID = 1;
+UPDATE Stores SET StoreName = TRIM(StoreName) WHERE StoreID = 1;
+UPDATE Products SET StockQuantity = StockQuantity + 1 WHERE ProductID = 1;
+SELECT * FROM ReferenceVersions; -- Stores up by 2, Products unchanged
+
+-- Deleting a store nulls its employees' StoreID through the foreign key, so Employees moves too
+INSERT INTO Stores (StoreName) VALUES ('Test Version Store');
+SET @version_store = LAST_INSERT_ID();
+SELECT StoreID INTO @employee_store FROM Employees WHERE EmployeeID = 2;
+UPDATE Employees SET StoreID = @version_store WHERE EmployeeID = 2;
+SELECT * FROM ReferenceVersions;
+DELETE FROM Stores WHERE StoreID = @version_store;
+SELECT * FROM ReferenceVersions; -- Stores and Employees both up by 1
+SELECT EmployeeID, StoreID FROM Employees WHERE EmployeeID = 2; -- StoreID is NULL
+UPDATE Employees SET StoreID = @employee_store WHERE EmployeeID = 2;
+
+
+
+-- Test product sales velocity (migration V008)
+-- A checkout (stock reserved by the procedure) still adds its lines to today's DailyProductSales row
+SELECT * FROM DailyProductSales WHERE SaleDate = CURDATE() AND StoreID = 1 AND ProductID = 6;
+CALL sp_CheckoutOrder(NULL, 1, 1, '[{"ProductID": 6, "Quantity": 3}]', 0, NULL, @velocity_summary);
+SELECT * FROM DailyProductSales WHERE SaleDate = CURDATE() AND StoreID = 1 AND ProductID = 6; -- UnitsSold up by 3
+
+-- Deleting the order takes its units back out
+DELETE FROM Orders WHERE OrderID = JSON_EXTRACT(@velocity_summary, '$.OrderID');
+SELECT * FROM DailyProductSales WHERE SaleDate = CURDATE() AND StoreID = 1 AND ProductID = 6;
+
+-- The rollup matches the order history (expect no rows)
+SELECT d.SaleDate, d.StoreID, d.ProductID, d.UnitsSold, r.Units
+FROM DailyProductSales d
+LEFT JOIN (
+    SELECT DATE(o.OrderTimestamp) AS SaleDate, o.StoreID, oi.ProductID, SUM(oi.Quantity) AS Units
+    FROM vw_AllOrders o JOIN vw_AllOrderItems oi ON oi.OrderID = o.OrderID
+    GROUP BY DATE(o.OrderTimestamp), o.StoreID, oi.ProductID
+) r ON r.SaleDate = d.SaleDate AND r.StoreID = d.StoreID AND r.ProductID = d.ProductID
+WHERE d.UnitsSold <> COALESCE(r.Units, 0);
+
+
+
+-- Test the deferred daily sales rollup (migration V009)
+-- sp_CheckoutOrder posts the order to today's DailyStoreSales row once, with its final totals
+SELECT * FROM DailyStoreSales WHERE SaleDate = CURDATE() AND StoreID = 1;
+CALL sp_CheckoutOrder(4, 1, 1, '[{"ProductID": 6, "Quantity": 2}]', 0, '[1]', @rollup_summary);
+SELECT * FROM DailyStoreSales WHERE SaleDate = CURDATE() AND StoreID = 1; -- OrderCount +1, Revenue + TotalAmount of the summary
+SELECT @rollup_summary AS CheckoutSummary;
+
+-- The rollup matches the order history (expect no rows)
+SELECT d.SaleDate, d.StoreID, d.OrderCount, r.Orders, d.Revenue, r.Revenue
+FROM DailyStoreSales d
+LEFT JOIN (
+    SELECT DATE(OrderTimestamp) AS SaleDate, StoreID, COUNT(*) AS Orders, SUM(TotalAmount) AS Revenue
+    FROM vw_AllOrders
+    GROUP BY DATE(OrderTimestamp), StoreID
+) r ON r.SaleDate = d.SaleDate AND r.StoreID = d.StoreID
+WHERE d.OrderCount <> COALESCE(r.Orders, 0) OR d.Revenue <> COALESCE(r.Revenue, 0);
+
+-- A store whose orders are gone can be deleted; its (zero) rollup rows go with it
+INSERT INTO Stores (StoreName, City) VALUES ('Rollup Test Store', 'Testville');
+SET @rollup_store = LAST_INSERT_ID();
+CALL sp_ProcessOrderSet(NULL, 1, @rollup_store, '[{"ProductID": 6, "Quantity": 1}]', 0, @rollup_order);
+DELETE FROM Orders WHERE StoreID = @rollup_store;
+DELETE FROM Stores WHERE StoreID = @rollup_store;
+SELECT COUNT(*) AS LeftoverRows FROM DailyStoreSales WHERE StoreID = @rollup_store; -- 0
@@ -3,15 +3,20 @@ DELIMITER $$
 
 -- Trigger 1: Update Stock Quantity After Order Item Insert
 -- Fires automatically AFTER a row is inserted into the OrderItems table.
+-- Migration V008 redefines it to also record the line in DailyProductSales (sales velocity).
 CREATE TRIGGER trg_UpdateStockAfterOrder
 AFTER INSERT ON OrderItems -- Specifies the event and table
 FOR EACH ROW -- Executes the trigger body for each row inserted
 BEGIN
     -- Decrease the StockQuantity in the Products table
     -- NEW refers to the row that was just inserted into OrderItems
-    UPDATE Products
-    SET StockQuantity = StockQuantity - NEW.Quantity -- Subtract the quantity ordered
-    WHERE ProductID = NEW.ProductID; -- For the specific product that was ordered
+    -- Skipped when sp_ProcessOrderSet already reserved (decremented) the stock for this order
+    -- and for historical order items loaded by bulk_import.py (@_historical_import is set)
+    IF @_historical_import IS NULL AND (@_stock_reserved_order IS NULL OR @_stock_reserved_order <> NEW.OrderID) THEN
+        UPDATE Products
+        SET StockQuantity = StockQuantity - NEW.Quantity -- Subtract the quantity ordered
+        WHERE ProductID = NEW.ProductID; -- For the specific product that was ordered
+    END IF;
 END$$
 
 -- Change the delimiter back to the standard semicolon